@@ -5,14 +5,44 @@ import time
 from datetime import datetime as dt
 import pytz
 import hashlib
-from github import Github
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client
-from utils.content_generator import get_random_content, get_extension
+from utils.content_generator import (
+    get_random_content, get_extension, prefetch_content, healthy_api_keys, note_api_error, generate_text,
+)
+from utils.offline_generator import leetcode_solution, set_history_source, generated_count
+from utils.leetcode_catalog import pick_problem, lookup as lookup_problem, problem_url
+from utils.schedule_index import ScheduleIndex, minute_of_day
+from utils.github_pool import github_client, github_user, discard_client, pool_stats
+from utils import prompts
+from utils.profiling import start_profile
+from utils.adaptive_limit import limited_transport, limits_summary
+from utils.hedging import latency_report, reset_latency
+from utils.run_budget import start_run, end_run, requested_budget, committing, BudgetExceeded
+from utils.priority_scheduler import priority_order, format_stats
+from utils.user_stream import stream_users, bounded, USER_PAGE_SIZE
+from utils.run_log import open_run_log, LogLines
+from utils.contribution_ledger import regular_repo_name, ledger_count, record_observed, after_commit
+from utils.failure_backoff import (
+    classify as classify_failure, record_failure, clear_failure, note_skipped, failure_summary, reset_failure_metrics,
+)
+from utils.decisions import (
+    is_owner as user_is_owner, regular_commit_decision, leetcode_decision, PAID_PLANS,
+)
+from utils.code_validation import (
+    strip_fences, parse_enterprise_output, parse_leetcode_output, language_for_path,
+    generate_validated, GenerationError, enterprise_prefix_reason, fenced_prefix_reason,
+)
+from utils.decision_engine import (
+    UserColumns, decide_batch, decide_user, summarize, RESET, REGULAR, LEETCODE, ENTERPRISE, NO_TOKEN, WORK, SKIP_BACKOFF,
+)
 
 # Configuration ok
 
 SUPABASE_URL = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+# Users processed in parallel per run; downstream load is capped by utils/adaptive_limit.py
+CRON_WORKERS = int(os.environ.get("CRON_WORKERS", "8"))
 
 # Add utils to sys.path for Vercel
 import sys
@@ -40,594 +70,549 @@ def _patched_client_init(self, *args, **kwargs):
 
 httpx.Client.__init__ = _patched_client_init
 
-class handler(BaseHTTPRequestHandler):
-    def do_GET(self):
+# Timing wheel of users by commit_time - survives across runs in a warm instance
+# SPREAD_ANYTIME_USERS=true gives users without a commit_time a stable slot in
+# their day instead of all firing on the first tick (needs ticks through the day)
+_schedule_index = ScheduleIndex(
+    spread_anytime=os.environ.get("SPREAD_ANYTIME_USERS", "false").lower() == "true"
+)
+
+def create_supabase_client():
+    """Service-role Supabase client used by the bot."""
+    from supabase.lib.client_options import ClientOptions
+
+    # Increase timeout to avoid ReadTimeout
+    options = ClientOptions(postgrest_client_timeout=60)
+    client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    # PostgREST calls share the adaptive 'postgrest' limit (utils/adaptive_limit.py)
+    session = client.postgrest.session
+    session._transport = limited_transport(session._transport)
+    return client
+
+def process_user(supabase, user, logs, actions=None):
+    """
+    Run one user's daily pass: repo setup, limit checks, regular commit,
+    LeetCode and enterprise commits. Progress is appended to `logs`.
+    Assumes the user is already due (see utils.schedule_index).
+    `actions` is the user's bitmask from utils.decision_engine (computed here
+    if not given); only planned stages are run.
+    """
+    if actions is None:
+        actions = decide_user(user)
+    # Get user settings
+    github_username = user['github_username']
+    # Sanitized (no spaces or invalid characters) - shared with the ledger reconciler
+    repo_name = regular_repo_name(user)
+
+    repo_visibility = user.get('repo_visibility', 'public')
+    full_repo_name = f"{github_username}/{repo_name}"
+
+    logs.append(f"Processing user {user['id']} for repo {full_repo_name}")
+
+    # === DAILY RESET CHECK ===
+    # Reset daily_commit_count if last commit was on a different day
+    if actions & RESET:
         try:
-            if not SUPABASE_URL or not SUPABASE_KEY:
-                self.send_response(500)
-                self.wfile.write("Missing Supabase credentials.".encode('utf-8'))
+            # It's a new day! Reset the counter
+            supabase.table("user_settings").update({
+                "daily_commit_count": 0,
+                "leetcode_daily_count": 0
+            }).eq("id", user['id']).execute()
+            user['daily_commit_count'] = 0
+            user['leetcode_daily_count'] = 0
+            logs.append(f"Reset daily counts for {github_username} (new day)")
+        except Exception as reset_error:
+            logs.append(f"Warning: Could not reset daily count for {github_username}: {reset_error}")
+
+    # Initialize Github with user's stored OAuth token
+    user_token = user.get('github_access_token')
+    if not user_token or actions & NO_TOKEN:
+        logs.append(f"Skipping user {user['id']}: No GitHub token found")
+        return
+
+    # Stages that failed permanently wait out their backoff (see utils/failure_backoff.py)
+    if actions & SKIP_BACKOFF:
+        note_skipped(user)
+        logs.append(f"User {github_username}: Backing off after {user.get('failure_count')} "
+                    f"{user.get('failure_class')} failures until {user.get('failure_until')} ({user.get('failure_message')})")
+
+    def note_failure(stage, error):
+        # A revoked token's pooled client (and cached user) must not outlive it
+        if classify_failure(error, stage) == 'auth':
+            discard_client(user_token)
+        try:
+            failure = record_failure(supabase, user, stage, error)
+        except Exception as backoff_error:
+            logs.append(f"Warning: Could not record failure: {backoff_error}")
+            return
+        if failure:
+            logs.append(f"User {github_username}: {failure[0]} failure, backing off until {failure[1].isoformat()}")
+
+    def note_success(stage):
+        try:
+            if clear_failure(supabase, user, stage):
+                logs.append(f"User {github_username}: {stage} works again, backoff cleared")
+        except Exception as backoff_error:
+            logs.append(f"Warning: Could not clear failure: {backoff_error}")
+
+    # Nothing planned today - don't spend any GitHub calls
+    if not actions & WORK:
+        now_utc = datetime.datetime.now(datetime.timezone.utc)
+        reasons = regular_commit_decision(user, ledger_count(user, now_utc), now_utc)[1]
+        reasons.append(leetcode_decision(user)[1])
+        logs.extend(reason for reason in reasons if reason)
+        logs.append(f"User {github_username}: Nothing to do today")
+        return
+
+    # Pooled per-token client: keep-alive session reused across repos, runs and daemon ticks
+    g = github_client(user_token)
+
+    # Regular repo: skipped entirely when the contribution ledger already meets today's target
+    repo = None
+    if actions & REGULAR:
+        # Check if repo exists, create if not
+        try:
+            repo = g.get_repo(full_repo_name)
+            logs.append(f"Repository {full_repo_name} exists")
+        except Exception:
+            logs.append(f"Repository {full_repo_name} not found, creating...")
+            try:
+                user_obj = github_user(user_token)
+                private = (repo_visibility == 'private')
+                repo = user_obj.create_repo(
+                    repo_name,
+                    private=private,
+                    description="Daily contributions",
+                    auto_init=True
+                )
+                logs.append(f"Created repository {full_repo_name}")
+            except Exception as create_error:
+                logs.append(f"Failed to create repository: {create_error}")
+                note_failure('regular', create_error)
                 return
 
-            from supabase.lib.client_options import ClientOptions
+    # Check contributions on github
 
-            # Increase timeout to avoid ReadTimeout
-            options = ClientOptions(postgrest_client_timeout=60)
-            supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
-            
-            # 1. Fetch active users
-            response = supabase.table("user_settings").select("*").eq("pause_bot", False).execute()
-            users = response.data
-            
-            logs = []
+    # Defaulting to IST
+    IST = pytz.timezone('Asia/Kolkata')
+    now_ist = dt.now(IST)
+    today_start = now_ist.replace(hour=0, minute=0, second=0, microsecond=0)
 
-            for user in users:
-                try:
-                    # Rate limit: add delay between users to avoid Gemini API quota issues
-                    time.sleep(3)
-                    
-                    # Get user settings
-                    github_username = user['github_username']
-                    repo_name = user.get('repo_name', 'auto-contributions')
-                    
-                    # Sanitize repo name (remove spaces and invalid characters)
-                    repo_name = repo_name.strip().replace(' ', '-').replace('_', '-')
-                    repo_name = ''.join(c for c in repo_name if c.isalnum() or c == '-')
-                    if not repo_name:
-                        repo_name = 'auto-contributions'
-                    
-                    repo_visibility = user.get('repo_visibility', 'public')
-                    full_repo_name = f"{github_username}/{repo_name}"
-                    
-                    logs.append(f"Processing user {user['id']} for repo {full_repo_name}")
-                    
-                    # === DAILY RESET CHECK ===
-                    # Reset daily_commit_count if last commit was on a different day
-                    last_commit_str = user.get('last_commit_ts')
-                    if last_commit_str:
-                        try:
-                            last_commit_dt = datetime.datetime.fromisoformat(last_commit_str.replace('Z', '+00:00'))
-                            today_utc = datetime.datetime.now(datetime.timezone.utc).date()
-                            if last_commit_dt.date() < today_utc:
-                                # It's a new day! Reset the counter
-                                supabase.table("user_settings").update({
-                                    "daily_commit_count": 0,
-                                    "leetcode_daily_count": 0
-                                }).eq("id", user['id']).execute()
-                                user['daily_commit_count'] = 0
-                                user['leetcode_daily_count'] = 0
-                                logs.append(f"Reset daily counts for {github_username} (new day)")
-                        except Exception as reset_error:
-                            logs.append(f"Warning: Could not reset daily count for {github_username}: {reset_error}")
-
-                    # Initialize Github with user's stored OAuth token
-                    user_token = user.get('github_access_token')
-                    if not user_token:
-                        logs.append(f"Skipping user {user['id']}: No GitHub token found")
-                        continue
-                    g = Github(user_token)
-                    
-                    # Check if repo exists, create if not
-                    try:
-                        repo = g.get_repo(full_repo_name)
-                        logs.append(f"Repository {full_repo_name} exists")
-                    except Exception:
-                        logs.append(f"Repository {full_repo_name} not found, creating...")
-                        try:
-                            user_obj = g.get_user()
-                            private = (repo_visibility == 'private')
-                            repo = user_obj.create_repo(
-                                repo_name,
-                                private=private,
-                                description="Daily contributions",
-                                auto_init=True
-                            )
-                            logs.append(f"Created repository {full_repo_name}")
-                        except Exception as create_error:
-                            logs.append(f"Failed to create repository: {create_error}")
-                            continue
-
-                    # Check contributions on github
-
-                    # Defaulting to IST
-                    IST = pytz.timezone('Asia/Kolkata')
-                    now_ist = dt.now(IST)
-                    today_start = now_ist.replace(hour=0, minute=0, second=0, microsecond=0)
-                    
-                    # Check Time Preference (New Logic)
-                    commit_time_str = user.get('commit_time')
-                    should_run_now = False
-
-                    if commit_time_str:
-                        try:
-                            # Parse "HH:MM" or "HH:MM:SS" format
-                            time_parts = commit_time_str.split(':')
-                            target_hour = int(time_parts[0])
-                            target_minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-                            # Ignore seconds if present
-                            target_time = now_ist.replace(hour=target_hour, minute=target_minute, second=0, microsecond=0)
-                            
-                            # Run if current time is past the target time
-                            # AND we haven't hit the daily limit (checked below)
-                            if now_ist >= target_time:
-                                should_run_now = True
-                            else:
-                                logs.append(f"User {user['github_username']}: Too early ({now_ist.strftime('%H:%M')} < {commit_time_str})")
-                        except (ValueError, IndexError) as e:
-                             logs.append(f"User {user['github_username']}: Invalid time format {commit_time_str} - {e}")
-                    else:
-                        # No specific time set - run anytime
-                        # Daily limit (daily_commit_count) will prevent duplicates
-                        should_run_now = True
-                        logs.append(f"User {user['github_username']}: Using default schedule (anytime)")
+    # Time preference already applied by the schedule index
+    if not user.get('commit_time'):
+        slot = _schedule_index.slot_of(user['id'])
+        if slot is not None:
+            logs.append(f"User {user['github_username']}: Using spread schedule ({slot // 60:02d}:{slot % 60:02d})")
+        else:
+            # No specific time set - run anytime
+            # Daily limit (daily_commit_count) will prevent duplicates
+            logs.append(f"User {user['github_username']}: Using default schedule (anytime)")
+
+    now_utc = datetime.datetime.now(datetime.timezone.utc)
+    if repo is None:
+        commit_count = ledger_count(user, now_utc)
+        logs.append(f"User {github_username}: Ledger shows {commit_count} commits today, skipping GitHub check")
+    else:
+        try:
+            commits = repo.get_commits(since=today_start)
+            commit_count = commits.totalCount
+        except Exception as e:
+            if "409" in str(e) or "empty" in str(e).lower():
+                logs.append(f"Repository is empty (new), starting fresh.")
+                commit_count = 0
+            else:
+                logs.append(f"Error fetching commits: {e}")
+                note_failure('regular', e)
+                return
 
-                    if not should_run_now:
-                        continue
+        # Write the observed count through so later runs can skip this read
+        try:
+            record_observed(supabase, user, commit_count, now_utc)
+        except Exception as ledger_error:
+            logs.append(f"Warning: Ledger update failed: {ledger_error}")
+
+    # OWNER OVERRIDE: Unlimited Access (case-insensitive check)
+    username = user.get('github_username', '')
+    plan = user.get('plan_type', 'free')
+    is_owner = user_is_owner(user)
+
+    # Debug logging for paid users
+    if plan in PAID_PLANS:
+        logs.append(f"💎 PAID USER: {username} | Plan: {plan} | Regular commits today: {user.get('daily_commit_count', 0)} | LeetCode commits today: {user.get('leetcode_daily_count', 0)}")
+
+    # Plan limits (see utils/decisions.py) - skipping regular commits still processes LeetCode
+    regular_allowed, skip_reasons = regular_commit_decision(user, commit_count, now_utc)
+    logs.extend(skip_reasons)
+    skip_regular_commit = not regular_allowed or repo is None
+
+    if is_owner:
+        logs.append(f"Owner {username}: Bypassing all limits.")
 
+    # Check for specialty repos (for logging and priority)
+    leetcode_repo_name = user.get('leetcode_repo')
+
+    if plan == 'enterprise':
+        # Check if user has active enterprise project
+        try:
+            project_response = supabase.table("projects").select("id").eq("user_id", user['id']).eq("status", "in_progress").execute()
+            if project_response.data:
+                logs.append(f"Enterprise Plan: {username} has active project (will process after regular commit)")
+        except Exception:
+            pass
+
+    if plan == 'leetcode' and leetcode_repo_name:
+        logs.append(f"LeetCode Plan: {username} has LeetCode repo configured (will process after regular commit)")
+
+    # === REGULAR COMMIT (if not skipped) ===
+    if not skip_regular_commit:
+        # === GENERATION ===
+        # Handle 'any' language logic here to get correct extension
+        lang_for_generation = user['preferred_language']
+        if lang_for_generation == 'any':
+            from utils.content_generator import get_random_language
+            lang_for_generation = get_random_language()
+
+        gemini_key = os.environ.get("GEMINI_API_KEY")
+
+        def generate_regular(feedback):
+            # Pass the specific language to generator
+            text = get_random_content(gemini_key, lang_for_generation)
+            # Guard against API errors
+            if text.startswith("Error") or "not found" in text:
+                raise GenerationError(text)
+            return text
+
+        def parse_regular(text):
+            code, fenced, closed = strip_fences(text)
+            return code, code, lang_for_generation, closed or not fenced
+
+        # Validate before spending a GitHub write (one regeneration on failure)
+        try:
+            content, invalid_reason = generate_validated(generate_regular, parse_regular, logs, f"Regular ({lang_for_generation})")
+        except GenerationError as gen_error:
+            content, invalid_reason = None, str(gen_error)
+
+        if content:
+            # Extract filename from code if available, or generate creative one
+            ext = get_extension(lang_for_generation)
+            file_name = None
+
+            # Try to find filename in comments (AI might include it)
+            for line in content.split('\n')[:5]:
+                if 'file:' in line.lower() or 'filename:' in line.lower():
+                    parts = line.lower().split(':')
+                    if len(parts) > 1:
+                        potential_name = parts[1].strip().replace('.py', '').replace('.js', '')
+                        if potential_name and len(potential_name) < 50:
+                            file_name = f"{potential_name}.{ext}"
+                            break
+
+            # If no filename found, generate creative one based on content
+            if not file_name:
+                import hashlib
+                content_hash = hashlib.md5(content.encode()).hexdigest()[:6]
+                topics = ['tutorial', 'example', 'guide', 'demo', 'learning']
+                import random
+                topic = random.choice(topics)
+                file_name = f"{lang_for_generation}_{topic}_{content_hash}.{ext}"
+
+            # Clean filename
+            file_name = file_name.replace(' ', '_').replace('-', '_').lower()
+
+            # All users get clean code without watermarks
+            final_content = content
+
+            try:
+                # One budget check covers the write and its bookkeeping (see utils/run_budget.py)
+                with committing():
+                    repo.create_file(
+                        path=file_name,
+                        message=f"Add {lang_for_generation} learning example",
+                        content=final_content,
+                        branch="main"
+                    )
+
+                    # Log success & Update Limits
                     try:
-                        commits = repo.get_commits(since=today_start)
-                        commit_count = commits.totalCount
-                    except Exception as e:
-                        if "409" in str(e) or "empty" in str(e).lower():
-                            logs.append(f"Repository is empty (new), starting fresh.")
-                            commit_count = 0
-                        else:
-                            logs.append(f"Error fetching commits: {e}")
-                            continue
-                    
-                    # OWNER OVERRIDE: Unlimited Access (case-insensitive check)
-                    username = user.get('github_username', '')
-                    plan = user.get('plan_type', 'free')
-                    is_owner = username.lower() == 'rishittandon7'
-                    
-                    # Debug logging for paid users
-                    if plan in ['pro', 'leetcode', 'enterprise']:
-                        logs.append(f"💎 PAID USER: {username} | Plan: {plan} | Regular commits today: {user.get('daily_commit_count', 0)} | LeetCode commits today: {user.get('leetcode_daily_count', 0)}")
-                    
-                    # If Owner, allow them to set high targets (handled in UI) but respect their setting here
-                    target_contributions = user['min_contributions']
-                    
-                    # Flag to skip regular commits but still process LeetCode
-                    skip_regular_commit = False
-                    
-                    if commit_count >= target_contributions:
-                        logs.append(f"User {user['github_username']} has enough contributions ({commit_count})")
-                        skip_regular_commit = True  # Don't skip LeetCode for owner/leetcode plan!
-                    
-                    if is_owner:
-                        logs.append(f"Owner {username}: Bypassing all limits.")
-                    
-                    # Check for specialty repos (for logging and priority)
-                    leetcode_repo_name = user.get('leetcode_repo')
-                    has_enterprise_project = False
-                    
-                    if plan == 'enterprise':
-                        # Check if user has active enterprise project
-                        try:
-                            project_response = supabase.table("projects").select("id").eq("user_id", user['id']).eq("status", "in_progress").execute()
-                            has_enterprise_project = project_response.data and len(project_response.data) > 0
-                            if has_enterprise_project:
-                                logs.append(f"Enterprise Plan: {username} has active project (will process after regular commit)")
-                        except:
-                            pass
-                    
-                    if plan == 'leetcode' and leetcode_repo_name:
-                        logs.append(f"LeetCode Plan: {username} has LeetCode repo configured (will process after regular commit)")
-                    
-                    elif not skip_regular_commit:
-                        # Regular repo commit limits (LeetCode/Enterprise treated like Free for regular repo)
-                        if plan in ['free', 'leetcode', 'enterprise']:
-                            # FREE/LEETCODE/ENTERPRISE TIER: 1 Regular Commit per Week
-                            # (LeetCode & Enterprise get DAILY commits to their specialty repos instead)
-                            last_commit_str = user.get('last_commit_ts')
-                            if last_commit_str:
-                                last_commit_dt = datetime.datetime.fromisoformat(last_commit_str.replace('Z', '+00:00'))
-                                days_diff = (datetime.datetime.now(datetime.timezone.utc) - last_commit_dt).days
-                                if days_diff < 7:
-                                    plan_label = plan.title() if plan != 'free' else 'Free'
-                                    logs.append(f"{plan_label} Plan: User {username} already committed {days_diff} days ago to regular repo. Skipping (Wait 7 days).")
-                                    skip_regular_commit = True
-                        elif plan == 'pro':
-                            # PRO PLAN ONLY: 1 Daily Commit to regular repo
-                            commits_today = user.get('daily_commit_count', 0)
-                            if commits_today >= 1:
-                                logs.append(f"Pro Plan: User {username} reached 1 commit today to regular repo.")
-                                skip_regular_commit = True
-                    
-                    # === REGULAR COMMIT (if not skipped) ===
-                    if not skip_regular_commit:
-                        # === GENERATION ===
-                        # Handle 'any' language logic here to get correct extension
-                        lang_for_generation = user['preferred_language']
-                        if lang_for_generation == 'any':
-                            from utils.content_generator import get_random_language
-                            lang_for_generation = get_random_language()
-
-                        gemini_key = os.environ.get("GEMINI_API_KEY")
-                        # Pass the specific language to generator
-                        content = get_random_content(gemini_key, lang_for_generation) 
-                        
-                        # Guard against API errors
-                        if not content.startswith("Error") and "not found" not in content:
-                            # Extract filename from code if available, or generate creative one
-                            ext = get_extension(lang_for_generation)
-                            file_name = None
-                            
-                            # Try to find filename in comments (AI might include it)
-                            for line in content.split('\n')[:5]:
-                                if 'file:' in line.lower() or 'filename:' in line.lower():
-                                    parts = line.lower().split(':')
-                                    if len(parts) > 1:
-                                        potential_name = parts[1].strip().replace('.py', '').replace('.js', '')
-                                        if potential_name and len(potential_name) < 50:
-                                            file_name = f"{potential_name}.{ext}"
-                                            break
-                            
-                            # If no filename found, generate creative one based on content
-                            if not file_name:
-                                import hashlib
-                                content_hash = hashlib.md5(content.encode()).hexdigest()[:6]
-                                topics = ['tutorial', 'example', 'guide', 'demo', 'learning']
-                                import random
-                                topic = random.choice(topics)
-                                file_name = f"{lang_for_generation}_{topic}_{content_hash}.{ext}"
-                            
-                            # Clean filename
-                            file_name = file_name.replace(' ', '_').replace('-', '_').lower()
-                            
-                            # All users get clean code without watermarks
-                            final_content = content
-                            
-                            try:
-                                repo.create_file(
-                                    path=file_name,
-                                    message=f"Add {lang_for_generation} learning example",
-                                    content=final_content,
-                                    branch="main"
-                                )
-                                
-                                # Log success & Update Limits
+                        import hashlib
+                        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+                        supabase.table("generated_history").insert({
+                            "user_id": user['id'],
+                            "content_snippet": content[:100],
+                            "language": lang_for_generation, 
+                            "content_hash": content_hash
+                        }).execute()
+
+                        # Increment Counters / Update TS
+                        supabase.table("user_settings").update({
+                            "last_commit_ts": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                            "daily_commit_count": user.get('daily_commit_count', 0) + 1,
+                            **after_commit(user, commit_count, now_utc),
+                        }).eq("id", user['id']).execute()
+
+                    except Exception as db_error:
+                        logs.append(f"Warning: DB Log failed: {db_error}")
+
+                logs.append(f"Successfully committed to {full_repo_name}")
+                note_success('regular')
+
+            except Exception as e:
+                logs.append(f"Failed to commit: {e}")
+                note_failure('regular', e)
+        else:
+            logs.append(f"Skipping commit for user {username}: Generation failed - {invalid_reason}")
+
+    # === LEETCODE PLAN BONUS ===
+    # If user is owner or has leetcode plan, also commit to their leetcode repo
+    # But respect daily limits - LeetCode users get max 1 commit per day (unless owner)
+    # Planned stage only: a LeetCode repo in backoff has the bit masked off
+    leetcode_allowed, leetcode_skip_reason = leetcode_decision(user)
+    if leetcode_skip_reason:
+        logs.append(leetcode_skip_reason)
+    if actions & LEETCODE and leetcode_allowed:
+        leetcode_commits_today = user.get('leetcode_daily_count', 0)
+        try:
+            logs.append(f"LeetCode Plan: Processing {username}'s LeetCode repo...")
+
+            # Get or create the LeetCode repo
+            leetcode_full = f"{github_username}/{leetcode_repo_name}"
+            repo_exists = True
+            try:
+                leetcode_repo = g.get_repo(leetcode_full)
+            except Exception:
+                # Create if doesn't exist
+                logs.append(f"Creating LeetCode repo: {leetcode_full}")
+                user_obj = github_user(user_token)
+                leetcode_repo = user_obj.create_repo(
+                    leetcode_repo_name,
+                    private=False,
+                    description="My Daily LeetCode Solutions 🚀",
+                    auto_init=True
+                )
+                repo_exists = False  # Just created, skip content commit to avoid 2 commits
+
+            # If repo was just created, skip adding content (auto_init already made 1 commit)
+            if not repo_exists:
+                logs.append(f"LeetCode: Repo {leetcode_full} created. Skipping content to avoid double commit.")
+            else:
+                # 🚀 AI-POWERED LEETCODE: Generate a solution for a catalog problem
+
+                # Get existing files in the repo to avoid duplicates
+                existing_problems = set()
+                try:
+                    contents = leetcode_repo.get_contents("")
+                    def scan_folder(items):
+                        for item in items:
+                            if item.type == "dir":
                                 try:
-                                    import hashlib
-                                    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
-                                    supabase.table("generated_history").insert({
-                                        "user_id": user['id'],
-                                        "content_snippet": content[:100],
-                                        "language": lang_for_generation, 
-                                        "content_hash": content_hash
-                                    }).execute()
-                                    
-                                    # Increment Counters / Update TS
-                                    supabase.table("user_settings").update({
-                                        "last_commit_ts": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                                        "daily_commit_count": user.get('daily_commit_count', 0) + 1
-                                    }).eq("id", user['id']).execute()
-
-                                except Exception as db_error:
-                                    logs.append(f"Warning: DB Log failed: {db_error}")
-
-                                logs.append(f"Successfully committed to {full_repo_name}")
-                                
-                            except Exception as e:
-                                logs.append(f"Failed to commit: {e}")
-                        else:
-                            logs.append(f"Skipping commit for user {username}: Generation failed - {content}")
-
-                    # === LEETCODE PLAN BONUS ===
-                    # If user is owner or has leetcode plan, also commit to their leetcode repo
-                    # But respect daily limits - LeetCode users get max 1 commit per day (unless owner)
-                    if (is_owner or plan == 'leetcode') and leetcode_repo_name:
-                        # Check if we should skip LeetCode too (for non-owners)
-                        leetcode_commits_today = user.get('leetcode_daily_count', 0)
-                        max_leetcode_commits = 50 if is_owner else 1  # Owner gets unlimited, others get 1
-                        
-                        if leetcode_commits_today >= max_leetcode_commits and not is_owner:
-                            logs.append(f"LeetCode Limit: User {username} already committed today to LeetCode repo")
-                        else:
-                            try:
-                                logs.append(f"LeetCode Plan: Processing {username}'s LeetCode repo...")
-                                
-                                # Get or create the LeetCode repo
-                                leetcode_full = f"{github_username}/{leetcode_repo_name}"
-                                repo_exists = True
+                                    sub_items = leetcode_repo.get_contents(item.path)
+                                    scan_folder(sub_items)
+                                except Exception:
+                                    pass
+                            elif item.name.endswith('.py'):
+                                # Extract problem number from filename (e.g., "1_two_sum_abc123.py" -> 1)
                                 try:
-                                    leetcode_repo = g.get_repo(leetcode_full)
+                                    prob_num = int(item.name.split('_')[0])
+                                    existing_problems.add(prob_num)
                                 except Exception:
-                                    # Create if doesn't exist
-                                    logs.append(f"Creating LeetCode repo: {leetcode_full}")
-                                    user_obj = g.get_user()
-                                    leetcode_repo = user_obj.create_repo(
-                                        leetcode_repo_name,
-                                        private=False,
-                                        description="My Daily LeetCode Solutions 🚀",
-                                        auto_init=True
-                                    )
-                                    repo_exists = False  # Just created, skip content commit to avoid 2 commits
-                                
-                                # If repo was just created, skip adding content (auto_init already made 1 commit)
-                                if not repo_exists:
-                                    logs.append(f"LeetCode: Repo {leetcode_full} created. Skipping content to avoid double commit.")
-                                else:
-                                    # 🚀 AI-POWERED LEETCODE: Generate solution for ANY problem (3000+)
-                                    import random
-                                    import hashlib
-                                    
-                                    # Get existing files in the repo to avoid duplicates
-                                    existing_problems = set()
-                                    try:
-                                        contents = leetcode_repo.get_contents("")
-                                        def scan_folder(items):
-                                            for item in items:
-                                                if item.type == "dir":
-                                                    try:
-                                                        sub_items = leetcode_repo.get_contents(item.path)
-                                                        scan_folder(sub_items)
-                                                    except:
-                                                        pass
-                                                elif item.name.endswith('.py'):
-                                                    # Extract problem number from filename (e.g., "1_two_sum_abc123.py" -> 1)
-                                                    try:
-                                                        prob_num = int(item.name.split('_')[0])
-                                                        existing_problems.add(prob_num)
-                                                    except:
-                                                        pass
-                                        scan_folder(contents if isinstance(contents, list) else [contents])
-                                        logs.append(f"LeetCode: Found {len(existing_problems)} existing problems in repo")
-                                    except Exception as scan_error:
-                                        logs.append(f"LeetCode: Could not scan existing problems: {scan_error}")
-                                    
-                                    # Pick a random problem that doesn't already exist
-                                    max_attempts = 10
-                                    problem_number = None
-                                    for attempt in range(max_attempts):
-                                        candidate = random.randint(1, 3000)
-                                        if candidate not in existing_problems:
-                                            problem_number = candidate
-                                            break
-                                    
-                                    if problem_number is None:
-                                        # Fallback: just pick a random one (might be duplicate but rare)
-                                        problem_number = random.randint(1, 3000)
-                                        logs.append(f"LeetCode: Warning - Could not find unique problem after {max_attempts} attempts")
-                                    
-                                    # Use Gemini AI to solve ANY LeetCode problem
-                                    try:
-                                        import google.generativeai as genai
-                                        gemini_key = os.environ.get("GEMINI_API_KEY")
-                                        genai.configure(api_key=gemini_key)
-                                        model = genai.GenerativeModel('gemini-2.0-flash')
-                                        
-                                        # Simple prompt: just send the problem number!
-                                        ai_prompt = f"""You are a LeetCode expert. Solve LeetCode Problem #{problem_number}.
-
-**Instructions:**
-1. First, identify the problem title and difficulty
-2. Generate a COMPLETE, WORKING Python solution
-3. Use the OPTIMAL algorithm (best time/space complexity)
-4. Include detailed docstring explaining the approach
-5. Add inline comments for key steps
-6. Include Time & Space Complexity analysis
-
-**Output Format:**
-```python
-# Problem Title
-# Difficulty: [Easy/Medium/Hard]
-# Category: [Array/String/DP/etc]
-
-class Solution:
-    def methodName(self, params) -> ReturnType:
-        \"\"\"
-        [Clear explanation of approach and algorithm]
-        \"\"\"
-        # Your optimal solution here
-        
-# Time Complexity: O(?)
-# Space Complexity: O(?)
-```
-
-Generate production-ready code that passes all test cases!"""
-
-                                        response = model.generate_content(ai_prompt)
-                                        ai_output = response.text
-                                        
-                                        # Clean up markdown code blocks
-                                        if "```python" in ai_output:
-                                            code_start = ai_output.find("```python") + 9
-                                            code_end = ai_output.rfind("```")
-                                            ai_solution = ai_output[code_start:code_end].strip()
-                                        elif "```" in ai_output:
-                                            code_start = ai_output.find("```") + 3
-                                            code_end = ai_output.rfind("```")
-                                            ai_solution = ai_output[code_start:code_end].strip()
-                                        else:
-                                            ai_solution = ai_output.strip()
-                                        
-                                        # Extract title and difficulty from AI response
-                                        problem_title = f"Problem {problem_number}"
-                                        difficulty = "Medium"
-                                        
-                                        # Parse first few lines for metadata
-                                        lines = ai_solution.split('\n')
-                                        for line in lines[:5]:
-                                            if '# ' in line and 'Difficulty:' not in line and 'Category:' not in line:
-                                                # First comment line is usually the title
-                                                problem_title = line.replace('#', '').strip()
-                                                if problem_title.startswith(str(problem_number)):
-                                                    problem_title = problem_title[len(str(problem_number)):].strip('. ')
-                                            if 'Difficulty:' in line:
-                                                difficulty = line.split(':')[1].strip()
-                                        
-                                        leetcode_content = f'''# {problem_number}. {problem_title}
-# LeetCode Link: https://leetcode.com/problems/
-
-{ai_solution}
+                                    pass
+                    scan_folder(contents if isinstance(contents, list) else [contents])
+                    logs.append(f"LeetCode: Found {len(existing_problems)} existing problems in repo")
+                except Exception as scan_error:
+                    logs.append(f"LeetCode: Could not scan existing problems: {scan_error}")
+
+                # Pick a free problem from the bundled catalog that isn't in the repo yet
+                problem = pick_problem(existing_problems)
+                if problem is None:
+                    # Every catalog problem is solved: allow repeats
+                    problem = pick_problem()
+                    logs.append("LeetCode: Warning - every catalog problem is already in the repo")
+                problem_number = problem.id
+
+                # Use Gemini AI to solve the problem
+                try:
+                    gemini_key = os.environ.get("GEMINI_API_KEY")
+                    if not gemini_key:
+                        raise GenerationError("GEMINI_API_KEY is not set")
+                    if gemini_key not in healthy_api_keys():
+                        raise GenerationError("no healthy Gemini capacity")
+
+                    def generate_leetcode(feedback):
+                        suffix = None
+                        if feedback:
+                            suffix = f"\n\nYour previous answer was rejected ({feedback}). Return the COMPLETE solution in a single ```python block."
+                        try:
+                            return generate_text(prompts.LEETCODE_SOLUTION, gemini_key, 'gemini-2.0-flash', suffix,
+                                                 stream_check=fenced_prefix_reason, problem_number=problem.id, title=problem.title,
+                                                 difficulty=problem.difficulty, tags=', '.join(problem.tags)).text
+                        except Exception as api_error:
+                            note_api_error(gemini_key, api_error)
+                            raise
+
+                    def parse_leetcode(text):
+                        parsed = parse_leetcode_output(text)
+                        return parsed, parsed['code'], 'python', parsed['closed']
+
+                    # Validate before committing (one regeneration on failure)
+                    parsed, invalid_reason = generate_validated(generate_leetcode, parse_leetcode, logs, f"LeetCode #{problem_number}")
+                    if not parsed:
+                        raise ValueError(f"invalid solution: {invalid_reason}")
+                    solution = parsed['code']
+                    logs.append(f"LeetCode: ✅ AI solved Problem #{problem.id} - {problem.title} ({problem.difficulty})")
+
+                except Exception as ai_error:
+                    logs.append(f"LeetCode: ❌ AI failed for Problem #{problem_number} - {ai_error}")
+                    # Fallback: a known-good solution from the offline bank
+                    offline = leetcode_solution(existing_problems)
+                    if not offline:
+                        raise Exception("AI unavailable and every offline solution is already in the repo - skipping today's commit")
+                    problem_number, _, _, solution = offline
+                    problem = lookup_problem(problem_number)
+                    logs.append(f"LeetCode: Using offline solution for Problem #{problem.id} - {problem.title} ({problem.difficulty})")
+
+                leetcode_content = f'''# {problem.id}. {problem.title}
+# Difficulty: {problem.difficulty}
+# Topics: {', '.join(problem.tags)}
+# LeetCode Link: {problem_url(problem)}
+
+{solution}
 
 # Solved: {datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")}
 '''
-                                        logs.append(f"LeetCode: ✅ AI solved Problem #{problem_number} - {problem_title} ({difficulty})")
-                                        
-                                    except Exception as ai_error:
-                                        logs.append(f"LeetCode: ❌ AI failed for Problem #{problem_number} - {ai_error}")
-                                        # Fallback: Create placeholder with safe defaults
-                                        problem_title = f"Problem {problem_number}"
-                                        difficulty = "Medium"
-                                        leetcode_content = f'''# {problem_number}. LeetCode Problem
-# LeetCode Link: https://leetcode.com/problems/
-
-class Solution:
-    def solve(self):
-        """
-        LeetCode Problem #{problem_number}
-        
-        AI generation temporarily unavailable.
-        Visit LeetCode to solve this problem manually.
-        """
-        pass
 
-# Solved: {datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")}
-'''
-                                    
-                                    # Create folder structure: difficulty/problem_title.py
-                                    # Use the extracted values from AI response (not undefined 'problem' dict)
-                                    folder = difficulty if difficulty != "Unknown" else "Medium"
-                                    safe_title = problem_title.replace(' ', '_').replace('/', '_').lower()[:50]
-                                    content_hash = hashlib.md5(leetcode_content.encode()).hexdigest()[:6]
-                                    file_path = f"{folder}/{problem_number}_{safe_title}_{content_hash}.py"
-                                    
-                                    leetcode_repo.create_file(
-                                        path=file_path,
-                                        message=f"Solve: {problem_number}. {problem_title} ({difficulty})",
-                                        content=leetcode_content,
-                                        branch="main"
-                                    )
-                                    
-                                    # Update LeetCode daily count
-                                    supabase.table("user_settings").update({
-                                        "leetcode_daily_count": leetcode_commits_today + 1
-                                    }).eq("id", user['id']).execute()
-                                    
-                                    logs.append(f"LeetCode: Committed {problem_title} to {leetcode_full}")
-                                
-                            except Exception as lc_error:
-                                logs.append(f"LeetCode Error for {username}: {lc_error}")
-                    
-                    # === ENTERPRISE PROJECT GENERATION ===
-                    # If user is owner or has enterprise plan, check for active projects
-                    if (is_owner or plan == 'enterprise'):
-                        try:
-                            # Get user's active project
-                            project_response = supabase.table("projects").select("*").eq("user_id", user['id']).eq("status", "in_progress").execute()
-                            
-                            if project_response.data and len(project_response.data) > 0:
-                                active_project = project_response.data[0]
-                                project_id = active_project['id']
-                                current_day = active_project.get('current_day', 0)
-                                days_duration = active_project.get('days_duration', 15)
-                                project_name = active_project.get('project_name', 'Untitled Project')
-                                repo_name = active_project.get('repo_name', 'project')
-                                tech_stack = active_project.get('tech_stack', [])
-                                description = active_project.get('project_description', '')
-                                
-                                logs.append(f"Enterprise: Found active project '{project_name}' for {username} (Day {current_day}/{days_duration})")
-                                
-                                # Check if we need to make today's commit
-                                if current_day < days_duration:
-                                    next_day = current_day + 1
-                                    logs.append(f"Enterprise: Generating code for Day {next_day}...")
-                                    
-                                    # Get GitHub repo
-                                    enterprise_repo_full = f"{github_username}/{repo_name}"
-                                    try:
-                                        enterprise_repo = g.get_repo(enterprise_repo_full)
-                                    except Exception:
-                                        logs.append(f"Enterprise: ERROR - Repository {enterprise_repo_full} not found!")
-                                        raise Exception(f"Repository {enterprise_repo_full} not found. Please ensure it was created.")
-                                    
-                                    # Generate day-specific code using Gemini AI
-                                    gemini_key = os.environ.get("GEMINI_API_KEY")
-                                    
-                                    # Create phase-based prompts
-                                    if next_day <= 3:
-                                        phase = "Setup & Foundation"
-                                        focus = "project structure, configuration files, README, package.json/requirements.txt"
-                                    elif next_day <= 7:
-                                        phase = "Core Features"
-                                        focus = "main components, models, API routes, authentication"
-                                    elif next_day <= 12:
-                                        phase = "Advanced Features"
-                                        focus = "UI components, business logic, integrations, state management"
-                                    else:
-                                        phase = "Polish & Finish"
-                                        focus = "testing, documentation, optimization, deployment setup"
-                                    
-                                    # Use Gemini to generate realistic project code
-                                    try:
-                                        import google.generativeai as genai
-                                        genai.configure(api_key=gemini_key)
-                                        model = genai.GenerativeModel('gemini-2.0-flash')
-                                        
-                                        prompt = f"""Generate realistic, production-quality code for Day {next_day} of a 15-day project build.
-
-Project: {project_name}
-Description: {description}
-Tech Stack: {', '.join(tech_stack) if tech_stack else 'Modern web stack'}
-Phase: {phase} (Day {next_day}/15)
-Focus: {focus}
-
-Generate ONE complete, functional file that would be created on Day {next_day}.
-Include:
-1. Proper file path (e.g., src/components/Header.tsx or backend/routes/auth.js)
-2. Complete, working code with proper imports
-3. Comments explaining key parts
-4. Follow best practices for the tech stack
-
-Format your response EXACTLY as:
-FILEPATH: path/to/file.ext
-CODE:
-[complete code here]
-
-Generate actual working code, not templates or placeholders."""
-
-                                        response = model.generate_content(prompt)
-                                        ai_output = response.text
-                                        
-                                        # Parse AI response
-                                        if "FILEPATH:" in ai_output and "CODE:" in ai_output:
-                                            parts = ai_output.split("CODE:")
-                                            filepath_line = parts[0].replace("FILEPATH:", "").strip()
-                                            code_content = parts[1].strip()
-                                            
-                                            # Clean up code content (remove markdown if present)
-                                            if code_content.startswith("```"):
-                                                lines = code_content.split("\n")
-                                                code_content = "\n".join(lines[1:-1]) if len(lines) > 2 else code_content
-                                            
-                                            # Commit to GitHub
-                                            enterprise_repo.create_file(
-                                                path=filepath_line,
-                                                message=f"Day {next_day}: {phase} - Add {filepath_line.split('/')[-1]}",
-                                                content=code_content,
-                                                branch="main"
-                                            )
-                                            
-                                            # Update project progress
-                                            current_commits = active_project.get('total_commits', 0)
-                                            update_data = {
-                                                'current_day': next_day,
-                                                'total_commits': current_commits + 1
-                                            }
-                                            
-                                            # Mark as completed if we reached the final day
-                                            if next_day >= days_duration:
-                                                update_data['status'] = 'completed'
-                                                logs.append(f"Enterprise: 🎉 Project '{project_name}' COMPLETED!")
-                                            
-                                            supabase.table("projects").update(update_data).eq("id", project_id).execute()
-                                            
-                                            logs.append(f"Enterprise: ✅ Day {next_day} committed to {enterprise_repo_full}")
-                                        else:
-                                            logs.append(f"Enterprise: AI response format error. Using fallback code.")
-                                            # Fallback: Create a simple README update
-                                            fallback_content = f"""# {project_name}
+                # Create folder structure: difficulty/<id>_<slug>_<hash>.py
+                safe_title = problem.slug.replace('-', '_')[:50]
+                content_hash = hashlib.md5(leetcode_content.encode()).hexdigest()[:6]
+                file_path = f"{problem.difficulty}/{problem.id}_{safe_title}_{content_hash}.py"
+
+                # One budget check covers the write and its bookkeeping
+                with committing():
+                    leetcode_repo.create_file(
+                        path=file_path,
+                        message=f"Solve: {problem.id}. {problem.title} ({problem.difficulty})",
+                        content=leetcode_content,
+                        branch="main"
+                    )
+
+                    # Update LeetCode daily count
+                    supabase.table("user_settings").update({
+                        "leetcode_daily_count": leetcode_commits_today + 1
+                    }).eq("id", user['id']).execute()
+
+                logs.append(f"LeetCode: Committed {problem.title} to {leetcode_full}")
+                note_success('leetcode')
+
+        except Exception as lc_error:
+            logs.append(f"LeetCode Error for {username}: {lc_error}")
+            note_failure('leetcode', lc_error)
+
+    # === ENTERPRISE PROJECT GENERATION ===
+    # If user is owner or has enterprise plan, check for active projects
+    if actions & ENTERPRISE:
+        try:
+            # Get user's active project
+            project_response = supabase.table("projects").select("*").eq("user_id", user['id']).eq("status", "in_progress").execute()
+
+            if project_response.data and len(project_response.data) > 0:
+                active_project = project_response.data[0]
+                project_id = active_project['id']
+                current_day = active_project.get('current_day') or 0
+                days_duration = active_project.get('days_duration') or 15
+                project_name = active_project.get('project_name', 'Untitled Project')
+                repo_name = active_project.get('repo_name', 'project')
+                tech_stack = active_project.get('tech_stack', [])
+                description = active_project.get('project_description', '')
+
+                logs.append(f"Enterprise: Found active project '{project_name}' for {username} (Day {current_day}/{days_duration})")
+
+                # Check if we need to make today's commit
+                if current_day < days_duration:
+                    next_day = current_day + 1
+                    logs.append(f"Enterprise: Generating code for Day {next_day}...")
+
+                    # Get GitHub repo
+                    enterprise_repo_full = f"{github_username}/{repo_name}"
+                    try:
+                        enterprise_repo = g.get_repo(enterprise_repo_full)
+                    except Exception as repo_error:
+                        logs.append(f"Enterprise: ERROR - Repository {enterprise_repo_full} not found!")
+                        note_failure('enterprise', repo_error)
+                        raise Exception(f"Repository {enterprise_repo_full} not found. Please ensure it was created.")
+
+                    # Generate day-specific code using Gemini AI
+                    gemini_key = os.environ.get("GEMINI_API_KEY")
+
+                    # Create phase-based prompts
+                    if next_day <= 3:
+                        phase = "Setup & Foundation"
+                        focus = "project structure, configuration files, README, package.json/requirements.txt"
+                    elif next_day <= 7:
+                        phase = "Core Features"
+                        focus = "main components, models, API routes, authentication"
+                    elif next_day <= 12:
+                        phase = "Advanced Features"
+                        focus = "UI components, business logic, integrations, state management"
+                    else:
+                        phase = "Polish & Finish"
+                        focus = "testing, documentation, optimization, deployment setup"
+
+                    # Use Gemini to generate realistic project code
+                    try:
+                        def generate_enterprise(feedback):
+                            suffix = None
+                            if feedback:
+                                suffix = f"\n\nYour previous answer was rejected ({feedback}). Follow the FILEPATH/CODE format and return the COMPLETE file."
+                            return generate_text(
+                                prompts.ENTERPRISE_DAY, gemini_key, 'gemini-2.0-flash', suffix,
+                                stream_check=enterprise_prefix_reason,
+                                project_name=project_name, description=description,
+                                tech_stack=', '.join(tech_stack) if tech_stack else 'Modern web stack',
+                                phase=phase, day=next_day, focus=focus,
+                            ).text
+
+                        def parse_enterprise(text):
+                            filepath, code, closed = parse_enterprise_output(text)
+                            if not filepath:
+                                return None
+                            filepath = filepath.lstrip('/')
+                            return (filepath, code), code, language_for_path(filepath), closed
+
+                        # Parse + validate AI response (one regeneration on failure)
+                        parsed, invalid_reason = generate_validated(generate_enterprise, parse_enterprise, logs, f"Enterprise Day {next_day}")
+
+                        if parsed:
+                            filepath_line, code_content = parsed
+
+                            # Commit to GitHub
+                            # One budget check covers the write and its bookkeeping
+                            with committing():
+                                enterprise_repo.create_file(
+                                    path=filepath_line,
+                                    message=f"Day {next_day}: {phase} - Add {filepath_line.split('/')[-1]}",
+                                    content=code_content,
+                                    branch="main"
+                                )
+
+                                # Update project progress
+                                current_commits = active_project.get('total_commits', 0)
+                                update_data = {
+                                    'current_day': next_day,
+                                    'total_commits': current_commits + 1
+                                }
+
+                                # Mark as completed if we reached the final day
+                                if next_day >= days_duration:
+                                    update_data['status'] = 'completed'
+                                    logs.append(f"Enterprise: 🎉 Project '{project_name}' COMPLETED!")
+
+                                supabase.table("projects").update(update_data).eq("id", project_id).execute()
+
+                            logs.append(f"Enterprise: ✅ Day {next_day} committed to {enterprise_repo_full}")
+                            note_success('enterprise')
+                        else:
+                            logs.append(f"Enterprise: AI response rejected ({invalid_reason}). Using fallback code.")
+                            # Fallback: Create a simple README update
+                            fallback_content = f"""# {project_name}
 
 Day {next_day} - {phase}
 
@@ -638,38 +623,220 @@ Day {next_day} - {phase}
 
 This project is being built incrementally over 15 days.
 """
-                                            enterprise_repo.create_file(
-                                                path=f"day_{next_day}_progress.md",
-                                                message=f"Day {next_day}: {phase} progress update",
-                                                content=fallback_content,
-                                                branch="main"
-                                            )
-                                            
-                                            current_commits = active_project.get('total_commits', 0)
-                                            supabase.table("projects").update({
-                                                'current_day': next_day,
-                                                'total_commits': current_commits + 1
-                                            }).eq("id", project_id).execute()
-                                            
-                                            logs.append(f"Enterprise: Fallback commit made for Day {next_day}")
-                                    
-                                    except Exception as ai_error:
-                                        logs.append(f"Enterprise: AI generation error - {ai_error}")
-                                
-                                else:
-                                    logs.append(f"Enterprise: Project '{project_name}' already at day {current_day}/{days_duration}")
-                            
-                        except Exception as enterprise_error:
-                            logs.append(f"Enterprise Error for {username}: {enterprise_error}")
-                
+                            # One budget check covers the write and its bookkeeping
+                            with committing():
+                                enterprise_repo.create_file(
+                                    path=f"day_{next_day}_progress.md",
+                                    message=f"Day {next_day}: {phase} progress update",
+                                    content=fallback_content,
+                                    branch="main"
+                                )
+
+                                current_commits = active_project.get('total_commits', 0)
+                                supabase.table("projects").update({
+                                    'current_day': next_day,
+                                    'total_commits': current_commits + 1
+                                }).eq("id", project_id).execute()
+
+                            logs.append(f"Enterprise: Fallback commit made for Day {next_day}")
+                            note_success('enterprise')
+
+                    except Exception as ai_error:
+                        logs.append(f"Enterprise: AI generation error - {ai_error}")
+                        note_failure('enterprise', ai_error)
+
+                else:
+                    logs.append(f"Enterprise: Project '{project_name}' already at day {current_day}/{days_duration}")
+
+        except Exception as enterprise_error:
+            logs.append(f"Enterprise Error for {username}: {enterprise_error}")
+
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        profile = None
+        run_log = None
+        try:
+            if not SUPABASE_URL or not SUPABASE_KEY:
+                self.send_response(500)
+                self.wfile.write("Missing Supabase credentials.".encode('utf-8'))
+                return
+
+            # Opt-in (?profile=1 or CRON_PROFILE, see utils/profiling.py); None when off
+            profile = start_profile(getattr(self, 'path', None))
+            # Every external call below is clamped to this run's time left (see utils/run_budget.py)
+            budget = start_run(requested_budget(getattr(self, 'path', None)))
+
+            supabase: Client = create_supabase_client()
+
+            # Lines are also batched to the run log store for the admin Live Terminal (see utils/run_log.py)
+            run_log = open_run_log(supabase)
+            logs = LogLines(run_log)
+            prompts.reset_usage()   # warm instances keep module state between runs
+            reset_latency()
+            reset_failure_metrics()
+
+            # Recent history seeds the offline generator (only loaded if Gemini runs dry)
+            set_history_source(
+                lambda: supabase.table("generated_history").select(
+                    "content_hash, content_snippet, language").order("created_at", desc=True).limit(1000).execute().data,
+                summaries=lambda: supabase.table("generated_history_summaries").select(
+                    "hash_sketch").order("last_at", desc=True).limit(200).execute().data)
+            offline_before = generated_count()
+
+            run_now_ist = dt.now(pytz.timezone('Asia/Kolkata'))
+            run_minute = minute_of_day(run_now_ist)
+
+            # Active projects are read once and shared by every page's plan
+            active_projects = None
+            try:
+                project_rows = supabase.table("projects").select("*").eq("status", "in_progress").execute().data
+                active_projects = {}
+                for project in project_rows:
+                    active_projects.setdefault(project['user_id'], project)
+            except Exception as project_error:
+                logs.append(f"Warning: Could not prefetch projects: {project_error}")
+
+            # 1. Active users whose commit_time has come up (or who have none) stream in
+            # id-ordered pages (see utils/user_stream.py), filtered by PostgREST: each
+            # page is gated, planned and prioritized, then fed to the workers while the
+            # next page is fetched. Only CRON_WORKERS * 2 users are in flight at a time,
+            # so a slow run stops the fetching instead of piling up rows.
+            totals = {'users': 0, 'pages': 0, 'due': 0, 'invalid': 0}
+            plan_totals = summarize([])
+            priority_totals = {}
+            seen_ids = set()
+
+            def planned_users():
+                due_before = f"{(run_minute + 1) // 60:02d}:{(run_minute + 1) % 60:02d}"
+                for page in stream_users(supabase, due_before=due_before):
+                    totals['pages'] += 1
+                    totals['users'] += len(page)
+
+                    # === SCHEDULE GATING ===
+                    # Only users whose commit_time has come up (or who have none) are processed
+                    _schedule_index.sync(page, prune=False)
+                    due = []
+                    for user in page:
+                        seen_ids.add(user['id'])
+                        if user['id'] in _schedule_index.invalid:
+                            totals['invalid'] += 1
+                            logs.append(f"User {user['github_username']}: {_schedule_index.invalid[user['id']]}")
+                        elif _schedule_index.is_due(user['id'], run_minute):
+                            due.append(user)
+                    totals['due'] += len(due)
+                    if not due:
+                        continue
+
+                    # === ACTION PLAN ===
+                    # Decide the page's actions up front (see utils/decision_engine.py)
+                    plan = decide_batch(UserColumns.from_rows(due), datetime.datetime.now(datetime.timezone.utc), active_projects)
+                    for name, count in summarize(plan).items():
+                        plan_totals[name] = plan_totals.get(name, 0) + count
+
+                    # === PRIORITY ===
+                    # Users with work go first: earliest deadline first, weighted by plan
+                    # (see utils/priority_scheduler.py), within each page
+                    working = [(user, actions) for user, actions in zip(due, plan) if actions & WORK]
+                    idle = [(user, actions) for user, actions in zip(due, plan) if not actions & WORK]
+                    working, priority_stats = priority_order(working, run_minute, key=lambda pair: pair[0])
+                    for name, count in priority_stats.items():
+                        priority_totals[name] = priority_totals.get(name, 0) + count
+
+                    # === BATCHED GENERATION ===
+                    # One Gemini request covers several users' regular commits; get_random_content
+                    # serves from this pool (users who turn out to be covered leave theirs for the next run)
+                    regular_languages = [user.get('preferred_language') or 'any' for user, actions in working if actions & REGULAR]
+                    if len(regular_languages) > 1:
+                        try:
+                            batch_stats = prefetch_content(regular_languages)
+                            logs.append(f"Batch generation: {batch_stats['items']} items in {batch_stats['requests']} requests ({batch_stats['failed']} left to per-user generation)")
+                        except Exception as batch_error:
+                            logs.append(f"Warning: Batch generation failed: {batch_error}")
+
+                    yield from working + idle
+
+            # Reading users (and batch generation) also stops when the budget runs out;
+            # the users not read yet simply wait for the next run
+            read_all = []
+
+            def users_to_run():
+                try:
+                    yield from planned_users()
+                    read_all.append(True)
+                except BudgetExceeded as budget_error:
+                    logs.append(f"⏳ Stopped reading users: {budget_error}")
+
+            # Users run in parallel; the adaptive per-downstream limits (not a fixed
+            # sleep) keep Gemini/GitHub/PostgREST load at what they currently accept.
+            # Submission follows the priority order, logs are kept per user.
+            # Users that can't finish within the budget are deferred to the next run.
+            def run_user(user, actions):
+                user_logs = []
+                if actions & WORK and not budget.can_start_user():
+                    return user_logs, True
+                started = time.monotonic()
+                try:
+                    process_user(supabase, user, user_logs, actions)
+                except BudgetExceeded as budget_error:
+                    user_logs.append(f"User {user.get('github_username')}: stopped, {budget_error}")
+                    return user_logs, True
                 except Exception as user_error:
-                    logs.append(f"Error processing user {user.get('github_username')}: {user_error}")
+                    user_logs.append(f"Error processing user {user.get('github_username')}: {user_error}")
+                if actions & WORK:
+                    budget.record_user(time.monotonic() - started)
+                return user_logs, False
+
+            deferred = []
+            with ThreadPoolExecutor(max_workers=CRON_WORKERS) as pool:
+                for (user, _), future in bounded(pool, run_user, users_to_run(), CRON_WORKERS * 2):
+                    user_logs, was_deferred = future.result()
+                    logs.extend(user_logs, username=user.get('github_username'))
+                    if was_deferred:
+                        deferred.append(user.get('github_username'))
+            # The margin kept back is for the summary and the response
+            budget.release_margin()
+            # Every page was read: drop users that are gone, paused or not due yet from the index
+            if read_all:
+                _schedule_index.retain(seen_ids)
+
+            not_due = totals['users'] - totals['due'] - totals['invalid']
+            logs.append(f"Users: {totals['users']} active and due or unscheduled, read in {totals['pages']} pages of up to {USER_PAGE_SIZE}")
+            logs.append(f"Schedule: {totals['due']} users due, {not_due} not yet due ({run_now_ist.strftime('%H:%M')} IST)")
+            logs.append("Plan: " + ", ".join(f"{name}={count}" for name, count in plan_totals.items()))
+            if priority_totals:
+                logs.append(format_stats(priority_totals))
+            logs.append(f"Run budget: {budget.elapsed():.0f}s of {budget.seconds:.0f}s used")
+            if deferred:
+                logs.append(f"⏳ Deferred {len(deferred)} users to the next run (out of time): {', '.join(deferred)}")
+
+            # Token usage and latency per prompt template for this run
+            logs.extend(prompts.usage_summary())
+            logs.extend(limits_summary())
+            logs.extend(latency_report())
+            logs.extend(failure_summary())
+            github_pool = pool_stats()
+            logs.append(f"GitHub client pool: {github_pool['size']} clients, {github_pool['hits']} reused, {github_pool['misses']} created, {github_pool['evictions']} evicted")
+            if generated_count() > offline_before:
+                logs.append(f"Offline generator: {generated_count() - offline_before} files generated without Gemini")
+            if profile:
+                logs.extend(profile.finish(supabase))
+            if run_log:
+                run_log.close()
+                logs.append(run_log.summary())
 
             self.send_response(200)
             self.end_headers()
             self.wfile.write(("\n".join(logs)).encode('utf-8'))
             
-        except Exception as e:
+        except (Exception, BudgetExceeded) as e:
+            if profile:
+                profile.abort()
+            if run_log:
+                run_log.emit(f"❌ Run failed: {e}")
+                run_log.close()
             self.send_response(500)
             self.end_headers()
             self.wfile.write(str(e).encode('utf-8'))
+        finally:
+            end_run()
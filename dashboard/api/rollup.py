@@ -0,0 +1,68 @@
+from http.server import BaseHTTPRequestHandler
+import hmac
+import os
+import sys
+from urllib.parse import urlparse, parse_qs
+
+# Add dashboard root to sys.path for Vercel
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.cron import create_supabase_client, SUPABASE_URL, SUPABASE_KEY
+from utils.rollups import run_all, prune, format_report
+from utils import history_compaction
+from utils.contribution_ledger import reconcile, reconcile_candidates
+
+CRON_SECRET = os.environ.get("CRON_SECRET")
+
+
+def authorized(header):
+    """True for `Authorization: Bearer <CRON_SECRET>` (never when CRON_SECRET is unset)."""
+    if not CRON_SECRET or not header:
+        return False
+    return hmac.compare_digest(header.encode('utf-8'), f"Bearer {CRON_SECRET}".encode('utf-8'))
+
+
+class handler(BaseHTTPRequestHandler):
+    """
+    Incremental stats rollup and history compaction. The scheduled job
+    (bearer CRON_SECRET) also re-checks met contribution ledgers against
+    GitHub, and with ?prune=true applies retention.
+    """
+
+    def do_GET(self):
+        try:
+            if not SUPABASE_URL or not SUPABASE_KEY:
+                self.send_response(500)
+                self.end_headers()
+                self.wfile.write("Missing Supabase credentials.".encode('utf-8'))
+                return
+
+            query = parse_qs(urlparse(self.path).query)
+            wants_prune = query.get('prune', ['false'])[0].lower() == 'true'
+            scheduled = authorized(self.headers.get('Authorization'))
+            # Retention deletes raw rows: only the scheduled job (stats-rollup.yml) may ask for it
+            if wants_prune and not scheduled:
+                self.send_response(401)
+                self.end_headers()
+                self.wfile.write("Unauthorized".encode('utf-8'))
+                return
+
+            supabase = create_supabase_client()
+            results = run_all(supabase)
+            compaction = history_compaction.compact(supabase)
+            pruned = prune(supabase) if wants_prune else None
+
+            report = format_report(results, pruned) + "\n" + history_compaction.format_report(compaction)
+            # Uses the users' GitHub tokens: scheduled job only
+            if scheduled:
+                ledger = reconcile(supabase, reconcile_candidates(supabase))
+                report += (f"\nLedger reconcile: {ledger['checked']} checked, {ledger['corrected']} corrected, "
+                           f"{ledger['errors']} errors")
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(report.encode('utf-8'))
+
+        except Exception as e:
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(str(e).encode('utf-8'))
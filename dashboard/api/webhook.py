@@ -0,0 +1,64 @@
+from http.server import BaseHTTPRequestHandler
+import datetime
+import json
+import os
+import sys
+
+# Add dashboard root to sys.path for Vercel
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.cron import create_supabase_client, SUPABASE_URL, SUPABASE_KEY
+from utils.push_webhook import WEBHOOK_SECRET, PushBatcher, verify_signature, parse_push
+
+_batcher = None
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        _batcher = PushBatcher(create_supabase_client())
+    return _batcher
+
+
+class handler(BaseHTTPRequestHandler):
+    """GitHub push webhook: counts today's pushed commits into the contribution ledger."""
+
+    def _reply(self, code, message):
+        self.send_response(code)
+        self.end_headers()
+        self.wfile.write(message.encode('utf-8'))
+
+    def do_POST(self):
+        try:
+            if not WEBHOOK_SECRET or not SUPABASE_URL or not SUPABASE_KEY:
+                self._reply(500, "Missing GITHUB_WEBHOOK_SECRET or Supabase credentials.")
+                return
+
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if not verify_signature(WEBHOOK_SECRET, body, self.headers.get('X-Hub-Signature-256')):
+                self._reply(401, "Invalid signature")
+                return
+
+            event_name = self.headers.get('X-GitHub-Event')
+            if event_name == 'ping':
+                self._reply(200, "pong")
+                return
+            if event_name != 'push':
+                self._reply(202, f"Ignored {event_name} event")
+                return
+
+            event = parse_push(self.headers.get('X-GitHub-Delivery'), json.loads(body),
+                               datetime.datetime.now(datetime.timezone.utc))
+            if event is None or not event['commits']:
+                self._reply(202, "Ignored: no commits for today on the default branch")
+                return
+
+            batcher = get_batcher()
+            if batcher.add(event):
+                stats = batcher.flush()
+                self._reply(200, f"Applied {stats['events']} push events, {stats['users_updated']} users updated")
+            else:
+                self._reply(202, "Queued")
+
+        except Exception as e:
+            self._reply(500, str(e))
@@ -8,8 +8,12 @@ import Link from 'next/link'
 // Reuse the verify logic or just protect heavily
 // In real app, middleware protection is needed.
 
+// Lines kept in the Live Terminal
+const RUN_LOG_LINES = 300
+
 export default function AdminPage() {
     const [stats, setStats] = useState<any>(null)
+    const [runLogs, setRunLogs] = useState<any[]>([])
 
     useEffect(() => {
         // Fetch real stats
@@ -29,6 +33,28 @@ export default function AdminPage() {
         return () => clearInterval(interval)
     }, [])
 
+    useEffect(() => {
+        // Tail the bot run log: only events after the last cursor are fetched
+        let cursor: number | null = null
+        const fetchLogs = async () => {
+            try {
+                const res = await fetch(cursor === null ? '/api/admin/run-logs' : `/api/admin/run-logs?since=${cursor}`)
+                if (!res.ok) return
+                const data = await res.json()
+                cursor = data.cursor
+                if (data.events.length > 0) {
+                    setRunLogs(prev => [...prev, ...data.events].slice(-RUN_LOG_LINES))
+                }
+            } catch (e) {
+                console.error("Run log tail error:", e)
+            }
+        }
+
+        fetchLogs()
+        const interval = setInterval(fetchLogs, 2000)
+        return () => clearInterval(interval)
+    }, [])
+
     return (
         <div className="min-h-screen bg-[#050505] text-white font-sans selection:bg-red-500/30 overflow-x-hidden">
             {/* Background Effects */}
@@ -165,7 +191,15 @@ export default function AdminPage() {
                                 <p className="opacity-50">{'> System initialized...'}</p>
                                 <p className="opacity-50">{'> Connected to Supabase [Latency: 24ms]'}</p>
 
-                                {stats?.recentLogs?.length > 0 ? (
+                                {runLogs.length > 0 ? (
+                                    runLogs.map((log: any) => (
+                                        <p key={log.seq} className="break-all border-l-2 border-green-500/20 pl-2 my-1 hover:bg-white/5">
+                                            <span className="text-gray-500">[{new Date(log.created_at).toLocaleTimeString()}]</span>
+                                            <span className="text-blue-400"> [{log.username || log.source}]</span>
+                                            <span className={log.level === 'error' ? 'text-red-400' : log.level === 'warn' ? 'text-yellow-400' : 'text-gray-300'}> {log.message}</span>
+                                        </p>
+                                    ))
+                                ) : stats?.recentLogs?.length > 0 ? (
                                     stats.recentLogs.map((log: any, i: number) => (
                                         <p key={i} className="break-all border-l-2 border-green-500/20 pl-2 my-1 hover:bg-white/5">
                                             <span className="text-gray-500">[{new Date(log.created_at).toLocaleTimeString()}]</span>
@@ -0,0 +1,51 @@
+import { createClient } from '@supabase/supabase-js'
+import { NextResponse } from 'next/server'
+
+export const dynamic = 'force-dynamic'
+
+const supabaseAdmin = createClient(
+    process.env.NEXT_PUBLIC_SUPABASE_URL || 'https://placeholder.supabase.co',
+    process.env.SUPABASE_SERVICE_ROLE_KEY || process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY || 'placeholder'
+)
+
+const COLUMNS = 'seq, run_id, source, level, username, message, created_at'
+const MAX_LIMIT = 500
+
+// Incremental tail of the bot run log (run_logs ring buffer, see utils/run_log.py).
+// ?since=<cursor> returns only newer events; without it, the latest `limit`.
+// `gap` is true when the ring overwrote events the caller hadn't seen yet.
+export async function GET(request: Request) {
+    try {
+        const { searchParams } = new URL(request.url)
+        const sinceParam = searchParams.get('since')
+        const limit = Math.min(Number(searchParams.get('limit')) || 200, MAX_LIMIT)
+
+        let events: any[] = []
+        if (sinceParam === null) {
+            const { data, error } = await supabaseAdmin
+                .from('run_logs')
+                .select(COLUMNS)
+                .order('seq', { ascending: false })
+                .limit(limit)
+            if (error) throw error
+            events = (data || []).reverse()
+        } else {
+            const { data, error } = await supabaseAdmin
+                .from('run_logs')
+                .select(COLUMNS)
+                .gt('seq', Number(sinceParam) || 0)
+                .order('seq', { ascending: true })
+                .limit(limit)
+            if (error) throw error
+            events = data || []
+        }
+
+        const since = Number(sinceParam) || 0
+        const cursor = events.length > 0 ? events[events.length - 1].seq : since
+        const gap = since > 0 && events.length > 0 && events[0].seq > since + 1
+
+        return NextResponse.json({ events, cursor, gap })
+    } catch (error: any) {
+        return NextResponse.json({ error: error.message }, { status: 500 })
+    }
+}
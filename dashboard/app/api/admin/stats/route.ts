@@ -7,6 +7,41 @@ const supabaseAdmin = createClient(
     process.env.SUPABASE_SERVICE_ROLE_KEY || process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY || 'placeholder'
 )
 
+// Rows counted since `since`: rolled-up hour buckets (see utils/rollups.py)
+// plus the raw rows above the rollup high-water mark. Falls back to a raw
+// count when the rollup tables aren't set up yet.
+async function countSince(source: string, table: string, since: string) {
+    const { data: state, error: stateError } = await supabaseAdmin
+        .from('rollup_state')
+        .select('high_water')
+        .eq('source', source)
+        .maybeSingle()
+
+    if (stateError || !state) {
+        const { count } = await supabaseAdmin
+            .from(table)
+            .select('*', { count: 'exact', head: true })
+            .gte('created_at', since)
+        return count || 0
+    }
+
+    const { data: buckets } = await supabaseAdmin
+        .from('stat_rollups')
+        .select('count')
+        .eq('source', source)
+        .eq('granularity', 'hour')
+        .gte('bucket', since)
+    const rolledUp = buckets?.reduce((sum: number, b: any) => sum + Number(b.count), 0) || 0
+
+    const tailStart = new Date(state.high_water) > new Date(since) ? state.high_water : since
+    const { count: tail } = await supabaseAdmin
+        .from(table)
+        .select('*', { count: 'exact', head: true })
+        .gt('created_at', tailStart)
+
+    return rolledUp + (tail || 0)
+}
+
 export async function GET() {
     try {
         // 1. Total Users
@@ -27,16 +62,10 @@ export async function GET() {
         const activeUsers = new Set(activeData?.map(d => d.user_id).filter(Boolean)).size
 
         // 3. Opened Today (Analytics count since midnight)
-        const { count: openedToday } = await supabaseAdmin
-            .from('analytics')
-            .select('*', { count: 'exact', head: true })
-            .gte('created_at', startOfDay)
+        const openedToday = await countSince('page_views', 'analytics', startOfDay)
 
         // 4. Commits Generated Today (Generated History count since midnight)
-        const { count: commitsToday } = await supabaseAdmin
-            .from('generated_history')
-            .select('*', { count: 'exact', head: true })
-            .gte('created_at', startOfDay)
+        const commitsToday = await countSince('commits', 'generated_history', startOfDay)
 
         // 5. Total Revenue & Plan Stats
         const { data: plans } = await supabaseAdmin
@@ -66,7 +66,43 @@ def run_bot_loop():
 # Let's write a small script that actually serves it on localhost:3001 and triggers it via curl loop? 
 # Or just run the logic.
 
+def run_daemon(args):
+    """Event-driven mode: wake only when a user is due (see utils.bot_daemon)."""
+    import signal
+    from api import cron
+    from utils.bot_daemon import BotDaemon
+    from utils.contribution_ledger import reconcile
+    from utils.run_log import RunLog, SegmentSink
+
+    print("=== GitMaxer Local Bot Daemon v3.0 ===")
+    daemon = BotDaemon(
+        cron.create_supabase_client(),
+        cron.process_user,
+        workers=args.workers,
+        refresh_seconds=args.refresh,
+        spread_anytime=not args.no_spread,
+        reconcile=reconcile,
+        run_log=RunLog(SegmentSink(args.log_dir), source='daemon') if args.log_dir else None,
+    )
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the GitMaxer bot locally")
+    parser.add_argument("--workers", type=int, default=2, help="Users processed in parallel")
+    parser.add_argument("--refresh", type=int, default=60, help="Seconds between user_settings delta refreshes")
+    parser.add_argument("--no-spread", action="store_true", help="Run users without a commit_time at midnight instead of spreading them")
+    parser.add_argument("--poll", action="store_true", help="Legacy mode: full run every 15 minutes")
+    parser.add_argument("--log-dir", default="run_logs", help="Run log segment directory, tail with `python -m utils.run_log tail --dir` ('' to disable)")
+    args = parser.parse_args()
+
+    if not args.poll:
+        run_daemon(args)
+        sys.exit(0)
+
     # We need to hack the handler to be callable without a socket
     # Re-import to patch
     from api import cron
@@ -0,0 +1,8 @@
+-- Contribution ledger columns (see dashboard/utils/contribution_ledger.py)
+-- Lower bound of today's commits in the user's regular repo, kept by the bot
+-- Run this in your Supabase SQL Editor
+
+ALTER TABLE public.user_settings
+ADD COLUMN IF NOT EXISTS ledger_day date,
+ADD COLUMN IF NOT EXISTS ledger_count integer DEFAULT 0,
+ADD COLUMN IF NOT EXISTS ledger_checked_at timestamp with time zone;
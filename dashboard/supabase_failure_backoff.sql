@@ -0,0 +1,15 @@
+-- Failure backoff columns (see dashboard/utils/failure_backoff.py)
+-- Users whose token or repos keep failing are skipped until failure_until
+-- Run this in your Supabase SQL Editor
+
+ALTER TABLE public.user_settings
+ADD COLUMN IF NOT EXISTS failure_class text,                    -- auth / regular_repo / leetcode_repo / enterprise_repo
+ADD COLUMN IF NOT EXISTS failure_count integer DEFAULT 0,       -- consecutive failures of that class
+ADD COLUMN IF NOT EXISTS failure_until timestamp with time zone,
+ADD COLUMN IF NOT EXISTS failure_fingerprint text,              -- settings hash; a change lifts the backoff
+ADD COLUMN IF NOT EXISTS failure_message text;
+
+-- Admin view of users currently backing off
+CREATE INDEX IF NOT EXISTS idx_user_settings_failure_until
+ON public.user_settings (failure_until)
+WHERE failure_class IS NOT NULL;
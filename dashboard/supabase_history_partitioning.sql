@@ -0,0 +1,207 @@
+-- generated_history: monthly range partitions, (user_id, created_at) indexes
+-- and per-user summaries of compacted rows (see dashboard/utils/history_compaction.py)
+-- Run this in your Supabase SQL Editor after supabase_rollups.sql.
+-- It migrates the existing rows once; the old table is kept as
+-- generated_history_legacy until you drop it.
+
+-- 1. Partitioned table with the same columns (the partition key must be in the PK)
+CREATE TABLE IF NOT EXISTS public.generated_history_partitioned (
+    id uuid DEFAULT uuid_generate_v4() NOT NULL,
+    user_id uuid REFERENCES public.user_settings(id) NOT NULL,
+    content_snippet text,
+    content_hash text NOT NULL,
+    language text,
+    created_at timestamp with time zone DEFAULT timezone('utc'::text, now()) NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside the monthly partitions (should stay empty)
+CREATE TABLE IF NOT EXISTS public.generated_history_default
+PARTITION OF public.generated_history_partitioned DEFAULT;
+
+-- 2. Monthly partitions generated_history_yYYYYmMM (UTC months) from p_from
+-- through p_months months ahead of now. Returns the number created.
+CREATE OR REPLACE FUNCTION public.ensure_history_partitions(
+    p_from date,
+    p_months integer DEFAULT 3,
+    p_parent text DEFAULT 'generated_history'
+) RETURNS integer AS $$
+DECLARE
+    month_start date := date_trunc('month', p_from)::date;
+    last_month date := (date_trunc('month', timezone('utc'::text, now())) + make_interval(months => p_months))::date;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    IF p_parent NOT IN ('generated_history', 'generated_history_partitioned') THEN
+        RAISE EXCEPTION 'ensure_history_partitions: unexpected parent table %', p_parent;
+    END IF;
+
+    WHILE month_start <= last_month LOOP
+        partition_name := 'generated_history_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM');
+        IF to_regclass('public.' || partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, p_parent,
+                month_start::timestamp AT TIME ZONE 'UTC',
+                (month_start + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Service role only: PostgREST exposes public functions to every API key
+REVOKE ALL ON FUNCTION public.ensure_history_partitions(date, integer, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.ensure_history_partitions(date, integer, text) TO service_role;
+
+-- 3. Copy the rows and swap the tables (writers wait on the lock meanwhile)
+DO $$
+BEGIN
+    IF to_regclass('public.generated_history_legacy') IS NULL THEN
+        LOCK TABLE public.generated_history IN SHARE ROW EXCLUSIVE MODE;
+        PERFORM public.ensure_history_partitions(
+            (SELECT coalesce(min(created_at), now())::date FROM public.generated_history),
+            3, 'generated_history_partitioned');
+        INSERT INTO public.generated_history_partitioned (id, user_id, content_snippet, content_hash, language, created_at)
+        SELECT id, user_id, content_snippet, content_hash, language, created_at FROM public.generated_history;
+        ALTER TABLE public.generated_history RENAME TO generated_history_legacy;
+        ALTER TABLE public.generated_history_partitioned RENAME TO generated_history;
+    END IF;
+END $$;
+
+-- 4. Indexes (created on every partition)
+-- History views and per-user dedupe: newest rows of one user
+CREATE INDEX IF NOT EXISTS idx_history_user_created ON public.generated_history (user_id, created_at DESC);
+-- Keyset scans of the rollup and compaction jobs
+CREATE INDEX IF NOT EXISTS idx_history_created_id ON public.generated_history (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_history_user_hash ON public.generated_history (user_id, content_hash);
+
+-- 5. RLS (same policies as supabase_security_fix.sql)
+ALTER TABLE public.generated_history ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own history" ON public.generated_history;
+CREATE POLICY "Users can view own history"
+ON public.generated_history
+FOR SELECT
+TO authenticated
+USING (user_id = auth.uid());
+
+DROP POLICY IF EXISTS "Users can insert own history" ON public.generated_history;
+CREATE POLICY "Users can insert own history"
+ON public.generated_history
+FOR INSERT
+TO authenticated
+WITH CHECK (user_id = auth.uid());
+
+DROP POLICY IF EXISTS "Service role full access to generated_history" ON public.generated_history;
+CREATE POLICY "Service role full access to generated_history"
+ON public.generated_history
+FOR ALL
+TO service_role
+USING (true)
+WITH CHECK (true);
+
+-- 6. Per-user summaries of compacted rows (snippets are not kept)
+CREATE TABLE IF NOT EXISTS public.generated_history_summaries (
+    user_id uuid PRIMARY KEY REFERENCES public.user_settings(id) ON DELETE CASCADE,
+    rows_compacted bigint NOT NULL DEFAULT 0,
+    first_at timestamp with time zone,
+    last_at timestamp with time zone,
+    languages jsonb NOT NULL DEFAULT '{}'::jsonb,   -- language -> commits
+    hash_sketch text,                               -- scalable Bloom filter of content_hash (JSON)
+    updated_at timestamp with time zone DEFAULT timezone('utc'::text, now())
+);
+
+ALTER TABLE public.generated_history_summaries ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own history summary" ON public.generated_history_summaries;
+CREATE POLICY "Users can view own history summary"
+ON public.generated_history_summaries
+FOR SELECT
+TO authenticated
+USING (user_id = auth.uid());
+
+-- Write merged summaries for a batch and advance the compaction mark
+-- (rollup_state source 'history_compaction') in one transaction.
+-- Fails if another run moved the mark since p_expected was read.
+CREATE OR REPLACE FUNCTION public.apply_history_compaction(
+    p_expected timestamp with time zone,
+    p_expected_id uuid,
+    p_high_water timestamp with time zone,
+    p_last_id uuid,
+    p_rows jsonb
+) RETURNS void AS $$
+DECLARE
+    current_mark timestamp with time zone;
+    current_id uuid;
+BEGIN
+    INSERT INTO public.rollup_state (source) VALUES ('history_compaction') ON CONFLICT DO NOTHING;
+
+    SELECT high_water, last_id INTO current_mark, current_id
+    FROM public.rollup_state WHERE source = 'history_compaction' FOR UPDATE;
+
+    IF current_mark IS DISTINCT FROM p_expected OR current_id IS DISTINCT FROM p_expected_id THEN
+        RAISE EXCEPTION 'history compaction: mark moved (expected %, found %)', p_expected, current_mark;
+    END IF;
+
+    INSERT INTO public.generated_history_summaries (user_id, rows_compacted, first_at, last_at, languages, hash_sketch, updated_at)
+    SELECT r.user_id, r.rows_compacted, r.first_at, r.last_at, r.languages, r.hash_sketch, timezone('utc'::text, now())
+    FROM jsonb_to_recordset(p_rows)
+        AS r(user_id uuid, rows_compacted bigint, first_at timestamp with time zone,
+             last_at timestamp with time zone, languages jsonb, hash_sketch text)
+    ON CONFLICT (user_id) DO UPDATE SET
+        rows_compacted = EXCLUDED.rows_compacted,
+        first_at = EXCLUDED.first_at,
+        last_at = EXCLUDED.last_at,
+        languages = EXCLUDED.languages,
+        hash_sketch = EXCLUDED.hash_sketch,
+        updated_at = EXCLUDED.updated_at;
+
+    UPDATE public.rollup_state
+    SET high_water = p_high_water, last_id = p_last_id, updated_at = timezone('utc'::text, now())
+    WHERE source = 'history_compaction';
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Service role only: PostgREST exposes public functions to every API key
+REVOKE ALL ON FUNCTION public.apply_history_compaction(timestamp with time zone, uuid, timestamp with time zone, uuid, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.apply_history_compaction(timestamp with time zone, uuid, timestamp with time zone, uuid, jsonb) TO service_role;
+
+-- 7. Retention: drop whole monthly partitions that end before p_before and
+-- delete the remainder row by row. Returns the number of partitions dropped.
+CREATE OR REPLACE FUNCTION public.prune_generated_history(p_before timestamp with time zone)
+RETURNS integer AS $$
+DECLARE
+    part record;
+    upper_bound timestamp with time zone;
+    dropped integer := 0;
+BEGIN
+    FOR part IN
+        SELECT c.oid::regclass AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.generated_history'::regclass
+    LOOP
+        -- e.g. FOR VALUES FROM ('2026-01-01 00:00:00+00') TO ('2026-02-01 00:00:00+00')
+        IF part.bound LIKE 'FOR VALUES FROM%' THEN
+            upper_bound := substring(part.bound FROM 'TO \(''([^'']+)''\)')::timestamp with time zone;
+            IF upper_bound <= p_before THEN
+                EXECUTE format('DROP TABLE %s', part.name);
+                dropped := dropped + 1;
+            END IF;
+        END IF;
+    END LOOP;
+
+    DELETE FROM public.generated_history WHERE created_at < p_before;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Service role only: PostgREST exposes public functions to every API key
+REVOKE ALL ON FUNCTION public.prune_generated_history(timestamp with time zone) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.prune_generated_history(timestamp with time zone) TO service_role;
+
+-- Once the numbers check out:
+-- DROP TABLE public.generated_history_legacy;
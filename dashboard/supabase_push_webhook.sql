@@ -0,0 +1,60 @@
+-- GitHub push webhook state (see dashboard/utils/push_webhook.py)
+-- Commits pushed today to each user's regular repo, counted from push events
+-- Run this in your Supabase SQL Editor
+
+ALTER TABLE public.user_settings
+ADD COLUMN IF NOT EXISTS push_day date,
+ADD COLUMN IF NOT EXISTS push_count integer DEFAULT 0;
+
+-- Delivery ids already counted (GitHub redelivers on timeouts and on demand)
+CREATE TABLE IF NOT EXISTS public.push_deliveries (
+    delivery_id text PRIMARY KEY,
+    received_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_push_deliveries_received_at
+ON public.push_deliveries (received_at);
+
+-- Service role only
+ALTER TABLE public.push_deliveries ENABLE ROW LEVEL SECURITY;
+
+-- Apply one batch of push counts: rows are {delivery, user_id, commits}, all for
+-- p_day. Deliveries seen before are skipped, the rest are summed per user and
+-- added in a single UPDATE. Returns the number of users updated.
+CREATE OR REPLACE FUNCTION public.apply_push_counts(p_day date, p_rows jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+DECLARE
+    updated integer;
+BEGIN
+    WITH incoming AS (
+        SELECT * FROM jsonb_to_recordset(p_rows) AS r(delivery text, user_id uuid, commits integer)
+    ), fresh AS (
+        INSERT INTO public.push_deliveries (delivery_id)
+        SELECT DISTINCT delivery FROM incoming
+        ON CONFLICT (delivery_id) DO NOTHING
+        RETURNING delivery_id
+    ), totals AS (
+        SELECT i.user_id, sum(i.commits) AS commits
+        FROM incoming i JOIN fresh f ON f.delivery_id = i.delivery
+        GROUP BY i.user_id
+    )
+    UPDATE public.user_settings u SET
+        push_day = p_day,
+        push_count = CASE WHEN u.push_day = p_day THEN coalesce(u.push_count, 0) + t.commits ELSE t.commits END
+    FROM totals t
+    WHERE u.id = t.user_id AND (u.push_day IS NULL OR u.push_day <= p_day);
+    GET DIAGNOSTICS updated = ROW_COUNT;
+
+    -- Redeliveries older than a few days are not expected
+    DELETE FROM public.push_deliveries WHERE received_at < now() - interval '3 days';
+    RETURN updated;
+END;
+$$;
+
+-- Service role only (api/webhook.py): PostgREST exposes public functions to every API key
+REVOKE ALL ON FUNCTION public.apply_push_counts(date, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.apply_push_counts(date, jsonb) TO service_role;
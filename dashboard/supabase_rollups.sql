@@ -0,0 +1,73 @@
+-- Rollup tables for admin stats
+-- Per-minute/hour/day counters for generated_history and analytics, kept
+-- up to date incrementally by dashboard/utils/rollups.py (api/rollup.py)
+-- Run this in your Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS public.stat_rollups (
+    source text NOT NULL,                -- 'commits' (generated_history) or 'page_views' (analytics)
+    granularity text NOT NULL CHECK (granularity IN ('minute', 'hour', 'day')),
+    bucket timestamp with time zone NOT NULL,
+    plan text NOT NULL DEFAULT '',
+    language text NOT NULL DEFAULT '',
+    outcome text NOT NULL DEFAULT '',
+    count bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, granularity, bucket, plan, language, outcome)
+);
+
+-- High-water mark per source: (created_at, id) of the last row rolled up
+CREATE TABLE IF NOT EXISTS public.rollup_state (
+    source text PRIMARY KEY,
+    high_water timestamp with time zone NOT NULL DEFAULT 'epoch',
+    last_id uuid,
+    updated_at timestamp with time zone DEFAULT timezone('utc'::text, now())
+);
+
+-- Service role only (no policies)
+ALTER TABLE public.stat_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.rollup_state ENABLE ROW LEVEL SECURITY;
+
+-- Keyset scans from the high-water mark
+CREATE INDEX IF NOT EXISTS idx_generated_history_created_at ON public.generated_history(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_analytics_created_at ON public.analytics(created_at, id);
+
+-- Add a batch of counters and advance the mark in one transaction.
+-- Fails if another run moved the mark since p_expected was read.
+CREATE OR REPLACE FUNCTION public.apply_rollup(
+    p_source text,
+    p_expected timestamp with time zone,
+    p_expected_id uuid,
+    p_high_water timestamp with time zone,
+    p_last_id uuid,
+    p_rows jsonb
+) RETURNS void AS $$
+DECLARE
+    current_mark timestamp with time zone;
+    current_id uuid;
+BEGIN
+    INSERT INTO public.rollup_state (source) VALUES (p_source) ON CONFLICT DO NOTHING;
+
+    SELECT high_water, last_id INTO current_mark, current_id
+    FROM public.rollup_state WHERE source = p_source FOR UPDATE;
+
+    IF current_mark IS DISTINCT FROM p_expected OR current_id IS DISTINCT FROM p_expected_id THEN
+        RAISE EXCEPTION 'rollup %: high-water mark moved (expected %, found %)', p_source, p_expected, current_mark;
+    END IF;
+
+    INSERT INTO public.stat_rollups (source, granularity, bucket, plan, language, outcome, count)
+    SELECT p_source, r.granularity, r.bucket, r.plan, r.language, r.outcome, r.count
+    FROM jsonb_to_recordset(p_rows)
+        AS r(granularity text, bucket timestamp with time zone, plan text, language text, outcome text, count bigint)
+    ON CONFLICT (source, granularity, bucket, plan, language, outcome)
+    DO UPDATE SET count = public.stat_rollups.count + EXCLUDED.count;
+
+    UPDATE public.rollup_state
+    SET high_water = p_high_water, last_id = p_last_id, updated_at = timezone('utc'::text, now())
+    WHERE source = p_source;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Service role only (utils/rollups.py): PostgREST exposes public functions to every API key
+REVOKE ALL ON FUNCTION public.apply_rollup(text, timestamp with time zone, uuid, timestamp with time zone, uuid, jsonb)
+    FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.apply_rollup(text, timestamp with time zone, uuid, timestamp with time zone, uuid, jsonb)
+    TO service_role;
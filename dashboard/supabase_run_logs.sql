@@ -0,0 +1,69 @@
+-- Run log store for the admin Live Terminal (see dashboard/utils/run_log.py)
+-- Bot runs append their log lines in batches; the dashboard tails them with
+-- `seq > cursor` (app/api/admin/run-logs). The table is a ring buffer: each
+-- line overwrites slot seq % capacity, so it never needs pruning.
+-- Run this in your Supabase SQL Editor
+
+CREATE SEQUENCE IF NOT EXISTS public.run_log_seq;
+
+CREATE TABLE IF NOT EXISTS public.run_logs (
+    slot integer PRIMARY KEY,                -- seq % capacity
+    seq bigint NOT NULL,                     -- monotonic cursor
+    run_id text NOT NULL,
+    source text NOT NULL DEFAULT 'cron',     -- 'cron' or 'daemon'
+    level text NOT NULL DEFAULT 'info',      -- info / warn / error
+    username text,
+    message text NOT NULL,
+    created_at timestamp with time zone NOT NULL DEFAULT timezone('utc'::text, now())
+);
+
+-- Service role only (no policies)
+ALTER TABLE public.run_logs ENABLE ROW LEVEL SECURITY;
+
+-- Tails: WHERE seq > cursor ORDER BY seq
+CREATE UNIQUE INDEX IF NOT EXISTS idx_run_logs_seq ON public.run_logs(seq);
+
+-- Append a batch of events ([{run_id, source, level, username, message, at}]).
+-- Batches are serialized so seq order is also commit order: a tail that has
+-- seen seq N never misses a later commit with a smaller seq.
+-- Returns the last seq written.
+CREATE OR REPLACE FUNCTION public.append_run_logs(
+    p_events jsonb,
+    p_capacity integer DEFAULT 100000
+) RETURNS bigint AS $$
+DECLARE
+    last_seq bigint;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('public.run_logs'));
+
+    WITH ordered AS (
+        SELECT e.value AS event
+        FROM jsonb_array_elements(p_events) WITH ORDINALITY AS e(value, n)
+        ORDER BY e.n
+    ), numbered AS (
+        SELECT nextval('public.run_log_seq') AS seq, event FROM ordered
+    ), written AS (
+        INSERT INTO public.run_logs (slot, seq, run_id, source, level, username, message, created_at)
+        SELECT (seq % p_capacity)::integer, seq,
+               event->>'run_id',
+               coalesce(event->>'source', 'cron'),
+               coalesce(event->>'level', 'info'),
+               event->>'username',
+               event->>'message',
+               coalesce((event->>'at')::timestamp with time zone, timezone('utc'::text, now()))
+        FROM numbered
+        ON CONFLICT (slot) DO UPDATE SET
+            seq = EXCLUDED.seq, run_id = EXCLUDED.run_id, source = EXCLUDED.source,
+            level = EXCLUDED.level, username = EXCLUDED.username,
+            message = EXCLUDED.message, created_at = EXCLUDED.created_at
+        RETURNING seq
+    )
+    SELECT max(seq) INTO last_seq FROM written;
+
+    RETURN last_seq;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Service role only (bot runs): PostgREST exposes public functions to every API key
+REVOKE ALL ON FUNCTION public.append_run_logs(jsonb, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.append_run_logs(jsonb, integer) TO service_role;
@@ -0,0 +1,19 @@
+-- Keep user_settings.updated_at current on every update
+-- The local bot daemon refreshes only rows with updated_at > its last cursor
+-- Run this in your Supabase SQL Editor
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS trigger AS $$
+BEGIN
+  NEW.updated_at = timezone('utc'::text, now());
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_settings_touch_updated_at ON public.user_settings;
+CREATE TRIGGER user_settings_touch_updated_at
+  BEFORE UPDATE ON public.user_settings
+  FOR EACH ROW EXECUTE PROCEDURE public.touch_updated_at();
+
+-- Index for delta refreshes (updated_at > cursor)
+CREATE INDEX IF NOT EXISTS idx_user_settings_updated_at ON public.user_settings(updated_at);
@@ -0,0 +1,143 @@
+"""Shared fakes for the bot's unit tests."""
+
+import re
+import types
+
+import pytest
+
+
+def _or_term(term):
+    """Row predicate for one PostgREST or= term: col.eq.x, col.lt.x, col.is.null, col.not.match.re."""
+    column, op, arg = term.split('.', 2)
+    if op == 'eq':
+        return lambda row: row.get(column) is not None and str(row[column]) == arg
+    if op == 'lt':
+        return lambda row: row.get(column) is not None and row[column] < arg
+    if op == 'is' and arg == 'null':
+        return lambda row: row.get(column) is None
+    if op == 'not' and arg.startswith('match.'):
+        pattern = re.compile(arg[len('match.'):])
+        return lambda row: row.get(column) is not None and not pattern.search(row[column])
+    raise ValueError(f"unsupported or= term {term}")
+
+
+class FakeParams:
+    """query.params stand-in: only add("or", "(a,b,...)") is supported."""
+
+    def __init__(self, query):
+        self.query = query
+
+    def add(self, key, value):
+        assert key == 'or' and value.startswith('(') and value.endswith(')')
+        terms = [_or_term(term) for term in value[1:-1].split(',')]
+        self.query.filters.append(lambda row: any(term(row) for term in terms))
+        return self
+
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST query on one in-memory table."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.write = None
+        self.count = None
+
+    @property
+    def params(self):
+        return FakeParams(self)
+
+    @params.setter
+    def params(self, value):
+        pass                # add() already registered the filter
+
+    def select(self, *columns, **kwargs):
+        return self
+
+    def update(self, data):
+        self.write = ('update', data)
+        return self
+
+    def insert(self, data):
+        self.write = ('insert', data)
+        return self
+
+    def upsert(self, data, **kwargs):
+        self.write = ('upsert', data)
+        return self
+
+    def delete(self, **kwargs):
+        self.write = ('delete', None)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        rows = [row for row in self.db.tables.setdefault(self.table, []) if all(f(row) for f in self.filters)]
+        if self.write:
+            kind, data = self.write
+            self.db.writes.append((self.table, kind, data))
+            if kind == 'update':
+                for row in rows:
+                    row.update(data)
+            elif kind == 'delete':
+                self.db.tables[self.table] = [row for row in self.db.tables[self.table] if row not in rows]
+            return types.SimpleNamespace(data=rows)
+        return types.SimpleNamespace(data=rows[:self.count] if self.count is not None else rows)
+
+
+class FakeSupabase:
+    """
+    In-memory tables plus a log of every write: (table, kind, data).
+    RPCs are logged in `calls` and answered by `rpc_handlers[name](params)`
+    (None when there is no handler).
+    """
+
+    def __init__(self, **tables):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in tables.items()}
+        self.writes = []
+        self.calls = []
+        self.rpc_handlers = {}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        handler = self.rpc_handlers.get(name)
+        return types.SimpleNamespace(execute=lambda: types.SimpleNamespace(data=handler(params) if handler else None))
+
+
+@pytest.fixture
+def fake_supabase():
+    return FakeSupabase
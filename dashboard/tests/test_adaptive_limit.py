@@ -0,0 +1,122 @@
+import threading
+
+import httpx
+import pytest
+
+from utils import adaptive_limit
+from utils.adaptive_limit import AdaptiveLimiter, LimitTimeout, classify, limited_transport
+
+
+def make_limiter(initial=2, max_limit=4):
+    return AdaptiveLimiter('test', initial, max_limit, latency_target=1.0)
+
+
+def test_classify():
+    assert classify(RuntimeError("429 Too Many Requests")) == 'overload'
+    assert classify(TimeoutError("read")) == 'overload'
+    assert classify(Exception("Resource exhausted: quota")) == 'overload'
+    assert classify(ValueError("bad json")) == 'error'
+
+
+def test_grows_only_when_saturated_and_fast():
+    limiter = make_limiter()
+    limiter.in_flight = 1
+    limiter.release(0.1, 'ok', saturated=False)
+    assert limiter.limit == 2.0
+    limiter.in_flight = 1
+    limiter.release(5.0, 'ok', saturated=True)
+    assert limiter.limit == 2.0 and limiter.metrics['slow'] == 1
+    limiter.in_flight = 1
+    limiter.release(0.1, 'ok', saturated=True)
+    assert limiter.limit == 2.5
+
+
+def test_growth_stops_at_max():
+    limiter = make_limiter(initial=4, max_limit=4)
+    limiter.in_flight = 1
+    limiter.release(0.1, 'ok')
+    assert limiter.limit == 4.0
+
+
+def test_overload_halves_once_per_latency_window():
+    limiter = make_limiter(initial=4, max_limit=8)
+    for _ in range(3):
+        limiter.in_flight = 1
+        limiter.release(0.1, 'overload')
+    assert limiter.limit == 2.0
+    assert (limiter.metrics['overloaded'], limiter.metrics['cuts']) == (3, 1)
+
+
+def test_never_below_min_limit():
+    limiter = make_limiter(initial=1)
+    limiter.in_flight = 1
+    limiter.release(0.1, 'overload')
+    assert limiter.limit == 1.0
+
+
+def test_errors_do_not_adapt():
+    limiter = make_limiter()
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError("bad json")
+    assert limiter.limit == 2.0
+    assert limiter.metrics['errors'] == 1 and limiter.in_flight == 0
+
+
+def test_slot_classifies_exceptions_and_is_reentrant():
+    limiter = make_limiter(initial=1)
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            with limiter.slot():        # same thread: no deadlock on a limit of 1
+                assert limiter.in_flight == 1
+            raise RuntimeError("429")
+    assert limiter.metrics['overloaded'] == 1 and limiter.in_flight == 0
+
+
+def test_acquire_blocks_at_limit_and_times_out():
+    limiter = make_limiter(initial=1)
+    assert limiter.acquire() is True
+    with pytest.raises(LimitTimeout):
+        limiter.acquire(timeout=0.01)
+    assert limiter.metrics['waits'] == 1
+
+
+def test_waiter_gets_released_slot():
+    limiter = make_limiter(initial=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def waiter():
+        limiter.acquire(timeout=5)
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release(0.1, 'ok')
+    thread.join(5)
+    assert acquired.is_set() and limiter.in_flight == 1
+
+
+def test_limiter_max_from_env(monkeypatch):
+    monkeypatch.setattr(adaptive_limit, '_limiters', {})
+    monkeypatch.setenv("LIMIT_GEMINI_MAX", "1")
+    gemini = adaptive_limit.limiter('gemini')
+    assert (gemini.limit, gemini.max_limit) == (1.0, 1)
+    assert adaptive_limit.limiter('gemini') is gemini
+    assert adaptive_limit.limits_summary()[0].startswith("Limit gemini: 1 ")
+
+
+@pytest.mark.parametrize('status,headers,metric', [
+    (200, {}, 'ok'),
+    (429, {}, 'overloaded'),
+    (403, {'x-ratelimit-remaining': '0'}, 'overloaded'),
+    (403, {}, 'ok'),
+    (500, {}, 'errors'),
+])
+def test_limited_transport_reads_status(monkeypatch, status, headers, metric):
+    monkeypatch.setattr(adaptive_limit, '_limiters', {})
+    inner = httpx.MockTransport(lambda request: httpx.Response(status, headers=headers))
+    with httpx.Client(transport=limited_transport(inner, 'postgrest')) as client:
+        assert client.get('https://example.supabase.co/rest/v1/user_settings').status_code == status
+    assert adaptive_limit.limiter('postgrest').metrics[metric] == 1
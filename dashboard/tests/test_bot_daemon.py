@@ -0,0 +1,131 @@
+import datetime
+
+import pytest
+import pytz
+
+from utils.bot_daemon import BotDaemon, IST
+from utils.decision_engine import REGULAR
+
+NOW = datetime.datetime(2026, 10, 19, 6, 30, tzinfo=pytz.utc)      # 12:00 IST
+
+
+def user(user_id, **fields):
+    row = {'id': user_id, 'github_username': user_id, 'github_access_token': 'token', 'plan_type': 'free',
+           'min_contributions': 1, 'daily_commit_count': 0, 'leetcode_daily_count': 0,
+           'last_commit_ts': '2026-10-01T08:00:00+00:00', 'commit_time': '09:00', 'pause_bot': False,
+           'updated_at': '2026-10-19T00:00:00+00:00'}
+    row.update(fields)
+    return row
+
+
+def ist(day, hour, minute=0):
+    return IST.localize(datetime.datetime(2026, 10, day, hour, minute)).timestamp()
+
+
+@pytest.fixture
+def daemon(fake_supabase):
+    def make(*rows, process_user=None):
+        calls = []
+
+        def record(supabase, row, logs, actions):
+            calls.append((row['id'], actions))
+            if process_user:
+                process_user(row)
+            logs.append(f"processed {row['id']}")
+
+        bot = BotDaemon(fake_supabase(user_settings=list(rows)), record, spread_anytime=False)
+        bot.calls = calls
+        return bot
+    return make
+
+
+@pytest.mark.parametrize("row, served", [
+    (user('u'), False),
+    (user('u', last_commit_ts='2026-10-19T04:00:00+00:00'), True),      # 09:30 IST today
+    (user('u', last_commit_ts='2026-10-18T20:00:00+00:00'), True),      # 01:30 IST today
+    (user('u', plan_type='pro', last_commit_ts='2026-10-18T18:00:00+00:00'), False),    # 23:30 IST yesterday
+    (user('u', github_access_token=None), True),                        # nothing to do today
+    (user('u', last_commit_ts='not a time'), False),
+])
+def test_served_today_from_the_persisted_row(daemon, row, served):
+    bot = daemon(row)
+    bot.users['u'] = row
+    assert bot._served_today('u', NOW) is served
+
+
+def test_served_today_in_this_process(daemon):
+    bot = daemon()
+    bot._served_day['u'] = NOW.astimezone(IST).date()
+    assert bot._served_today('u', NOW)
+
+
+@pytest.mark.parametrize("row, due", [
+    (user('u'), ist(19, 9)),
+    (user('u', commit_time='18:15'), ist(19, 18, 15)),
+    (user('u', commit_time=None), ist(19, 0)),
+    (user('u', last_commit_ts='2026-10-19T04:00:00+00:00'), ist(20, 9)),
+])
+def test_next_due(daemon, row, due):
+    bot = daemon(row)
+    bot._apply_rows([row], NOW)
+    assert bot._next_due('u', NOW) == due
+
+
+def test_refresh_arms_active_users_and_drops_paused_ones(daemon):
+    bot = daemon(user('a'), user('b', commit_time='25:00'), user('c', pause_bot=True))
+    assert bot.refresh() == 2
+    assert set(bot.users) == {'a', 'b'}
+    assert 'b' in bot.index.invalid
+    assert set(bot._version) == {'a'}
+
+    bot.supabase.tables['user_settings'][0].update(pause_bot=True, updated_at='2026-10-19T01:00:00+00:00')
+    assert bot.refresh() == 1
+    assert 'a' not in bot.users and 'a' not in bot._version
+
+
+def test_pop_due_skips_stale_and_in_flight_entries(daemon):
+    bot = daemon()
+    bot._arm('a', 100)
+    bot._arm('a', 200)          # re-armed: the first entry is stale
+    bot._arm('b', 150)
+    bot._arm('c', 500)
+    assert bot._pop_due(300) == [('b', 150), ('a', 200)]
+    bot._arm('b', 250)
+    assert bot._pop_due(300) == []      # b is still running
+    assert bot._next_wake(300, 1000, 1000) == 200
+
+
+def test_run_user_plans_processes_and_rearms_for_tomorrow(daemon):
+    row = user('a')
+    bot = daemon(row)
+    bot.refresh()
+    bot._in_flight.add('a')
+    bot._run_user('a', ist(19, 9))
+    [(user_id, actions)] = bot.calls
+    assert user_id == 'a' and actions & REGULAR
+    assert bot.metrics['runs_ok'] == 1
+    assert 'a' not in bot._in_flight
+    today = datetime.datetime.now(IST).date()
+    assert bot._served_day['a'] == today
+    assert bot._heap[-1][0] > datetime.datetime.now(pytz.utc).timestamp()
+
+
+def test_failed_run_is_retried(daemon):
+    def fail(row):
+        raise RuntimeError("GitHub down")
+
+    bot = daemon(user('a'), process_user=fail)
+    bot.refresh()
+    before = datetime.datetime.now(pytz.utc).timestamp()
+    bot._run_user('a', ist(19, 9))
+    assert bot.metrics['runs_failed'] == 1
+    assert 'a' not in bot._served_day
+    due = min(entry[0] for entry in bot._heap if entry[3] == bot._version['a'])
+    assert due >= before + bot.retry_seconds
+
+
+def test_paused_user_is_not_processed(daemon):
+    bot = daemon(user('a', pause_bot=True))
+    bot.users['a'] = user('a')
+    bot._run_user('a', ist(19, 9))
+    assert bot.calls == []
@@ -0,0 +1,98 @@
+import datetime
+
+import pytest
+
+from api import cron
+from utils.capacity_planner import (
+    simulate, estimate, regular_gemini_calls, synthetic_users, fetch_snapshot, STAGE_CALLS,
+)
+
+NOW = datetime.datetime(2026, 10, 19, 23, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30)))
+LONG_AGO = '2026-10-01T08:00:00+00:00'
+
+
+def user(user_id, **fields):
+    row = {'id': user_id, 'github_username': user_id, 'github_access_token': 'token', 'plan_type': 'free',
+           'min_contributions': 1, 'daily_commit_count': 0, 'leetcode_daily_count': 0,
+           'last_commit_ts': LONG_AGO, 'commit_time': None}
+    row.update(fields)
+    return row
+
+
+@pytest.mark.parametrize("regular_users, batch_size, fallback, calls", [
+    (0, 5, 0.1, 2),
+    (1, 5, 0.1, 2),             # a lone regular commit isn't batched
+    (10, 5, 0.0, 0.2),
+    (10, 5, 0.1, 0.4),
+    (10, 1, 0.1, 2),
+])
+def test_regular_gemini_calls(regular_users, batch_size, fallback, calls):
+    assert regular_gemini_calls(regular_users, batch_size, fallback) == pytest.approx(calls)
+
+
+def test_simulate_counts_users_and_stages():
+    users = [
+        user('a'),
+        user('b', github_access_token=None),
+        user('c', pause_bot=True),
+        user('d', commit_time='25:00'),
+        user('e', last_commit_ts='2026-10-18T08:00:00+00:00'),             # weekly rule
+        user('f', plan_type='leetcode', leetcode_repo='LC'),
+        user('g', plan_type='enterprise', min_contributions=0),
+    ]
+    projects = [{'user_id': 'g', 'status': 'in_progress', 'current_day': 2, 'days_duration': 15}]
+    result = simulate(users, projects, NOW)
+    assert (result['users_total'], result['users_active'], result['users_due']) == (7, 6, 5)
+    assert result['users_invalid_time'] == 1
+    assert result['users_no_token'] == 1
+    assert result['users_idle'] == 1
+    assert result['stages']['regular'] == 2
+    assert result['stages']['leetcode'] == 1
+    assert result['stages']['enterprise'] == 1
+
+
+def test_simulate_batches_regular_generation():
+    users = [user(f"u{i}") for i in range(10)]
+    batched = simulate(users, now=NOW, batch_size=5, batch_fallback=0.0)
+    unbatched = simulate(users, now=NOW, batch_size=1)
+    assert unbatched['calls']['gemini'] == 10 * STAGE_CALLS['regular']['gemini']
+    assert batched['calls']['gemini'] == pytest.approx(2)
+    assert batched['calls']['github'] == unbatched['calls']['github']
+
+
+def test_simulate_assumed_commits_skip_regular():
+    result = simulate([user('a', min_contributions=2)], now=NOW, commits_today=2)
+    assert result['stages']['regular'] == 0
+    assert result['stages']['repo_check'] == 1
+
+
+def test_estimate_is_capped_by_the_slowest_limiter():
+    result = simulate([user(f"u{i}") for i in range(100)], now=NOW, batch_size=1)
+    estimates = estimate(result, latency={'gemini': 10.0}, concurrency_levels=(1, 1000),
+                         limits={'gemini': 2})
+    assert estimates['wall_time'][1]['limited_by'] == 'workers'
+    assert estimates['wall_time'][1000]['limited_by'] == 'gemini'
+    assert estimates['wall_time'][1000]['seconds'] == pytest.approx(100 * 2 * 10.0 / 2)
+
+
+def test_estimate_spreads_gemini_quota_over_keys():
+    result = simulate([user(f"u{i}") for i in range(9)], now=NOW, batch_size=1)
+    assert estimate(result, gemini_keys=4)['gemini_calls_per_key'] == 5
+
+
+def test_synthetic_users_are_reproducible():
+    first = synthetic_users(50, NOW)
+    assert first == synthetic_users(50, NOW)
+    assert len(first[0]) == 50
+    assert all(p['user_id'].startswith('00000000') for p in first[1])
+
+
+def test_fetch_snapshot_reads_every_page(fake_supabase, monkeypatch):
+    # More than one PostgREST page (USER_PAGE_SIZE), paused users included
+    users = [user(f"{i:05d}", pause_bot=i % 3 == 0) for i in range(1203)]
+    supabase = fake_supabase(user_settings=users, projects=[
+        {'user_id': '00001', 'status': 'in_progress'}, {'user_id': '00002', 'status': 'done'}])
+    monkeypatch.setattr(cron, 'create_supabase_client', lambda: supabase)
+    read, projects = fetch_snapshot()
+    assert [row['id'] for row in read] == [row['id'] for row in users]
+    assert projects == [{'user_id': '00001', 'status': 'in_progress'}]
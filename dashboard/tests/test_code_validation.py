@@ -0,0 +1,140 @@
+import pytest
+
+from utils.code_validation import (
+    validate_code, strip_fences, parse_enterprise_output, parse_leetcode_output, language_for_path,
+    enterprise_prefix_reason, fenced_prefix_reason, raw_code_prefix_reason, generate_validated,
+    EarlyAbort, PREFIX_CHECK_CHARS,
+)
+
+PYTHON = "def add(a, b):\n    return a + b\n"
+
+
+@pytest.mark.parametrize("code, language", [
+    (PYTHON, 'python'),
+    ('{"name": "demo", "items": [1, 2, 3]}', 'json'),
+    ("function f(x) {\n  return [x, (x + 1)];\n}\n", 'javascript'),
+    ("const s = '}'; // { not code\n/* ( */ let t = `)`;\n", 'javascript'),
+    ("fn longest<'a>(x: &'a str) -> &'a str {\n    x\n}\n", 'rust'),
+    ("def greet(name)\n  puts \"Hi #{name}\" # )\nend\n", 'ruby'),
+    # Valid shell that isn't bracket-balanced
+    ("#!/bin/bash\necho \"args: $#\"\necho done here\n", 'bash'),
+    ("case $1 in\n  start) run_it ;;\n  stop) halt_it ;;\nesac\n", 'bash'),
+    ("arr=(a b c)\necho \"${#arr[@]} items\"\n", 'shell'),
+    # A fence inside a string or comment isn't a stray fence
+    ('FENCE = "```"\nprint(FENCE)  # prints ```\n', 'python'),
+    ("SELECT name FROM users WHERE id IN (1, 2);", 'sql'),
+    # Comment syntax of the bracket-checked languages
+    ("-- 1) active users\nSELECT name FROM users WHERE active;\n", 'sql'),
+    ("SELECT 'it''s (' AS note /* ( */ FROM t;", 'sql'),
+    ("<?php\n# step 1) load\n// and [b\necho strlen('x');\n", 'php'),
+    ('val help = """\n  usage: run (options\n"""\nfun main() { println(help) }\n', 'kotlin'),
+    ("some text in a language we can't check", 'cobol'),
+], ids=[
+    'python', 'json', 'js', 'js-strings-comments', 'rust-lifetimes', 'ruby-comment',
+    'bash-argc', 'bash-case', 'bash-array-length', 'fence-in-string', 'sql',
+    'sql-line-comment', 'sql-quotes-block-comment', 'php-comments', 'kotlin-raw-string', 'unknown-language',
+])
+def test_valid_code(code, language):
+    assert validate_code(code, language) == (True, None)
+
+
+@pytest.mark.parametrize("code, language, reason", [
+    ("", 'python', "empty or too short"),
+    ("x = 1", 'python', "empty or too short"),
+    ("def broken(:\n    pass\n", 'python', "SyntaxError"),
+    ('{"name": "demo", "items": [1, 2}', 'json', "invalid JSON"),
+    ("function f(x) {\n  return x;\n", 'javascript', "unclosed '{'"),
+    ("function f(x) {\n  return x;\n}}\n", 'javascript', "unbalanced '}'"),
+    ("int main() { return 0; } /* never closed", 'c', "unterminated block comment"),
+    ("SELECT name FROM users WHERE id IN (1, 2;\n-- (closed here)\n", 'sql', "unclosed '('"),
+    ('let usage = """\nnever closed (\nfunc main() {}\n', 'swift', "unterminated string"),
+    ("print('a much longer line')\n```\n", 'python', "stray markdown fence"),
+    ("def f():\n    return 1\n  ```python\n", 'python', "stray markdown fence"),
+], ids=[
+    'empty', 'too-short', 'python-syntax', 'json', 'unclosed-brace', 'extra-brace',
+    'block-comment', 'sql-unclosed', 'unterminated-raw-string', 'fence-line', 'indented-fence-line',
+])
+def test_invalid_code(code, language, reason):
+    ok, message = validate_code(code, language)
+    assert not ok
+    assert reason in message
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("plain code", ("plain code", False, False)),
+    ("```python\nx = 1\n```", ("x = 1", True, True)),
+    ("Here you go:\n```python\nx = 1\n```\ntrailing", ("x = 1", True, True)),
+    ("```python\nx = 1\n", ("x = 1", True, False)),
+])
+def test_strip_fences(text, expected):
+    assert strip_fences(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("FILEPATH: src/app.ts\nCODE:\nconst a = 1;", ("src/app.ts", "const a = 1;", True)),
+    ("**FILEPATH: `src/app.ts`**\n**CODE:**\n```ts\nconst a = 1;\n```", ("src/app.ts", "const a = 1;", True)),
+    ("FILEPATH: src/app.ts\nCODE:\n```ts\nconst a = 1;", ("src/app.ts", "const a = 1;", False)),
+    ("CODE:\nconst a = 1;", (None, None, False)),
+    ("FILEPATH: src/app.ts\nno code label", (None, None, False)),
+])
+def test_parse_enterprise_output(text, expected):
+    assert parse_enterprise_output(text) == expected
+
+
+def test_parse_leetcode_output():
+    assert parse_leetcode_output("```python\nclass Solution:\n    pass\n```") == {
+        'code': "class Solution:\n    pass", 'closed': True}
+
+
+PADDING = "x" * PREFIX_CHECK_CHARS
+
+
+@pytest.mark.parametrize("check, text, rejected", [
+    (enterprise_prefix_reason, "FILEPATH: a.py\nCODE:\n", False),
+    (enterprise_prefix_reason, "FILEPATH: a.py\n", False),             # too early to tell
+    (enterprise_prefix_reason, "FILEPATH: \nCODE:\n", True),
+    (enterprise_prefix_reason, "Sure! " + PADDING, True),
+    (enterprise_prefix_reason, "FILEPATH: a.py\n" + PADDING, True),
+    (fenced_prefix_reason, "```python\n" + PADDING, False),
+    (fenced_prefix_reason, "short", False),
+    (fenced_prefix_reason, PADDING, True),
+    (raw_code_prefix_reason, "import os\n" + PADDING, False),
+    (raw_code_prefix_reason, "Sure, here is the code:\n```python\n" + PADDING, False),
+    (raw_code_prefix_reason, "Sure, here is the code:\n" + PADDING, True),
+])
+def test_prefix_checks(check, text, rejected):
+    assert (check(text) is not None) is rejected
+
+
+@pytest.mark.parametrize("path, language", [
+    ("src/App.TSX", 'typescript'),
+    ("scripts/run.sh", 'bash'),
+    ("Makefile", ''),
+    ("notes.unknownext", ''),
+])
+def test_language_for_path(path, language):
+    assert language_for_path(path) == language
+
+
+def test_generate_validated_regenerates_once_with_feedback():
+    responses = iter(["def broken(:\n    pass\n", PYTHON])
+    feedback = []
+    logs = []
+
+    def generate(reason):
+        feedback.append(reason)
+        return next(responses)
+
+    result, reason = generate_validated(generate, lambda raw: (raw, raw, 'python', True), logs, "Test")
+    assert (result, reason) == (PYTHON, None)
+    assert feedback[0] is None and "SyntaxError" in feedback[1]
+    assert len(logs) == 1 and "regenerating once" in logs[0]
+
+
+def test_generate_validated_counts_early_abort_as_off_format():
+    def generate(reason):
+        raise EarlyAbort("no code block", 400)
+
+    result, reason = generate_validated(generate, lambda raw: None, [], "Test")
+    assert result is None
+    assert reason.startswith("off-format")
@@ -0,0 +1,95 @@
+import types
+
+import pytest
+
+from utils import content_generator
+from utils.content_generator import parse_batch_response, generate_batch, prefetch_content, take_pooled_content
+
+PY = "def greet(name):\n    return f'Hello, {name}'\n"
+JS = "function greet(name) {\n  return `Hello, ${name}`;\n}\n"
+
+
+def item(job_id, code):
+    return f"=== ITEM {job_id} ===\n{code}\n=== END {job_id} ===\n"
+
+
+def jobs(*languages):
+    return [{'id': f"t{i}", 'language': language} for i, language in enumerate(languages)]
+
+
+@pytest.mark.parametrize("text, done, failed", [
+    (item('t0', PY) + item('t1', JS), ['t0', 't1'], []),
+    ("Here you go:\n" + item('t1', JS) + item('t0', PY), ['t0', 't1'], []),
+    (item('t0', f"```python\n{PY}```"), ['t0'], ['t1']),
+    (item('t0', f"```python\n{PY}") + item('t1', JS), ['t1'], ['t0']),               # unclosed fence
+    (item('t0', "def broken(:\n    pass\n") + item('t1', JS), ['t1'], ['t0']),      # invalid code
+    (item('t0', PY) + "=== ITEM t1 ===\nfunction cut() {", ['t0'], ['t1']),         # truncated
+    ("", [], ['t0', 't1']),
+])
+def test_parse_batch_response(text, done, failed):
+    results, missing = parse_batch_response(text, jobs('python', 'javascript'))
+    assert sorted(results) == done
+    assert [job['id'] for job in missing] == failed
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Fake batch requests: answers every task line with a valid item, except ids in `bad`."""
+    state = types.SimpleNamespace(requests=[], bad=set(), fail=0, errors=[])
+
+    def generate_text(template, api_key, model_name, **params):
+        assert template is content_generator.prompts.BATCH_ITEMS
+        ids = [line.split()[2].rstrip(':') for line in params['tasks'].splitlines()]
+        state.requests.append(ids)
+        if state.fail:
+            state.fail -= 1
+            raise RuntimeError("503 overloaded")
+        text = "".join(item(job_id, "x" if job_id in state.bad else PY) for job_id in ids)
+        state.bad = set()
+        return types.SimpleNamespace(text=text)
+
+    monkeypatch.setattr(content_generator, 'generate_text', generate_text)
+    monkeypatch.setattr(content_generator, 'get_next_api_key_and_model', lambda: ('key', 'model'))
+    monkeypatch.setattr(content_generator, 'note_api_error', lambda key, e: state.errors.append(str(e)))
+    monkeypatch.setattr(content_generator, '_content_pool', {})
+    return state
+
+
+def test_generate_batch_chunks_jobs(gemini):
+    results, stats = generate_batch(jobs(*['python'] * 7), max_items=3)
+    assert gemini.requests == [['t0', 't1', 't2'], ['t3', 't4', 't5'], ['t6']]
+    assert len(results) == 7
+    assert stats == {'requests': 3, 'items': 7, 'requeued': 0, 'failed': 0}
+
+
+def test_generate_batch_requeues_invalid_and_failed_items(gemini):
+    gemini.bad = {'t1'}
+    results, stats = generate_batch(jobs(*['python'] * 3), max_items=3)
+    assert gemini.requests == [['t0', 't1', 't2'], ['t1']]
+    assert sorted(results) == ['t0', 't1', 't2']
+    assert stats['requeued'] == 1
+
+    gemini.requests.clear()
+    gemini.fail = 5
+    results, stats = generate_batch(jobs('python', 'python'), max_items=5, max_rounds=2)
+    assert results == {}
+    assert stats == {'requests': 2, 'items': 2, 'requeued': 2, 'failed': 2}
+    assert gemini.errors == ["503 overloaded"] * 2
+
+
+def test_generate_batch_without_keys_sends_nothing(gemini, monkeypatch):
+    monkeypatch.setattr(content_generator, 'get_next_api_key_and_model', lambda: (None, None))
+    results, stats = generate_batch(jobs('python'), max_rounds=2)
+    assert gemini.requests == []
+    assert stats['failed'] == 1
+
+
+def test_prefetched_content_is_served_per_language(gemini, monkeypatch):
+    stats = prefetch_content(['python', 'Python', 'go'])
+    assert stats['items'] == 3 and stats['failed'] == 0
+    assert take_pooled_content('PYTHON') == PY.strip()
+    assert take_pooled_content('python') == PY.strip()
+    assert take_pooled_content('python') is None
+    # get_random_content serves the pool before any Gemini call
+    monkeypatch.setattr(content_generator, 'generate_creative_idea', lambda *args: pytest.fail("called Gemini"))
+    assert content_generator.get_random_content(language='go') == PY.strip()
@@ -0,0 +1,127 @@
+import datetime
+import types
+
+import pytest
+
+from utils import github_pool
+from utils.contribution_ledger import (
+    ledger_day, regular_repo_name, ledger_state, ledger_count, is_met, after_commit, record_observed,
+    needs_reconcile, reconcile_candidates, reconcile,
+)
+
+NOW = datetime.datetime(2026, 10, 19, 12, 0, tzinfo=datetime.timezone.utc)
+TODAY, YESTERDAY = '2026-10-19', '2026-10-18'
+
+
+def user(**fields):
+    row = {'id': 'u1', 'github_username': 'someone', 'github_access_token': 'token', 'repo_name': 'auto',
+           'min_contributions': 2, 'pause_bot': False}
+    row.update(fields)
+    return row
+
+
+@pytest.mark.parametrize("now, day", [
+    (datetime.datetime(2026, 10, 19, 18, 29, tzinfo=datetime.timezone.utc), datetime.date(2026, 10, 19)),
+    (datetime.datetime(2026, 10, 19, 18, 30, tzinfo=datetime.timezone.utc), datetime.date(2026, 10, 20)),
+])
+def test_ledger_day_is_the_ist_date(now, day):
+    assert ledger_day(now) == day
+
+
+@pytest.mark.parametrize("repo_name, sanitized", [
+    (None, 'auto-contributions'),
+    ('my repo_name', 'my-repo-name'),
+    ('  daily!! ', 'daily'),
+    ('!!!', 'auto-contributions'),
+])
+def test_regular_repo_name(repo_name, sanitized):
+    assert regular_repo_name({'repo_name': repo_name}) == sanitized
+
+
+@pytest.mark.parametrize("fields, state, count", [
+    ({}, (None, 0), 0),
+    ({'ledger_day': TODAY, 'ledger_count': 2}, (TODAY, 2), 2),
+    ({'ledger_day': YESTERDAY, 'ledger_count': 5}, (YESTERDAY, 5), 0),
+    ({'ledger_day': TODAY, 'ledger_count': 1, 'push_day': TODAY, 'push_count': 3}, (TODAY, 3), 3),
+    ({'ledger_day': YESTERDAY, 'ledger_count': 4, 'push_day': TODAY, 'push_count': 1}, (TODAY, 1), 1),
+    ({'ledger_day': TODAY, 'ledger_count': 2, 'push_day': YESTERDAY, 'push_count': 9}, (TODAY, 2), 2),
+])
+def test_ledger_state_and_count(fields, state, count):
+    assert ledger_state(user(**fields)) == state
+    assert ledger_count(user(**fields), NOW) == count
+
+
+@pytest.mark.parametrize("fields, met", [
+    ({'ledger_day': TODAY, 'ledger_count': 2}, True),
+    ({'ledger_day': TODAY, 'ledger_count': 1}, False),
+    ({'ledger_day': TODAY, 'ledger_count': 5, 'min_contributions': 0}, False),
+])
+def test_is_met(fields, met):
+    assert is_met(user(**fields), NOW) is met
+
+
+@pytest.mark.parametrize("fields, observed, count", [
+    ({}, 0, 1),
+    ({'ledger_day': TODAY, 'ledger_count': 3}, 1, 4),
+    ({'ledger_day': YESTERDAY, 'ledger_count': 3}, 1, 2),
+])
+def test_after_commit(fields, observed, count):
+    row = user(**fields)
+    assert after_commit(row, observed, NOW) == {'ledger_day': TODAY, 'ledger_count': count}
+    assert row['ledger_count'] == count
+
+
+def test_record_observed_writes_only_new_information(fake_supabase):
+    row = user(ledger_day=TODAY, ledger_count=2)
+    supabase = fake_supabase(user_settings=[row])
+    assert not record_observed(supabase, row, 2, NOW)
+    assert supabase.writes == []
+    assert record_observed(supabase, row, 3, NOW)
+    assert supabase.tables['user_settings'][0]['ledger_count'] == 3
+    assert row['ledger_checked_at'] == NOW.isoformat()
+
+
+@pytest.mark.parametrize("fields, needed", [
+    ({'ledger_day': TODAY, 'ledger_count': 2}, True),
+    ({'ledger_day': TODAY, 'ledger_count': 2, 'ledger_checked_at': '2026-10-19T10:00:00+00:00'}, False),
+    ({'ledger_day': TODAY, 'ledger_count': 2, 'ledger_checked_at': '2026-10-19T05:00:00Z'}, True),
+    ({'ledger_day': TODAY, 'ledger_count': 1}, False),
+    ({'ledger_day': TODAY, 'ledger_count': 2, 'github_access_token': None}, False),
+])
+def test_needs_reconcile(fields, needed):
+    assert needs_reconcile(user(**fields), NOW) is needed
+
+
+def test_reconcile_candidates_are_todays_ledgers(fake_supabase):
+    supabase = fake_supabase(user_settings=[
+        user(id='a', ledger_day=TODAY),
+        user(id='b', push_day=TODAY),
+        user(id='c', ledger_day=YESTERDAY),
+        user(id='d', ledger_day=TODAY, pause_bot=True),
+    ])
+    assert [row['id'] for row in reconcile_candidates(supabase, NOW)] == ['a', 'b']
+
+
+def test_reconcile_stores_the_real_count(fake_supabase, monkeypatch):
+    counts = {'someone/auto': 1, 'other/auto': 2}
+    repos = []
+
+    def get_repo(full_name):
+        repos.append(full_name)
+        if full_name not in counts:
+            raise RuntimeError("404 Not Found")
+        return types.SimpleNamespace(get_commits=lambda since: types.SimpleNamespace(totalCount=counts[full_name]))
+
+    monkeypatch.setattr(github_pool, 'github_client', lambda token: types.SimpleNamespace(get_repo=get_repo))
+    rows = [
+        user(id='a', ledger_day=TODAY, ledger_count=2),                             # force-pushed away
+        user(id='b', github_username='other', push_day=TODAY, push_count=2),        # confirmed
+        user(id='c', github_username='gone', ledger_day=TODAY, ledger_count=2),     # repo deleted
+        user(id='d', ledger_day=TODAY, ledger_count=1),                             # not met: skipped
+    ]
+    supabase = fake_supabase(user_settings=rows)
+    assert reconcile(supabase, rows, NOW) == {'checked': 2, 'corrected': 1, 'errors': 1}
+    assert repos == ['someone/auto', 'other/auto', 'gone/auto']
+    stored = {row['id']: row for row in supabase.tables['user_settings']}
+    assert (stored['a']['ledger_count'], stored['a']['push_count']) == (1, 1)
+    assert not is_met(rows[0], NOW)
@@ -0,0 +1,82 @@
+"""process_user against in-memory Supabase and GitHub fakes."""
+
+import pytest
+
+from api import cron
+from utils.decision_engine import RESET, REGULAR, LEETCODE, ENTERPRISE
+
+
+class StatusError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(f"{status} {message}")
+        self.status = status
+
+
+class FakeGithub:
+    def __init__(self, create_error=None):
+        self.repos = []
+        self.created = []
+        self.create_error = create_error
+
+    def get_repo(self, full_name):
+        self.repos.append(full_name)
+        raise StatusError(404, "Not Found")
+
+    def create_repo(self, name, **kwargs):
+        if self.create_error:
+            raise self.create_error
+        self.created.append(name)
+        return object()
+
+
+@pytest.fixture
+def github(monkeypatch):
+    fakes = {}
+    discarded = []
+
+    def install(fake):
+        fakes['github'] = fake
+        return fake
+
+    monkeypatch.setattr(cron, 'github_client', lambda token: fakes['github'])
+    monkeypatch.setattr(cron, 'github_user', lambda token: fakes['github'])
+    monkeypatch.setattr(cron, 'discard_client', discarded.append)
+    install.discarded = discarded
+    return install
+
+
+def user(**fields):
+    row = {'id': 'u1', 'github_username': 'someone', 'github_access_token': 'token', 'plan_type': 'free',
+           'repo_name': 'auto', 'leetcode_daily_count': 0, 'daily_commit_count': 0, 'min_contributions': 1}
+    row.update(fields)
+    return row
+
+
+@pytest.mark.parametrize("error, discarded, failure_class", [
+    (StatusError(401, "Bad credentials"), ['token'], 'auth'),
+    (StatusError(403, "Resource not accessible"), [], 'regular_repo'),
+    (StatusError(503), [], None),
+])
+def test_auth_failures_drop_the_pooled_client(fake_supabase, github, error, discarded, failure_class):
+    github(FakeGithub(create_error=error))
+    supabase = fake_supabase(user_settings=[user()], projects=[])
+    logs = []
+    cron.process_user(supabase, user(), logs, RESET | REGULAR)
+    assert github.discarded == discarded
+    assert supabase.tables['user_settings'][0].get('failure_class') == failure_class
+    assert any("Failed to create repository" in line for line in logs)
+
+
+@pytest.mark.parametrize("actions, runs_leetcode", [
+    (ENTERPRISE, False),
+    (ENTERPRISE | LEETCODE, True),
+])
+def test_leetcode_stage_follows_the_plan(fake_supabase, github, actions, runs_leetcode):
+    fake = github(FakeGithub())
+    row = user(plan_type='leetcode', leetcode_repo='LC')
+    logs = []
+    cron.process_user(fake_supabase(projects=[], user_settings=[dict(row)]), row, logs, actions)
+    assert ('someone/LC' in fake.repos) is runs_leetcode
+    assert (fake.created == ['LC']) is runs_leetcode
+    assert any("LeetCode Plan: Processing" in line for line in logs) is runs_leetcode
+    assert any("LC created. Skipping content" in line for line in logs) is runs_leetcode
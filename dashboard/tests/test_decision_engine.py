@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+
+from utils.decision_engine import (
+    UserColumns, decide_batch, decide_user, summarize,
+    RESET, REGULAR, LEETCODE, ENTERPRISE, NO_TOKEN, SKIP_WEEKLY, SKIP_PRO_DAILY,
+    SKIP_LEETCODE, SKIP_LEDGER, SKIP_BACKOFF,
+)
+from utils.decisions import OWNER_USERNAME, LEETCODE_DAILY_MAX
+from utils.failure_backoff import settings_fingerprint
+
+NOW = datetime.datetime(2026, 10, 19, 12, 0, tzinfo=datetime.timezone.utc)
+TODAY = '2026-10-19'        # IST ledger day of NOW
+EARLIER_TODAY = '2026-10-19T08:00:00+00:00'
+TWO_DAYS_AGO = '2026-10-17T08:00:00+00:00'
+LONG_AGO = '2026-10-01T08:00:00+00:00'
+
+
+def user(**fields):
+    row = {
+        'id': 'u1', 'github_username': 'someone', 'github_access_token': 'token',
+        'plan_type': 'free', 'min_contributions': 1, 'daily_commit_count': 0,
+        'leetcode_daily_count': 0, 'last_commit_ts': LONG_AGO,
+    }
+    row.update(fields)
+    return row
+
+
+def in_backoff(row, failure_class):
+    row.update(failure_class=failure_class, failure_until='2026-10-20T00:00:00+00:00',
+               failure_fingerprint=settings_fingerprint(row))
+    return row
+
+
+@pytest.mark.parametrize("row, expected", [
+    (user(github_access_token=None), NO_TOKEN),
+    (user(), RESET | REGULAR),
+    (user(last_commit_ts=None), REGULAR),
+    (user(min_contributions=0), RESET),
+    # Weekly rule for free, LeetCode and enterprise plans
+    (user(last_commit_ts=TWO_DAYS_AGO), RESET | SKIP_WEEKLY),
+    (user(plan_type='enterprise', last_commit_ts=TWO_DAYS_AGO), RESET | SKIP_WEEKLY | ENTERPRISE),
+    # Pro: once a day
+    (user(plan_type='pro', last_commit_ts=EARLIER_TODAY, daily_commit_count=1), SKIP_PRO_DAILY),
+    (user(plan_type='pro', last_commit_ts=TWO_DAYS_AGO, daily_commit_count=1), RESET | REGULAR),
+    # A met ledger decides without GitHub
+    (user(ledger_day=TODAY, ledger_count=1), RESET | SKIP_LEDGER),
+    (user(ledger_day='2026-10-18', ledger_count=5), RESET | REGULAR),
+    (user(push_day=TODAY, push_count=2, min_contributions=2), RESET | SKIP_LEDGER),
+], ids=[
+    'no-token', 'free-due', 'never-committed', 'no-target', 'free-weekly', 'enterprise-weekly',
+    'pro-daily', 'pro-new-day', 'ledger-met', 'ledger-stale', 'push-count-met',
+])
+def test_regular_and_plan_rules(row, expected):
+    assert decide_user(row, NOW) == expected
+
+
+@pytest.mark.parametrize("row, expected", [
+    (user(plan_type='leetcode', leetcode_repo='LC'), RESET | REGULAR | LEETCODE),
+    # No LeetCode repo: no LeetCode stage, and the weekly rule applies to regular commits
+    (user(plan_type='leetcode', last_commit_ts=TWO_DAYS_AGO), RESET | SKIP_WEEKLY),
+    (user(plan_type='leetcode', leetcode_repo='LC', last_commit_ts=EARLIER_TODAY,
+          leetcode_daily_count=LEETCODE_DAILY_MAX), REGULAR | SKIP_LEETCODE),
+    # The counter from yesterday is reset first
+    (user(plan_type='leetcode', leetcode_repo='LC', leetcode_daily_count=LEETCODE_DAILY_MAX),
+     RESET | REGULAR | LEETCODE),
+    # Other plans never get the LeetCode stage
+    (user(plan_type='pro', leetcode_repo='LC'), RESET | REGULAR),
+    # The owner is not limited
+    (user(github_username=OWNER_USERNAME, plan_type='free', leetcode_repo='LC', last_commit_ts=EARLIER_TODAY,
+          leetcode_daily_count=LEETCODE_DAILY_MAX + 5, min_contributions=0), LEETCODE | ENTERPRISE),
+    # A LeetCode repo in backoff only masks the LeetCode stage
+    (in_backoff(user(plan_type='leetcode', leetcode_repo='LC'), 'leetcode_repo'),
+     RESET | REGULAR | SKIP_BACKOFF),
+    (in_backoff(user(plan_type='leetcode', leetcode_repo='LC'), 'auth'), RESET | SKIP_BACKOFF),
+], ids=[
+    'leetcode-due', 'leetcode-no-repo', 'leetcode-limit', 'leetcode-new-day', 'pro-no-leetcode',
+    'owner-unlimited', 'leetcode-backoff', 'auth-backoff',
+])
+def test_leetcode_gating(row, expected):
+    assert decide_user(row, NOW) == expected
+
+
+def test_backoff_lifts_when_settings_change():
+    row = in_backoff(user(plan_type='leetcode', leetcode_repo='LC'), 'leetcode_repo')
+    row['leetcode_repo'] = 'LeetCode-Solutions'
+    assert decide_user(row, NOW) == RESET | REGULAR | LEETCODE
+
+
+def test_backoff_ends():
+    row = in_backoff(user(plan_type='leetcode', leetcode_repo='LC'), 'leetcode_repo')
+    later = datetime.datetime(2026, 10, 20, 1, 0, tzinfo=datetime.timezone.utc)
+    assert decide_user(row, later) & LEETCODE
+
+
+@pytest.mark.parametrize("project, expected", [
+    (None, RESET),
+    ({'current_day': 3, 'days_duration': 15}, RESET | ENTERPRISE),
+    ({'current_day': 15, 'days_duration': 15}, RESET),
+    # Both columns are nullable: NULL reads as day 0 of a 15-day project
+    ({'current_day': None, 'days_duration': 15}, RESET | ENTERPRISE),
+    ({'current_day': 3, 'days_duration': None}, RESET | ENTERPRISE),
+    ({'current_day': 15, 'days_duration': None}, RESET),
+], ids=['no-project', 'days-left', 'finished', 'null-current-day', 'null-duration', 'null-duration-finished'])
+def test_enterprise_needs_a_project_with_days_left(project, expected):
+    row = user(plan_type='enterprise', min_contributions=0)
+    projects = {row['id']: project} if project else {}
+    assert decide_batch(UserColumns.from_rows([row]), NOW, projects)[0] == expected
+
+
+def test_batch_matches_single_decisions():
+    rows = [
+        user(id='a'),
+        user(id='b', github_access_token=None),
+        user(id='c', plan_type='leetcode', leetcode_repo='LC'),
+        user(id='d', plan_type='pro', last_commit_ts=EARLIER_TODAY, daily_commit_count=1),
+    ]
+    assert list(decide_batch(UserColumns.from_rows(rows), NOW)) == [decide_user(row, NOW) for row in rows]
+
+
+def test_summarize():
+    counts = summarize([RESET | REGULAR, NO_TOKEN, RESET | SKIP_WEEKLY, REGULAR | LEETCODE])
+    assert counts['regular'] == 2
+    assert counts['leetcode'] == 1
+    assert counts['no_token'] == 1
+    assert counts['reset'] == 2
+    assert counts['idle'] == 2
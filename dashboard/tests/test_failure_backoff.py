@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+from utils import failure_backoff
+from utils.failure_backoff import (
+    classify, backoff_delay, backoff_record, record_failure, clear_failure, settings_fingerprint,
+)
+
+NOW = datetime.datetime(2026, 10, 19, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+class StatusError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(f"{status} {message}")
+        self.status = status
+
+
+@pytest.mark.parametrize("error, stage, failure_class", [
+    (StatusError(401), 'regular', 'auth'),
+    (Exception("Bad credentials"), 'leetcode', 'auth'),
+    (StatusError(404, "Not Found"), 'regular', 'regular_repo'),
+    (StatusError(410), 'enterprise', 'enterprise_repo'),
+    (StatusError(403, "Resource not accessible"), 'leetcode', 'leetcode_repo'),
+    (StatusError(403, "API rate limit exceeded"), 'regular', None),
+    # create_file's "path already exists" - a one-off collision, not a broken repo
+    (StatusError(422, "sha wasn't supplied"), 'leetcode', None),
+    (StatusError(500), 'regular', None),
+    (TimeoutError("timed out"), 'regular', None),
+])
+def test_classify(error, stage, failure_class):
+    assert classify(error, stage) == failure_class
+
+
+@pytest.mark.parametrize("failure_class, failures, minutes", [
+    ('regular_repo', 1, 30),
+    ('regular_repo', 2, 60),
+    ('regular_repo', 4, 240),
+    ('regular_repo', 10, 24 * 60),
+    ('auth', 10, 7 * 24 * 60),
+    ('auth', 1000, 7 * 24 * 60),
+])
+def test_backoff_delay(failure_class, failures, minutes, monkeypatch):
+    monkeypatch.setattr(failure_backoff, 'BACKOFF_BASE_MINUTES', 30.0)
+    assert backoff_delay(failure_class, failures) == datetime.timedelta(minutes=minutes)
+
+
+def user(**fields):
+    row = {'id': 'u1', 'github_access_token': 'token', 'github_username': 'someone',
+           'repo_name': 'auto', 'leetcode_repo': 'LC', 'plan_type': 'leetcode'}
+    row.update(fields)
+    return row
+
+
+def test_backoff_record_requires_a_matching_fingerprint():
+    row = user(failure_class='auth', failure_until='2026-10-20T00:00:00+00:00')
+    row['failure_fingerprint'] = settings_fingerprint(row)
+    assert backoff_record(row)[0] == 'auth'
+    row['github_access_token'] = 'new token'
+    assert backoff_record(row) == (None, float('-inf'))
+
+
+def test_record_failure_extends_the_same_class(fake_supabase):
+    row = user()
+    supabase = fake_supabase(user_settings=[row])
+    first = record_failure(supabase, row, 'leetcode', StatusError(404), NOW)
+    second = record_failure(supabase, row, 'leetcode', StatusError(404), NOW)
+    assert first[0] == second[0] == 'leetcode_repo'
+    assert second[1] - NOW == 2 * (first[1] - NOW)
+    assert row['failure_count'] == 2
+    assert supabase.tables['user_settings'][0]['failure_count'] == 2
+
+
+def test_record_failure_ignores_transient_errors(fake_supabase):
+    supabase = fake_supabase(user_settings=[user()])
+    assert record_failure(supabase, user(), 'regular', StatusError(503), NOW) is None
+    assert supabase.writes == []
+
+
+@pytest.mark.parametrize("failure_class, stage, cleared", [
+    ('leetcode_repo', 'leetcode', True),
+    ('auth', 'regular', True),
+    ('leetcode_repo', 'regular', False),
+    (None, 'regular', False),
+])
+def test_clear_failure(fake_supabase, failure_class, stage, cleared):
+    row = user(failure_class=failure_class)
+    supabase = fake_supabase(user_settings=[row])
+    assert clear_failure(supabase, row, stage) is cleared
+    assert (row['failure_class'] is None) is (cleared or failure_class is None)
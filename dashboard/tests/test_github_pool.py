@@ -0,0 +1,70 @@
+import pytest
+
+from utils import github_pool
+from utils.github_pool import GithubPool
+
+
+class FakeGithub:
+    instances = []
+
+    def __init__(self, auth=None):
+        self.auth = auth
+        self.closed = False
+        self.user_lookups = 0
+        FakeGithub.instances.append(self)
+
+    def get_user(self):
+        self.user_lookups += 1
+        return ('user', self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_github(monkeypatch):
+    FakeGithub.instances = []
+    monkeypatch.setattr(github_pool, 'Github', FakeGithub)
+    monkeypatch.setattr(github_pool, 'GITHUB_TRANSPORT', 'requests')
+    monkeypatch.setattr(github_pool, 'limit_github_requester', lambda requester: None)
+    monkeypatch.setattr(FakeGithub, '_Github__requester', None, raising=False)
+
+
+def test_one_client_per_token():
+    pool = GithubPool()
+    first = pool.client('token-a')
+    assert pool.client('token-a') is first
+    assert pool.client('token-b') is not first
+    assert pool.stats() == {'size': 2, 'hits': 1, 'misses': 2, 'evictions': 0}
+
+
+def test_lru_eviction_closes_the_oldest_client():
+    pool = GithubPool(max_size=2)
+    a, b = pool.client('a'), pool.client('b')
+    pool.client('a')                    # b is now least recently used
+    pool.client('c')
+    assert b.closed and not a.closed
+    assert pool.client('a') is a
+    assert pool.stats()['evictions'] == 1
+
+
+def test_authenticated_user_is_cached_per_token():
+    pool = GithubPool()
+    assert pool.user('a') is pool.user('a')
+    assert pool.client('a').user_lookups == 1
+
+
+def test_discard_closes_and_forgets_the_token():
+    pool = GithubPool()
+    client = pool.client('a')
+    pool.discard('a')
+    pool.discard('unknown')
+    assert client.closed
+    assert pool.client('a') is not client
+
+
+def test_tokens_are_not_kept_in_the_clear():
+    pool = GithubPool()
+    pool.client('ghp_secret')
+    assert 'ghp_secret' not in pool._entries
+    assert all('ghp_secret' not in key for key in pool._entries)
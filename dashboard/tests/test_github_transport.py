@@ -0,0 +1,98 @@
+import base64
+import datetime
+import json
+
+import httpx
+import pytest
+
+from utils.github_transport import Http2Github, GitHubError, API_URL
+
+REPO = {'full_name': 'someone/auto', 'name': 'auto', 'private': True, 'default_branch': 'main'}
+
+
+@pytest.fixture
+def github():
+    requests = []
+    responses = {}
+
+    def handle(request):
+        requests.append(request)
+        status, body, headers = responses.get((request.method, request.url.raw_path.decode().split('?')[0]),
+                                              (404, {'message': 'Not Found'}, {}))
+        return httpx.Response(status, json=body, headers=headers)
+
+    client = httpx.Client(base_url=API_URL, transport=httpx.MockTransport(handle))
+    gh = Http2Github('token', client=client)
+    gh.requests = requests
+    gh.responses = responses
+    yield gh
+    client.close()
+
+
+def test_token_travels_per_request(github):
+    github.responses[('GET', '/repos/someone/auto')] = (200, REPO, {})
+    repo = github.get_repo('someone/auto')
+    assert (repo.full_name, repo.private, repo.default_branch) == ('someone/auto', True, 'main')
+    assert github.requests[0].headers['Authorization'] == 'token token'
+
+
+def test_errors_carry_the_status(github):
+    with pytest.raises(GitHubError) as excinfo:
+        github.get_repo('someone/missing')
+    assert excinfo.value.status == 404
+    assert str(excinfo.value) == "404 Not Found"
+
+
+def test_commit_count_from_the_last_page_link(github):
+    github.responses[('GET', '/repos/someone/auto')] = (200, REPO, {})
+    github.responses[('GET', '/repos/someone/auto/commits')] = (200, [{'sha': 'a'}], {
+        'link': '<https://api.github.com/repositories/1/commits?since=x&per_page=1&page=2>; rel="next", '
+                '<https://api.github.com/repositories/1/commits?since=x&per_page=1&page=7>; rel="last"'})
+    since = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+    assert github.get_repo('someone/auto').get_commits(since=since).totalCount == 7
+    assert github.requests[-1].url.params['per_page'] == '1'
+    assert github.requests[-1].url.params['since'] == since.isoformat()
+
+
+def test_commit_count_without_link_header(github):
+    github.responses[('GET', '/repos/someone/auto')] = (200, REPO, {})
+    github.responses[('GET', '/repos/someone/auto/commits')] = (200, [{'sha': 'a'}], {})
+    assert github.get_repo('someone/auto').get_commits().totalCount == 1
+
+
+def test_create_file_quotes_the_path(github):
+    github.responses[('GET', '/repos/someone/auto')] = (200, REPO, {})
+    path = '/Easy/1_two sum#2?.py'
+    github.responses[('PUT', '/repos/someone/auto/contents/Easy/1_two%20sum%232%3F.py')] = (201, {'content': {}}, {})
+    github.get_repo('someone/auto').create_file(path, "Solve: 1. Two Sum", "print('hi')", branch='main')
+    body = json.loads(github.requests[-1].content)
+    assert base64.b64decode(body['content']) == b"print('hi')"
+    assert (body['message'], body['branch']) == ("Solve: 1. Two Sum", 'main')
+
+
+def test_get_contents_lists_directories(github):
+    github.responses[('GET', '/repos/someone/auto')] = (200, REPO, {})
+    github.responses[('GET', '/repos/someone/auto/contents/C%23%20notes')] = (200, [
+        {'type': 'file', 'name': '4_median.py', 'path': 'C# notes/4_median.py', 'sha': 's', 'size': 10},
+        {'type': 'dir', 'name': 'old', 'path': 'C# notes/old', 'sha': 't'},
+    ], {})
+    entries = github.get_repo('someone/auto').get_contents('C# notes', ref='main')
+    assert [(e.type, e.path, e.size) for e in entries] == [('file', 'C# notes/4_median.py', 10),
+                                                            ('dir', 'C# notes/old', 0)]
+    assert github.requests[-1].url.params['ref'] == 'main'
+
+
+def test_git_tree_and_create_repo(github):
+    github.responses[('GET', '/repos/someone/auto')] = (200, REPO, {})
+    github.responses[('GET', '/repos/someone/auto/git/trees/main')] = (200, {
+        'sha': 'root', 'truncated': False, 'tree': [{'path': 'Easy/1.py', 'type': 'blob', 'sha': 'b', 'size': 3}]}, {})
+    github.responses[('GET', '/user')] = (200, {'login': 'someone'}, {})
+    github.responses[('POST', '/user/repos')] = (201, dict(REPO, name='LC', full_name='someone/LC'), {})
+
+    tree = github.get_repo('someone/auto').get_git_tree('main', recursive=True)
+    assert [entry.path for entry in tree.tree] == ['Easy/1.py']
+    assert github.requests[-1].url.params['recursive'] == '1'
+    user = github.get_user()
+    assert user.login == 'someone'
+    assert user.create_repo('LC', private=True).full_name == 'someone/LC'
+    assert json.loads(github.requests[-1].content)['private'] is True
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from utils import hedging
+from utils.hedging import hedged_call, percentile, Cancel, AttemptCancelled
+
+
+@pytest.fixture(autouse=True)
+def fast_hedges(monkeypatch):
+    monkeypatch.setattr(hedging, 'HEDGE_DEFAULT_DELAY', 0.05)
+    monkeypatch.setattr(hedging, '_recent', {})
+    hedging.reset_latency()
+    yield
+    hedging.reset_latency()
+
+
+@pytest.mark.parametrize("values, pct, expected", [
+    ([], 50, None),
+    ([5], 99, 5),
+    ([1, 2, 3, 4], 50, 2),
+    ([1, 2, 3, 4], 100, 4),
+    (list(range(1, 21)), 50, 10),
+])
+def test_percentile(values, pct, expected):
+    assert percentile(values, pct) == expected
+
+
+def test_disabled_runs_only_the_primary():
+    calls = []
+
+    def call(key, model, cancel):
+        calls.append((key, cancel))
+        return key
+
+    assert hedged_call('t', call, ('k1', 'm'), lambda: ('k2', 'm'), enabled=False) == 'k1'
+    assert calls == [('k1', None)]
+
+
+def test_fast_primary_sends_no_hedge():
+    alternates = []
+    result = hedged_call('t', lambda key, model, cancel: key, ('k1', 'm'),
+                         lambda: alternates.append(1) or ('k2', 'm'), enabled=True)
+    assert result == 'k1'
+    assert alternates == []
+
+
+def test_slow_primary_is_cancelled_when_the_hedge_wins():
+    primary_cancel = {}
+
+    def call(key, model, cancel):
+        if key == 'slow':
+            primary_cancel['cancel'] = cancel
+            stopped = threading.Event()
+            cancel.on_cancel(stopped.set)
+            stopped.wait(5)
+            raise AttemptCancelled(0)
+        return 'hedge result'
+
+    assert hedged_call('t', call, ('slow', 'm'), lambda: ('fast', 'm'), enabled=True) == 'hedge result'
+    assert primary_cancel['cancel'].cancelled
+    assert any('1 won' in line for line in hedging.latency_report())
+
+
+def test_invalid_primary_result_lets_the_hedge_win():
+    release = threading.Event()
+
+    def call(key, model, cancel):
+        if key == 'k1':
+            release.wait(5)
+            return ''
+        release.set()
+        return 'text'
+
+    assert hedged_call('t', call, ('k1', 'm'), lambda: ('k2', 'm'), valid=bool, enabled=True) == 'text'
+
+
+def test_primary_error_is_raised_when_nothing_wins():
+    def call(key, model, cancel):
+        raise RuntimeError(f"{key} failed")
+
+    with pytest.raises(RuntimeError, match="k1 failed"):
+        hedged_call('t', call, ('k1', 'm'), lambda: (None, None), enabled=True)
+
+
+def test_hedge_errors_go_to_on_error():
+    errors = []
+    release = threading.Event()
+
+    def call(key, model, cancel):
+        if key == 'k2':
+            release.set()
+            raise RuntimeError("hedge failed")
+        release.wait(5)
+        return ''
+
+    with pytest.raises(ValueError, match="no valid Gemini response"):
+        hedged_call('t', call, ('k1', 'm'), lambda: ('k2', 'm'), valid=bool,
+                    on_error=lambda key, error: errors.append(key), enabled=True)
+    assert errors == ['k2']
+
+
+def test_cancel_runs_stops_once_and_late_registrations_at_once():
+    cancel = Cancel()
+    stops = []
+    cancel.on_cancel(lambda: stops.append('early'))
+    cancel.cancel()
+    cancel.cancel()
+    cancel.on_cancel(lambda: stops.append('late'))
+    assert stops == ['early', 'late']
@@ -0,0 +1,64 @@
+import pytest
+
+from utils.history_compaction import HashSketch, merge, seen_before
+
+
+def test_sketch_has_no_false_negatives_as_it_grows():
+    sketch = HashSketch(capacity=16)
+    hashes = [f"hash-{i}" for i in range(200)]
+    for content_hash in hashes:
+        sketch.add(content_hash)
+    assert len(sketch.stages) > 1
+    assert all(content_hash in sketch for content_hash in hashes)
+    assert len(sketch) <= 200
+
+
+def test_sketch_false_positive_rate_stays_low():
+    sketch = HashSketch()
+    for i in range(500):
+        sketch.add(f"seen-{i}")
+    false_positives = sum(f"unseen-{i}" in sketch for i in range(5000))
+    assert false_positives < 25
+
+
+def test_sketch_roundtrip():
+    sketch = HashSketch(capacity=8)
+    for i in range(20):
+        sketch.add(f"h{i}")
+    loaded = HashSketch.loads(sketch.dumps())
+    assert loaded.dumps() == sketch.dumps()
+    assert all(f"h{i}" in loaded for i in range(20))
+    assert 'other' not in HashSketch.loads(None)
+
+
+def test_merge_folds_rows_into_summaries():
+    summaries = {'a': {'user_id': 'a', 'rows_compacted': 2, 'first_at': '2026-08-10T00:00:00+00:00',
+                       'last_at': '2026-08-20T00:00:00+00:00', 'languages': {'go': 2}, 'hash_sketch': None}}
+    rows = [
+        {'user_id': 'a', 'language': 'Go', 'content_hash': 'x1', 'created_at': '2026-08-01T00:00:00+00:00'},
+        {'user_id': 'b', 'language': None, 'content_hash': 'y1', 'created_at': '2026-09-01T00:00:00+00:00'},
+        {'user_id': 'b', 'language': 'rust', 'content_hash': None, 'created_at': '2026-09-03T00:00:00+00:00'},
+        {'user_id': None, 'language': 'go', 'content_hash': 'z', 'created_at': '2026-09-01T00:00:00+00:00'},
+    ]
+    merged = {row['user_id']: row for row in merge(summaries, rows)}
+    assert set(merged) == {'a', 'b'}
+    assert merged['a']['rows_compacted'] == 3
+    assert merged['a']['first_at'] == '2026-08-01T00:00:00+00:00'
+    assert merged['a']['last_at'] == '2026-08-20T00:00:00+00:00'
+    assert merged['a']['languages'] == {'go': 3}
+    assert merged['b']['languages'] == {'unknown': 1, 'rust': 1}
+    assert summaries['b'] is not None
+
+
+@pytest.mark.parametrize("summary, content_hash, seen", [
+    (None, 'x1', False),
+    ({'hash_sketch': None}, 'x1', False),
+    ('sketch', 'x1', True),
+    ('sketch', 'never-added', False),
+])
+def test_seen_before(summary, content_hash, seen):
+    if summary == 'sketch':
+        summaries = {}
+        merge(summaries, [{'user_id': 'a', 'content_hash': 'x1', 'created_at': '2026-08-01T00:00:00+00:00'}])
+        summary = summaries['a']
+    assert seen_before(summary, content_hash) is seen
@@ -0,0 +1,75 @@
+import json
+import random
+
+import pytest
+
+from utils.leetcode_catalog import Catalog, CatalogError, build, load_questions, problem_url, get_catalog
+
+QUESTIONS = [
+    {'frontendQuestionId': '1', 'title': 'Two Sum', 'titleSlug': 'two-sum', 'difficulty': 'EASY',
+     'paidOnly': False, 'topicTags': [{'name': 'Array'}, {'name': 'Hash Table'}]},
+    {'frontendQuestionId': '4', 'title': 'Median of Two Sorted Arrays', 'titleSlug': 'median-of-two-sorted-arrays',
+     'difficulty': 'Hard', 'paidOnly': False, 'topicTags': [{'name': 'Array'}, {'name': 'Binary Search'}]},
+    {'frontendQuestionId': '156', 'title': 'Binary Tree Upside Down', 'titleSlug': 'binary-tree-upside-down',
+     'difficulty': 'Medium', 'paidOnly': True, 'topicTags': [{'name': 'Tree'}]},
+    {'id': 7, 'title': 'Reverse Integer', 'slug': 'reverse-integer', 'difficulty': 'Medium',
+     'premium': False, 'tags': ['Math']},
+]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / 'catalog.bin'
+    path.write_bytes(build(QUESTIONS))
+    return Catalog(str(path))
+
+
+def test_lookup_by_id(catalog):
+    problem = catalog.get(1)
+    assert (problem.id, problem.slug, problem.title, problem.difficulty, problem.tags, problem.premium) == (
+        1, 'two-sum', 'Two Sum', 'Easy', ('Array', 'Hash Table'), False)
+    assert catalog.get(156).premium
+    assert catalog.get(7).tags == ('Math',)
+    assert problem_url(problem) == "https://leetcode.com/problems/two-sum/"
+
+
+@pytest.mark.parametrize("problem_id", [0, 2, 157, 10 ** 6, -1])
+def test_unknown_ids(catalog, problem_id):
+    assert catalog.get(problem_id) is None
+    assert problem_id not in catalog
+
+
+def test_free_ids_exclude_premium(catalog):
+    assert {d: list(catalog.free_ids(d)) for d in ('Easy', 'Medium', 'Hard')} == {
+        'Easy': [1], 'Medium': [7], 'Hard': [4]}
+    assert catalog.stats() == {'Easy': 1, 'Medium': 1, 'Hard': 1}
+
+
+def test_pick_skips_excluded_and_premium(catalog):
+    rng = random.Random(0)
+    picked = {catalog.pick(exclude={4}, rng=rng).id for _ in range(50)}
+    assert picked == {1, 7}
+    assert catalog.pick(difficulty='Hard', rng=rng).id == 4
+    assert catalog.pick(exclude={1, 4, 7}, rng=rng) is None
+    assert catalog.pick(exclude={4}, difficulty='Hard', rng=rng) is None
+
+
+def test_load_questions_from_graphql_response(tmp_path):
+    path = tmp_path / 'questions.json'
+    path.write_text(json.dumps({'data': {'problemsetQuestionList': {'total': 1, 'questions': QUESTIONS[:1]}}}))
+    assert load_questions(str(path)) == QUESTIONS[:1]
+
+
+def test_rejects_missing_or_foreign_files(tmp_path):
+    with pytest.raises(CatalogError, match="not found"):
+        Catalog(str(tmp_path / 'missing.bin'))
+    foreign = tmp_path / 'foreign.bin'
+    foreign.write_bytes(b'\0' * 128)
+    with pytest.raises(CatalogError, match="not a LeetCode catalog"):
+        Catalog(str(foreign))
+
+
+def test_bundled_catalog():
+    catalog = get_catalog()
+    assert catalog.get(1).slug == 'two-sum'
+    assert all(not catalog.get(pid).premium for pid in catalog.free_ids('Medium')[:50])
@@ -0,0 +1,102 @@
+import hashlib
+
+import pytest
+
+from utils import content_generator
+from utils.code_validation import validate_code
+from utils.history_compaction import HashSketch
+from utils.leetcode_catalog import lookup
+from utils.offline_generator import OfflineGenerator, OFFLINE_LANGUAGES, LANGUAGE_ALIASES, LEETCODE_BANK, leetcode_solution
+
+
+@pytest.mark.parametrize("language", OFFLINE_LANGUAGES)
+def test_every_language_passes_validation(language):
+    generator = OfflineGenerator(seed=1)
+    for _ in range(10):
+        content = generator.generate(language)
+        assert validate_code(content, language) == (True, None)
+        assert content == content.strip()
+
+
+@pytest.mark.parametrize("language, expected", [
+    ('shell', 'bash'),
+    ('C++', 'cpp'),
+    ('brainfuck', 'python'),
+])
+def test_unknown_and_aliased_languages(language, expected):
+    assert OfflineGenerator(seed=3).generate(language) == OfflineGenerator(seed=3).generate(expected)
+
+
+def test_same_seed_same_output_and_no_repeats():
+    first, second = OfflineGenerator(seed=5), OfflineGenerator(seed=5)
+    outputs = [first.generate('python') for _ in range(30)]
+    assert outputs == [second.generate('python') for _ in range(30)]
+    assert len(set(outputs)) == 30
+    assert first.generated == 30
+
+
+def test_shebang_stays_on_the_first_line():
+    assert OfflineGenerator().generate('bash').startswith('#!')
+    assert OfflineGenerator().generate('php').startswith('<?php')
+
+
+def hash_of(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def test_history_and_summaries_are_never_repeated():
+    committed = OfflineGenerator(seed=9).generate('go')
+    history = [{'content_hash': hash_of(committed), 'content_snippet': '', 'language': 'go'}]
+    # What the history-seeded generator would produce next, folded into a summary
+    compacted = OfflineGenerator(seed=9, history=history).generate('go')
+    sketch = HashSketch()
+    sketch.add(hash_of(compacted))
+
+    generator = OfflineGenerator(seed=9, history=history)
+    generator.load_summaries([{'hash_sketch': sketch.dumps()}])
+    assert generator.generate('go') not in (committed, compacted)
+
+
+def test_history_rotates_used_topics_to_the_back():
+    generator = OfflineGenerator(history=[
+        {'content_hash': 'h', 'content_snippet': '# Temperatures Summary', 'language': 'python'}])
+    assert generator.topic_uses == {('python', 'temperatures'): 1}
+    assert 'temperatures' not in generator.generate('python').split('\n', 1)[0].lower()
+
+
+@pytest.fixture
+def gemini_keys(monkeypatch):
+    for name in ['GEMINI_API_KEY'] + [f"GEMINI_API_KEY_{i}" for i in range(2, 11)]:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(content_generator, '_key_cooldown', {})
+    monkeypatch.setattr(content_generator, '_content_pool', {})
+    monkeypatch.setattr(content_generator, 'generate_offline', lambda language: f"offline {language}")
+    return monkeypatch
+
+
+def test_no_configured_key_fails_instead_of_going_offline(gemini_keys):
+    content = content_generator.get_random_content(language='go')
+    assert content.startswith("Error: No GEMINI_API_KEY found")
+
+
+def test_exhausted_keys_fall_back_offline(gemini_keys):
+    gemini_keys.setenv('GEMINI_API_KEY', 'k1')
+    gemini_keys.setenv('GEMINI_API_KEY_2', 'k2')
+    content_generator.mark_key_unhealthy('k1', 60)
+    content_generator.mark_key_unhealthy('k2', 60)
+    assert content_generator.get_random_content(language='go') == "offline go"
+
+
+@pytest.mark.parametrize("number", sorted(LEETCODE_BANK))
+def test_bank_solutions_are_bare_code_for_catalog_problems(number):
+    title, difficulty, code = LEETCODE_BANK[number]
+    problem = lookup(number)
+    assert (problem.title, problem.difficulty) == (title, difficulty)
+    # cron.py writes the title/difficulty header from the catalog
+    assert not code.startswith('#')
+    assert validate_code(code, 'python') == (True, None)
+
+
+def test_leetcode_solution_skips_solved_problems():
+    assert leetcode_solution(exclude=set(LEETCODE_BANK) - {9})[0] == 9
+    assert leetcode_solution(exclude=LEETCODE_BANK) is None
@@ -0,0 +1,59 @@
+from utils.priority_scheduler import plan_tier, priority_order, format_stats
+
+NOON = 12 * 60
+
+
+def user(user_id, plan='free', deadline=None, **fields):
+    row = {'user_id': user_id, 'plan_type': plan, **fields}
+    if deadline is not None:
+        row['custom_deadline_hour'], row['custom_deadline_minute'] = deadline
+    return row
+
+
+def ids(ordered):
+    return [row['user_id'] for row in ordered]
+
+
+def test_plan_tier():
+    assert plan_tier(user('a', 'pro')) == 'pro'
+    assert plan_tier(user('b', None)) == 'free'
+    assert plan_tier(user('c', 'legacy-gold')) == 'free'
+    assert plan_tier(user('d', 'free', github_username='RishitTandon7')) == 'owner'
+
+
+def test_urgent_users_first_by_deadline():
+    users = [
+        user('relaxed', 'enterprise'),
+        user('soon', 'free', deadline=(12, 45)),
+        user('missed', 'pro', deadline=(11, 0)),
+    ]
+    ordered, stats = priority_order(users, NOON)
+    assert ids(ordered) == ['missed', 'soon', 'relaxed']
+    assert stats['urgent'] == 2
+
+
+def test_weighted_fair_queuing_across_tiers():
+    users = [user(f'free{i}', 'free') for i in range(2)] + [user(f'pro{i}', 'pro') for i in range(5)]
+    ordered, stats = priority_order(users, NOON)
+    # pro (weight 3) is served three times per free turn, and wins the tie at pass 1.0
+    assert ids(ordered) == ['pro0', 'pro1', 'pro2', 'free0', 'pro3', 'pro4', 'free1']
+    assert (stats['pro'], stats['free'], stats['urgent']) == (5, 2, 0)
+
+
+def test_earliest_deadline_first_within_a_tier_and_stable_ties():
+    users = [user('late', 'pro'), user('a', 'pro', deadline=(18, 0)), user('b', 'pro', deadline=(18, 0)),
+             user('early', 'pro', deadline=(15, 0))]
+    ordered, _ = priority_order(users, NOON)
+    assert ids(ordered) == ['early', 'a', 'b', 'late']
+
+
+def test_key_selects_the_user_row():
+    items = [('x', user('x', 'free')), ('y', user('y', 'owner', github_username='rishittandon7'))]
+    ordered, _ = priority_order(items, NOON, key=lambda item: item[1])
+    assert [name for name, _ in ordered] == ['y', 'x']
+
+
+def test_format_stats():
+    _, stats = priority_order([user('a', 'pro'), user('b', 'free', deadline=(12, 30))], NOON)
+    assert format_stats(stats) == "Priority: 1 urgent (deadline within 60 min) first, then weighted by plan (pro=1, free=1)"
+    assert format_stats(priority_order([], NOON)[1]).endswith("(none)")
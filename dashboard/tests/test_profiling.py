@@ -0,0 +1,92 @@
+import marshal
+import time
+from collections import Counter
+
+import pytest
+
+from utils import profiling
+from utils.profiling import SamplingProfiler, RunProfile, requested_mode, start_profile
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("CRON_PROFILE", raising=False)
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILE_BUCKET', None)
+    return tmp_path
+
+
+@pytest.mark.parametrize('path,env,expected', [
+    ('/api/cron', None, None),
+    ('/api/cron?profile=1', None, 'sample'),
+    ('/api/cron?profile=cprofile', None, 'cprofile'),
+    ('/api/cron?profile=off', 'sample', None),
+    ('/api/cron', 'CProfile', 'cprofile'),
+    (None, '0', None),
+])
+def test_requested_mode(monkeypatch, path, env, expected):
+    if env is not None:
+        monkeypatch.setenv("CRON_PROFILE", env)
+    assert requested_mode(path) == expected
+
+
+def test_start_profile_is_none_when_not_requested():
+    assert start_profile('/api/cron') is None
+
+
+def test_folded_and_top():
+    sampler = SamplingProfiler(thread_id=0)
+    sampler.stacks = Counter({('main', 'run', 'gemini'): 3, ('main', 'run'): 1, ('main', 'github'): 2})
+    sampler.samples = 6
+    assert sampler.folded().splitlines() == ['main;run;gemini 3', 'main;github 2', 'main;run 1']
+    assert sampler.top(3) == [('main', 0, 6), ('run', 1, 4), ('gemini', 3, 3)]
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sample_profile_writes_folded_stacks(profile_dir):
+    profile = RunProfile('sample', name='test')
+    profile._profiler.interval = 0.001
+    busy(0.05)
+    logs = profile.finish()
+
+    assert [line.split(':')[0] for line in logs] == ['Profile .folded', 'Profile .top.txt']
+    folded = (profile_dir / f"{profile.name}.folded").read_text()
+    assert 'busy (test_profiling.py' in folded
+    top = (profile_dir / f"{profile.name}.top.txt").read_text()
+    assert top.startswith(f"{profile.name}: ")
+
+
+def test_cprofile_writes_loadable_stats(profile_dir):
+    profile = RunProfile('cprofile', name='test')
+    busy(0.01)
+    profile.finish()
+
+    stats = marshal.loads((profile_dir / f"{profile.name}.prof").read_bytes())
+    assert any(func[2] == 'busy' for func in stats)
+    assert 'busy' in (profile_dir / f"{profile.name}.top.txt").read_text()
+
+
+def test_upload_failure_is_logged(monkeypatch):
+    class Storage:
+        def from_(self, bucket):
+            return self
+
+        def upload(self, name, data, options):
+            raise RuntimeError("bucket not found")
+
+    class Supabase:
+        storage = Storage()
+
+    monkeypatch.setattr(profiling, 'PROFILE_BUCKET', 'profiles')
+    logs = RunProfile('cprofile', name='test').finish(Supabase())
+    assert all('upload failed: bucket not found' in line for line in logs)
+
+
+def test_abort_writes_nothing(profile_dir):
+    RunProfile('sample', name='test').abort()
+    assert list(profile_dir.iterdir()) == []
@@ -0,0 +1,159 @@
+import types
+
+import pytest
+
+from utils import prompts
+from utils.code_validation import EarlyAbort, fenced_prefix_reason, PREFIX_CHECK_CHARS
+from utils.hedging import Cancel, AttemptCancelled
+from utils.prompts import PromptTemplate, generate, usage_stats, usage_summary, reset_usage
+
+TEMPLATE = PromptTemplate('demo', 3, "Static instructions.\n", "Topic: {topic}\nLanguage: {language}\n")
+
+
+@pytest.fixture(autouse=True)
+def clean_usage():
+    reset_usage()
+    yield
+    reset_usage()
+
+
+class FakeModel:
+    def __init__(self, text="print('hi')", usage=None):
+        self.text = text
+        self.usage = usage
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        return types.SimpleNamespace(text=self.text, usage_metadata=self.usage)
+
+
+class FakeStream:
+    """A streamed response: iterates chunks, `_iterator.cancel()` closes it."""
+
+    def __init__(self, chunks, on_chunk=None):
+        self.chunks = chunks
+        self.on_chunk = on_chunk
+        self.closed = False
+        self.usage_metadata = None
+        self._iterator = types.SimpleNamespace(cancel=self.close)
+
+    def close(self):
+        self.closed = True
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            if self.closed:
+                return
+            yield types.SimpleNamespace(text=chunk)
+            if self.on_chunk:
+                self.on_chunk()
+
+
+class StreamingModel:
+    def __init__(self, stream):
+        self.stream = stream
+        self.streamed = []
+
+    def generate_content(self, prompt, stream=False):
+        self.streamed.append(stream)
+        return self.stream
+
+
+def test_template_key_and_fields():
+    assert TEMPLATE.key == 'demo@v3'
+    assert TEMPLATE.fields == {'topic', 'language'}
+
+
+@pytest.mark.parametrize("suffix, expected", [
+    (None, "Static instructions.\nTopic: queues\nLanguage: go\n"),
+    ("Previous attempt rejected.", "Static instructions.\nTopic: queues\nLanguage: go\nPrevious attempt rejected."),
+])
+def test_render(suffix, expected):
+    assert TEMPLATE.render(suffix, topic='queues', language='go') == expected
+
+
+def test_render_names_missing_fields():
+    with pytest.raises(KeyError, match="demo@v3 missing language, topic"):
+        TEMPLATE.render()
+
+
+@pytest.mark.parametrize("template", [
+    prompts.TUTORIAL_IDEA, prompts.TUTORIAL_CODE, prompts.LEETCODE_SOLUTION, prompts.ENTERPRISE_DAY,
+    prompts.BATCH_ITEMS,
+])
+def test_shipped_templates_render(template):
+    prompt = template.render(**{field: f"<{field}>" for field in template.fields})
+    assert prompt.startswith(template.static)
+    assert all(f"<{field}>" in prompt for field in template.fields)
+
+
+def test_generate_records_reported_usage():
+    usage = types.SimpleNamespace(prompt_token_count=30, cached_content_token_count=0, candidates_token_count=12)
+    model = FakeModel(usage=usage)
+    response = generate(model, TEMPLATE, topic='queues', language='go')
+    assert response.text == "print('hi')"
+    assert model.prompts == [TEMPLATE.render(topic='queues', language='go')]
+    stats = usage_stats()['demo@v3']
+    assert (stats['calls'], stats['prompt_tokens'], stats['output_tokens']) == (1, 30, 12)
+    assert stats['static_chars'] == len(TEMPLATE.static)
+
+
+def test_generate_estimates_tokens_without_usage_metadata():
+    generate(FakeModel(), TEMPLATE, topic='q' * 40, language='go')
+    stats = usage_stats()['demo@v3']
+    assert stats['prompt_tokens'] == stats['prompt_chars'] // 4
+    assert stats['output_tokens'] == 0
+
+
+def test_usage_summary():
+    generate(FakeModel(), TEMPLATE, topic='queues', language='go')
+    generate(FakeModel(), TEMPLATE, topic='stacks', language='go')
+    [line] = usage_summary()
+    assert line.startswith("Prompt demo@v3: 2 calls")
+    assert "static prefix" in line and "cancelled early" not in line
+
+
+def test_cancel_closes_the_stream_and_records_the_abort():
+    cancel = Cancel()
+    stream = FakeStream(["def a():\n", "    pass\n", "def b():\n"], on_chunk=cancel.cancel)
+    model = StreamingModel(stream)
+    with pytest.raises(AttemptCancelled) as excinfo:
+        generate(model, TEMPLATE, cancel=cancel, topic='queues', language='go')
+    assert model.streamed == [True]
+    assert stream.closed
+    assert excinfo.value.chars == len("def a():\n")
+    stats = usage_stats()['demo@v3']
+    assert (stats['calls'], stats['aborted']) == (1, 1)
+    assert "1 cancelled early" in usage_summary()[0]
+
+
+def test_uncancelled_stream_returns_the_response():
+    stream = FakeStream(["print(", "'hi')"])
+    assert generate(StreamingModel(stream), TEMPLATE, cancel=Cancel(), topic='queues', language='go') is stream
+    assert usage_stats()['demo@v3']['aborted'] == 0
+
+
+def test_stream_check_aborts_an_off_format_start():
+    chunks = ["Sure! Let me explain. ", "x" * PREFIX_CHECK_CHARS, "```python\nprint(1)\n```"]
+    stream = FakeStream(chunks)
+    with pytest.raises(EarlyAbort) as excinfo:
+        generate(StreamingModel(stream), TEMPLATE, stream_check=fenced_prefix_reason, topic='queues', language='go')
+    assert stream.closed
+    assert excinfo.value.chars == len(chunks[0] + chunks[1])
+    assert usage_stats()['demo@v3']['aborted'] == 1
+
+
+def test_stream_check_passes_a_fenced_answer():
+    stream = FakeStream(["```python\n", "print(1)\n", "x" * PREFIX_CHECK_CHARS, "```"])
+    assert generate(StreamingModel(stream), TEMPLATE, stream_check=fenced_prefix_reason,
+                    topic='queues', language='go') is stream
+    assert not stream.closed
+
+
+def test_stream_checks_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(prompts, 'STREAM_CHECKS', False)
+    model = StreamingModel(FakeStream(["Sure! " + "x" * PREFIX_CHECK_CHARS]))
+    generate(model, TEMPLATE, stream_check=fenced_prefix_reason, topic='queues', language='go')
+    assert model.streamed == [False]
+    assert usage_stats()['demo@v3']['aborted'] == 0
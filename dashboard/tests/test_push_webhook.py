@@ -0,0 +1,98 @@
+import datetime
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from utils.push_webhook import verify_signature, parse_push, collapse, apply_events, PushBatcher, replay
+
+NOW = datetime.datetime(2026, 10, 19, 12, 0, tzinfo=datetime.timezone.utc)   # 17:30 IST
+BODY = b'{"zen": "Keep it logically awesome."}'
+GOOD = 'sha256=' + hmac.new(b'secret', BODY, hashlib.sha256).hexdigest()
+
+
+@pytest.mark.parametrize("secret, signature, valid", [
+    ('secret', GOOD, True),
+    ('other', GOOD, False),
+    ('secret', GOOD.replace('sha256=', 'sha1='), False),
+    ('secret', None, False),
+    (None, GOOD, False),
+])
+def test_verify_signature(secret, signature, valid):
+    assert verify_signature(secret, BODY, signature) is valid
+
+
+def payload(**fields):
+    data = {
+        'ref': 'refs/heads/main',
+        'repository': {'name': 'auto-contributions', 'default_branch': 'main', 'owner': {'login': 'someone'}},
+        'commits': [
+            {'timestamp': '2026-10-19T09:00:00+05:30'},
+            {'timestamp': '2026-10-19T00:10:00Z'},
+            {'timestamp': '2026-10-18T23:59:00+05:30'},     # yesterday in IST
+            {'message': 'no timestamp'},
+        ],
+    }
+    data.update(fields)
+    return data
+
+
+def test_parse_push_counts_todays_commits():
+    assert parse_push('d1', payload(), NOW) == {
+        'delivery': 'd1', 'owner': 'someone', 'repo': 'auto-contributions', 'day': '2026-10-19', 'commits': 2}
+
+
+@pytest.mark.parametrize("fields", [
+    {'ref': 'refs/heads/feature'},
+    {'ref': 'refs/tags/v1'},
+    {'deleted': True},
+])
+def test_parse_push_ignores_other_refs(fields):
+    assert parse_push('d1', payload(**fields), NOW) is None
+
+
+def event(delivery, commits=1, owner='someone', repo='auto-contributions'):
+    return {'delivery': delivery, 'owner': owner, 'repo': repo, 'day': '2026-10-19', 'commits': commits}
+
+
+def test_collapse_drops_redeliveries_and_empty_pushes():
+    events = [event('d1'), event('d1'), event('d2', commits=0), event('d3', owner=None), event('d4', commits=3)]
+    assert [e['delivery'] for e in collapse(events)] == ['d1', 'd4']
+
+
+def test_apply_events_sends_matched_pushes_per_day(fake_supabase):
+    supabase = fake_supabase(user_settings=[{'id': 'u1', 'github_username': 'someone', 'repo_name': 'auto_contributions'}])
+    supabase.rpc_handlers['apply_push_counts'] = lambda params: len(params['p_rows'])
+    stats = apply_events(supabase, [event('d1', repo='Auto-Contributions'), event('d2', repo='other')])
+    assert stats == {'events': 2, 'matched': 1, 'users_updated': 1}
+    assert supabase.calls == [('apply_push_counts', {
+        'p_day': '2026-10-19', 'p_rows': [{'delivery': 'd1', 'user_id': 'u1', 'commits': 1}]})]
+
+
+def test_batcher_flushes_at_max_events(fake_supabase):
+    supabase = fake_supabase(user_settings=[])
+    batcher = PushBatcher(supabase, max_events=2, max_seconds=3600)
+    assert not batcher.add(event('d1'))
+    assert batcher.add(event('d2'))
+    assert batcher.flush()['events'] == 2
+    assert batcher.flush() == {'events': 0, 'matched': 0, 'users_updated': 0}
+
+
+def test_replay_checks_signatures_and_skips_other_events(tmp_path, capsys):
+    body = json.dumps(payload()).encode('utf-8')
+    good = 'sha256=' + hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+    recordings = {
+        'push.json': {'event': 'push', 'delivery': 'd1', 'signature': good, 'body': body.decode()},
+        'forged.json': {'event': 'push', 'delivery': 'd2', 'signature': 'sha256=00', 'body': body.decode()},
+        'star.json': {'event': 'star', 'delivery': 'd3', 'body': '{}'},
+    }
+    paths = []
+    for name, recording in recordings.items():
+        path = tmp_path / name
+        path.write_text(json.dumps(recording))
+        paths.append(str(path))
+    assert replay(paths, secret='secret') is None
+    out = capsys.readouterr().out
+    assert "Replaying 1 push events (2 skipped)" in out
+    assert "signature mismatch" in out
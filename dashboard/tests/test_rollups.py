@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+
+from utils.rollups import bucket_start, aggregate, fetch_batch, run_rollup, prune, LAG_SECONDS
+
+TS = datetime.datetime(2026, 10, 19, 13, 47, 25, 123456, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.parametrize("granularity, start", [
+    ('minute', datetime.datetime(2026, 10, 19, 13, 47, tzinfo=datetime.timezone.utc)),
+    ('hour', datetime.datetime(2026, 10, 19, 13, 0, tzinfo=datetime.timezone.utc)),
+    ('day', datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)),
+])
+def test_bucket_start(granularity, start):
+    assert bucket_start(TS, granularity) == start
+
+
+def counts(rows):
+    return {(r['granularity'], r['bucket'], r['plan'], r['language'], r['outcome']): r['count'] for r in rows}
+
+
+def test_aggregate_commits_by_plan_and_language():
+    rows = [
+        {'id': 1, 'user_id': 'a', 'language': 'Python', 'created_at': '2026-10-19T13:47:10+00:00'},
+        {'id': 2, 'user_id': 'a', 'language': 'python', 'created_at': '2026-10-19T13:58:00+00:00'},
+        {'id': 3, 'user_id': 'b', 'language': None, 'created_at': '2026-10-19T13:47:59+00:00'},
+    ]
+    result = counts(aggregate('commits', rows, {'a': 'pro'}))
+    assert result[('minute', '2026-10-19T13:47:00+00:00', 'pro', 'python', 'committed')] == 1
+    assert result[('hour', '2026-10-19T13:00:00+00:00', 'pro', 'python', 'committed')] == 2
+    assert result[('day', '2026-10-19T00:00:00+00:00', 'unknown', '', 'committed')] == 1
+    assert sum(count for (g, *_), count in result.items() if g == 'day') == 3
+
+
+def test_aggregate_page_views_without_a_user_are_visitors():
+    rows = [{'id': 1, 'user_id': None, 'created_at': '2026-10-19T05:30:00+05:30'}]
+    assert counts(aggregate('page_views', rows, {})) == {
+        ('minute', '2026-10-19T00:00:00+00:00', 'visitor', '', 'view'): 1,
+        ('hour', '2026-10-19T00:00:00+00:00', 'visitor', '', 'view'): 1,
+        ('day', '2026-10-19T00:00:00+00:00', 'visitor', '', 'view'): 1,
+    }
+
+
+@pytest.mark.parametrize("last_id, fresh_ids", [
+    (None, [1, 2, 3, 4]),
+    (2, [3, 4]),
+    (3, [4]),
+])
+def test_fetch_batch_skips_rows_counted_at_the_mark(fake_supabase, last_id, fresh_ids):
+    mark = '2026-10-19T10:00:00+00:00'
+    supabase = fake_supabase(generated_history=[
+        {'id': 1, 'user_id': 'a', 'language': 'go', 'created_at': mark},
+        {'id': 2, 'user_id': 'a', 'language': 'go', 'created_at': mark},
+        {'id': 3, 'user_id': 'a', 'language': 'go', 'created_at': mark},
+        {'id': 4, 'user_id': 'a', 'language': 'go', 'created_at': '2026-10-19T10:00:01+00:00'},
+        {'id': 5, 'user_id': 'a', 'language': 'go', 'created_at': '2026-10-19T11:00:00+00:00'},
+    ])
+    rows, read = fetch_batch(supabase, 'commits', mark, last_id, '2026-10-19T10:30:00+00:00')
+    assert [row['id'] for row in rows] == fresh_ids
+    assert read == 4
+
+
+def history(count, start='2026-10-19T10:00:00+00:00'):
+    base = datetime.datetime.fromisoformat(start)
+    return [{'id': i, 'user_id': 'a', 'language': 'go',
+             'created_at': (base + datetime.timedelta(seconds=i)).isoformat()} for i in range(1, count + 1)]
+
+
+def test_run_rollup_advances_the_mark_batch_by_batch(fake_supabase):
+    supabase = fake_supabase(generated_history=history(5), user_settings=[{'id': 'a', 'plan_type': 'pro'}])
+    now = datetime.datetime(2026, 10, 19, 11, 0, tzinfo=datetime.timezone.utc)
+    stats = run_rollup(supabase, 'commits', now=now, batch_size=2)
+    applied = [params for name, params in supabase.calls if name == 'apply_rollup']
+    # gte re-reads the row at the mark, so later batches hold one new row each
+    assert [(p['p_expected_id'], p['p_last_id']) for p in applied] == [(None, 2), (2, 3), (3, 4), (4, 5)]
+    assert sum(row['count'] for p in applied for row in p['p_rows'] if row['granularity'] == 'day') == 5
+    assert {row['plan'] for p in applied for row in p['p_rows']} == {'pro'}
+    assert (stats['rows'], stats['batches']) == (5, 4)
+
+
+def test_run_rollup_leaves_rows_still_committing(fake_supabase):
+    supabase = fake_supabase(generated_history=history(3))
+    now = datetime.datetime(2026, 10, 19, 10, 0, 2, tzinfo=datetime.timezone.utc) + \
+        datetime.timedelta(seconds=LAG_SECONDS)
+    assert run_rollup(supabase, 'commits', now=now)['rows'] == 2
+
+
+def test_prune_never_passes_the_rollup_or_compaction_marks(fake_supabase):
+    supabase = fake_supabase(rollup_state=[
+        {'source': 'commits', 'high_water': '2026-09-01T00:00:00+00:00'},
+        {'source': 'page_views', 'high_water': '2026-10-19T00:00:00+00:00'},
+        {'source': 'history_compaction', 'high_water': '2026-08-01T00:00:00+00:00'},
+    ], analytics=[{'id': 1, 'created_at': '2026-08-01T00:00:00+00:00'},
+                  {'id': 2, 'created_at': '2026-10-25T00:00:00+00:00'}])
+    now = datetime.datetime(2026, 12, 31, tzinfo=datetime.timezone.utc)
+    pruned = prune(supabase, now)
+    assert pruned['generated_history'] == '2026-08-01T00:00:00+00:00'
+    assert supabase.calls == [('prune_generated_history', {'p_before': '2026-08-01T00:00:00+00:00'})]
+    assert [row['id'] for row in supabase.tables['analytics']] == [2]
+    assert pruned['analytics'] == '2026-10-19T00:00:00+00:00'
+    assert pruned['stat_rollups/minute'] == '2026-12-28T00:00:00+00:00'
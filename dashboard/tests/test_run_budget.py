@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from utils import run_budget
+from utils.run_budget import (
+    RunBudget, BudgetExceeded, requested_budget, start_run, end_run, call_timeout, committing,
+    RUN_BUDGET_SECONDS, COMMIT_RESERVE_SECONDS,
+)
+
+
+@pytest.fixture
+def budget():
+    started = start_run(60)
+    yield started
+    end_run()
+
+
+def left(budget, seconds):
+    budget.deadline = time.monotonic() + seconds
+
+
+@pytest.mark.parametrize("path, seconds", [
+    (None, RUN_BUDGET_SECONDS),
+    ("/api/cron", RUN_BUDGET_SECONDS),
+    ("/api/cron?budget=30", 30.0),
+    ("/api/cron?budget=0", RUN_BUDGET_SECONDS),
+    ("/api/cron?budget=-5", RUN_BUDGET_SECONDS),
+    ("/api/cron?budget=soon", RUN_BUDGET_SECONDS),
+])
+def test_requested_budget(path, seconds):
+    assert requested_budget(path) == seconds
+
+
+def test_no_run_keeps_own_timeouts():
+    end_run()
+    assert call_timeout(15) == 15
+
+
+@pytest.mark.parametrize("remaining, own, timeout", [
+    (30, 15, 15),
+    (10, 15, 10),
+    (10, None, 10),
+])
+def test_call_timeout_is_clamped(budget, remaining, own, timeout):
+    left(budget, remaining)
+    assert call_timeout(own) == pytest.approx(timeout, abs=0.1)
+
+
+def test_budget_exceeded_is_not_an_exception(budget):
+    left(budget, 0.5)
+    with pytest.raises(BudgetExceeded):
+        try:
+            call_timeout(15)
+        except Exception:
+            pytest.fail("BudgetExceeded was caught by `except Exception`")
+
+
+def test_committing_checks_once_then_keeps_own_timeouts(budget):
+    left(budget, COMMIT_RESERVE_SECONDS + 1)
+    with committing():
+        left(budget, 0)
+        assert call_timeout(15) == 15
+    with pytest.raises(BudgetExceeded):
+        call_timeout(15)
+
+
+def test_committing_refuses_without_the_reserve(budget):
+    left(budget, COMMIT_RESERVE_SECONDS - 1)
+    with pytest.raises(BudgetExceeded):
+        with committing():
+            pytest.fail("the write should not start")
+
+
+def test_release_margin_gives_back_the_reserve():
+    budget = RunBudget(seconds=20, margin=10)
+    assert budget.remaining() == pytest.approx(10, abs=0.1)
+    budget.release_margin()
+    assert budget.remaining() == pytest.approx(20, abs=0.1)
+
+
+@pytest.mark.parametrize("durations, estimate", [
+    ([], run_budget.USER_ESTIMATE_SECONDS),
+    ([40], 40),
+    ([5, 6], run_budget.USER_ESTIMATE_SECONDS),
+    ([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 9),
+])
+def test_user_estimate(durations, estimate):
+    budget = RunBudget(seconds=100)
+    for seconds in durations:
+        budget.record_user(seconds)
+    assert budget.user_estimate() == estimate
+
+
+def test_can_start_user_needs_an_estimate_of_time_left():
+    budget = RunBudget(seconds=100, margin=0)
+    budget.record_user(10)
+    budget.deadline = time.monotonic() + 35
+    assert budget.can_start_user()
+    budget.deadline = time.monotonic() + 20
+    assert not budget.can_start_user()
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from utils import run_log
+from utils.run_log import level_for, SegmentSink, RunLog, LogLines
+
+
+@pytest.mark.parametrize("line, level", [
+    ("❌ Error: Bad credentials", 'error'),
+    ("Error reading users", 'error'),
+    ("⚠️ Gemini key exhausted", 'warn'),
+    ("Warning: slow run", 'warn'),
+    ("Generated code rejected: SyntaxError", 'warn'),
+    ("✅ Committed 3 files", 'info'),
+])
+def test_level_for(line, level):
+    assert level_for(line) == level
+
+
+def test_segment_sink_appends_and_tails(tmp_path):
+    sink = SegmentSink(str(tmp_path))
+    assert sink.append([{'message': 'a'}, {'message': 'b'}]) == 2
+    assert sink.append([{'message': 'c'}]) == 3
+    assert [e['message'] for e in sink.tail()] == ['a', 'b', 'c']
+    assert [e['seq'] for e in sink.tail(since=1, limit=1)] == [2]
+
+
+def test_segment_sink_rotates_and_drops_old_segments(tmp_path):
+    sink = SegmentSink(str(tmp_path), segment_bytes=1, max_segments=2)
+    for message in 'abcd':
+        sink.append([{'message': message}])
+    assert len(sink._segments()) == 2
+    assert [e['message'] for e in sink.tail()] == ['c', 'd']
+
+
+def test_segment_sink_recovers_past_a_torn_line(tmp_path):
+    sink = SegmentSink(str(tmp_path))
+    sink.append([{'message': 'a'}, {'message': 'b'}])
+    with open(sink._segments()[-1][1], 'a', encoding='utf-8') as f:
+        f.write('{"seq": 3, "mess')
+    assert SegmentSink(str(tmp_path)).last_seq == 2
+
+
+class ListSink:
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.written = threading.Event()
+
+    def append(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("store down")
+        self.batches.append(events)
+        self.written.set()
+        return sum(len(batch) for batch in self.batches)
+
+
+def test_run_log_writes_batches_and_the_rest_on_close():
+    sink = ListSink()
+    log = RunLog(sink, batch_size=3, flush_seconds=60)
+    lines = LogLines(log)
+    lines.extend(["one", "two", "three"], username='someone')
+    assert sink.written.wait(5)
+    lines.append("❌ four")
+    assert log.close() == 4
+    assert [len(batch) for batch in sink.batches] == [3, 1]
+    assert sink.batches[0][0]['username'] == 'someone'
+    assert sink.batches[1][0]['level'] == 'error'
+    assert list(lines) == ["one", "two", "three", "❌ four"]
+    assert log.metrics['written'] == 4 and log.metrics['dropped'] == 0
+
+
+def wait_for(condition, seconds=5):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_run_log_retries_a_failed_batch(monkeypatch):
+    monkeypatch.setattr(run_log, 'STORE_ERRORS_BEFORE_OFF', 2)
+    sink = ListSink(failures=1)
+    log = RunLog(sink, flush_seconds=0.01)
+    log.emit("kept")
+    assert sink.written.wait(5)
+    assert log.close() == 1
+    assert log.metrics['errors'] == 1 and log.metrics['written'] == 1
+
+
+def test_run_log_switches_off_after_errors_in_a_row(monkeypatch):
+    monkeypatch.setattr(run_log, 'STORE_ERRORS_BEFORE_OFF', 2)
+    sink = ListSink(failures=5)
+    log = RunLog(sink, flush_seconds=0.01)
+    log.emit("lost")
+    assert wait_for(lambda: log.metrics['errors'] == 2)
+    log.emit("after switch-off")
+    assert log.close() is None
+    assert sink.batches == []
+    assert log.metrics['dropped'] == 1 and log.metrics['emitted'] == 1
@@ -0,0 +1,133 @@
+import datetime
+
+import pytest
+
+from utils.schedule_index import (
+    ScheduleIndex, parse_commit_time, deadline_minute, spread_slot, minute_of_day, SPREAD_MARGIN_MINUTES,
+)
+
+
+@pytest.mark.parametrize("value, minute", [
+    ("00:00", 0),
+    ("09:05", 545),
+    ("9:05", 545),
+    ("23:59", 1439),
+    ("18:30:45", 1110),
+    ("7", 420),
+])
+def test_parse_commit_time(value, minute):
+    assert parse_commit_time(value) == minute
+
+
+@pytest.mark.parametrize("value", ["24:00", "12:60", "-1:00", "ab:cd", ""])
+def test_parse_commit_time_rejects(value):
+    with pytest.raises((ValueError, IndexError)):
+        parse_commit_time(value)
+
+
+def test_minute_of_day():
+    assert minute_of_day(datetime.datetime(2026, 10, 19, 13, 7)) == 787
+
+
+@pytest.mark.parametrize("commit_time, minute, due", [
+    ("09:00", 539, False),
+    ("09:00", 540, True),
+    ("09:00", 1439, True),
+    (None, 0, True),
+    ("bad", 1439, False),
+])
+def test_is_due(commit_time, minute, due):
+    index = ScheduleIndex()
+    index.upsert("u", commit_time)
+    assert index.is_due("u", minute) is due
+
+
+def test_invalid_commit_time_is_reported():
+    index = ScheduleIndex()
+    index.upsert("u", "25:00")
+    assert "u" in index.invalid
+    assert "u" in index
+    assert index.slot_of("u") is None
+
+
+def test_sync_only_reparses_changed_rows_and_prunes():
+    index = ScheduleIndex()
+    rows = [
+        {'id': 'a', 'commit_time': '08:00', 'updated_at': '1'},
+        {'id': 'b', 'commit_time': '10:00', 'updated_at': '1'},
+    ]
+    assert index.sync(rows) == 2
+    assert index.sync(rows) == 0
+    rows[0] = {'id': 'a', 'commit_time': '11:00', 'updated_at': '2'}
+    assert index.sync(rows[:1]) == 1
+    assert index.slot_of('a') == 660
+    assert 'b' not in index
+
+
+def test_sync_without_prune_keeps_other_pages():
+    index = ScheduleIndex()
+    index.sync([{'id': 'a', 'commit_time': '08:00'}], prune=False)
+    index.sync([{'id': 'b', 'commit_time': '09:00'}], prune=False)
+    assert 'a' in index and 'b' in index
+    index.retain({'b'})
+    assert 'a' not in index
+
+
+def test_due_through():
+    index = ScheduleIndex()
+    index.upsert('early', '06:00')
+    index.upsert('late', '22:00')
+    index.upsert('anytime', None)
+    assert index.due_through(6 * 60) == {'early', 'anytime'}
+    assert index.due_through(1439) == {'early', 'late', 'anytime'}
+
+
+def test_advance_sweeps_each_slot_once_per_day():
+    index = ScheduleIndex()
+    index.upsert('a', '06:00')
+    index.upsert('b', '07:00')
+    index.upsert('anytime', None)
+    day = datetime.date(2026, 10, 19)
+    assert index.advance(day, 6 * 60) == {'a', 'anytime'}
+    assert index.advance(day, 6 * 60 + 30) == set()
+    assert index.advance(day, 7 * 60) == {'b'}
+    # Re-indexed behind the cursor: handed to the next sweep
+    index.upsert('c', '05:00')
+    assert index.advance(day, 7 * 60) == {'c'}
+    # A new day starts over
+    assert index.advance(day + datetime.timedelta(days=1), 6 * 60) == {'a', 'c', 'anytime'}
+
+
+@pytest.mark.parametrize("user, minute", [
+    ({}, 23 * 60 + 45),
+    ({'custom_deadline_hour': 20, 'custom_deadline_minute': 0}, 1200),
+    ({'custom_deadline_hour': 0, 'custom_deadline_minute': 0}, 0),
+    ({'custom_deadline_hour': 30, 'custom_deadline_minute': 0}, 1439),
+])
+def test_deadline_minute(user, minute):
+    assert deadline_minute(user) == minute
+
+
+@pytest.mark.parametrize("deadline", [None, 60, 20 * 60, 10])
+def test_spread_slot_is_stable_and_before_deadline(deadline):
+    window_end = max((deadline if deadline is not None else 23 * 60 + 45) - SPREAD_MARGIN_MINUTES, 0)
+    for user_id in ("u1", "u2", "00000000-0000-0000-0000-000000000042"):
+        slot = spread_slot(user_id, deadline)
+        assert slot == spread_slot(user_id, deadline)
+        assert 0 <= slot <= window_end
+
+
+def test_spread_anytime_places_users_on_their_slot():
+    index = ScheduleIndex(spread_anytime=True)
+    index.upsert("u", None, deadline=600)
+    assert index.slot_of("u") == spread_slot("u", 600)
+
+
+def test_spread_users_become_due_at_their_slot():
+    index = ScheduleIndex(spread_anytime=True)
+    index.upsert("u", None, deadline=600)
+    slot = index.slot_of("u")
+    assert slot > 0
+    assert not index.is_due("u", slot - 1)
+    assert index.is_due("u", slot)
+    assert index.due_through(slot) == {"u"}
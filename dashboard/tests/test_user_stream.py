@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.user_stream import user_pages, prefetched, stream_users, bounded
+
+
+def users(*commit_times, paused=()):
+    return [{'id': f'u{i:02d}', 'commit_time': commit_time, 'pause_bot': i in paused}
+            for i, commit_time in enumerate(commit_times)]
+
+
+def ids(pages):
+    return [[row['id'] for row in page] for page in pages]
+
+
+def test_keyset_pages_cover_every_row_once(fake_supabase):
+    supabase = fake_supabase(user_settings=users(*['09:00'] * 5))
+    assert ids(user_pages(supabase, page_size=2)) == [['u00', 'u01'], ['u02', 'u03'], ['u04']]
+
+
+def test_full_last_page_ends_with_an_empty_read(fake_supabase):
+    supabase = fake_supabase(user_settings=users('09:00', '10:00'))
+    assert ids(user_pages(supabase, page_size=2)) == [['u00', 'u01']]
+
+
+def test_active_only(fake_supabase):
+    supabase = fake_supabase(user_settings=users('09:00', '09:00', '09:00', paused={1}))
+    assert ids(user_pages(supabase)) == [['u00', 'u02']]
+    assert ids(user_pages(supabase, active_only=False)) == [['u00', 'u01', 'u02']]
+
+
+def test_due_before_keeps_unset_and_malformed_times(fake_supabase):
+    supabase = fake_supabase(user_settings=users('09:00', '18:30', None, '9:05', '12:00'))
+    assert ids(user_pages(supabase, due_before='12:00')) == [['u00', 'u02', 'u03']]
+
+
+def test_stream_users_matches_user_pages(fake_supabase):
+    supabase = fake_supabase(user_settings=users(*['09:00'] * 7))
+    assert ids(stream_users(supabase, page_size=3)) == ids(user_pages(supabase, page_size=3))
+
+
+def test_prefetched_reraises_producer_errors():
+    def pages():
+        yield 1
+        raise RuntimeError("PostgREST timeout")
+
+    stream = prefetched(pages())
+    assert next(stream) == 1
+    with pytest.raises(RuntimeError, match="PostgREST timeout"):
+        next(stream)
+
+
+def test_prefetched_stays_bounded_and_stops_when_closed():
+    produced = []
+    stopped = threading.Event()
+
+    def pages():
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield i
+        finally:
+            stopped.set()
+
+    stream = prefetched(pages(), depth=2)
+    assert next(stream) == 0
+    stopped.wait(0.2)
+    # One handed out, `depth` queued and one blocked in put()
+    assert len(produced) <= 4
+    stream.close()
+    assert stopped.wait(5)
+    assert len(produced) < 100
+
+
+def test_bounded_keeps_order_and_limit():
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work(n):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        try:
+            if n == 3:
+                raise ValueError(n)
+            return n * n
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = [(item, future.exception() or future.result())
+                   for item, future in bounded(pool, work, [(n,) for n in range(8)], limit=2)]
+    assert [item for item, _ in results] == [(n,) for n in range(8)]
+    assert isinstance(results[3][1], ValueError)
+    assert results[4][1] == 16
+    assert peak[0] <= 2
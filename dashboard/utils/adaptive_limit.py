@@ -0,0 +1,237 @@
+"""
+Adaptive (AIMD) concurrency limits for the bot's downstreams.
+
+One limiter per downstream - Gemini, GitHub, PostgREST - caps how many calls
+are in flight at once. The cap grows by ~1 per round trip (+1/limit per
+success) while calls succeed within the downstream's latency target and the
+cap is actually being used, and is halved on a 429/quota error or timeout (at
+most once per typical latency, so a burst of 429s from one overload counts
+as one signal). Throughput settles just under what the downstream currently
+allows, per process, without a fixed sleep between users.
+
+Hooks: prompts.generate() (Gemini), the pooled PyGithub requesters
+(utils/github_pool.py), and the httpx transports of the Supabase client
+(api/cron.create_supabase_client) and the HTTP/2 GitHub client
+(utils/github_transport.py) via limited_transport(). Current
+limits and counters: limiter_stats() / limits_summary().
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.run_budget import call_timeout
+
+# name: (initial limit, max limit, latency target in seconds)
+DOWNSTREAMS = {
+    'gemini': (2, 8, 20.0),
+    'github': (4, 16, 3.0),
+    'postgrest': (8, 32, 2.0),
+}
+MIN_LIMIT = 1
+BACKOFF = 0.5
+WAIT_TIMEOUT_SECONDS = 120
+GITHUB_TIMEOUT_SECONDS = 15     # PyGithub's default
+
+_OVERLOAD_MARKERS = ('429', '503', 'quota', 'rate limit', 'resource exhausted', 'resourceexhausted',
+                     'too many requests', 'timeout', 'timed out', 'unavailable')
+
+
+class LimitTimeout(Exception):
+    """No slot freed up within WAIT_TIMEOUT_SECONDS."""
+
+
+def classify(error):
+    """'overload' for 429/quota/timeouts (cut the limit), else 'error' (no signal)."""
+    text = f"{type(error).__name__} {error}".lower()
+    return 'overload' if any(marker in text for marker in _OVERLOAD_MARKERS) else 'error'
+
+
+class _Slot:
+    __slots__ = ('outcome',)
+
+    def __init__(self):
+        self.outcome = 'ok'
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent calls to one downstream."""
+
+    def __init__(self, name, initial, max_limit, latency_target, min_limit=MIN_LIMIT):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.latency_avg = None
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self.metrics = {'calls': 0, 'ok': 0, 'slow': 0, 'overloaded': 0, 'errors': 0, 'cuts': 0,
+                        'waits': 0, 'wait_seconds': 0.0, 'peak_in_flight': 0,
+                        'lowest_limit': self.limit, 'highest_limit': self.limit}
+
+    def acquire(self, timeout=WAIT_TIMEOUT_SECONDS):
+        """Block until a slot is free. Returns whether the limit was saturated."""
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                self.metrics['waits'] += 1
+                started = time.monotonic()
+                if not self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                    raise LimitTimeout(f"{self.name}: no free slot after {timeout}s (limit {int(self.limit)})")
+                self.metrics['wait_seconds'] += time.monotonic() - started
+            self.in_flight += 1
+            self.metrics['calls'] += 1
+            self.metrics['peak_in_flight'] = max(self.metrics['peak_in_flight'], self.in_flight)
+            return self.in_flight >= int(self.limit)
+
+    def release(self, latency, outcome, saturated=True):
+        """Free a slot and adapt: 'ok' may grow the limit, 'overload' cuts it."""
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == 'overload':
+                self.metrics['overloaded'] += 1
+                if now - self._last_cut >= max(self.latency_avg or 0.0, 1.0):
+                    self.limit = max(float(self.min_limit), self.limit * BACKOFF)
+                    self._last_cut = now
+                    self.metrics['cuts'] += 1
+            elif outcome == 'ok':
+                self.metrics['ok'] += 1
+                self.latency_avg = latency if self.latency_avg is None else 0.8 * self.latency_avg + 0.2 * latency
+                if latency > self.latency_target:
+                    self.metrics['slow'] += 1
+                elif saturated:
+                    # Only grow a limit that is actually the bottleneck
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            else:
+                self.metrics['errors'] += 1
+            self.metrics['lowest_limit'] = min(self.metrics['lowest_limit'], self.limit)
+            self.metrics['highest_limit'] = max(self.metrics['highest_limit'], self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one slot around a call. Exceptions are classified; set
+        `slot.outcome = 'overload'` for overload signalled by a return value.
+        Re-entrant per thread (a nested call on the same thread reuses the slot).
+        """
+        if getattr(self._local, 'held', False):
+            yield _Slot()
+            return
+        saturated = self.acquire(call_timeout(WAIT_TIMEOUT_SECONDS))
+        self._local.held = True
+        slot = _Slot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except Exception as e:
+            slot.outcome = classify(e)
+            raise
+        finally:
+            self._local.held = False
+            self.release(time.monotonic() - started, slot.outcome, saturated)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.metrics)
+            stats.update(limit=int(self.limit), in_flight=self.in_flight,
+                         latency_avg=round(self.latency_avg or 0.0, 3))
+            return stats
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter(name):
+    """Shared limiter for a downstream in DOWNSTREAMS (max overridable with LIMIT_<NAME>_MAX)."""
+    with _limiters_lock:
+        if name not in _limiters:
+            initial, max_limit, latency_target = DOWNSTREAMS[name]
+            max_limit = int(os.environ.get(f"LIMIT_{name.upper()}_MAX", max_limit))
+            _limiters[name] = AdaptiveLimiter(name, min(initial, max_limit), max_limit, latency_target)
+        return _limiters[name]
+
+
+def limiter_stats():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {l.name: l.stats() for l in limiters}
+
+
+def limits_summary():
+    """One log line per downstream used so far."""
+    lines = []
+    for name, s in sorted(limiter_stats().items()):
+        lines.append(
+            f"Limit {name}: {s['limit']} (range {s['lowest_limit']:.1f}-{s['highest_limit']:.1f}), "
+            f"{s['calls']} calls, peak {s['peak_in_flight']} in flight, {s['overloaded']} overloaded, "
+            f"{s['cuts']} cuts, {s['slow']} slow, avg {s['latency_avg']:.2f}s, "
+            f"{s['waits']} waits ({s['wait_seconds']:.1f}s)")
+    return lines
+
+
+# === TRANSPORT HOOKS ===
+
+def limit_github_requester(requester, name='github'):
+    """
+    Route every HTTP request of a PyGithub (2.1.x) Requester through the
+    limiter. 429s and exhausted/secondary rate limits count as overload.
+    Each request's timeout is clamped to the run budget (utils/run_budget.py).
+    """
+    raw = requester._Requester__requestRaw
+    github_limiter = limiter(name)
+
+    def limited_raw(cnx, verb, url, headers, input):
+        timeout = call_timeout(GITHUB_TIMEOUT_SECONDS)
+        # The requester keeps one persistent connection; new ones read __timeout
+        requester._Requester__timeout = timeout
+        connection = requester._Requester__connection
+        if connection is not None:
+            connection.timeout = timeout
+        with github_limiter.slot() as slot:
+            status, response_headers, output = raw(cnx, verb, url, headers, input)
+            if status == 429 or (status == 403 and (
+                    response_headers.get('x-ratelimit-remaining') == '0' or 'rate limit' in str(output).lower())):
+                slot.outcome = 'overload'
+            elif status >= 500:
+                slot.outcome = 'overload' if status == 503 else 'error'
+            return status, response_headers, output
+
+    requester._Requester__requestRaw = limited_raw
+    return requester
+
+
+def limited_transport(transport, name='postgrest'):
+    """
+    Wrap an httpx transport so each request holds a slot of the named limiter
+    and its timeouts are clamped to the run budget.
+    """
+    import httpx
+
+    class LimitedTransport(httpx.BaseTransport):
+        def __init__(self, inner, downstream):
+            self.inner = inner
+            self.downstream = downstream
+
+        def handle_request(self, request):
+            timeouts = request.extensions.get('timeout') or {}
+            request.extensions['timeout'] = {
+                kind: call_timeout(seconds) for kind, seconds in timeouts.items()}
+            with self.downstream.slot() as slot:
+                response = self.inner.handle_request(request)
+                if response.status_code in (429, 503) or (
+                        response.status_code == 403 and response.headers.get('x-ratelimit-remaining') == '0'):
+                    slot.outcome = 'overload'
+                elif response.status_code >= 500:
+                    slot.outcome = 'error'
+                return response
+
+        def close(self):
+            self.inner.close()
+
+    return LimitedTransport(transport, limiter(name))
@@ -0,0 +1,294 @@
+"""
+Event-driven bot daemon for local_bot.py.
+
+Keeps a heap of each user's next due time (from the schedule index), sleeps
+exactly until the earliest one, refreshes only user_settings rows whose
+updated_at moved, and runs due users on a small worker pool.
+
+Whether a user was already served today comes from the persisted row too
+(last_commit_ts, and the decision engine's counters and ledger), so a
+restarted daemon doesn't run everyone whose slot has passed a second time.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytz
+
+from utils.schedule_index import ScheduleIndex, deadline_minute, minute_of_day
+from utils.decision_engine import decide_user, WORK
+from utils.decisions import parse_timestamp
+from utils.priority_scheduler import priority_order
+from utils.adaptive_limit import limits_summary
+from utils.failure_backoff import failure_summary
+from utils.user_stream import stream_users
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+class BotDaemon:
+    """
+    Long-running scheduler around `process_user(supabase, user, logs, actions)`
+    (actions from utils.decision_engine.decide_user).
+
+    Each user is run once per IST day at their slot. A run that raises is
+    retried after `retry_seconds`. Call run() to block until stop().
+    An optional `reconcile(supabase, users)` (see utils.contribution_ledger)
+    runs on the pool every `reconcile_seconds`. With a `run_log`
+    (utils.run_log.RunLog) every user's log lines are also stored for tails.
+    """
+
+    def __init__(self, supabase, process_user, workers=2, refresh_seconds=60,
+                 retry_seconds=900, metrics_seconds=3600, spread_anytime=True,
+                 reconcile=None, reconcile_seconds=1800, run_log=None):
+        self.supabase = supabase
+        self.run_log = run_log
+        self.process_user = process_user
+        self.reconcile = reconcile
+        self.reconcile_seconds = reconcile_seconds
+        self.workers = workers
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.metrics_seconds = metrics_seconds
+
+        self.index = ScheduleIndex(spread_anytime=spread_anytime)
+        self.users = {}             # user_id -> latest user_settings row
+        self._heap = []             # (due_epoch, seq, user_id, version)
+        self._seq = itertools.count()
+        self._version = {}          # user_id -> current heap entry version
+        self._served_day = {}       # user_id -> IST date of last completed run in this process
+        self._in_flight = set()
+        self._cursor = None         # highest updated_at seen
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self.metrics = {
+            'runs_started': 0,
+            'runs_ok': 0,
+            'runs_failed': 0,
+            'refreshes': 0,
+            'rows_refreshed': 0,
+            'max_lag_seconds': 0.0,
+            'ledger_checked': 0,
+            'ledger_corrected': 0,
+        }
+
+    # === SCHEDULING ===
+
+    def _served_today(self, user_id, now):
+        """
+        Whether today's run already happened: in this process, or per the
+        persisted row (committed today, or nothing left to do today).
+        """
+        today = now.astimezone(IST).date()
+        if self._served_day.get(user_id) == today:
+            return True
+        user = self.users.get(user_id)
+        if not user:
+            return False
+        last_commit = user.get('last_commit_ts')
+        try:
+            if last_commit and parse_timestamp(last_commit).astimezone(IST).date() == today:
+                return True
+        except ValueError:
+            pass
+        return not decide_user(user, now) & WORK
+
+    def _next_due(self, user_id, now):
+        """Epoch seconds of the user's next slot that hasn't been served yet."""
+        now_ist = now.astimezone(IST)
+        day = now_ist.date()
+        if self._served_today(user_id, now):
+            day = day + timedelta(days=1)
+        slot = self.index.slot_of(user_id) or 0
+        midnight = IST.localize(datetime(day.year, day.month, day.day))
+        return (midnight + timedelta(minutes=slot)).timestamp()
+
+    def _arm(self, user_id, due_epoch):
+        """Push a fresh heap entry, invalidating any older one for this user."""
+        version = self._version.get(user_id, 0) + 1
+        self._version[user_id] = version
+        heapq.heappush(self._heap, (due_epoch, next(self._seq), user_id, version))
+        self._wake.set()
+
+    def _disarm(self, user_id):
+        self._version.pop(user_id, None)
+        self.users.pop(user_id, None)
+        self.index.remove(user_id)
+
+    # === REFRESH ===
+
+    def _apply_rows(self, rows, now):
+        for row in rows:
+            user_id = row['id']
+            updated_at = row.get('updated_at')
+            if updated_at and (self._cursor is None or updated_at > self._cursor):
+                self._cursor = updated_at
+            if row.get('pause_bot'):
+                self._disarm(user_id)
+                continue
+            self.users[user_id] = row
+            if self.index.upsert(user_id, row.get('commit_time'), updated_at,
+                                 deadline_minute(row)):
+                if user_id in self.index.invalid:
+                    print(f"User {row.get('github_username')}: {self.index.invalid[user_id]}")
+                    self._version.pop(user_id, None)
+                elif user_id not in self._in_flight:
+                    self._arm(user_id, self._next_due(user_id, now))
+
+    def refresh(self):
+        """Load all active users on the first call (page by page), then only changed rows."""
+        if self._cursor is None:
+            pages = stream_users(self.supabase)
+        else:
+            # Paused rows are included so they can be dropped from the heap
+            pages = [self.supabase.table("user_settings").select("*")
+                     .gt("updated_at", self._cursor).order("updated_at").execute().data or []]
+        count = 0
+        for rows in pages:
+            now = datetime.now(pytz.utc)
+            with self._lock:
+                self._apply_rows(rows, now)
+            count += len(rows)
+        self.metrics['refreshes'] += 1
+        self.metrics['rows_refreshed'] += count
+        return count
+
+    # === EXECUTION ===
+
+    def _run_user(self, user_id, due_epoch):
+        lag = max(time.time() - due_epoch, 0.0)
+        with self._lock:
+            self.metrics['max_lag_seconds'] = max(self.metrics['max_lag_seconds'], lag)
+            self.metrics['runs_started'] += 1
+        logs = []
+        user = None
+        failed = False
+        try:
+            # Re-read the row so limits and counters are current
+            rows = self.supabase.table("user_settings").select("*").eq("id", user_id).execute().data
+            user = rows[0] if rows else None
+            if user and not user.get('pause_bot'):
+                # Planned like a cron page (see utils/decision_engine.py)
+                self.process_user(self.supabase, user, logs, decide_user(user, datetime.now(pytz.utc)))
+        except Exception as e:
+            failed = True
+            logs.append(f"Error processing user {user_id}: {e}")
+
+        if logs:
+            print("\n".join(logs))
+            if self.run_log:
+                for line in logs:
+                    self.run_log.emit(line, user.get('github_username') if user else None)
+
+        now = datetime.now(pytz.utc)
+        with self._lock:
+            self._in_flight.discard(user_id)
+            if failed:
+                self.metrics['runs_failed'] += 1
+                if user_id in self.users:
+                    self._arm(user_id, time.time() + self.retry_seconds)
+            else:
+                self.metrics['runs_ok'] += 1
+                self._served_day[user_id] = now.astimezone(IST).date()
+                if user_id in self.users and user_id in self.index and user_id not in self.index.invalid:
+                    self._arm(user_id, self._next_due(user_id, now))
+
+    def _reconcile(self):
+        with self._lock:
+            users = list(self.users.values())
+        try:
+            stats = self.reconcile(self.supabase, users)
+        except Exception as e:
+            print(f"Ledger reconcile failed: {e}")
+            return
+        with self._lock:
+            self.metrics['ledger_checked'] += stats['checked']
+            self.metrics['ledger_corrected'] += stats['corrected']
+
+    def _pop_due(self, now_epoch):
+        """Pop every valid heap entry that is due; returns [(user_id, due_epoch)]."""
+        due = []
+        while self._heap and self._heap[0][0] <= now_epoch:
+            due_epoch, _, user_id, version = heapq.heappop(self._heap)
+            if self._version.get(user_id) != version or user_id in self._in_flight:
+                continue  # stale entry
+            self._in_flight.add(user_id)
+            due.append((user_id, due_epoch))
+        return due
+
+    def _next_wake(self, now_epoch, next_refresh, next_metrics):
+        with self._lock:
+            while self._heap and self._version.get(self._heap[0][2]) != self._heap[0][3]:
+                heapq.heappop(self._heap)
+            next_due = self._heap[0][0] if self._heap else float('inf')
+        return max(min(next_due, next_refresh, next_metrics) - now_epoch, 0.0)
+
+    def report(self):
+        with self._lock:
+            queued = len(self._version)
+            in_flight = len(self._in_flight)
+        m = self.metrics
+        print(f"[Metrics] users={len(self.users)} queued={queued} in_flight={in_flight} "
+              f"runs={m['runs_started']} ok={m['runs_ok']} failed={m['runs_failed']} "
+              f"refreshes={m['refreshes']} rows_refreshed={m['rows_refreshed']} "
+              f"max_lag={m['max_lag_seconds']:.1f}s "
+              f"ledger_checked={m['ledger_checked']} ledger_corrected={m['ledger_corrected']}")
+        for line in limits_summary():
+            print(f"[Metrics] {line}")
+        for line in failure_summary():
+            print(f"[Metrics] {line}")
+        if self.run_log:
+            print(f"[Metrics] {self.run_log.summary()}")
+
+    def run(self):
+        """Block, dispatching due users, until stop() is called."""
+        self.refresh()
+        print(f"Loaded {len(self.users)} active users")
+        next_refresh = time.time() + self.refresh_seconds
+        next_metrics = time.time() + self.metrics_seconds
+        next_reconcile = time.time() + self.reconcile_seconds
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not self._stop.is_set():
+                now_epoch = time.time()
+                if now_epoch >= next_refresh:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        print(f"Refresh failed: {e}")
+                    next_refresh = now_epoch + self.refresh_seconds
+                if now_epoch >= next_metrics:
+                    self.report()
+                    next_metrics = now_epoch + self.metrics_seconds
+                # Checked on every wake; refreshes bound the wait, so no extra timer
+                if self.reconcile and now_epoch >= next_reconcile:
+                    pool.submit(self._reconcile)
+                    next_reconcile = now_epoch + self.reconcile_seconds
+
+                with self._lock:
+                    due = self._pop_due(now_epoch)
+                    # Several users due at once (e.g. after a stall): most urgent first
+                    if len(due) > 1:
+                        due, _ = priority_order(due, minute_of_day(datetime.now(IST)),
+                                                key=lambda entry: self.users.get(entry[0], {}))
+                for user_id, due_epoch in due:
+                    pool.submit(self._run_user, user_id, due_epoch)
+
+                self._wake.clear()
+                self._wake.wait(self._next_wake(time.time(), next_refresh, next_metrics))
+
+            print("Stopping: waiting for in-flight users to finish...")
+        if self.run_log:
+            self.run_log.close()
+        self.report()
+
+    def stop(self, *_):
+        """Request a graceful shutdown (usable as a signal handler)."""
+        self._stop.set()
+        self._wake.set()
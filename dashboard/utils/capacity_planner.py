@@ -0,0 +1,334 @@
+"""
+Dry-run capacity planner for the cron run.
+
+Replays the decision logic of api/cron.py (schedule gating, then the batch
+action plan from utils/decision_engine.py: daily reset, plan limits, weekly
+free-tier rule, LeetCode and enterprise branches) against a
+snapshot of user_settings/projects or synthetic data, with a fixed clock and
+no Gemini/GitHub calls. Reports per-service call counts, estimated wall time
+per concurrency level (capped by each service's adaptive limiter) and the
+Gemini quota needed per key.
+
+Regular commits are modelled the way the cron serves them: when a page has
+more than one, their tutorials come from batched prefetch_content requests
+(BATCH_MAX_ITEMS per request), and only the share that fails batch
+validation (`batch_fallback`) falls back to the per-user idea + code calls.
+
+Usage (from the dashboard directory):
+    python -m utils.capacity_planner --synthetic 100000
+    python -m utils.capacity_planner --snapshot snapshot.json --now 2026-10-19T23:30:00+05:30
+    python -m utils.capacity_planner --from-supabase
+"""
+
+import argparse
+import datetime
+import json
+import math
+import random
+import time
+
+import pytz
+
+from utils.adaptive_limit import DOWNSTREAMS
+from utils.content_generator import BATCH_MAX_ITEMS
+from utils.decision_engine import (
+    UserColumns, decide_batch, RESET, REGULAR, LEETCODE, ENTERPRISE, NO_TOKEN, WORK,
+)
+from utils.schedule_index import ScheduleIndex, minute_of_day
+from utils.user_stream import user_pages
+
+IST = pytz.timezone('Asia/Kolkata')
+
+SERVICES = ('gemini', 'github', 'supabase')
+
+# Calls made by each stage of process_user (see api/cron.py)
+STAGE_CALLS = {
+    'reset':            {'supabase': 1},                  # daily counter reset
+    'repo_check':       {'github': 2},                    # get_repo + get_commits totalCount
+    'enterprise_probe': {'supabase': 1},                  # projects lookup for logging
+    'regular':          {'gemini': 2, 'github': 1, 'supabase': 2},  # idea + code (unbatched), create_file, history + counters
+    'leetcode':         {'gemini': 1, 'github': 6, 'supabase': 1},  # get_repo, contents scan (~4), create_file
+    'enterprise_check': {'supabase': 1},                  # active project select
+    'enterprise':       {'gemini': 1, 'github': 2, 'supabase': 1},  # get_repo, create_file, progress update
+}
+
+# Rough per-call latency in seconds, overridable from the CLI
+DEFAULT_LATENCY = {'gemini': 6.0, 'github': 0.35, 'supabase': 0.12}
+
+# Adaptive limiter in front of each service (utils/adaptive_limit.py)
+LIMITERS = {'gemini': 'gemini', 'github': 'github', 'supabase': 'postgrest'}
+
+# Share of batched tutorials that fail validation and are generated per user
+BATCH_FALLBACK_RATE = 0.1
+
+CONCURRENCY_LEVELS = (1, 2, 4, 8, 16, 32)
+
+
+def regular_gemini_calls(regular_users, batch_size=BATCH_MAX_ITEMS, batch_fallback=BATCH_FALLBACK_RATE):
+    """Gemini calls per regular commit: a share of a batch request plus the per-user fallback."""
+    per_user = STAGE_CALLS['regular']['gemini']
+    if regular_users < 2 or batch_size < 2:
+        return per_user
+    return 1 / batch_size + batch_fallback * per_user
+
+
+def simulate(users, projects=None, now=None, commits_today=0, spread_anytime=False,
+             batch_size=BATCH_MAX_ITEMS, batch_fallback=BATCH_FALLBACK_RATE):
+    """
+    Replay the cron decisions for `users` at `now` (aware datetime).
+
+    `projects` are rows of the projects table; `commits_today` is the GitHub
+    commit count assumed for users whose row has no 'commits_today' field.
+    Regular commits use batched generation (`batch_size` tutorials per
+    request, `batch_fallback` of them regenerated per user).
+    Returns a dict with user counts, stage counts and per-service call counts.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    now_utc = now.astimezone(datetime.timezone.utc)
+    now_ist = now.astimezone(IST)
+
+    active_projects = {}
+    for project in projects or []:
+        if project.get('status', 'in_progress') == 'in_progress':
+            active_projects.setdefault(project['user_id'], project)
+
+    active = [u for u in users if not u.get('pause_bot')]
+    index = ScheduleIndex(spread_anytime=spread_anytime)
+    index.sync(active)
+    due_ids = index.due_through(minute_of_day(now_ist))
+
+    stages = {stage: 0 for stage in STAGE_CALLS}
+    result = {
+        'users_total': len(users),
+        'users_active': len(active),
+        'users_due': 0,
+        'users_not_due': 0,
+        'users_invalid_time': len(index.invalid),
+        'users_no_token': 0,
+        'users_idle': 0,
+        'stages': stages,
+        'calls': {service: 0 for service in SERVICES},
+        'user_calls': [],
+        'batch_size': batch_size,
+        'batch_fallback': batch_fallback,
+    }
+
+    due = [user for user in active if user['id'] in due_ids]
+    result['users_due'] = len(due)
+    result['users_not_due'] = len(active) - len(due) - len(index.invalid)
+    plan = decide_batch(UserColumns.from_rows(due), now_utc, active_projects)
+
+    user_stages = []
+    for user, actions in zip(due, plan):
+        ran = []
+        user_stages.append(ran)
+        if actions & NO_TOKEN:
+            result['users_no_token'] += 1
+            continue
+        if actions & RESET:
+            ran.append('reset')
+        if not actions & WORK:
+            result['users_idle'] += 1
+            continue
+
+        # A met contribution ledger clears REGULAR, so no GitHub check either
+        if actions & REGULAR:
+            ran.append('repo_check')
+        if user.get('plan_type', 'free') == 'enterprise':
+            ran.append('enterprise_probe')
+
+        count = user.get('commits_today', commits_today)
+        if actions & REGULAR and count < user['min_contributions']:
+            ran.append('regular')
+        if actions & LEETCODE:
+            ran.append('leetcode')
+        if actions & ENTERPRISE:
+            # process_user re-reads the project before generating
+            ran.extend(['enterprise_check', 'enterprise'])
+
+    # The cron batch-generates the tutorials of a page's regular commits up front
+    regular_users = sum('regular' in ran for ran in user_stages)
+    stage_calls = dict(STAGE_CALLS, regular=dict(
+        STAGE_CALLS['regular'], gemini=regular_gemini_calls(regular_users, batch_size, batch_fallback)))
+    result['regular_gemini_calls'] = stage_calls['regular']['gemini']
+    for ran in user_stages:
+        _tally(result, stages, ran, stage_calls)
+
+    return result
+
+
+def _tally(result, stages, ran, stage_calls=STAGE_CALLS):
+    calls = {service: 0 for service in SERVICES}
+    for stage in ran:
+        stages[stage] += 1
+        for service, n in stage_calls[stage].items():
+            calls[service] += n
+    for service, n in calls.items():
+        result['calls'][service] += n
+    result['user_calls'].append(calls)
+
+
+def estimate(result, latency=None, concurrency_levels=CONCURRENCY_LEVELS,
+             gemini_keys=1, limits=None):
+    """
+    Estimated wall time per concurrency level and Gemini quota per key.
+    Each user runs its calls sequentially; users are spread over workers,
+    and no service has more calls in flight than its adaptive limiter's
+    cap (`limits`, default: the max limits in DOWNSTREAMS).
+    """
+    latency = dict(DEFAULT_LATENCY, **(latency or {}))
+    limits = dict({service: DOWNSTREAMS[name][1] for service, name in LIMITERS.items()}, **(limits or {}))
+    per_user = [
+        sum(calls[service] * latency[service] for service in SERVICES)
+        for calls in result['user_calls']
+    ]
+    # A service at its limiter cap the whole run
+    service_seconds = {
+        service: result['calls'][service] * latency[service] / limits[service] for service in SERVICES
+    }
+    bottleneck = max(SERVICES, key=service_seconds.get)
+    total = sum(per_user)
+    longest = max(per_user) if per_user else 0.0
+
+    gemini_calls = result['calls']['gemini']
+    keys = max(gemini_keys, 1)
+    wall = {}
+    for level in concurrency_levels:
+        seconds = max(total / level, longest, service_seconds[bottleneck])
+        minutes = max(seconds / 60, 1 / 60)
+        wall[level] = {
+            'seconds': round(seconds, 1),
+            'limited_by': bottleneck if seconds == service_seconds[bottleneck] else 'workers',
+            'gemini_rpm_per_key': round(gemini_calls / minutes / keys, 1),
+        }
+    return {
+        'wall_time': wall,
+        'gemini_calls_per_key': math.ceil(gemini_calls / keys),
+        'gemini_keys': keys,
+        'limits': limits,
+    }
+
+
+def synthetic_users(n, now=None, seed=7):
+    """Generate `n` user_settings rows (and their projects) with a realistic plan mix."""
+    rng = random.Random(seed)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    plans = ['free'] * 70 + ['pro'] * 15 + ['leetcode'] * 10 + ['enterprise'] * 5
+    users, projects = [], []
+    for i in range(n):
+        plan = rng.choice(plans)
+        user_id = f"00000000-0000-0000-0000-{i:012d}"
+        last_commit = now - datetime.timedelta(hours=rng.randint(1, 24 * 14))
+        users.append({
+            'id': user_id,
+            'github_username': f"user{i}",
+            'github_access_token': 'token' if rng.random() < 0.97 else None,
+            'plan_type': plan,
+            'pause_bot': rng.random() < 0.05,
+            'commit_time': None if rng.random() < 0.6 else f"{rng.randint(0, 23):02d}:{rng.choice([0, 15, 30, 45]):02d}",
+            'min_contributions': rng.choice([1, 1, 1, 2, 3]),
+            'daily_commit_count': rng.choice([0, 0, 1]),
+            'leetcode_daily_count': rng.choice([0, 0, 1]),
+            'leetcode_repo': 'LeetCode-Solutions' if plan == 'leetcode' else None,
+            'last_commit_ts': last_commit.isoformat(),
+            'custom_deadline_hour': 23,
+            'custom_deadline_minute': 45,
+        })
+        if plan == 'enterprise' and rng.random() < 0.8:
+            projects.append({
+                'user_id': user_id,
+                'status': 'in_progress',
+                'current_day': rng.randint(0, 15),
+                'days_duration': 15,
+            })
+    return users, projects
+
+
+def load_snapshot(path):
+    """Read {"user_settings": [...], "projects": [...]} from a JSON file."""
+    with open(path) as f:
+        data = json.load(f)
+    return data.get('user_settings', []), data.get('projects', [])
+
+
+def fetch_snapshot():
+    """Read-only snapshot of user_settings/projects from Supabase."""
+    from api.cron import create_supabase_client
+    supabase = create_supabase_client()
+    # Keyset pages like the cron: one select is cut off at PostgREST's max-rows
+    users = [user for page in user_pages(supabase, active_only=False) for user in page]
+    projects = supabase.table("projects").select("*").eq("status", "in_progress").execute().data
+    return users, projects
+
+
+def format_report(result, estimates, elapsed):
+    lines = [
+        f"Users: {result['users_total']} total, {result['users_active']} active, "
+        f"{result['users_due']} due, {result['users_not_due']} not yet due, "
+        f"{result['users_invalid_time']} invalid commit_time, {result['users_no_token']} without token, "
+        f"{result['users_idle']} with nothing to do",
+        "Stages: " + ", ".join(f"{stage}={n}" for stage, n in result['stages'].items()),
+        "Calls: " + ", ".join(f"{service}={math.ceil(n)}" for service, n in result['calls'].items()),
+        f"Gemini per regular commit: {result['regular_gemini_calls']:.2f} calls " + (
+            f"({result['batch_size']} tutorials per batch request, {result['batch_fallback']:.0%} regenerated per user)"
+            if result['regular_gemini_calls'] < STAGE_CALLS['regular']['gemini'] else "(idea + code, not batched)"),
+        f"Gemini quota needed: {estimates['gemini_calls_per_key']} calls per key ({estimates['gemini_keys']} keys)",
+        "Estimated wall time:",
+    ]
+    for level, est in estimates['wall_time'].items():
+        lines.append(f"  concurrency {level:>3}: {est['seconds'] / 60:8.1f} min  "
+                     f"(~{est['gemini_rpm_per_key']} Gemini req/min per key, limited by {est['limited_by']})")
+    lines.append(f"Simulated in {elapsed:.2f}s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dry-run capacity planner for the cron run")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--snapshot", help="JSON file with user_settings and projects arrays")
+    source.add_argument("--synthetic", type=int, help="Generate N synthetic users")
+    source.add_argument("--from-supabase", action="store_true", help="Read a snapshot from Supabase")
+    parser.add_argument("--now", help="Clock for the run (ISO 8601, default: now)")
+    parser.add_argument("--commits-today", type=int, default=0, help="Assumed GitHub commits today per user")
+    parser.add_argument("--spread-anytime", action="store_true", help="Simulate SPREAD_ANYTIME_USERS=true")
+    parser.add_argument("--gemini-keys", type=int, default=1, help="Number of Gemini API keys")
+    parser.add_argument("--batch-size", type=int, default=BATCH_MAX_ITEMS,
+                        help="Tutorials per batched Gemini request (1: no batching)")
+    parser.add_argument("--batch-fallback", type=float, default=BATCH_FALLBACK_RATE,
+                        help="Share of batched tutorials regenerated per user")
+    parser.add_argument("--gemini-latency", type=float, default=DEFAULT_LATENCY['gemini'])
+    parser.add_argument("--github-latency", type=float, default=DEFAULT_LATENCY['github'])
+    parser.add_argument("--supabase-latency", type=float, default=DEFAULT_LATENCY['supabase'])
+    parser.add_argument("--json", action="store_true", help="Print the raw result as JSON")
+    args = parser.parse_args(argv)
+
+    now = datetime.datetime.fromisoformat(args.now) if args.now else datetime.datetime.now(IST)
+    if now.tzinfo is None:
+        now = IST.localize(now)
+
+    if args.snapshot:
+        users, projects = load_snapshot(args.snapshot)
+    elif args.synthetic:
+        users, projects = synthetic_users(args.synthetic, now)
+    else:
+        users, projects = fetch_snapshot()
+
+    started = time.perf_counter()
+    result = simulate(users, projects, now, args.commits_today, args.spread_anytime,
+                      args.batch_size, args.batch_fallback)
+    estimates = estimate(result, {
+        'gemini': args.gemini_latency,
+        'github': args.github_latency,
+        'supabase': args.supabase_latency,
+    }, gemini_keys=args.gemini_keys)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        summary = {k: v for k, v in result.items() if k != 'user_calls'}
+        print(json.dumps(dict(summary, **estimates), indent=2, default=str))
+    else:
+        print(format_report(result, estimates, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Post-processing and cheap validity checks for generated code.
+
+Gemini output is parsed in a single pass (markdown fences, FILEPATH/CODE
+layout, LeetCode header) and checked locally before anything is committed:
+ast.parse for Python, json.loads for JSON and bracket balance for the other
+brace languages. A failed check lets the caller regenerate once instead of
+spending a GitHub write on truncated or malformed output.
+
+The *_prefix_reason() checks run on a streamed response while it is being
+generated (prompts.generate(stream_check=...)): once the first
+PREFIX_CHECK_CHARS show the layout is wrong, the stream is cancelled with
+EarlyAbort and the regeneration starts without waiting for the rest.
+"""
+
+import ast
+import json
+import re
+
+# Languages checked with bracket balance (// and /* */ comments)
+C_STYLE = {
+    'javascript', 'typescript', 'java', 'cpp', 'c++', 'c', 'csharp', 'go',
+    'rust', 'swift', 'kotlin', 'php', 'css', 'scss', 'dart', 'scala',
+}
+# Languages checked with bracket balance (# comments). Not shell: `$#`,
+# `${#arr[@]}` and `case` patterns like `start)` are valid but unbalanced
+HASH_STYLE = {'ruby', 'r', 'yaml'}
+# Line comment markers where they differ from // (C_STYLE) and # (HASH_STYLE)
+LINE_COMMENTS = {'php': ('//', '#'), 'sql': ('--',)}
+
+EXTENSION_LANGUAGES = {
+    'py': 'python', 'js': 'javascript', 'jsx': 'javascript', 'mjs': 'javascript',
+    'ts': 'typescript', 'tsx': 'typescript', 'java': 'java', 'cpp': 'cpp',
+    'cc': 'cpp', 'c': 'c', 'h': 'c', 'hpp': 'cpp', 'cs': 'csharp', 'go': 'go',
+    'rs': 'rust', 'rb': 'ruby', 'swift': 'swift', 'kt': 'kotlin', 'php': 'php',
+    'css': 'css', 'scss': 'scss', 'sql': 'sql', 'sh': 'bash', 'json': 'json',
+    'dart': 'dart', 'scala': 'scala',
+}
+
+MIN_CODE_LENGTH = 20
+
+# Rust lifetimes ('a) and char literals make ' unreliable as a string delimiter
+SINGLE_QUOTE_NOT_STRING = {'rust'}
+
+_PAIRS = {')': '(', ']': '[', '}': '{'}
+
+# How much of a streamed response the prefix checks get to see before deciding
+PREFIX_CHECK_CHARS = 400
+
+# A ``` that starts a line; one inside a string or comment is fine
+_FENCE_LINE = re.compile(r"^[ \t]*```", re.M)
+
+# Chat-style openers that mean prose instead of the requested raw code
+_PROSE_OPENER = re.compile(r"(sure|certainly|of course|okay|ok|here(?:'s| is| are)|below is|i'll|i will|let's)\b", re.I)
+
+
+def language_for_path(path):
+    """Language key for a file path's extension ('' if unknown)."""
+    name = path.rsplit('/', 1)[-1]
+    if '.' not in name:
+        return ''
+    return EXTENSION_LANGUAGES.get(name.rsplit('.', 1)[-1].lower(), '')
+
+
+def strip_fences(text):
+    """
+    Single-pass markdown fence parser.
+
+    Returns (code, fenced, closed): the body of the first ``` block (or the
+    whole text when there is none), whether a fence was found and whether it
+    was closed. An unclosed fence usually means the output was truncated.
+    """
+    lines = text.strip().split('\n')
+    body = []
+    fenced = closed = False
+    for line in lines:
+        if line.lstrip().startswith('```'):
+            if not fenced:
+                fenced = True
+                body = []       # drop any preamble before the fence
+                continue
+            closed = True
+            break
+        body.append(line)
+    if not fenced:
+        return text.strip(), False, False
+    return '\n'.join(body).strip(), True, closed
+
+
+def _label_value(line, label):
+    """Value after `label` ('FILEPATH:') on a line, or None (same matching as the parsers)."""
+    stripped = line.strip().strip('*')
+    if stripped.upper().startswith(label):
+        return stripped[len(label):].strip()
+    return None
+
+
+def parse_enterprise_output(text):
+    """
+    Parse the "FILEPATH: ... / CODE: ..." layout in one pass.
+    Returns (filepath, code, closed) or (None, None, False) when off-format.
+    """
+    filepath = None
+    code_lines = None
+    for line in text.strip().split('\n'):
+        if code_lines is not None:
+            code_lines.append(line)
+            continue
+        path_value = _label_value(line, 'FILEPATH:')
+        code_value = _label_value(line, 'CODE:')
+        if filepath is None and path_value is not None:
+            filepath = path_value.strip('`')
+        elif code_value is not None:
+            code_lines = [code_value] if code_value else []
+    if not filepath or code_lines is None:
+        return None, None, False
+    code, fenced, closed = strip_fences('\n'.join(code_lines))
+    return filepath, code, closed or not fenced
+
+
+def parse_leetcode_output(text):
+    """
+    Parse a LeetCode answer: fenced Python. Title and difficulty come from
+    the problem catalog (utils/leetcode_catalog.py), not the answer.
+    Returns dict(code, closed).
+    """
+    code, fenced, closed = strip_fences(text)
+    return {'code': code, 'closed': closed or not fenced}
+
+
+# === STREAMING PREFIX CHECKS ===
+# Each takes the text generated so far and returns a rejection reason, or None
+# while it still looks right (or it's too early to tell).
+
+def _complete_lines(text):
+    """Lines of the first PREFIX_CHECK_CHARS that are known to be complete."""
+    head = text[:PREFIX_CHECK_CHARS]
+    lines = head.split('\n')
+    if len(text) <= PREFIX_CHECK_CHARS:
+        lines = lines[:-1]      # still being generated
+    return lines
+
+
+def enterprise_prefix_reason(text):
+    """FILEPATH: must come first (after at most a short preamble), then CODE:."""
+    lines = _complete_lines(text)
+    for index, line in enumerate(lines):
+        path = _label_value(line, 'FILEPATH:')
+        if path is None:
+            continue
+        if not path.strip('`'):
+            return "empty FILEPATH"
+        if any(_label_value(rest, 'CODE:') is not None for rest in lines[index + 1:]):
+            return None
+        break
+    else:
+        if len(text) >= PREFIX_CHECK_CHARS:
+            return f"no FILEPATH: line in the first {PREFIX_CHECK_CHARS} chars"
+        return None
+    if len(text) >= PREFIX_CHECK_CHARS:
+        return f"no CODE: line in the first {PREFIX_CHECK_CHARS} chars"
+    return None
+
+
+def fenced_prefix_reason(text):
+    """A ``` block must open within the first PREFIX_CHECK_CHARS (LeetCode answers)."""
+    if '```' in text[:PREFIX_CHECK_CHARS] or len(text) < PREFIX_CHECK_CHARS:
+        return None
+    return f"no code block in the first {PREFIX_CHECK_CHARS} chars"
+
+
+def raw_code_prefix_reason(text):
+    """
+    Raw code expected (tutorials): a chat-style prose opener is only allowed
+    when a ``` block follows it, since strip_fences() drops such a preamble.
+    """
+    lines = [line for line in _complete_lines(text) if line.strip()]
+    if not lines or not _PROSE_OPENER.match(lines[0].strip()):
+        return None
+    if '```' in text[:PREFIX_CHECK_CHARS] or len(text) < PREFIX_CHECK_CHARS:
+        return None
+    return "prose instead of raw code"
+
+
+def _bracket_error(code, line_comments=('//',), quotes='"\'`'):
+    """First bracket problem in `code`, skipping strings and comments (None if balanced)."""
+    stack = []
+    comment_starts = {marker[0] for marker in line_comments}
+    i, n = 0, len(code)
+    while i < n:
+        ch = code[i]
+        if ch in quotes and code.startswith(ch * 3, i) and ch != '`':
+            # Triple-quoted (multi-line) string: Kotlin, Swift, Scala, Dart
+            end = code.find(ch * 3, i + 3)
+            if end == -1:
+                return "unterminated string"
+            i = end + 2
+        elif ch in quotes:
+            # Skip the string literal (with escapes)
+            i += 1
+            while i < n and code[i] != ch:
+                if code[i] == '\\':
+                    i += 1
+                elif code[i] == '\n' and ch != '`':
+                    break
+                i += 1
+        elif ch in comment_starts and any(code.startswith(marker, i) for marker in line_comments):
+            while i < n and code[i] != '\n':
+                i += 1
+        elif ch == '/' and code.startswith('/*', i):
+            end = code.find('*/', i + 2)
+            if end == -1:
+                return "unterminated block comment"
+            i = end + 1
+        elif ch in '([{':
+            stack.append(ch)
+        elif ch in ')]}':
+            if not stack or stack[-1] != _PAIRS[ch]:
+                return f"unbalanced '{ch}'"
+            stack.pop()
+        i += 1
+    if stack:
+        return f"{len(stack)} unclosed '{stack[-1]}'"
+    return None
+
+
+def validate_code(code, language):
+    """
+    Cheap local validity check. Returns (ok, reason).
+    Unknown languages only get the emptiness check.
+    """
+    if not code or len(code.strip()) < MIN_CODE_LENGTH:
+        return False, "empty or too short"
+    if _FENCE_LINE.search(code):
+        return False, "stray markdown fence"
+
+    language = (language or '').lower()
+    if language == 'python':
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            return False, f"SyntaxError line {e.lineno}: {e.msg}"
+    elif language == 'json':
+        try:
+            json.loads(code)
+        except ValueError as e:
+            return False, f"invalid JSON: {e}"
+    elif language in C_STYLE or language in HASH_STYLE or language == 'sql':
+        quotes = '"`' if language in SINGLE_QUOTE_NOT_STRING else '"\'`'
+        line_comments = LINE_COMMENTS.get(language, ('#',) if language in HASH_STYLE else ('//',))
+        error = _bracket_error(code, line_comments, quotes)
+        if error:
+            return False, error
+    return True, None
+
+
+class GenerationError(Exception):
+    """The generator itself failed (no usable response at all)."""
+
+
+class EarlyAbort(Exception):
+    """A streamed generation was cancelled because its prefix was off-format."""
+
+    def __init__(self, reason, chars):
+        super().__init__(f"{reason} (cancelled after {chars} chars)")
+        self.reason = reason
+        self.chars = chars
+
+
+def generate_validated(generate, parse, logs, label, attempts=2):
+    """
+    Generate, parse and validate, regenerating once on failure.
+
+    `generate(feedback)` returns raw model text (feedback is the previous
+    rejection reason or None) and may raise GenerationError, or EarlyAbort
+    when a streamed response was cancelled (counts as off-format).
+    `parse(raw)` returns (result, code, language, closed) or None when the
+    response is off-format. Returns (result, None) on success or
+    (None, reason) after the last attempt fails.
+    """
+    reason = None
+    for attempt in range(attempts):
+        try:
+            parsed = parse(generate(reason))
+            reason = "response not in the expected format"
+        except EarlyAbort as abort:
+            parsed, reason = None, f"off-format: {abort}"
+        if parsed is not None:
+            result, code, language, closed = parsed
+            if not closed:
+                reason = "truncated output (unclosed code fence)"
+            else:
+                ok, reason = validate_code(code, language)
+                if ok:
+                    return result, None
+        retrying = attempt + 1 < attempts
+        logs.append(f"{label}: generated code rejected ({reason})" + (" - regenerating once" if retrying else ""))
+    return None, reason
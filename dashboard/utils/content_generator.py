@@ -1,9 +1,17 @@
 import google.generativeai as genai
 import random
 import os
+import re
+import threading
 import time
 from datetime import datetime
 
+from utils import prompts
+from utils.code_validation import EarlyAbort, raw_code_prefix_reason
+from utils.hedging import hedged_call
+from utils.run_budget import call_timeout
+from utils.offline_generator import generate_offline
+
 # ============================================
 # MULTI-API-KEY & MULTI-MODEL ROTATION SYSTEM
 # ============================================
@@ -23,6 +31,11 @@ GEMINI_MODELS = [
 _api_key_index = 0
 _model_index = 0
 
+# Key health: api_key -> time.monotonic() until which the key is skipped
+_key_cooldown = {}
+QUOTA_COOLDOWN_SECONDS = 120
+INVALID_KEY_COOLDOWN_SECONDS = 3600
+
 def get_api_keys():
     """Get all configured Gemini API keys from environment."""
     keys = []
@@ -49,9 +62,14 @@ def get_next_api_key_and_model():
     api_keys = get_api_keys()
     if not api_keys:
         return None, None
+    healthy = healthy_api_keys()
+    if not healthy:
+        return None, None
     
-    # Get current API key
+    # Get current API key (skipping keys that are cooling down)
     api_key = api_keys[_api_key_index % len(api_keys)]
+    if api_key not in healthy:
+        api_key = healthy[_api_key_index % len(healthy)]
     
     # Get current model
     model_name = GEMINI_MODELS[_model_index % len(GEMINI_MODELS)]
@@ -66,34 +84,104 @@ def get_next_api_key_and_model():
     
     return api_key, model_name
 
+def mark_key_unhealthy(api_key, seconds):
+    """Skip `api_key` in the rotation for the next `seconds`."""
+    _key_cooldown[api_key] = time.monotonic() + seconds
+
+def note_api_error(api_key, error):
+    """
+    Classify a Gemini error and update key health.
+    Returns 'model' (model unavailable), 'quota', 'invalid' or 'other'.
+    """
+    error_msg = str(error)
+    if "404" in error_msg or "not found" in error_msg.lower():
+        return 'model'
+    if "429" in error_msg or "quota" in error_msg.lower():
+        mark_key_unhealthy(api_key, QUOTA_COOLDOWN_SECONDS)
+        return 'quota'
+    if "403" in error_msg or "permission" in error_msg.lower():
+        mark_key_unhealthy(api_key, INVALID_KEY_COOLDOWN_SECONDS)
+        return 'invalid'
+    return 'other'
+
+def healthy_api_keys():
+    """Configured keys that are not cooling down after quota/permission errors."""
+    now = time.monotonic()
+    return [key for key in (get_api_keys() or []) if _key_cooldown.get(key, 0) <= now]
+
+def has_healthy_capacity():
+    """True while at least one Gemini key can take requests."""
+    return bool(healthy_api_keys())
+
+# Per-key Gemini clients: genai.configure() is process-global, so concurrent
+# users (and hedged attempts) on different keys each get their own client
+_clients = {}
+_clients_lock = threading.Lock()
+
+GEMINI_TIMEOUT_SECONDS = 60
+
+class _DeadlineClient:
+    """Passes a per-call timeout (clamped to the run budget) to generate_content and its streaming form."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, request, **kwargs):
+        kwargs.setdefault('timeout', call_timeout(GEMINI_TIMEOUT_SECONDS))
+        return self._client.generate_content(request, **kwargs)
+
+    def stream_generate_content(self, request, **kwargs):
+        kwargs.setdefault('timeout', call_timeout(GEMINI_TIMEOUT_SECONDS))
+        return self._client.stream_generate_content(request, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def gemini_model(api_key, model_name):
+    """GenerativeModel bound to `api_key` without touching the global configuration."""
+    with _clients_lock:
+        if api_key not in _clients:
+            import google.ai.generativelanguage as glm
+            _clients[api_key] = _DeadlineClient(glm.GenerativeServiceClient(client_options={"api_key": api_key}))
+        client = _clients[api_key]
+    model = genai.GenerativeModel(model_name)
+    model._client = client
+    return model
+
+def _alternate_for(primary):
+    """A healthy (key, model) different from `primary` for a hedge, or (None, None)."""
+    for _ in range(len(GEMINI_MODELS) * len(get_api_keys() or [1])):
+        candidate = get_next_api_key_and_model()
+        if not candidate[0] or candidate != primary:
+            return candidate
+    return None, None
+
+def generate_text(template, api_key, model_name, suffix=None, stream_check=None, **params):
+    """
+    One Gemini generation of `template` on (api_key, model_name), hedged to
+    another key/model when GEMINI_HEDGING is on (see utils/hedging.py).
+    Returns the response; errors of the primary attempt are raised
+    (EarlyAbort when `stream_check` cancelled an off-format stream).
+    """
+    def call(key, model, cancel):
+        return prompts.generate(gemini_model(key, model), template, suffix, stream_check, cancel, **params)
+
+    def has_text(response):
+        try:
+            return bool(response.text.strip())
+        except (ValueError, AttributeError):
+            return False     # blocked / empty candidate
+
+    return hedged_call(template.key, call, (api_key, model_name),
+                       lambda: _alternate_for((api_key, model_name)), valid=has_text, on_error=note_api_error)
+
 def generate_creative_idea(language, api_key, model_name):
     """
     Generate a COMPLETELY NEW creative learning idea each time.
     No fixed templates - fully AI-generated topics!
     """
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
-    
-    idea_prompt = (
-        f"Generate ONE creative, educational coding tutorial idea for {language}. "
-        f"Give me:\n"
-        f"1. A short, descriptive filename (2-3 words, snake_case, no extension)\n"
-        f"2. A one-line description of what to build\n"
-        f"\n"
-        f"Requirements:\n"
-        f"- Must be a LEARNING example (tutorial-style, educational)\n"
-        f"- Should teach a useful concept or technique\n"
-        f"- Examples: 'simple_http_server' (Create HTTP server basics), 'responsive_webpage' (Build responsive layout)\n"
-        f"- Make it DIFFERENT from common examples\n"
-        f"- Be creative and practical\n"
-        f"\n"
-        f"Format your response EXACTLY as:\n"
-        f"FILENAME: your_filename_here\n"
-        f"DESCRIPTION: Your description here\n"
-    )
-    
     try:
-        response = model.generate_content(idea_prompt)
+        response = generate_text(prompts.TUTORIAL_IDEA, api_key, model_name, language=language)
         text = response.text.strip()
         
         # Parse the response
@@ -134,8 +222,19 @@ def get_random_content(api_key=None, language='any', retry_count=0):
         retry_count: Internal retry counter
     """
     
-    # If no specific key provided, use rotation system
-    if not api_key:
+    # Serve from the batch-generated pool first (see prefetch_content)
+    if retry_count == 0 and language != 'any':
+        pooled = take_pooled_content(language)
+        if pooled:
+            return pooled
+    
+    # Every key cooling down or exhausted: serve from the offline backend.
+    # No key configured at all is a deployment error and fails below instead.
+    if get_api_keys() and not has_healthy_capacity():
+        return _offline_content(language)
+    
+    # If no specific key provided (or it is cooling down), use rotation system
+    if not api_key or api_key not in healthy_api_keys():
         api_key, model_name = get_next_api_key_and_model()
     else:
         # Use first available model if specific key is provided
@@ -155,29 +254,9 @@ def get_random_content(api_key=None, language='any', retry_count=0):
         # Generate a COMPLETELY NEW creative idea
         filename_idea, description = generate_creative_idea(language, api_key, model_name)
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
-        
-        # Enhanced prompt for educational code
-        prompt = (
-            f"Create an EDUCATIONAL code tutorial for: {description}\n"
-            f"Language: {language}\n"
-            f"\n"
-            f"Requirements:\n"
-            f"1. Write CLEAR, WELL-COMMENTED code that teaches concepts\n"
-            f"2. Include comments explaining WHAT and WHY (educational style)\n"
-            f"3. Add a header comment explaining the learning objective\n"
-            f"4. Make it 80-150 lines (complete but not overwhelming)\n"
-            f"5. Use best practices and modern {language} features\n"
-            f"6. Include example usage at the end\n"
-            f"7. Focus on ONE concept and teach it well\n"
-            f"8. NO markdown formatting - just raw code with comments\n"
-            f"9. Make it practical and immediately useful for learning\n"
-            f"\n"
-            f"Write code that a beginner could learn from!"
-        )
-        
-        response = model.generate_content(prompt)
+        # Educational code prompt (static prefix + topic, see utils/prompts.py)
+        response = generate_text(prompts.TUTORIAL_CODE, api_key, model_name, description=description,
+                                 language=language, stream_check=raw_code_prefix_reason)
         content = response.text.strip()
         
         # Clean markdown formatting
@@ -196,26 +275,37 @@ def get_random_content(api_key=None, language='any', retry_count=0):
     except Exception as e:
         error_msg = str(e)
         
+        error_kind = 'format' if isinstance(e, EarlyAbort) else note_api_error(api_key, e)
+        
         # Check if we should retry with different API key/model
-        if retry_count < max_retries:
+        if retry_count < max_retries and has_healthy_capacity():
             # Specific error handling with appropriate delays
-            if "404" in error_msg or "not found" in error_msg.lower():
+            if error_kind == 'format':
+                print(f"⚠️ Off-format output from {model_name} ({error_msg[:100]}), regenerating...")
+            elif error_kind == 'model':
                 print(f"⚠️ Model {model_name} not available, trying next...")
                 # No delay needed for model not found
-            elif "429" in error_msg or "quota" in error_msg.lower():
-                print(f"⚠️ API key quota exceeded, rotating to next key with delay...")
-                time.sleep(5)  # Wait 5 seconds before retrying with new key
-            elif "403" in error_msg or "permission" in error_msg.lower():
+            elif error_kind == 'quota':
+                print(f"⚠️ API key quota exceeded, key cooling down - rotating to next key...")
+            elif error_kind == 'invalid':
                 print(f"⚠️ API key invalid, trying next...")
             else:
                 print(f"⚠️ Error with {model_name}: {error_msg[:100]}")
-                time.sleep(2)  # Small delay for unknown errors
+                # No fixed delay: overload errors already cut the adaptive Gemini limit
             
             # Retry with next API key/model combination
             return get_random_content(api_key=None, language=language, retry_count=retry_count + 1)
         
         # All retries exhausted
-        return f"Error: All API keys/models failed. Last error: {error_msg}"
+        print(f"⚠️ All API keys/models failed ({error_msg[:100]})")
+        return _offline_content(language)
+
+def _offline_content(language):
+    """Deterministic local content (see utils/offline_generator.py)."""
+    if language == 'any':
+        language = get_random_language()
+    print(f"⚠️ No healthy Gemini capacity - generating {language} content offline")
+    return generate_offline(language)
 
 def get_extension(language):
     """Returns the file extension for a given language."""
@@ -252,10 +342,134 @@ def get_realistic_filename(language):
     ]
     return f"{language}_{random.choice(topics)}"
 
+SUPPORTED_LANGUAGES = [
+    'python', 'javascript', 'typescript', 'java', 'cpp', 'go', 'rust',
+    'ruby', 'swift', 'kotlin', 'php', 'html', 'css', 'sql', 'bash'
+]
+
 def get_random_language():
-    """Returns a random language key from the supported list."""
-    languages = [
-        'python', 'javascript', 'typescript', 'java', 'cpp', 'go', 'rust',
-        'ruby', 'swift', 'kotlin', 'php', 'html', 'css', 'sql', 'bash'
-    ]
-    return random.choice(languages)
+    """
+    Returns a random language key from the supported list.
+    Prefers languages that already have batch-generated content waiting.
+    """
+    with _pool_lock:
+        pooled = [lang for lang, items in _content_pool.items() if items]
+    if pooled:
+        return random.choice(pooled)
+    return random.choice(SUPPORTED_LANGUAGES)
+
+# ============================================
+# BATCHED GENERATION (several jobs per request)
+# ============================================
+# Per-request overhead and requests-per-minute quotas are the bottleneck, so
+# pending jobs (tutorials for several users) are combined
+# into one request with a delimited multi-item response and split back out.
+
+BATCH_MAX_ITEMS = 5
+BATCH_MAX_ROUNDS = 3
+
+# language -> list of ready tutorial contents, filled by prefetch_content()
+_content_pool = {}
+_pool_lock = threading.Lock()
+
+_ITEM_RE = re.compile(r"^=== ITEM (\S+) ===\s*$(.*?)^=== END \1 ===\s*$", re.MULTILINE | re.DOTALL)
+
+def _batch_tasks(jobs):
+    """Task lines for a batched request (the instructions are the BATCH_ITEMS prefix)."""
+    return "\n".join(
+        f"- id {job['id']}: Invent a fresh, uncommon EDUCATIONAL tutorial idea in {job['language']} "
+        f"and write it: header comment with the learning objective, clear comments explaining "
+        f"WHAT and WHY, 80-150 lines, modern {job['language']} best practices, example usage at the end."
+        for job in jobs
+    )
+
+def parse_batch_response(text, jobs):
+    """
+    Split a batched response back into items.
+    Returns (results, failed): {job_id: code} and the jobs that were missing
+    or didn't pass the local validity check.
+    """
+    from utils.code_validation import strip_fences, validate_code
+
+    found = {}
+    for match in _ITEM_RE.finditer(text):
+        code, fenced, closed = strip_fences(match.group(2))
+        found[match.group(1)] = (code, closed or not fenced)
+
+    results, failed = {}, []
+    for job in jobs:
+        code, complete = found.get(str(job['id']), (None, False))
+        if code and complete and validate_code(code, job['language'])[0]:
+            results[job['id']] = code
+        else:
+            failed.append(job)
+    return results, failed
+
+def generate_batch(jobs, max_items=BATCH_MAX_ITEMS, max_rounds=BATCH_MAX_ROUNDS):
+    """
+    Generate content for many jobs with as few requests as possible.
+
+    Each job is a tutorial dict with 'id' and 'language' (LeetCode answers
+    are generated one per problem, see api/cron.py). Jobs are sent
+    max_items per request; items that fail parsing/validation are
+    re-queued for the next round.
+    Returns ({job_id: content}, stats).
+    """
+    results = {}
+    pending = list(jobs)
+    stats = {'requests': 0, 'items': len(jobs), 'requeued': 0, 'failed': 0}
+
+    for round_number in range(max_rounds):
+        if not pending:
+            break
+        requeue = []
+        for start in range(0, len(pending), max_items):
+            chunk = pending[start:start + max_items]
+            api_key, model_name = get_next_api_key_and_model()
+            if not api_key:
+                requeue.extend(chunk)
+                continue
+            try:
+                stats['requests'] += 1
+                # Hedged like single generations: the losing request's stream is cancelled
+                response = generate_text(prompts.BATCH_ITEMS, api_key, model_name, tasks=_batch_tasks(chunk))
+                done, failed = parse_batch_response(response.text, chunk)
+                results.update(done)
+                requeue.extend(failed)
+            except Exception as e:
+                print(f"⚠️ Batch request failed on {model_name}: {str(e)[:100]}")
+                note_api_error(api_key, e)
+                requeue.extend(chunk)
+        if requeue and round_number + 1 < max_rounds:
+            stats['requeued'] += len(requeue)
+        pending = requeue
+
+    stats['failed'] = len(pending)
+    return results, stats
+
+def prefetch_content(languages, max_items=BATCH_MAX_ITEMS):
+    """
+    Batch-generate one tutorial per entry in `languages` ('any' picks a
+    random language) into the pool that get_random_content() serves from.
+    Returns the generate_batch stats.
+    """
+    jobs = []
+    for i, language in enumerate(languages):
+        if language == 'any':
+            language = random.choice(SUPPORTED_LANGUAGES)
+        jobs.append({'id': f"t{i}", 'language': language})
+
+    results, stats = generate_batch(jobs, max_items=max_items)
+    with _pool_lock:
+        for job in jobs:
+            if job['id'] in results:
+                _content_pool.setdefault(job['language'].lower(), []).append(results[job['id']])
+    return stats
+
+def take_pooled_content(language):
+    """Pop one prefetched tutorial for `language` (None if the pool is empty)."""
+    with _pool_lock:
+        items = _content_pool.get(language.lower())
+        if items:
+            return items.pop()
+    return None
@@ -0,0 +1,154 @@
+"""
+Write-through ledger of today's commits in each user's regular repo.
+
+user_settings.ledger_count is a lower bound of the commits made today (IST,
+the same day boundary as the get_commits check in api/cron.py) in the repo
+the bot commits to, valid for ledger_day. The bot raises it with every
+commit it makes and with every count it reads from GitHub, so once it
+reaches min_contributions the decision needs no GitHub read at all; GitHub
+is only consulted while the ledger is below target (manual commits may have
+met it already). reconcile() re-checks "met" ledgers in the background (the
+hourly api/rollup job and the local BotDaemon) and corrects them if commits
+disappeared (force-pushes, deleted repos).
+
+push_day/push_count are kept separately by the push webhook (api/webhook.py):
+every commit pushed to the repo's default branch today, the bot's own
+included. Both are lower bounds, so the ledger is their maximum.
+
+Columns: see supabase_contribution_ledger.sql.
+"""
+
+import datetime
+
+# IST has no DST, so a fixed offset matches pytz's Asia/Kolkata
+LEDGER_TZ = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+
+RECONCILE_HOURS = 6
+RECONCILE_LIMIT = 50
+RECONCILE_READ_LIMIT = 1000     # PostgREST's default max rows
+
+RECONCILE_COLUMNS = ("id, github_username, github_access_token, repo_name, min_contributions, "
+                     "ledger_day, ledger_count, ledger_checked_at, push_day, push_count")
+
+
+def ledger_day(now_utc):
+    """The ledger's day (IST date) for `now_utc`."""
+    return now_utc.astimezone(LEDGER_TZ).date()
+
+
+def regular_repo_name(user):
+    """Sanitized name of the user's regular contributions repo."""
+    repo_name = (user.get('repo_name') or 'auto-contributions').strip().replace(' ', '-').replace('_', '-')
+    repo_name = ''.join(c for c in repo_name if c.isalnum() or c == '-')
+    return repo_name or 'auto-contributions'
+
+
+def ledger_state(user):
+    """(day ISO string or None, count) from the bot's ledger and the webhook's push count."""
+    day, count = user.get('ledger_day'), user.get('ledger_count') or 0
+    push_day, push_count = user.get('push_day'), user.get('push_count') or 0
+    if push_day and (not day or push_day > day):
+        return push_day, push_count
+    if push_day == day:
+        count = max(count, push_count)
+    return day, count
+
+
+def ledger_count(user, now_utc):
+    """Known lower bound of today's commits in the regular repo (0 for a stale ledger)."""
+    day, count = ledger_state(user)
+    if day != ledger_day(now_utc).isoformat():
+        return 0
+    return count
+
+
+def is_met(user, now_utc):
+    """True when the ledger alone shows today's target is reached."""
+    target = user.get('min_contributions') or 0
+    return target > 0 and ledger_count(user, now_utc) >= target
+
+
+def after_commit(user, observed, now_utc):
+    """
+    Ledger fields to write together with a bot commit's counter update.
+    `observed` is the GitHub count read before the commit (0 if none).
+    """
+    count = max(ledger_count(user, now_utc), observed) + 1
+    fields = {'ledger_day': ledger_day(now_utc).isoformat(), 'ledger_count': count}
+    user.update(fields)
+    return fields
+
+
+def record_observed(supabase, user, observed, now_utc):
+    """Raise the ledger to a count read from GitHub. Writes only when it adds information."""
+    if observed <= ledger_count(user, now_utc):
+        return False
+    fields = {
+        'ledger_day': ledger_day(now_utc).isoformat(),
+        'ledger_count': observed,
+        'ledger_checked_at': now_utc.isoformat(),
+    }
+    supabase.table("user_settings").update(fields).eq("id", user['id']).execute()
+    user.update(fields)
+    return True
+
+
+def needs_reconcile(user, now_utc, max_age_hours=RECONCILE_HOURS):
+    """A "met" ledger that GitHub hasn't confirmed in the last `max_age_hours`."""
+    if not is_met(user, now_utc) or not user.get('github_access_token'):
+        return False
+    checked = user.get('ledger_checked_at')
+    if not checked:
+        return True
+    checked_at = datetime.datetime.fromisoformat(checked.replace('Z', '+00:00'))
+    return now_utc - checked_at > datetime.timedelta(hours=max_age_hours)
+
+
+def reconcile_candidates(supabase, now_utc=None, limit=RECONCILE_READ_LIMIT):
+    """
+    Active users with a ledger or push count for today, least recently
+    checked first (the rows reconcile() may pick; the cron side of the bot
+    has no long-lived user list like BotDaemon).
+    """
+    now_utc = now_utc or datetime.datetime.now(datetime.timezone.utc)
+    today = ledger_day(now_utc).isoformat()
+    query = supabase.table("user_settings").select(RECONCILE_COLUMNS).eq("pause_bot", False)
+    # The pinned postgrest client has no or_()
+    query.params = query.params.add("or", f"(ledger_day.eq.{today},push_day.eq.{today})")
+    return query.order("ledger_checked_at", nullsfirst=True).limit(limit).execute().data or []
+
+
+def reconcile(supabase, users, now_utc=None, limit=RECONCILE_LIMIT, max_age_hours=RECONCILE_HOURS):
+    """
+    Re-check up to `limit` met ledgers against GitHub and store the real
+    count (which may be lower). Returns {'checked', 'corrected', 'errors'}.
+    """
+    from utils.github_pool import github_client
+
+    now_utc = now_utc or datetime.datetime.now(datetime.timezone.utc)
+    stats = {'checked': 0, 'corrected': 0, 'errors': 0}
+    today_start = datetime.datetime.combine(ledger_day(now_utc), datetime.time(), LEDGER_TZ)
+
+    for user in [u for u in users if needs_reconcile(u, now_utc, max_age_hours)][:limit]:
+        try:
+            repo = github_client(user['github_access_token']).get_repo(
+                f"{user['github_username']}/{regular_repo_name(user)}")
+            observed = repo.get_commits(since=today_start).totalCount
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"Ledger reconcile failed for {user.get('github_username')}: {str(e)[:100]}")
+            continue
+        # The push count is reset too, or a force-push would keep it "met"
+        fields = {
+            'ledger_day': ledger_day(now_utc).isoformat(),
+            'ledger_count': observed,
+            'ledger_checked_at': now_utc.isoformat(),
+            'push_day': ledger_day(now_utc).isoformat(),
+            'push_count': observed,
+        }
+        supabase.table("user_settings").update(fields).eq("id", user['id']).execute()
+        if observed < ledger_count(user, now_utc):
+            stats['corrected'] += 1
+        user.update(fields)
+        stats['checked'] += 1
+    return stats
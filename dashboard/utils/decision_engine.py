@@ -0,0 +1,200 @@
+"""
+Batch decision engine for plan and limit eligibility.
+
+Evaluates the rules from utils/decisions.py for a whole user set at once over
+a compact columnar snapshot (parallel arrays instead of PostgREST dicts) and
+returns an action bitmask per user. The cron run plans everything up front
+and only spends GitHub/Gemini calls on the actions that were planned.
+"""
+
+import datetime
+from array import array
+
+from utils.decisions import OWNER_USERNAME, OWNER_LEETCODE_DAILY_MAX, LEETCODE_DAILY_MAX, parse_timestamp
+from utils.contribution_ledger import ledger_day, ledger_state
+from utils.failure_backoff import backoff_record
+
+# Action bits
+RESET = 1               # zero daily_commit_count / leetcode_daily_count (new UTC day)
+REGULAR = 2             # plan limits allow a regular commit (still needs today's GitHub count)
+LEETCODE = 4            # LeetCode commit allowed
+ENTERPRISE = 8          # enterprise project commit (active project with days left)
+NO_TOKEN = 16           # no GitHub token - nothing can run
+SKIP_WEEKLY = 32        # weekly free-tier rule blocked the regular commit
+SKIP_PRO_DAILY = 64     # pro plan already committed today
+SKIP_LEETCODE = 128     # LeetCode daily limit reached
+SKIP_LEDGER = 256       # contribution ledger already shows today's target met
+SKIP_BACKOFF = 512      # a recent permanent failure blocks some stages (utils/failure_backoff.py)
+
+WORK = REGULAR | LEETCODE | ENTERPRISE
+
+# Stages each failure class blocks while its backoff lasts
+BACKOFF_BLOCKS = {
+    'auth': WORK,
+    'regular_repo': REGULAR,
+    'leetcode_repo': LEETCODE,
+    'enterprise_repo': ENTERPRISE,
+}
+
+# Plan codes for the plan column
+PLAN_OTHER, PLAN_FREE, PLAN_PRO, PLAN_LEETCODE, PLAN_ENTERPRISE = 0, 1, 2, 3, 4
+PLAN_CODES = {
+    'free': PLAN_FREE,
+    'pro': PLAN_PRO,
+    'leetcode': PLAN_LEETCODE,
+    'enterprise': PLAN_ENTERPRISE,
+}
+WEEKLY_PLAN_CODES = (PLAN_FREE, PLAN_LEETCODE, PLAN_ENTERPRISE)
+
+_NO_COMMIT = float('-inf')
+_WEEK_SECONDS = 7 * 24 * 3600
+_DAY_SECONDS = 24 * 3600
+
+
+class UserColumns:
+    """Columnar snapshot of the user_settings fields the rules need."""
+
+    __slots__ = ('ids', 'plan', 'owner', 'has_token', 'has_leetcode_repo',
+                 'min_contributions', 'daily_count', 'leetcode_count', 'last_commit',
+                 'ledger_day', 'ledger_count', 'failure_block', 'failure_until')
+
+    def __init__(self):
+        self.ids = []
+        self.plan = array('b')
+        self.owner = array('b')
+        self.has_token = array('b')
+        self.has_leetcode_repo = array('b')
+        self.min_contributions = array('i')
+        self.daily_count = array('i')
+        self.leetcode_count = array('i')
+        self.last_commit = array('d')   # epoch seconds, -inf if never
+        self.ledger_day = array('i')    # date ordinal of the ledger, 0 if none
+        self.ledger_count = array('i')
+        self.failure_block = array('H')     # BACKOFF_BLOCKS bits of the user's failure record
+        self.failure_until = array('d')     # epoch seconds, -inf if none
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        cols = cls()
+        for row in rows:
+            cols.append(row)
+        return cols
+
+    def append(self, row):
+        self.ids.append(row['id'])
+        self.plan.append(PLAN_CODES.get(row.get('plan_type', 'free'), PLAN_OTHER))
+        self.owner.append((row.get('github_username') or '').lower() == OWNER_USERNAME)
+        self.has_token.append(bool(row.get('github_access_token')))
+        self.has_leetcode_repo.append(bool(row.get('leetcode_repo')))
+        self.min_contributions.append(row.get('min_contributions') or 0)
+        self.daily_count.append(row.get('daily_commit_count') or 0)
+        self.leetcode_count.append(row.get('leetcode_daily_count') or 0)
+        try:
+            last_commit = parse_timestamp(row['last_commit_ts']).timestamp() if row.get('last_commit_ts') else _NO_COMMIT
+        except ValueError:
+            last_commit = _NO_COMMIT
+        self.last_commit.append(last_commit)
+        day, count = ledger_state(row)
+        try:
+            day = datetime.date.fromisoformat(day).toordinal() if day else 0
+        except ValueError:
+            day = 0
+        self.ledger_day.append(day)
+        self.ledger_count.append(count)
+        failure_class, until = backoff_record(row)
+        self.failure_block.append(BACKOFF_BLOCKS.get(failure_class, 0))
+        self.failure_until.append(until)
+
+
+def decide_batch(cols, now_utc, active_projects=None):
+    """
+    Action bitmask for every user in `cols` (an array('H') aligned with cols.ids).
+
+    `active_projects` maps user_id -> in-progress project row; when given, the
+    ENTERPRISE bit is only set for projects with days left. Without it every
+    enterprise-eligible user gets the bit and the project is looked up later.
+    """
+    now = now_utc.timestamp()
+    midnight = now - (now % _DAY_SECONDS)   # start of today (UTC)
+    today = ledger_day(now_utc).toordinal()
+    actions = array('H', bytes(2 * len(cols)))
+
+    for i, (plan, owner, token, lc_repo, min_contrib, daily, lc_count, last, l_day, l_count, blocked, until) in enumerate(zip(
+            cols.plan, cols.owner, cols.has_token, cols.has_leetcode_repo,
+            cols.min_contributions, cols.daily_count, cols.leetcode_count, cols.last_commit,
+            cols.ledger_day, cols.ledger_count, cols.failure_block, cols.failure_until)):
+        if not token:
+            actions[i] = NO_TOKEN
+            continue
+
+        bits = 0
+        if last < midnight and last != _NO_COMMIT:
+            bits |= RESET
+            daily = lc_count = 0
+
+        # Regular repo: needs min_contributions > 0. A met ledger decides on its
+        # own; otherwise today's GitHub count is checked later
+        if min_contrib > 0:
+            if l_day == today and l_count >= min_contrib:
+                bits |= SKIP_LEDGER
+            elif plan == PLAN_LEETCODE and lc_repo:
+                bits |= REGULAR
+            elif plan in WEEKLY_PLAN_CODES and now - last < _WEEK_SECONDS:
+                bits |= SKIP_WEEKLY
+            elif plan == PLAN_PRO and daily >= 1:
+                bits |= SKIP_PRO_DAILY
+            else:
+                bits |= REGULAR
+
+        # LeetCode: owner (unlimited) or leetcode plan with a repo
+        if lc_repo and (owner or plan == PLAN_LEETCODE):
+            max_commits = OWNER_LEETCODE_DAILY_MAX if owner else LEETCODE_DAILY_MAX
+            if lc_count >= max_commits and not owner:
+                bits |= SKIP_LEETCODE
+            else:
+                bits |= LEETCODE
+
+        # Enterprise: owner or enterprise plan
+        if owner or plan == PLAN_ENTERPRISE:
+            if active_projects is None:
+                bits |= ENTERPRISE
+            else:
+                project = active_projects.get(cols.ids[i])
+                if project and (project.get('current_day') or 0) < (project.get('days_duration') or 15):
+                    bits |= ENTERPRISE
+
+        # Known-broken stages wait for their backoff to end
+        if bits & blocked and now < until:
+            bits = (bits & ~blocked) | SKIP_BACKOFF
+
+        actions[i] = bits
+
+    return actions
+
+
+def decide_user(user, now_utc=None, active_project=None):
+    """Action bitmask for a single user_settings row."""
+    now_utc = now_utc or datetime.datetime.now(datetime.timezone.utc)
+    projects = None if active_project is None else {user['id']: active_project}
+    return decide_batch(UserColumns.from_rows([user]), now_utc, projects)[0]
+
+
+def summarize(actions):
+    """Count of users per action bit, for run logs."""
+    names = {
+        'reset': RESET, 'regular': REGULAR, 'leetcode': LEETCODE,
+        'enterprise': ENTERPRISE, 'no_token': NO_TOKEN, 'ledger_met': SKIP_LEDGER,
+        'backoff': SKIP_BACKOFF,
+    }
+    counts = {name: 0 for name in names}
+    counts['idle'] = 0
+    for bits in actions:
+        for name, bit in names.items():
+            if bits & bit:
+                counts[name] += 1
+        if not bits & WORK:
+            counts['idle'] += 1
+    return counts
@@ -0,0 +1,78 @@
+"""
+Plan and limit rules for the bot.
+
+Pure functions (no network, no clock reads) for one user at a time; they
+also produce the log lines for skipped commits. utils/decision_engine.py
+evaluates the same rules over a whole user set.
+"""
+
+import datetime
+
+OWNER_USERNAME = 'rishittandon7'
+
+PAID_PLANS = ('pro', 'leetcode', 'enterprise')
+WEEKLY_PLANS = ('free', 'leetcode', 'enterprise')  # 1 regular commit per week
+
+LEETCODE_DAILY_MAX = 1
+OWNER_LEETCODE_DAILY_MAX = 50
+
+
+def is_owner(user):
+    """OWNER OVERRIDE: unlimited access (case-insensitive check)."""
+    return (user.get('github_username') or '').lower() == OWNER_USERNAME
+
+
+def parse_timestamp(value):
+    """Parse a Supabase timestamp string ("...Z" or "+00:00") into an aware datetime."""
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def regular_commit_decision(user, commit_count, now_utc):
+    """
+    Whether to make a regular commit today.
+    Returns (allowed, reasons) where reasons are log lines explaining a skip.
+    """
+    username = user.get('github_username', '')
+    plan = user.get('plan_type', 'free')
+    reasons = []
+
+    if commit_count >= user['min_contributions']:
+        reasons.append(f"User {username} has enough contributions ({commit_count})")
+        return False, reasons
+
+    # LeetCode users with a LeetCode repo aren't held to the weekly rule here
+    if plan == 'leetcode' and user.get('leetcode_repo'):
+        return True, reasons
+
+    if plan in WEEKLY_PLANS:
+        # FREE/LEETCODE/ENTERPRISE TIER: 1 Regular Commit per Week
+        # (LeetCode & Enterprise get DAILY commits to their specialty repos instead)
+        last_commit_str = user.get('last_commit_ts')
+        if last_commit_str:
+            days_diff = (now_utc - parse_timestamp(last_commit_str)).days
+            if days_diff < 7:
+                plan_label = plan.title() if plan != 'free' else 'Free'
+                reasons.append(f"{plan_label} Plan: User {username} already committed {days_diff} days ago to regular repo. Skipping (Wait 7 days).")
+                return False, reasons
+    elif plan == 'pro':
+        # PRO PLAN ONLY: 1 Daily Commit to regular repo
+        if user.get('daily_commit_count', 0) >= 1:
+            reasons.append(f"Pro Plan: User {username} reached 1 commit today to regular repo.")
+            return False, reasons
+
+    return True, reasons
+
+
+def leetcode_decision(user):
+    """
+    Whether to make a LeetCode commit today (owner or leetcode plan with a repo).
+    Returns (allowed, reason) - reason is a log line when the daily limit is hit.
+    """
+    owner = is_owner(user)
+    if not ((owner or user.get('plan_type', 'free') == 'leetcode') and user.get('leetcode_repo')):
+        return False, None
+
+    max_commits = OWNER_LEETCODE_DAILY_MAX if owner else LEETCODE_DAILY_MAX
+    if user.get('leetcode_daily_count', 0) >= max_commits and not owner:
+        return False, f"LeetCode Limit: User {user.get('github_username', '')} already committed today to LeetCode repo"
+    return True, None
@@ -0,0 +1,157 @@
+"""
+Negative cache for users whose GitHub setup keeps failing.
+
+A revoked token, an enterprise repo that was deleted or a regular repo that
+can't be created fails the same way on every run, after several GitHub round
+trips (and sometimes a wasted Gemini generation). Permanent failures are
+recorded on user_settings with a reason class and an exponential backoff;
+until it ends the decision engine drops the stages the class blocks
+(utils/decision_engine.py, SKIP_BACKOFF), so those users cost no GitHub or
+Gemini calls. Changing the relevant settings (new token, username, repo
+names, plan) lifts the backoff at once, and any success on the stage clears
+the record.
+
+Reason classes:
+    auth              401 / bad credentials - every stage
+    regular_repo      regular repo can't be read, created or written
+    leetcode_repo     LeetCode repo can't be read, created or written
+    enterprise_repo   enterprise project repo missing or not writable
+
+Rate limits, 5xx and timeouts are transient (the adaptive limits handle
+them) and never start a backoff.
+
+Columns: see supabase_failure_backoff.sql.
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+
+from utils.decisions import parse_timestamp
+
+BACKOFF_BASE_MINUTES = float(os.environ.get("FAILURE_BACKOFF_MINUTES", "30"))
+# Longest backoff per class: a fixed repo is picked up within a day; a token
+# fix changes the fingerprint, so auth can back off longer
+MAX_BACKOFF_HOURS = {'auth': 7 * 24, 'regular_repo': 24, 'leetcode_repo': 24, 'enterprise_repo': 24}
+CLASSES = tuple(MAX_BACKOFF_HOURS)
+STAGES = ('regular', 'leetcode', 'enterprise')
+
+# Settings whose change means the failure may be fixed
+FINGERPRINT_FIELDS = ('github_access_token', 'github_username', 'repo_name', 'leetcode_repo', 'plan_type')
+# Not 422: create_file answers 422 when the path already exists, a one-off name collision
+PERMANENT_STATUSES = (403, 404, 410)
+
+_lock = threading.Lock()
+_counts = {'recorded': {}, 'skipped': {}, 'cleared': 0}
+
+
+def settings_fingerprint(user):
+    """Short hash of the settings a failure depends on."""
+    text = '\x1f'.join(str(user.get(field) or '') for field in FINGERPRINT_FIELDS)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def classify(error, stage):
+    """Reason class for a permanent failure of `stage`, or None if it may be transient."""
+    status = getattr(error, 'status', None)
+    message = str(error).lower()
+    if status == 401 or 'bad credentials' in message:
+        return 'auth'
+    if status in PERMANENT_STATUSES and 'rate limit' not in message:
+        return f"{stage}_repo"
+    return None
+
+
+def backoff_record(user):
+    """(class, until as epoch seconds) of a user's failure record, or (None, -inf) if none applies."""
+    failure_class = user.get('failure_class')
+    if not failure_class or not user.get('failure_until'):
+        return None, float('-inf')
+    if user.get('failure_fingerprint') != settings_fingerprint(user):
+        return None, float('-inf')
+    try:
+        return failure_class, parse_timestamp(user['failure_until']).timestamp()
+    except ValueError:
+        return None, float('-inf')
+
+
+def backoff_delay(failure_class, failures):
+    """Backoff after `failures` consecutive failures: doubling from BACKOFF_BASE_MINUTES, capped."""
+    minutes = BACKOFF_BASE_MINUTES * 2 ** min(max(failures - 1, 0), 20)
+    return datetime.timedelta(minutes=min(minutes, MAX_BACKOFF_HOURS[failure_class] * 60))
+
+
+def record_failure(supabase, user, stage, error, now_utc=None):
+    """
+    Record a permanent failure of `stage` and start/extend the user's backoff.
+    Returns (class, until) or None when the error is not permanent.
+    """
+    failure_class = classify(error, stage)
+    if failure_class is None:
+        return None
+    now_utc = now_utc or datetime.datetime.now(datetime.timezone.utc)
+    fingerprint = settings_fingerprint(user)
+    failures = 1
+    if user.get('failure_class') == failure_class and user.get('failure_fingerprint') == fingerprint:
+        failures = (user.get('failure_count') or 0) + 1
+    until = now_utc + backoff_delay(failure_class, failures)
+    update = {
+        'failure_class': failure_class,
+        'failure_count': failures,
+        'failure_until': until.isoformat(),
+        'failure_fingerprint': fingerprint,
+        'failure_message': str(error)[:200],
+    }
+    supabase.table("user_settings").update(update).eq("id", user['id']).execute()
+    user.update(update)
+    with _lock:
+        _counts['recorded'][failure_class] = _counts['recorded'].get(failure_class, 0) + 1
+    return failure_class, until
+
+
+def clear_failure(supabase, user, stage):
+    """Drop the failure record after `stage` succeeded (no write if there is none)."""
+    failure_class = user.get('failure_class')
+    if not failure_class or failure_class not in ('auth', f"{stage}_repo"):
+        return False
+    update = {'failure_class': None, 'failure_count': 0, 'failure_until': None,
+              'failure_fingerprint': None, 'failure_message': None}
+    supabase.table("user_settings").update(update).eq("id", user['id']).execute()
+    user.update(update)
+    with _lock:
+        _counts['cleared'] += 1
+    return True
+
+
+def note_skipped(user):
+    with _lock:
+        failure_class = user.get('failure_class') or 'unknown'
+        _counts['skipped'][failure_class] = _counts['skipped'].get(failure_class, 0) + 1
+
+
+def failure_stats():
+    with _lock:
+        return {'recorded': dict(_counts['recorded']), 'skipped': dict(_counts['skipped']),
+                'cleared': _counts['cleared']}
+
+
+def failure_summary():
+    """Log lines: users skipped while backing off, failures recorded and cleared."""
+    stats = failure_stats()
+    if not (stats['recorded'] or stats['skipped'] or stats['cleared']):
+        return []
+
+    def by_class(counts):
+        return ", ".join(f"{name}={count}" for name, count in sorted(counts.items())) or "none"
+
+    return [f"Backoff: {sum(stats['skipped'].values())} users skipped ({by_class(stats['skipped'])}), "
+            f"{sum(stats['recorded'].values())} failures recorded ({by_class(stats['recorded'])}), "
+            f"{stats['cleared']} cleared"]
+
+
+def reset_failure_metrics():
+    with _lock:
+        _counts['recorded'].clear()
+        _counts['skipped'].clear()
+        _counts['cleared'] = 0
@@ -0,0 +1,119 @@
+"""
+Token-keyed pool of PyGithub clients.
+
+Each Github object keeps one keep-alive requests session, so reusing it for
+the same token skips TLS setup on later calls - across users' repos in one
+run, across runs in a warm serverless instance and for the whole lifetime of
+the local_bot daemon. The pool is bounded with LRU eviction (evicted clients
+are closed) and caches the authenticated user object per token, so the
+create_repo fallbacks don't each build a new /user lookup. Every client's
+requests go through the shared 'github' adaptive limiter (utils/adaptive_limit.py).
+
+With GITHUB_TRANSPORT=http2 the pooled clients are utils/github_transport
+Http2Github objects, which multiplex every token over one shared HTTP/2
+connection pool instead of a session per token.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from github import Auth, Github
+
+from utils.adaptive_limit import limit_github_requester
+from utils.github_transport import GITHUB_TRANSPORT, Http2Github
+
+DEFAULT_POOL_SIZE = int(os.environ.get("GITHUB_POOL_SIZE", "256"))
+
+
+def _token_key(token):
+    # Raw tokens never become dict keys or show up in stats
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class GithubPool:
+    """LRU of {token hash: [Github/Http2Github client, cached AuthenticatedUser or None]}."""
+
+    def __init__(self, max_size=DEFAULT_POOL_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry(self, token):
+        key = _token_key(token)
+        evicted = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            if GITHUB_TRANSPORT == 'http2':
+                client = Http2Github(token)
+            else:
+                client = Github(auth=Auth.Token(token))
+                limit_github_requester(client._Github__requester)
+            entry = [client, None]
+            self._entries[key] = entry
+            if len(self._entries) > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.evictions += 1
+        if evicted is not None:
+            evicted[0].close()
+        return entry
+
+    def client(self, token):
+        """Pooled Github client for `token`."""
+        return self._entry(token)[0]
+
+    def user(self, token):
+        """Cached authenticated user for `token` (lazy - no request until used)."""
+        entry = self._entry(token)
+        if entry[1] is None:
+            entry[1] = entry[0].get_user()
+        return entry[1]
+
+    def discard(self, token):
+        """Drop and close the client for `token` (e.g. after a 401)."""
+        with self._lock:
+            entry = self._entries.pop(_token_key(token), None)
+        if entry is not None:
+            entry[0].close()
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry[0].close()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+_pool = GithubPool()
+
+
+def github_client(token):
+    """Shared-pool Github client for `token`."""
+    return _pool.client(token)
+
+
+def github_user(token):
+    """Shared-pool authenticated user for `token`."""
+    return _pool.user(token)
+
+
+def discard_client(token):
+    """Drop `token`'s pooled client (after a 401: the token was revoked or expired)."""
+    _pool.discard(token)
+
+
+def pool_stats():
+    return _pool.stats()
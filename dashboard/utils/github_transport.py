@@ -0,0 +1,295 @@
+"""
+HTTP/2 transport for the bot's GitHub API calls.
+
+PyGithub opens a requests connection per client, so every user in flight in
+api/cron.py costs its own TCP+TLS connection to api.github.com. With
+GITHUB_TRANSPORT=http2 the pooled clients (utils/github_pool.py) are
+Http2Github objects instead: one shared httpx client speaks HTTP/2 and
+multiplexes every token's requests over GITHUB_HTTP2_CONNECTIONS connections
+(the token travels per request). Requests still go through the 'github'
+adaptive limiter and are clamped to the run budget (limited_transport()).
+
+Only the calls the bot makes are covered, with the PyGithub names and the
+attributes the callers read: get_repo, get_user, Repository.get_commits
+(.totalCount), create_file, get_contents, get_git_tree and
+AuthenticatedUser.create_repo. Errors are GitHubError with .status, like
+PyGithub's GithubException. Without the h2 package the same client falls
+back to pooled HTTP/1.1 keep-alive connections.
+
+Benchmark against PyGithub (one client per worker, like the cron run):
+    python -m utils.github_transport bench --repo owner/name --token $GITHUB_TOKEN
+"""
+
+import argparse
+import base64
+import os
+import re
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import httpx
+
+from utils.adaptive_limit import limited_transport, GITHUB_TIMEOUT_SECONDS
+
+GITHUB_TRANSPORT = os.environ.get("GITHUB_TRANSPORT", "pygithub").lower()
+API_URL = "https://api.github.com"
+HTTP2_CONNECTIONS = int(os.environ.get("GITHUB_HTTP2_CONNECTIONS", "2"))
+USER_AGENT = "Git-Maxer-bot"
+
+ContentFile = namedtuple('ContentFile', 'type name path sha size')
+TreeEntry = namedtuple('TreeEntry', 'path type sha size')
+Tree = namedtuple('Tree', 'sha tree truncated')
+
+
+class GitHubError(Exception):
+    """Non-2xx GitHub response (str() starts with the status, like PyGithub's)."""
+
+    def __init__(self, status, data=None, headers=None):
+        self.status = status
+        self.data = data
+        self.headers = headers or {}
+        message = data.get('message') if isinstance(data, dict) else data
+        super().__init__(f"{status} {message or ''}".strip())
+
+
+def http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def make_http_client(base_url=API_URL, connections=HTTP2_CONNECTIONS, prior_knowledge=False):
+    """
+    httpx client for the GitHub API: HTTP/2 when h2 is installed (over
+    cleartext only with `prior_knowledge`, for local test servers).
+    """
+    http2 = http2_available()
+    transport = httpx.HTTPTransport(
+        http1=not (http2 and prior_knowledge), http2=http2,
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+    )
+    return httpx.Client(
+        base_url=base_url,
+        transport=limited_transport(transport, 'github'),
+        timeout=GITHUB_TIMEOUT_SECONDS,
+        headers={
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28',
+            'User-Agent': USER_AGENT,
+        },
+    )
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(base_url=API_URL):
+    """Process-wide client per base URL (shared by every token)."""
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = make_http_client(base_url)
+        return _clients[base_url]
+
+
+class Http2Github:
+    """The subset of github.Github the bot uses, on a shared HTTP/2 client."""
+
+    def __init__(self, token, base_url=API_URL, client=None):
+        self._auth = {'Authorization': f"token {token}"}
+        self._http = client or shared_client(base_url)
+
+    def request(self, method, url, params=None, json=None):
+        """(status, headers, decoded JSON) or GitHubError for a non-2xx response."""
+        response = self._http.request(method, url, params=params, json=json, headers=self._auth)
+        try:
+            data = response.json() if response.content else None
+        except ValueError:
+            data = response.text
+        if response.status_code >= 400:
+            raise GitHubError(response.status_code, data, response.headers)
+        return response.status_code, response.headers, data
+
+    def get_repo(self, full_name):
+        return Repository(self, self.request('GET', f"/repos/{full_name}")[2])
+
+    def get_user(self):
+        return AuthenticatedUser(self)
+
+    def close(self):
+        # The connection pool is shared by every token
+        pass
+
+
+class AuthenticatedUser:
+    def __init__(self, github):
+        self._github = github
+        self._login = None
+
+    @property
+    def login(self):
+        if self._login is None:
+            self._login = self._github.request('GET', '/user')[2]['login']
+        return self._login
+
+    def create_repo(self, name, private=False, description="", auto_init=False):
+        data = self._github.request('POST', '/user/repos', json={
+            'name': name, 'private': private, 'description': description, 'auto_init': auto_init,
+        })[2]
+        return Repository(self._github, data)
+
+
+class CommitList:
+    """Lazy commit listing; only totalCount is read by the bot."""
+
+    def __init__(self, github, url, params):
+        self._github = github
+        self._url = url
+        self._params = params
+        self._total = None
+
+    @property
+    def totalCount(self):
+        # One per_page=1 request: the last page number of the Link header is the count
+        if self._total is None:
+            _, headers, data = self._github.request('GET', self._url, params=dict(self._params, per_page=1))
+            match = re.search(r'[?&]page=(\d+)>; rel="last"', headers.get('link', ''))
+            self._total = int(match.group(1)) if match else len(data or [])
+        return self._total
+
+
+class Repository:
+    def __init__(self, github, data):
+        self._github = github
+        self.raw_data = data
+        self.full_name = data['full_name']
+        self.name = data['name']
+        self.private = data.get('private', False)
+        self.default_branch = data.get('default_branch', 'main')
+
+    def get_commits(self, since=None):
+        params = {}
+        if since is not None:
+            params['since'] = since.isoformat()
+        return CommitList(self._github, f"/repos/{self.full_name}/commits", params)
+
+    def create_file(self, path, message, content, branch=None):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        body = {'message': message, 'content': base64.b64encode(content).decode('ascii')}
+        if branch:
+            body['branch'] = branch
+        return self._github.request('PUT', f"/repos/{self.full_name}/contents/{quote(path.lstrip('/'))}", json=body)[2]
+
+    def get_contents(self, path="", ref=None):
+        params = {'ref': ref} if ref else None
+        data = self._github.request('GET', f"/repos/{self.full_name}/contents/{quote(path.lstrip('/'))}", params=params)[2]
+
+        def entry(item):
+            return ContentFile(item['type'], item['name'], item['path'], item.get('sha'), item.get('size', 0))
+
+        return [entry(item) for item in data] if isinstance(data, list) else entry(data)
+
+    def get_git_tree(self, sha, recursive=False):
+        params = {'recursive': '1'} if recursive else None
+        data = self._github.request('GET', f"/repos/{self.full_name}/git/trees/{sha}", params=params)[2]
+        return Tree(data['sha'], [TreeEntry(item['path'], item['type'], item.get('sha'), item.get('size', 0))
+                                  for item in data.get('tree', [])], data.get('truncated', False))
+
+
+# === BENCHMARK ===
+
+class _ConnectionCounter:
+    """Counts TCP connects made while active (socket.socket.connect is patched)."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        counter = self
+        original = socket.socket.connect
+
+        def connect(sock, address):
+            with counter._lock:
+                counter.count += 1
+            return original(sock, address)
+
+        self._original = original
+        socket.socket.connect = connect
+        return self
+
+    def __exit__(self, *exc):
+        socket.socket.connect = self._original
+
+
+def _run(call, requests, concurrency):
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for error in pool.map(lambda _: call(), range(requests)):
+            errors += error
+    return time.perf_counter() - started, errors
+
+
+def bench(token, repo, requests=200, concurrency=16, base_url=API_URL, prior_knowledge=False):
+    """get_repo `requests` times from `concurrency` workers on each transport. Returns result dicts."""
+    from github import Auth, Github
+
+    results = []
+    local = threading.local()
+
+    def pygithub_call():
+        # One client per worker, as in the cron run (one per user token)
+        if not hasattr(local, 'client'):
+            local.client = Github(auth=Auth.Token(token), base_url=base_url, retry=0)
+        try:
+            local.client.get_repo(repo)
+            return 0
+        except Exception:
+            return 1
+
+    client = make_http_client(base_url, prior_knowledge=prior_knowledge)
+    http2 = Http2Github(token, client=client)
+
+    def http2_call():
+        try:
+            http2.get_repo(repo)
+            return 0
+        except Exception:
+            return 1
+
+    for name, call in (('pygithub', pygithub_call), ('http2' if http2_available() else 'httpx-http1', http2_call)):
+        with _ConnectionCounter() as connections:
+            seconds, errors = _run(call, requests, concurrency)
+        results.append({'transport': name, 'requests': requests, 'seconds': seconds,
+                        'rps': requests / seconds, 'connections': connections.count, 'errors': errors})
+    client.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GitHub HTTP/2 transport tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench_cmd = sub.add_parser("bench", help="Compare requests/sec and connections with PyGithub")
+    bench_cmd.add_argument("--repo", required=True, help="owner/name to fetch")
+    bench_cmd.add_argument("--token", default=os.environ.get("GITHUB_TOKEN"))
+    bench_cmd.add_argument("--requests", type=int, default=200)
+    bench_cmd.add_argument("--concurrency", type=int, default=16)
+    bench_cmd.add_argument("--base-url", default=API_URL)
+    bench_cmd.add_argument("--h2c", action="store_true", help="HTTP/2 without TLS (local test servers)")
+    args = parser.parse_args(argv)
+
+    for r in bench(args.token, args.repo, args.requests, args.concurrency, args.base_url, args.h2c):
+        print(f"{r['transport']:>12}: {r['rps']:.1f} req/s ({r['requests']} in {r['seconds']:.2f}s), "
+              f"{r['connections']} connections, {r['errors']} errors")
+
+
+if __name__ == "__main__":
+    main()
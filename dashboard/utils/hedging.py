@@ -0,0 +1,205 @@
+"""
+Hedged Gemini requests.
+
+With GEMINI_HEDGING=1, a generation whose primary (key, model) hasn't
+answered within the template's recent HEDGE_PERCENTILE latency gets a second
+request on a different (key, model). The first valid response wins and the
+loser is cancelled: a not-yet-started attempt never runs, and an in-flight
+one is stopped through its Cancel (hedged attempts are streamed, and
+prompts.generate() closes the stream, which stops generation and billing
+server-side). Hedges are capped at HEDGE_BUDGET of primary requests.
+
+End-to-end latency is tracked per mode, so latency_report() shows p50/p99
+with hedging on and off (run once with each setting to compare).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+HEDGING_ENABLED = os.environ.get("GEMINI_HEDGING", "0").lower() in ('1', 'true', 'on')
+HEDGE_PERCENTILE = float(os.environ.get("GEMINI_HEDGE_PERCENTILE", "95"))
+HEDGE_BUDGET = float(os.environ.get("GEMINI_HEDGE_BUDGET", "0.1"))    # hedges per primary request
+HEDGE_DEFAULT_DELAY = 10.0      # seconds, until a template has MIN_SAMPLES latencies
+MIN_SAMPLES = 20
+WINDOW = 200
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="gemini-hedge")
+_lock = threading.Lock()
+_recent = {}            # template key -> deque of primary latencies (hedge delay source)
+_end_to_end = {'single': deque(maxlen=5000), 'hedged': deque(maxlen=5000)}
+_counts = {'requests': 0, 'hedges': 0, 'hedge_wins': 0, 'over_budget': 0}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def hedge_delay(template_key):
+    with _lock:
+        samples = list(_recent.get(template_key, ()))
+    if len(samples) < MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return percentile(samples, HEDGE_PERCENTILE)
+
+
+def _record(template_key, attempt_seconds, total_seconds, mode):
+    with _lock:
+        if attempt_seconds is not None:
+            _recent.setdefault(template_key, deque(maxlen=WINDOW)).append(attempt_seconds)
+        _end_to_end[mode].append(total_seconds)
+
+
+def _take_hedge():
+    """Spend one hedge if the budget allows (1 hedge of slack for cold starts)."""
+    with _lock:
+        if _counts['hedges'] + 1 > HEDGE_BUDGET * _counts['requests'] + 1:
+            _counts['over_budget'] += 1
+            return False
+        _counts['hedges'] += 1
+        return True
+
+
+class AttemptCancelled(Exception):
+    """A hedged attempt was stopped because the other attempt won."""
+
+    def __init__(self, chars):
+        super().__init__(f"hedged attempt cancelled after {chars} chars")
+        self.chars = chars
+
+
+class Cancel:
+    """Cancellation handle of one hedged attempt; the attempt registers how to stop its call."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._stops = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, stop):
+        """Run `stop()` when the attempt is cancelled (right away if it already was)."""
+        with self._lock:
+            if not self.cancelled:
+                self._stops.append(stop)
+                return
+        stop()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            stops, self._stops = self._stops, []
+        for stop in stops:
+            try:
+                stop()
+            except Exception:
+                pass        # the call may have just finished
+
+
+def _timed(call, candidate, cancel=None):
+    started = time.monotonic()
+    result = call(*candidate, cancel)
+    return result, time.monotonic() - started
+
+
+def hedged_call(template_key, call, primary, alternate, valid=None, on_error=None, enabled=None):
+    """
+    Run `call(api_key, model_name, cancel)` for `primary`, hedging to
+    `alternate()` (another (api_key, model_name), or (None, None)) when
+    enabled and slow. `cancel` is the attempt's Cancel (None when not
+    hedging); the losing attempt's is cancelled once a result wins.
+    `valid(result)` rejects a response so the other attempt can still win;
+    `on_error(api_key, error)` is told about failures that are not raised.
+    Returns the winning result or raises the primary's error.
+    """
+    enabled = HEDGING_ENABLED if enabled is None else enabled
+    valid = valid or (lambda result: True)
+    started = time.monotonic()
+    with _lock:
+        _counts['requests'] += 1
+
+    if not enabled:
+        result, seconds = _timed(call, primary)
+        _record(template_key, seconds, time.monotonic() - started, 'single')
+        return result
+
+    cancels = {}
+    futures = {}
+
+    def submit(candidate):
+        cancel = Cancel()
+        future = _executor.submit(_timed, call, candidate, cancel)
+        futures[future], cancels[future] = candidate, cancel
+
+    submit(primary)
+    done, _ = wait(futures, timeout=hedge_delay(template_key))
+    if not done and _take_hedge():
+        candidate = alternate()
+        if candidate[0] and candidate != primary:
+            submit(candidate)
+
+    primary_error = None
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                candidate = futures[future]
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    if candidate == primary:
+                        primary_error = e
+                    elif on_error:
+                        on_error(candidate[0], e)
+                    continue
+                if not valid(result):
+                    continue
+                _record(template_key, seconds if candidate == primary else None, time.monotonic() - started, 'hedged')
+                if candidate != primary:
+                    with _lock:
+                        _counts['hedge_wins'] += 1
+                return result
+    finally:
+        # The loser (or every attempt, on BudgetExceeded) stops generating
+        for future in pending:
+            future.cancel()
+            cancels[future].cancel()
+
+    _record(template_key, None, time.monotonic() - started, 'hedged')
+    if primary_error is not None:
+        raise primary_error
+    raise ValueError("no valid Gemini response")
+
+
+def latency_report():
+    """Log lines: generation p50/p99 per mode and hedge spend."""
+    with _lock:
+        modes = {mode: list(values) for mode, values in _end_to_end.items()}
+        counts = dict(_counts)
+    lines = []
+    for mode, values in modes.items():
+        if values:
+            lines.append(f"Gemini latency ({'hedging on' if mode == 'hedged' else 'hedging off'}): "
+                         f"{len(values)} generations, p50 {percentile(values, 50):.2f}s, p99 {percentile(values, 99):.2f}s")
+    if counts['hedges'] or counts['over_budget']:
+        lines.append(f"Gemini hedges: {counts['hedges']} sent ({counts['hedges'] / max(counts['requests'], 1):.0%} of "
+                     f"{counts['requests']}, budget {HEDGE_BUDGET:.0%}), {counts['hedge_wins']} won, "
+                     f"{counts['over_budget']} skipped over budget")
+    return lines
+
+
+def reset_latency():
+    with _lock:
+        for values in _end_to_end.values():
+            values.clear()
+        for key in _counts:
+            _counts[key] = 0
@@ -0,0 +1,226 @@
+"""
+Compaction of old generated_history rows into per-user summaries.
+
+generated_history is range-partitioned by month (supabase_history_partitioning.sql).
+Rows older than COMPACT_AFTER_DAYS are folded into generated_history_summaries:
+a row count, first/last timestamps, commits per language and a scalable
+Bloom filter (HashSketch) of content_hash, so dedupe still works after the
+snippets are gone. The job continues from its own (created_at, id) mark in
+rollup_state (source 'history_compaction'); summaries and the mark are
+written together by apply_history_compaction(). Retention (rollups.prune)
+never drops rows above that mark, and drops whole monthly partitions where
+it can instead of deleting row by row.
+
+Usage (from the dashboard directory):
+    python -m utils.history_compaction
+"""
+
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import math
+import os
+
+from utils.decisions import parse_timestamp
+from utils.rollups import BATCH_SIZE, MAX_BATCHES, fetch_batch, read_state
+
+STATE_SOURCE = 'history_compaction'
+COMPACT_AFTER_DAYS = int(os.environ.get("GENERATED_HISTORY_COMPACT_DAYS", "30"))
+COMPACTION_CONFIG = {
+    'table': 'generated_history',
+    'columns': 'id, user_id, content_hash, language, created_at',
+}
+PARTITION_MONTHS_AHEAD = 3
+
+# Sketch sizing: each stage holds `capacity` hashes at `error` false positives;
+# later stages double the capacity and halve the error so the total stays
+# under 2x the first stage's rate however many hashes a user accumulates.
+SKETCH_CAPACITY = 512
+SKETCH_ERROR = 0.001
+
+
+class _BloomStage:
+    __slots__ = ('capacity', 'error', 'bits', 'hashes', 'count', 'array')
+
+    def __init__(self, capacity, error, array=None, count=0):
+        self.capacity = capacity
+        self.error = error
+        self.bits = max(8, int(math.ceil(-capacity * math.log(error) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.bits / capacity * math.log(2))))
+        self.count = count
+        self.array = array if array is not None else bytearray((self.bits + 7) // 8)
+
+    def _positions(self, digest):
+        # Double hashing (Kirsch-Mitzenmacher) from one sha256 digest
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest):
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class HashSketch:
+    """Scalable Bloom filter of content hashes (no false negatives)."""
+
+    def __init__(self, capacity=SKETCH_CAPACITY, error=SKETCH_ERROR):
+        self.stages = [_BloomStage(capacity, error / 2)]
+
+    @staticmethod
+    def _digest(content_hash):
+        return hashlib.sha256(content_hash.encode('utf-8')).digest()
+
+    def add(self, content_hash):
+        digest = self._digest(content_hash)
+        if any(digest in stage for stage in self.stages):
+            return
+        stage = self.stages[-1]
+        if stage.count >= stage.capacity:
+            stage = _BloomStage(stage.capacity * 2, stage.error / 2)
+            self.stages.append(stage)
+        stage.add(digest)
+
+    def __contains__(self, content_hash):
+        digest = self._digest(content_hash)
+        return any(digest in stage for stage in self.stages)
+
+    def __len__(self):
+        return sum(stage.count for stage in self.stages)
+
+    def dumps(self):
+        return json.dumps([
+            {'c': stage.capacity, 'e': stage.error, 'n': stage.count,
+             'b': base64.b64encode(bytes(stage.array)).decode('ascii')}
+            for stage in self.stages
+        ], separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, text):
+        sketch = cls()
+        if text:
+            sketch.stages = [
+                _BloomStage(stage['c'], stage['e'], bytearray(base64.b64decode(stage['b'])), stage['n'])
+                for stage in json.loads(text)
+            ]
+        return sketch
+
+
+def seen_before(summary, content_hash):
+    """Whether a compacted summary row (probably) already contains `content_hash`."""
+    return bool(summary and summary.get('hash_sketch')) and content_hash in HashSketch.loads(summary['hash_sketch'])
+
+
+def load_summaries(supabase, user_ids):
+    """user_id -> summary row for the given users."""
+    if not user_ids:
+        return {}
+    data = supabase.table("generated_history_summaries").select("*").in_("user_id", sorted(user_ids)).execute().data
+    return {row['user_id']: row for row in data}
+
+
+def merge(summaries, rows):
+    """Fold `rows` into `summaries` (user_id -> row, updated in place); returns the users touched."""
+    touched = {}
+    for row in rows:
+        user_id = row.get('user_id')
+        if not user_id:
+            continue
+        if user_id not in touched:
+            summary = summaries.get(user_id) or {'user_id': user_id, 'rows_compacted': 0,
+                                                 'first_at': None, 'last_at': None, 'languages': {}}
+            touched[user_id] = (summary, HashSketch.loads(summary.get('hash_sketch')))
+        summary, sketch = touched[user_id]
+        created_at = row['created_at']
+        summary['rows_compacted'] = (summary.get('rows_compacted') or 0) + 1
+        if not summary.get('first_at') or parse_timestamp(created_at) < parse_timestamp(summary['first_at']):
+            summary['first_at'] = created_at
+        if not summary.get('last_at') or parse_timestamp(created_at) > parse_timestamp(summary['last_at']):
+            summary['last_at'] = created_at
+        language = (row.get('language') or '').lower() or 'unknown'
+        languages = summary.get('languages') or {}
+        languages[language] = languages.get(language, 0) + 1
+        summary['languages'] = languages
+        if row.get('content_hash'):
+            sketch.add(row['content_hash'])
+
+    merged = []
+    for user_id, (summary, sketch) in touched.items():
+        summary['hash_sketch'] = sketch.dumps()
+        summaries[user_id] = summary
+        merged.append({key: summary.get(key) for key in
+                       ('user_id', 'rows_compacted', 'first_at', 'last_at', 'languages', 'hash_sketch')})
+    return merged
+
+
+def ensure_partitions(supabase, now):
+    """Create the monthly partitions for the coming months (None if the migration isn't applied)."""
+    try:
+        return supabase.rpc("ensure_history_partitions", {
+            'p_from': now.date().isoformat(),
+            'p_months': PARTITION_MONTHS_AHEAD,
+        }).execute().data
+    except Exception as e:
+        print(f"⚠️ History partitions: {str(e)[:100]}")
+        return None
+
+
+def compact(supabase, now=None, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES):
+    """Fold rows older than COMPACT_AFTER_DAYS into summaries. Returns a stats dict."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    cutoff = (now - datetime.timedelta(days=COMPACT_AFTER_DAYS)).isoformat()
+    high_water, last_id = read_state(supabase, STATE_SOURCE)
+    stats = {'rows': 0, 'batches': 0, 'users': 0, 'high_water': high_water,
+             'partitions_created': ensure_partitions(supabase, now)}
+
+    summaries = {}
+    for _ in range(max_batches):
+        rows, fetched = fetch_batch(supabase, STATE_SOURCE, high_water, last_id, cutoff, batch_size,
+                                    config=COMPACTION_CONFIG)
+        if not rows:
+            break
+        missing = {row['user_id'] for row in rows if row.get('user_id')} - set(summaries)
+        summaries.update(load_summaries(supabase, missing))
+        merged = merge(summaries, rows)
+        supabase.rpc("apply_history_compaction", {
+            'p_expected': high_water,
+            'p_expected_id': last_id,
+            'p_high_water': rows[-1]['created_at'],
+            'p_last_id': rows[-1]['id'],
+            'p_rows': merged,
+        }).execute()
+        high_water, last_id = rows[-1]['created_at'], rows[-1]['id']
+        stats['rows'] += len(rows)
+        stats['batches'] += 1
+        if fetched < batch_size:
+            break
+
+    stats['users'] = len(summaries)
+    stats['high_water'] = high_water
+    return stats
+
+
+def format_report(stats):
+    line = (f"Compacted generated_history: {stats['rows']} rows in {stats['batches']} batches "
+            f"into {stats['users']} user summaries, high-water {stats['high_water']}")
+    if stats.get('partitions_created'):
+        line += f", {stats['partitions_created']} new partitions"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fold old generated_history rows into per-user summaries")
+    parser.parse_args(argv)
+
+    from api.cron import create_supabase_client
+    print(format_report(compact(create_supabase_client())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Bundled LeetCode problem catalog.
+
+The LeetCode path picks its problem here instead of sampling 1..3000 and
+asking Gemini what the problem is called: id, slug, title, difficulty, topic
+tags and the premium flag come from leetcode_catalog.bin, a compact binary
+file that is memory-mapped on first use. Lookup by id is O(1) through a
+dense id -> record index, and the free (non-premium) ids of each difficulty
+are stored as ready-made uint32 arrays, so picking a problem never scans the
+catalog.
+
+File layout (little-endian):
+    header   MAGIC, version, counts and section offsets (HEADER)
+    index    uint32[max_id + 1]: record number + 1, 0 where no problem has that id
+    records  RECORD per problem, sorted by id
+    free ids uint32 arrays for Easy, Medium, Hard (premium problems excluded)
+    tags     TAG_ENTRY per topic tag (offset/length into the string pool)
+    pool     UTF-8 slugs, titles and tag names; per-problem tag numbers (uint8)
+
+Rebuild from LeetCode's public GraphQL API (from the dashboard directory):
+    python -m utils.leetcode_catalog fetch
+or from a saved problemsetQuestionList response:
+    python -m utils.leetcode_catalog build questions.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+from collections import namedtuple
+
+CATALOG_PATH = os.environ.get(
+    "LEETCODE_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "leetcode_catalog.bin"))
+GRAPHQL_URL = "https://leetcode.com/graphql"
+PROBLEM_URL = "https://leetcode.com/problems/{slug}/"
+
+MAGIC = b'LCCT'
+VERSION = 1
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+PREMIUM = 0x01
+
+# magic, version, tag count, problem count, max id, then offsets of index,
+# records, tags and pool, then (offset, length) of each free-id array
+HEADER = struct.Struct('<4sHHII4I6I')
+# id, difficulty, flags, tag count, slug/title/tags offsets, slug/title lengths
+RECORD = struct.Struct('<IBBBxIIIHH')
+TAG_ENTRY = struct.Struct('<IH')
+
+Problem = namedtuple('Problem', 'id slug title difficulty tags premium')
+
+
+class CatalogError(Exception):
+    """The catalog file is missing or not a catalog."""
+
+
+class Catalog:
+    """Read-only view of a catalog file (memory-mapped; falls back to reading it)."""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        try:
+            with open(path, 'rb') as f:
+                try:
+                    self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    self._buffer = f.read()
+        except OSError as e:
+            raise CatalogError(f"LeetCode catalog not found at {path}: {e}")
+        if len(self._buffer) < HEADER.size:
+            raise CatalogError(f"{path} is not a LeetCode catalog")
+        (magic, version, tag_count, self.count, self.max_id,
+         self._index, self._records, self._tags, self._pool, *free) = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise CatalogError(f"{path} is not a LeetCode catalog (version {VERSION})")
+        view = memoryview(self._buffer)
+        self._free = {
+            difficulty: self._uint32s(view[offset:offset + 4 * length])
+            for difficulty, offset, length in zip(DIFFICULTIES, free[0::2], free[1::2])
+        }
+        self.tag_names = tuple(
+            self._text(*TAG_ENTRY.unpack_from(self._buffer, self._tags + i * TAG_ENTRY.size))
+            for i in range(tag_count)
+        )
+
+    @staticmethod
+    def _uint32s(view):
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        return struct.unpack(f'<{len(view) // 4}I', view)
+
+    def _text(self, offset, length):
+        start = self._pool + offset
+        return bytes(self._buffer[start:start + length]).decode('utf-8')
+
+    def get(self, problem_id):
+        """The Problem with this id, or None (O(1))."""
+        if not 0 < problem_id <= self.max_id:
+            return None
+        slot, = struct.unpack_from('<I', self._buffer, self._index + 4 * problem_id)
+        if not slot:
+            return None
+        (pid, difficulty, flags, tag_count, slug_off, title_off, tags_off,
+         slug_len, title_len) = RECORD.unpack_from(self._buffer, self._records + (slot - 1) * RECORD.size)
+        tags_start = self._pool + tags_off
+        return Problem(
+            id=pid,
+            slug=self._text(slug_off, slug_len),
+            title=self._text(title_off, title_len),
+            difficulty=DIFFICULTIES[difficulty],
+            tags=tuple(self.tag_names[t] for t in self._buffer[tags_start:tags_start + tag_count]),
+            premium=bool(flags & PREMIUM),
+        )
+
+    def __contains__(self, problem_id):
+        return self.get(problem_id) is not None
+
+    def free_ids(self, difficulty):
+        """Sorted ids of the free problems of one difficulty (a uint32 view, not a copy)."""
+        return self._free[difficulty]
+
+    def pick(self, exclude=(), difficulty=None, rng=random):
+        """
+        A random free problem not in `exclude`, of `difficulty` if given
+        (otherwise uniform over all free problems). None when all are excluded.
+        """
+        pools = [self._free[difficulty]] if difficulty else [self._free[d] for d in DIFFICULTIES]
+        total = sum(len(ids) for ids in pools)
+        # Random probes first; a full scan only once most problems are taken
+        for _ in range(16):
+            if not total:
+                break
+            position = rng.randrange(total)
+            for ids in pools:
+                if position < len(ids):
+                    if ids[position] not in exclude:
+                        return self.get(ids[position])
+                    break
+                position -= len(ids)
+        remaining = [pid for ids in pools for pid in ids if pid not in exclude]
+        return self.get(rng.choice(remaining)) if remaining else None
+
+    def stats(self):
+        return {difficulty: len(ids) for difficulty, ids in self._free.items()}
+
+
+def problem_url(problem):
+    return PROBLEM_URL.format(slug=problem.slug)
+
+
+# === BUILD ===
+
+def _normalize(question):
+    """One problemsetQuestionList entry (or an already-flat dict) -> build tuple."""
+    tags = question.get('topicTags', question.get('tags', []))
+    return (
+        int(question.get('frontendQuestionId', question.get('id'))),
+        question.get('titleSlug', question.get('slug')),
+        question['title'],
+        question['difficulty'].capitalize(),
+        tuple(tag['name'] if isinstance(tag, dict) else tag for tag in tags),
+        bool(question.get('paidOnly', question.get('isPaidOnly', question.get('premium', False)))),
+    )
+
+
+def build(questions):
+    """Catalog file bytes for an iterable of question dicts."""
+    problems = sorted({p[0]: p for p in map(_normalize, questions)}.values())
+    tag_names = sorted({tag for p in problems for tag in p[4]})
+    if len(tag_names) > 255:
+        raise CatalogError("more than 255 topic tags")
+    tag_numbers = {name: i for i, name in enumerate(tag_names)}
+
+    pool = bytearray()
+
+    def intern(text):
+        data = text.encode('utf-8')
+        offset = len(pool)
+        pool.extend(data)
+        return offset, len(data)
+
+    tag_entries = b''.join(TAG_ENTRY.pack(*intern(name)) for name in tag_names)
+    records = bytearray()
+    free = {difficulty: [] for difficulty in DIFFICULTIES}
+    for pid, slug, title, difficulty, tags, premium in problems:
+        slug_off, slug_len = intern(slug)
+        title_off, title_len = intern(title)
+        tags_off = len(pool)
+        pool.extend(bytes(tag_numbers[tag] for tag in tags))
+        records += RECORD.pack(pid, DIFFICULTIES.index(difficulty), PREMIUM if premium else 0, len(tags),
+                               slug_off, title_off, tags_off, slug_len, title_len)
+        if not premium:
+            free[difficulty].append(pid)
+
+    max_id = problems[-1][0] if problems else 0
+    index = [0] * (max_id + 1)
+    for number, problem in enumerate(problems, 1):
+        index[problem[0]] = number
+
+    offset = HEADER.size
+    index_off = offset
+    offset += 4 * len(index)
+    records_off = offset
+    offset += len(records)
+    free_offsets = []
+    for difficulty in DIFFICULTIES:
+        free_offsets += [offset, len(free[difficulty])]
+        offset += 4 * len(free[difficulty])
+    tags_off = offset
+    offset += len(tag_entries)
+    pool_off = offset
+
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, len(tag_names), len(problems), max_id,
+                    index_off, records_off, tags_off, pool_off, *free_offsets),
+        struct.pack(f'<{len(index)}I', *index),
+        bytes(records),
+        *(struct.pack(f'<{len(free[d])}I', *free[d]) for d in DIFFICULTIES),
+        tag_entries,
+        bytes(pool),
+    ])
+
+
+def load_questions(path):
+    """Questions from a saved GraphQL response or a plain JSON list."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('data', data).get('problemsetQuestionList', data)
+        data = data.get('questions', data)
+    return data
+
+
+def fetch_questions(page_size=1000):
+    """Every problem from LeetCode's public problemsetQuestionList query."""
+    import requests
+
+    query = """query problemsetQuestionList($skip: Int, $limit: Int) {
+      problemsetQuestionList: questionList(categorySlug: "", skip: $skip, limit: $limit, filters: {}) {
+        total: totalNum
+        questions: data { frontendQuestionId: questionFrontendId title titleSlug difficulty paidOnly: isPaidOnly topicTags { name } }
+      }
+    }"""
+    questions, skip = [], 0
+    while True:
+        response = requests.post(GRAPHQL_URL, json={'query': query, 'variables': {'skip': skip, 'limit': page_size}},
+                                 headers={'Referer': 'https://leetcode.com/problemset/'}, timeout=30)
+        response.raise_for_status()
+        page = response.json()['data']['problemsetQuestionList']
+        questions.extend(page['questions'])
+        skip += page_size
+        if not page['questions'] or skip >= page['total']:
+            return questions
+
+
+def write(data, path=CATALOG_PATH):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# === DEFAULT INSTANCE ===
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_catalog():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Catalog()
+        return _default
+
+
+def lookup(problem_id):
+    """Module-level O(1) lookup in the bundled catalog."""
+    return get_catalog().get(problem_id)
+
+
+def pick_problem(exclude=(), difficulty=None):
+    """Module-level entry point used by the LeetCode path in api/cron.py."""
+    return get_catalog().pick(exclude, difficulty)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the bundled LeetCode catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="Build from a saved problemsetQuestionList JSON")
+    build_cmd.add_argument("source")
+    build_cmd.add_argument("-o", "--output", default=CATALOG_PATH)
+    fetch_cmd = sub.add_parser("fetch", help="Download every problem from leetcode.com and build")
+    fetch_cmd.add_argument("-o", "--output", default=CATALOG_PATH)
+    show_cmd = sub.add_parser("show", help="Print catalog stats or one problem")
+    show_cmd.add_argument("id", nargs="?", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        catalog = Catalog()
+        if args.id:
+            print(catalog.get(args.id))
+        else:
+            print(f"{catalog.count} problems (max id {catalog.max_id}), free: {catalog.stats()}, "
+                  f"{len(catalog.tag_names)} tags")
+        return
+    questions = load_questions(args.source) if args.command == "build" else fetch_questions()
+    write(build(questions), args.output)
+    catalog = Catalog(args.output)
+    print(f"Wrote {args.output}: {catalog.count} problems, free: {catalog.stats()}")
+
+
+if __name__ == "__main__":
+    main()
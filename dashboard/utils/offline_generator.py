@@ -0,0 +1,1166 @@
+"""
+Offline content backend for when no Gemini key has capacity left.
+
+Deterministic, network-free generator behind the same interface as
+get_random_content(): parameterized per-language templates (a topic, a data
+set and one of two small algorithms) are compiled once and rendered with a
+seeded RNG, producing varied files that pass utils/code_validation.py at
+thousands per second. The RNG seed, topic rotation and duplicate check come
+from recent generated_history rows (see set_history_source()).
+
+LeetCode commits fall back to a small bank of known-good solutions instead
+of an empty `class Solution` placeholder.
+"""
+
+import hashlib
+import random
+import re
+import threading
+
+# === TOPICS ===
+# (snake_case noun, unit, low, high) - values are drawn from [low, high]
+TOPICS = [
+    ('scores', 'points', 40, 100),
+    ('temperatures', 'degrees', -5, 42),
+    ('prices', 'dollars', 3, 250),
+    ('distances', 'km', 1, 120),
+    ('latencies', 'ms', 8, 900),
+    ('page_views', 'views', 10, 5000),
+    ('rainfall', 'mm', 0, 80),
+    ('heart_rates', 'bpm', 52, 180),
+    ('downloads', 'downloads', 5, 2000),
+    ('step_counts', 'steps', 800, 15000),
+    ('response_sizes', 'KB', 1, 512),
+    ('queue_lengths', 'jobs', 0, 60),
+    ('battery_levels', 'percent', 3, 100),
+    ('order_totals', 'dollars', 12, 480),
+]
+
+KERNELS = ('stats', 'threshold')
+
+OBJECTIVES = {
+    'stats': [
+        "compute the minimum, maximum and average in a single pass",
+        "aggregate a collection without sorting it",
+        "track several running values inside one loop",
+    ],
+    'threshold': [
+        "filter a collection with a predicate",
+        "select the values that cross a threshold",
+        "build a new collection instead of mutating the input",
+    ],
+}
+
+# Comment prefix per language (html/css use block comments)
+LINE_COMMENT = {
+    'python': '#', 'ruby': '#', 'bash': '#', 'shell': '#', 'sql': '--',
+    'javascript': '//', 'typescript': '//', 'java': '//', 'cpp': '//', 'go': '//',
+    'rust': '//', 'swift': '//', 'kotlin': '//', 'php': '//',
+}
+
+# === TEMPLATES ===
+# {{field}} placeholders; everything else is literal code.
+
+TEMPLATES = {
+    ('python', 'stats'): '''def summarize_{{noun}}({{noun}}):
+    """Return (minimum, maximum, average) of a non-empty list."""
+    lowest = highest = {{noun}}[0]
+    total = 0
+    for value in {{noun}}:
+        # Track the extremes and the running total in one pass
+        lowest = min(lowest, value)
+        highest = max(highest, value)
+        total += value
+    return lowest, highest, total / len({{noun}})
+
+
+if __name__ == "__main__":
+    {{noun}} = [{{values}}]
+    lowest, highest, average = summarize_{{noun}}({{noun}})
+    print(f"{{title}}: min={lowest} max={highest} avg={average:.2f} {{unit}}")
+''',
+    ('python', 'threshold'): '''THRESHOLD = {{threshold}}
+
+
+def above_threshold(values, threshold=THRESHOLD):
+    """Keep only the values strictly above `threshold` (list comprehension)."""
+    return [value for value in values if value > threshold]
+
+
+if __name__ == "__main__":
+    {{noun}} = [{{values}}]
+    high = above_threshold({{noun}})
+    print(f"{len(high)} of {len({{noun}})} {{noun_words}} above {THRESHOLD} {{unit}}: {high}")
+''',
+    ('javascript', 'stats'): '''function summarize{{Noun}}(values) {
+  // Track min, max and total in a single pass
+  let lowest = values[0];
+  let highest = values[0];
+  let total = 0;
+  for (const value of values) {
+    lowest = Math.min(lowest, value);
+    highest = Math.max(highest, value);
+    total += value;
+  }
+  return { lowest, highest, average: total / values.length };
+}
+
+const {{nounCamel}} = [{{values}}];
+const { lowest, highest, average } = summarize{{Noun}}({{nounCamel}});
+console.log(`{{title}}: min=${lowest} max=${highest} avg=${average.toFixed(2)} {{unit}}`);
+''',
+    ('javascript', 'threshold'): '''const THRESHOLD = {{threshold}};
+
+// filter() returns a new array with the values that pass the test
+function aboveThreshold(values, threshold = THRESHOLD) {
+  return values.filter((value) => value > threshold);
+}
+
+const {{nounCamel}} = [{{values}}];
+const high = aboveThreshold({{nounCamel}});
+const total = {{nounCamel}}.length;
+console.log(`${high.length} of ${total} {{noun_words}} above ${THRESHOLD} {{unit}}:`, high);
+''',
+    ('typescript', 'stats'): '''interface Summary {
+  lowest: number;
+  highest: number;
+  average: number;
+}
+
+// Track min, max and total in a single pass
+function summarize{{Noun}}(values: number[]): Summary {
+  let lowest = values[0];
+  let highest = values[0];
+  let total = 0;
+  for (const value of values) {
+    lowest = Math.min(lowest, value);
+    highest = Math.max(highest, value);
+    total += value;
+  }
+  return { lowest, highest, average: total / values.length };
+}
+
+const {{nounCamel}}: number[] = [{{values}}];
+const summary: Summary = summarize{{Noun}}({{nounCamel}});
+console.log(`{{title}}: min=${summary.lowest} max=${summary.highest} avg=${summary.average.toFixed(2)} {{unit}}`);
+''',
+    ('typescript', 'threshold'): '''const THRESHOLD: number = {{threshold}};
+
+// A typed predicate keeps filter() fully type-checked
+const isAbove = (threshold: number) => (value: number): boolean => value > threshold;
+
+function aboveThreshold(values: readonly number[], threshold: number = THRESHOLD): number[] {
+  return values.filter(isAbove(threshold));
+}
+
+const {{nounCamel}}: readonly number[] = [{{values}}];
+const high: number[] = aboveThreshold({{nounCamel}});
+const total: number = {{nounCamel}}.length;
+console.log(`${high.length} of ${total} {{noun_words}} above ${THRESHOLD} {{unit}}:`, high);
+''',
+    ('java', 'stats'): '''import java.util.Arrays;
+import java.util.List;
+
+class {{Noun}}Summary {
+    // Single pass: min, max and total together
+    static double[] summarize(List<Integer> values) {
+        int lowest = values.get(0);
+        int highest = values.get(0);
+        long total = 0;
+        for (int value : values) {
+            lowest = Math.min(lowest, value);
+            highest = Math.max(highest, value);
+            total += value;
+        }
+        return new double[] {lowest, highest, (double) total / values.size()};
+    }
+
+    public static void main(String[] args) {
+        List<Integer> {{nounCamel}} = Arrays.asList({{values}});
+        double[] summary = summarize({{nounCamel}});
+        System.out.printf("{{title}}: min=%.0f max=%.0f avg=%.2f {{unit}}%n", summary[0], summary[1], summary[2]);
+    }
+}
+''',
+    ('java', 'threshold'): '''import java.util.Arrays;
+import java.util.List;
+import java.util.stream.Collectors;
+
+class {{Noun}}Filter {
+    static final int THRESHOLD = {{threshold}};
+
+    // Streams: filter lazily, then collect into a new list
+    static List<Integer> aboveThreshold(List<Integer> values, int threshold) {
+        return values.stream().filter(value -> value > threshold).collect(Collectors.toList());
+    }
+
+    public static void main(String[] args) {
+        List<Integer> {{nounCamel}} = Arrays.asList({{values}});
+        List<Integer> high = aboveThreshold({{nounCamel}}, THRESHOLD);
+        System.out.println(high.size() + " of " + {{nounCamel}}.size() + " {{noun_words}} above " + THRESHOLD + " {{unit}}: " + high);
+    }
+}
+''',
+    ('cpp', 'stats'): '''#include <algorithm>
+#include <iostream>
+#include <vector>
+
+struct Summary {
+    int lowest;
+    int highest;
+    double average;
+};
+
+// Single pass over the data: extremes and running total
+Summary summarize{{Noun}}(const std::vector<int>& values) {
+    Summary summary{values.front(), values.front(), 0.0};
+    long long total = 0;
+    for (int value : values) {
+        summary.lowest = std::min(summary.lowest, value);
+        summary.highest = std::max(summary.highest, value);
+        total += value;
+    }
+    summary.average = static_cast<double>(total) / values.size();
+    return summary;
+}
+
+int main() {
+    std::vector<int> {{nounCamel}}{ {{values}} };
+    Summary summary = summarize{{Noun}}({{nounCamel}});
+    std::cout << "{{title}}: min=" << summary.lowest << " max=" << summary.highest
+              << " avg=" << summary.average << " {{unit}}" << std::endl;
+    return 0;
+}
+''',
+    ('cpp', 'threshold'): '''#include <algorithm>
+#include <iostream>
+#include <iterator>
+#include <vector>
+
+constexpr int kThreshold = {{threshold}};
+
+// std::copy_if keeps the elements that satisfy the predicate
+std::vector<int> aboveThreshold(const std::vector<int>& values, int threshold) {
+    std::vector<int> result;
+    std::copy_if(values.begin(), values.end(), std::back_inserter(result),
+                 [threshold](int value) { return value > threshold; });
+    return result;
+}
+
+int main() {
+    std::vector<int> {{nounCamel}}{ {{values}} };
+    std::vector<int> high = aboveThreshold({{nounCamel}}, kThreshold);
+    std::cout << high.size() << " of " << {{nounCamel}}.size() << " {{noun_words}} above "
+              << kThreshold << " {{unit}}" << std::endl;
+    for (int value : high) {
+        std::cout << "  " << value << std::endl;
+    }
+    return 0;
+}
+''',
+    ('go', 'stats'): '''package main
+
+import "fmt"
+
+// summarize{{Noun}} returns min, max and average in a single pass
+func summarize{{Noun}}(values []int) (int, int, float64) {
+	lowest, highest, total := values[0], values[0], 0
+	for _, value := range values {
+		if value < lowest {
+			lowest = value
+		}
+		if value > highest {
+			highest = value
+		}
+		total += value
+	}
+	return lowest, highest, float64(total) / float64(len(values))
+}
+
+func main() {
+	{{nounCamel}} := []int{ {{values}} }
+	lowest, highest, average := summarize{{Noun}}({{nounCamel}})
+	fmt.Printf("{{title}}: min=%d max=%d avg=%.2f {{unit}}\\n", lowest, highest, average)
+}
+''',
+    ('go', 'threshold'): '''package main
+
+import "fmt"
+
+const threshold = {{threshold}}
+
+// aboveThreshold appends matching values to a new slice
+func aboveThreshold(values []int, limit int) []int {
+	var result []int
+	for _, value := range values {
+		if value > limit {
+			result = append(result, value)
+		}
+	}
+	return result
+}
+
+func main() {
+	{{nounCamel}} := []int{ {{values}} }
+	high := aboveThreshold({{nounCamel}}, threshold)
+	fmt.Printf("%d of %d {{noun_words}} above %d {{unit}}: %v\\n", len(high), len({{nounCamel}}), threshold, high)
+}
+''',
+    ('rust', 'stats'): '''/// Returns (min, max, average) in a single pass
+fn summarize_{{noun}}(values: &[i64]) -> (i64, i64, f64) {
+    let mut lowest = values[0];
+    let mut highest = values[0];
+    let mut total: i64 = 0;
+    for &value in values {
+        lowest = lowest.min(value);
+        highest = highest.max(value);
+        total += value;
+    }
+    (lowest, highest, total as f64 / values.len() as f64)
+}
+
+fn main() {
+    let {{noun}} = vec![{{values}}];
+    let (lowest, highest, average) = summarize_{{noun}}(&{{noun}});
+    println!("{{title}}: min={} max={} avg={:.2} {{unit}}", lowest, highest, average);
+}
+''',
+    ('rust', 'threshold'): '''const THRESHOLD: i64 = {{threshold}};
+
+/// Iterator adapters: copied + filter + collect into a new Vec
+fn above_threshold(values: &[i64], threshold: i64) -> Vec<i64> {
+    values.iter().copied().filter(|&value| value > threshold).collect()
+}
+
+fn main() {
+    let {{noun}} = vec![{{values}}];
+    let high = above_threshold(&{{noun}}, THRESHOLD);
+    println!("{} of {} {{noun_words}} above {} {{unit}}: {:?}", high.len(), {{noun}}.len(), THRESHOLD, high);
+}
+''',
+    ('ruby', 'stats'): '''# Returns [min, max, average] using Enumerable helpers
+def summarize_{{noun}}(values)
+  lowest, highest = values.minmax
+  [lowest, highest, values.sum.to_f / values.size]
+end
+
+{{noun}} = [{{values}}]
+lowest, highest, average = summarize_{{noun}}({{noun}})
+puts "{{title}}: min=#{lowest} max=#{highest} avg=#{average.round(2)} {{unit}}"
+''',
+    ('ruby', 'threshold'): '''THRESHOLD = {{threshold}}
+
+# select keeps the elements for which the block returns true
+def above_threshold(values, threshold = THRESHOLD)
+  values.select { |value| value > threshold }
+end
+
+{{noun}} = [{{values}}]
+high = above_threshold({{noun}})
+total = {{noun}}.size
+puts "#{high.size} of #{total} {{noun_words}} above #{THRESHOLD} {{unit}}: #{high.inspect}"
+''',
+    ('swift', 'stats'): '''/// Returns the minimum, maximum and average in a single pass
+func summarize{{Noun}}(_ values: [Int]) -> (lowest: Int, highest: Int, average: Double) {
+    var lowest = values[0]
+    var highest = values[0]
+    var total = 0
+    for value in values {
+        lowest = min(lowest, value)
+        highest = max(highest, value)
+        total += value
+    }
+    return (lowest, highest, Double(total) / Double(values.count))
+}
+
+let {{nounCamel}} = [{{values}}]
+let summary = summarize{{Noun}}({{nounCamel}})
+print("{{title}}: min=\\(summary.lowest) max=\\(summary.highest) avg=\\(summary.average) {{unit}}")
+''',
+    ('swift', 'threshold'): '''let threshold = {{threshold}}
+
+// filter takes a closure; $0 is the current element
+func aboveThreshold(_ values: [Int], _ limit: Int) -> [Int] {
+    return values.filter { $0 > limit }
+}
+
+let {{nounCamel}} = [{{values}}]
+let high = aboveThreshold({{nounCamel}}, threshold)
+let total = {{nounCamel}}.count
+print("\\(high.count) of \\(total) {{noun_words}} above \\(threshold) {{unit}}: \\(high)")
+''',
+    ('kotlin', 'stats'): '''data class Summary(val lowest: Int, val highest: Int, val average: Double)
+
+// Collection helpers do the aggregation for us
+fun summarize{{Noun}}(values: List<Int>) = Summary(values.minOf { it }, values.maxOf { it }, values.average())
+
+fun main() {
+    val {{nounCamel}} = listOf({{values}})
+    val summary = summarize{{Noun}}({{nounCamel}})
+    println("{{title}}: min=${summary.lowest} max=${summary.highest} avg=${summary.average} {{unit}}")
+}
+''',
+    ('kotlin', 'threshold'): '''const val THRESHOLD = {{threshold}}
+
+// filter builds a new list from the elements matching the predicate
+fun aboveThreshold(values: List<Int>, threshold: Int = THRESHOLD) = values.filter { it > threshold }
+
+fun main() {
+    val {{nounCamel}} = listOf({{values}})
+    val high = aboveThreshold({{nounCamel}})
+    val total = {{nounCamel}}.size
+    println("${high.size} of $total {{noun_words}} above $THRESHOLD {{unit}}: $high")
+}
+''',
+    ('php', 'stats'): '''<?php
+// Returns [min, max, average] using built-in array helpers
+function summarize_{{noun}}(array $values): array
+{
+    return [min($values), max($values), array_sum($values) / count($values)];
+}
+
+${{noun}} = [{{values}}];
+[$lowest, $highest, $average] = summarize_{{noun}}(${{noun}});
+printf("{{title}}: min=%d max=%d avg=%.2f {{unit}}\\n", $lowest, $highest, $average);
+''',
+    ('php', 'threshold'): '''<?php
+const THRESHOLD = {{threshold}};
+
+// array_filter keeps the elements for which the callback returns true
+function above_threshold(array $values, int $threshold = THRESHOLD): array
+{
+    return array_values(array_filter($values, fn ($value) => $value > $threshold));
+}
+
+${{noun}} = [{{values}}];
+$high = above_threshold(${{noun}});
+printf("%d of %d {{noun_words}} above %d {{unit}}: %s\\n", count($high), count(${{noun}}), THRESHOLD, implode(', ', $high));
+''',
+    ('bash', 'stats'): '''#!/usr/bin/env bash
+
+values=({{values_space}})
+lowest=${values[0]}
+highest=${values[0]}
+total=0
+count=0
+
+# One loop tracks the extremes, the total and the count
+for value in "${values[@]}"; do
+  (( value < lowest )) && lowest=$value
+  (( value > highest )) && highest=$value
+  total=$(( total + value ))
+  count=$(( count + 1 ))
+done
+
+# Bash arithmetic is integer-only: scale by 100 for two decimals
+average=$(( total * 100 / count ))
+printf "%s: min=%d max=%d avg=%d.%02d %s\\n" "{{title}}" "$lowest" "$highest" $(( average / 100 )) $(( average % 100 )) "{{unit}}"
+''',
+    ('bash', 'threshold'): '''#!/usr/bin/env bash
+
+threshold={{threshold}}
+values=({{values_space}})
+count=0
+
+# (( )) evaluates arithmetic conditions without [ ] or -gt
+for value in "${values[@]}"; do
+  if (( value > threshold )); then
+    echo "  $value {{unit}}"
+    count=$(( count + 1 ))
+  fi
+done
+
+echo "$count {{noun_words}} above $threshold {{unit}}"
+''',
+    ('sql', 'stats'): '''CREATE TABLE {{noun}} (
+    id INTEGER PRIMARY KEY,
+    reading INTEGER NOT NULL
+);
+
+INSERT INTO {{noun}} (id, reading) VALUES
+{{sql_rows}};
+
+-- Aggregate functions collapse every row into one summary row
+SELECT MIN(reading) AS lowest,
+       MAX(reading) AS highest,
+       ROUND(AVG(reading), 2) AS average
+FROM {{noun}};
+''',
+    ('sql', 'threshold'): '''CREATE TABLE {{noun}} (
+    id INTEGER PRIMARY KEY,
+    reading INTEGER NOT NULL
+);
+
+INSERT INTO {{noun}} (id, reading) VALUES
+{{sql_rows}};
+
+-- WHERE filters rows before they are returned or counted
+SELECT id, reading
+FROM {{noun}}
+WHERE reading > {{threshold}}
+ORDER BY reading DESC;
+
+SELECT COUNT(*) AS above_threshold
+FROM {{noun}}
+WHERE reading > {{threshold}};
+''',
+    ('html', 'stats'): '''<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>{{title}}</title>
+  <style>
+    table { border-collapse: collapse; }
+    td, th { border: 1px solid #ccc; padding: 4px 12px; text-align: right; }
+  </style>
+</head>
+<body>
+  <!-- {{objective}} -->
+  <h1>{{title}}</h1>
+  <table>
+    <thead><tr><th>#</th><th>{{unit}}</th></tr></thead>
+    <tbody>
+{{html_rows}}
+    </tbody>
+  </table>
+  <p id="summary"></p>
+  <script>
+    // Read the values back from the table and summarize them
+    const cells = [...document.querySelectorAll("tbody td:last-child")];
+    const values = cells.map((cell) => Number(cell.textContent));
+    const average = values.reduce((sum, value) => sum + value, 0) / values.length;
+    document.getElementById("summary").textContent =
+      `min ${Math.min(...values)} / max ${Math.max(...values)} / avg ${average.toFixed(2)} {{unit}}`;
+  </script>
+</body>
+</html>
+''',
+    ('html', 'threshold'): '''<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>{{title}}</title>
+  <style>
+    li.high { font-weight: bold; color: #b00020; }
+  </style>
+</head>
+<body>
+  <!-- {{objective}} -->
+  <h1>{{title}}</h1>
+  <ul id="values"></ul>
+  <script>
+    const threshold = {{threshold}};
+    const values = [{{values}}];
+    const list = document.getElementById("values");
+    // Highlight the values above the threshold with a CSS class
+    for (const value of values) {
+      const item = document.createElement("li");
+      item.textContent = `${value} {{unit}}`;
+      item.classList.toggle("high", value > threshold);
+      list.appendChild(item);
+    }
+  </script>
+</body>
+</html>
+''',
+    ('css', 'stats'): ''':root {
+  --accent: {{accent}};
+  --radius: {{radius}}px;
+  --gap: {{gap}}px;
+}
+
+/* A card component driven entirely by custom properties */
+.{{noun_kebab}}-card {
+  display: flex;
+  flex-direction: column;
+  gap: var(--gap);
+  padding: calc(var(--gap) * 2);
+  border-radius: var(--radius);
+  border-top: 4px solid var(--accent);
+  box-shadow: 0 2px 8px rgba(0, 0, 0, 0.08);
+}
+
+.{{noun_kebab}}-card__value {
+  font-size: 2rem;
+  font-weight: 700;
+  color: var(--accent);
+}
+
+.{{noun_kebab}}-card:hover {
+  transform: translateY(-2px);
+  transition: transform 0.15s ease-out;
+}
+''',
+    ('css', 'threshold'): '''/* Responsive grid: as many columns as fit, each at least {{min_width}}px wide */
+.{{noun_kebab}}-grid {
+  display: grid;
+  grid-template-columns: repeat(auto-fill, minmax({{min_width}}px, 1fr));
+  gap: {{gap}}px;
+}
+
+.{{noun_kebab}}-grid > .item {
+  padding: {{gap}}px;
+  border-radius: {{radius}}px;
+  background: #f6f8fa;
+}
+
+/* Highlight items flagged as above the threshold */
+.{{noun_kebab}}-grid > .item.is-high {
+  background: {{accent}};
+  color: #ffffff;
+}
+
+@media (max-width: 600px) {
+  .{{noun_kebab}}-grid {
+    grid-template-columns: 1fr;
+  }
+}
+''',
+}
+
+ACCENTS = ['#0969da', '#1a7f37', '#8250df', '#bf3989', '#cf222e', '#bc4c00', '#0a3069']
+
+_FIELD_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+def _compile(text):
+    """Split a template once into alternating literal/field parts."""
+    return _FIELD_RE.split(text)
+
+
+_COMPILED = {key: _compile(text) for key, text in TEMPLATES.items()}
+
+LANGUAGE_ALIASES = {'shell': 'bash', 'c++': 'cpp'}
+OFFLINE_LANGUAGES = sorted({language for language, _ in TEMPLATES})
+
+
+def _render(parts, fields):
+    out = parts[:]
+    for i in range(1, len(out), 2):
+        out[i] = str(fields[out[i]])
+    return ''.join(out)
+
+
+def _header(language, title, objective):
+    if language == 'html':
+        return ''   # the objective goes into an HTML comment in the body
+    lines = [title, f"Learning objective: {objective}"]
+    if language == 'css':
+        return '/*\n' + '\n'.join(f" * {line}" for line in lines) + '\n */\n\n'
+    prefix = LINE_COMMENT[language]
+    return '\n'.join(f"{prefix} {line}" for line in lines) + '\n\n'
+
+
+class OfflineGenerator:
+    """Seeded template renderer; the same seed and history give the same output."""
+
+    def __init__(self, seed=0, history=None):
+        self.rng = random.Random(seed)
+        self.seen_hashes = set()
+        self.sketches = []          # HashSketch per compacted history summary
+        self.topic_uses = {}
+        self.generated = 0
+        self.lock = threading.Lock()
+        if history:
+            self.load_history(history)
+
+    def load_history(self, rows):
+        """
+        Seed from generated_history rows (content_hash, content_snippet, language):
+        known hashes are never repeated and topics already used per language
+        are rotated to the back.
+        """
+        for row in rows:
+            if row.get('content_hash'):
+                self.seen_hashes.add(row['content_hash'])
+            snippet = (row.get('content_snippet') or '').lower()
+            language = LANGUAGE_ALIASES.get((row.get('language') or '').lower(), (row.get('language') or '').lower())
+            for noun, _, _, _ in TOPICS:
+                if noun in snippet or noun.replace('_', ' ') in snippet:
+                    key = (language, noun)
+                    self.topic_uses[key] = self.topic_uses.get(key, 0) + 1
+        digest = hashlib.sha256(''.join(sorted(self.seen_hashes)).encode()).hexdigest()
+        self.rng.seed(int(digest[:16], 16))
+
+    def load_summaries(self, rows):
+        """Also avoid hashes folded into generated_history_summaries (see utils/history_compaction.py)."""
+        from utils.history_compaction import HashSketch
+        self.sketches.extend(HashSketch.loads(row['hash_sketch']) for row in rows if row.get('hash_sketch'))
+
+    def _seen(self, content_hash):
+        return content_hash in self.seen_hashes or any(content_hash in sketch for sketch in self.sketches)
+
+    def _pick_topic(self, language):
+        least = min(self.topic_uses.get((language, topic[0]), 0) for topic in TOPICS)
+        candidates = [topic for topic in TOPICS if self.topic_uses.get((language, topic[0]), 0) == least]
+        topic = self.rng.choice(candidates)
+        self.topic_uses[(language, topic[0])] = least + 1
+        return topic
+
+    def _fields(self, language, kernel):
+        noun, unit, low, high = self._pick_topic(language)
+        values = [self.rng.randint(low, high) for _ in range(self.rng.randint(6, 12))]
+        words = noun.replace('_', ' ')
+        camel = noun.split('_')[0] + ''.join(part.title() for part in noun.split('_')[1:])
+        objective = self.rng.choice(OBJECTIVES[kernel])
+        return {
+            'noun': noun,
+            'Noun': ''.join(part.title() for part in noun.split('_')),
+            'nounCamel': camel,
+            'noun_words': words,
+            'noun_kebab': noun.replace('_', '-'),
+            'unit': unit,
+            'title': f"{words.title()} {'Summary' if kernel == 'stats' else 'Filter'}",
+            'objective': objective.capitalize(),
+            'values': ', '.join(map(str, values)),
+            'values_space': ' '.join(map(str, values)),
+            'threshold': sorted(values)[len(values) // 2],
+            'sql_rows': ',\n'.join(f"    ({i}, {value})" for i, value in enumerate(values, 1)),
+            'html_rows': '\n'.join(f"      <tr><td>{i}</td><td>{value}</td></tr>" for i, value in enumerate(values, 1)),
+            'accent': self.rng.choice(ACCENTS),
+            'radius': self.rng.choice([4, 6, 8, 12]),
+            'gap': self.rng.choice([8, 12, 16, 24]),
+            'min_width': self.rng.choice([160, 200, 240, 280]),
+        }
+
+    def generate(self, language):
+        """One tutorial file for `language` (unknown languages fall back to Python)."""
+        language = LANGUAGE_ALIASES.get(language.lower(), language.lower())
+        if language not in OFFLINE_LANGUAGES:
+            language = 'python'
+        with self.lock:
+            for _ in range(8):
+                kernel = self.rng.choice(KERNELS)
+                fields = self._fields(language, kernel)
+                body = _render(_COMPILED[(language, kernel)], fields)
+                header = _header(language, fields['title'], fields['objective'])
+                if body.startswith(('#!', '<?php')):
+                    # Keep the shebang / opening tag on the first line
+                    first, body = body.split('\n', 1)
+                    content = f"{first}\n{header}{body.lstrip()}"
+                else:
+                    content = header + body
+                # Files are stored with a trailing newline stripped, like Gemini output
+                content = content.strip()
+                content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+                if not self._seen(content_hash):
+                    break
+            self.seen_hashes.add(content_hash)
+            self.generated += 1
+            return content
+
+
+# === LEETCODE BANK ===
+# number -> (title, difficulty, solution). Solutions carry no title/difficulty
+# header: cron.py writes one from the catalog.
+
+LEETCODE_BANK = {
+    1: ("Two Sum", "Easy", '''from typing import List
+
+
+class Solution:
+    def twoSum(self, nums: List[int], target: int) -> List[int]:
+        """
+        One pass with a hash map from value to index: for each number, the
+        complement (target - num) has either been seen already or not.
+        """
+        seen = {}
+        for i, num in enumerate(nums):
+            if target - num in seen:
+                return [seen[target - num], i]
+            seen[num] = i
+        return []
+
+# Time Complexity: O(n)
+# Space Complexity: O(n)'''),
+    9: ("Palindrome Number", "Easy", '''class Solution:
+    def isPalindrome(self, x: int) -> bool:
+        """
+        Reverse only the second half of the digits and compare it with the
+        first half, which avoids overflow and string conversion.
+        """
+        if x < 0 or (x % 10 == 0 and x != 0):
+            return False
+        reverted = 0
+        while x > reverted:
+            reverted = reverted * 10 + x % 10
+            x //= 10
+        # Odd digit counts leave the middle digit in reverted
+        return x == reverted or x == reverted // 10
+
+# Time Complexity: O(log n)
+# Space Complexity: O(1)'''),
+    13: ("Roman to Integer", "Easy", '''class Solution:
+    def romanToInt(self, s: str) -> int:
+        """
+        Add each symbol's value, subtracting it instead when a larger symbol
+        follows (IV, IX, XL, ...).
+        """
+        values = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
+        total = 0
+        for i, ch in enumerate(s):
+            if i + 1 < len(s) and values[ch] < values[s[i + 1]]:
+                total -= values[ch]
+            else:
+                total += values[ch]
+        return total
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    14: ("Longest Common Prefix", "Easy", '''from typing import List
+
+
+class Solution:
+    def longestCommonPrefix(self, strs: List[str]) -> str:
+        """
+        The common prefix of all strings is the common prefix of the
+        lexicographically smallest and largest ones.
+        """
+        if not strs:
+            return ""
+        first, last = min(strs), max(strs)
+        i = 0
+        while i < len(first) and first[i] == last[i]:
+            i += 1
+        return first[:i]
+
+# Time Complexity: O(n * m)
+# Space Complexity: O(1)'''),
+    20: ("Valid Parentheses", "Easy", '''class Solution:
+    def isValid(self, s: str) -> bool:
+        """
+        Push opening brackets on a stack; every closing bracket must match
+        the most recent unmatched opening one.
+        """
+        pairs = {')': '(', ']': '[', '}': '{'}
+        stack = []
+        for ch in s:
+            if ch in pairs:
+                if not stack or stack.pop() != pairs[ch]:
+                    return False
+            else:
+                stack.append(ch)
+        return not stack
+
+# Time Complexity: O(n)
+# Space Complexity: O(n)'''),
+    26: ("Remove Duplicates from Sorted Array", "Easy", '''from typing import List
+
+
+class Solution:
+    def removeDuplicates(self, nums: List[int]) -> int:
+        """
+        Slow pointer marks the end of the unique prefix; the fast pointer
+        copies each new value after it.
+        """
+        if not nums:
+            return 0
+        write = 1
+        for read in range(1, len(nums)):
+            if nums[read] != nums[write - 1]:
+                nums[write] = nums[read]
+                write += 1
+        return write
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    35: ("Search Insert Position", "Easy", '''from typing import List
+
+
+class Solution:
+    def searchInsert(self, nums: List[int], target: int) -> int:
+        """
+        Binary search for the first index whose value is >= target.
+        """
+        lo, hi = 0, len(nums)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if nums[mid] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+# Time Complexity: O(log n)
+# Space Complexity: O(1)'''),
+    53: ("Maximum Subarray", "Medium", '''from typing import List
+
+
+class Solution:
+    def maxSubArray(self, nums: List[int]) -> int:
+        """
+        Kadane's algorithm: the best subarray ending here either extends the
+        previous one or starts fresh at this element.
+        """
+        best = current = nums[0]
+        for num in nums[1:]:
+            current = max(num, current + num)
+            best = max(best, current)
+        return best
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    70: ("Climbing Stairs", "Easy", '''class Solution:
+    def climbStairs(self, n: int) -> int:
+        """
+        ways(n) = ways(n - 1) + ways(n - 2); keep only the last two values.
+        """
+        prev, curr = 1, 1
+        for _ in range(n - 1):
+            prev, curr = curr, prev + curr
+        return curr
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    121: ("Best Time to Buy and Sell Stock", "Easy", '''from typing import List
+
+
+class Solution:
+    def maxProfit(self, prices: List[int]) -> int:
+        """
+        Track the lowest price so far; the best profit is the largest gap
+        between today's price and that minimum.
+        """
+        lowest = float('inf')
+        best = 0
+        for price in prices:
+            lowest = min(lowest, price)
+            best = max(best, price - lowest)
+        return best
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    136: ("Single Number", "Easy", '''from typing import List
+
+
+class Solution:
+    def singleNumber(self, nums: List[int]) -> int:
+        """
+        XOR cancels every value that appears twice, leaving the single one.
+        """
+        result = 0
+        for num in nums:
+            result ^= num
+        return result
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    169: ("Majority Element", "Easy", '''from typing import List
+
+
+class Solution:
+    def majorityElement(self, nums: List[int]) -> int:
+        """
+        Boyer-Moore voting: the majority element survives pairwise
+        cancellation with every other value.
+        """
+        candidate, count = None, 0
+        for num in nums:
+            if count == 0:
+                candidate = num
+            count += 1 if num == candidate else -1
+        return candidate
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    217: ("Contains Duplicate", "Easy", '''from typing import List
+
+
+class Solution:
+    def containsDuplicate(self, nums: List[int]) -> bool:
+        """
+        Stop at the first value already in the set.
+        """
+        seen = set()
+        for num in nums:
+            if num in seen:
+                return True
+            seen.add(num)
+        return False
+
+# Time Complexity: O(n)
+# Space Complexity: O(n)'''),
+    242: ("Valid Anagram", "Easy", '''from collections import Counter
+
+
+class Solution:
+    def isAnagram(self, s: str, t: str) -> bool:
+        """
+        Two strings are anagrams when their character counts match.
+        """
+        return len(s) == len(t) and Counter(s) == Counter(t)
+
+# Time Complexity: O(n)
+# Space Complexity: O(1) - bounded alphabet'''),
+    268: ("Missing Number", "Easy", '''from typing import List
+
+
+class Solution:
+    def missingNumber(self, nums: List[int]) -> int:
+        """
+        The expected sum of 0..n minus the actual sum is the missing value.
+        """
+        n = len(nums)
+        return n * (n + 1) // 2 - sum(nums)
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    283: ("Move Zeroes", "Easy", '''from typing import List
+
+
+class Solution:
+    def moveZeroes(self, nums: List[int]) -> None:
+        """
+        Swap each non-zero value forward to the write position; zeroes end
+        up behind it in their original count.
+        """
+        write = 0
+        for read in range(len(nums)):
+            if nums[read] != 0:
+                nums[write], nums[read] = nums[read], nums[write]
+                write += 1
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    344: ("Reverse String", "Easy", '''from typing import List
+
+
+class Solution:
+    def reverseString(self, s: List[str]) -> None:
+        """
+        Swap the outermost pair and move both pointers inward.
+        """
+        left, right = 0, len(s) - 1
+        while left < right:
+            s[left], s[right] = s[right], s[left]
+            left += 1
+            right -= 1
+
+# Time Complexity: O(n)
+# Space Complexity: O(1)'''),
+    704: ("Binary Search", "Easy", '''from typing import List
+
+
+class Solution:
+    def search(self, nums: List[int], target: int) -> int:
+        """
+        Classic binary search on a sorted array; halve the range each step.
+        """
+        lo, hi = 0, len(nums) - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if nums[mid] == target:
+                return mid
+            if nums[mid] < target:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return -1
+
+# Time Complexity: O(log n)
+# Space Complexity: O(1)'''),
+    3: ("Longest Substring Without Repeating Characters", "Medium", '''class Solution:
+    def lengthOfLongestSubstring(self, s: str) -> int:
+        """
+        Sliding window: remember the last index of each character and jump
+        the left edge past a repeat.
+        """
+        last = {}
+        left = best = 0
+        for right, ch in enumerate(s):
+            if ch in last and last[ch] >= left:
+                left = last[ch] + 1
+            last[ch] = right
+            best = max(best, right - left + 1)
+        return best
+
+# Time Complexity: O(n)
+# Space Complexity: O(min(n, alphabet))'''),
+    238: ("Product of Array Except Self", "Medium", '''from typing import List
+
+
+class Solution:
+    def productExceptSelf(self, nums: List[int]) -> List[int]:
+        """
+        Multiply the prefix product from the left by the suffix product from
+        the right, without division.
+        """
+        n = len(nums)
+        result = [1] * n
+        prefix = 1
+        for i in range(n):
+            result[i] = prefix
+            prefix *= nums[i]
+        suffix = 1
+        for i in range(n - 1, -1, -1):
+            result[i] *= suffix
+            suffix *= nums[i]
+        return result
+
+# Time Complexity: O(n)
+# Space Complexity: O(1) extra (output excluded)'''),
+}
+
+
+def leetcode_solution(exclude=()):
+    """
+    A known-good solution for a problem not in `exclude`.
+    Returns (problem_number, title, difficulty, code) or None when every
+    problem in the bank has been used.
+    """
+    remaining = sorted(set(LEETCODE_BANK) - set(exclude))
+    if not remaining:
+        return None
+    number = random.choice(remaining)
+    title, difficulty, code = LEETCODE_BANK[number]
+    return number, title, difficulty, code
+
+
+# === DEFAULT INSTANCE ===
+
+_default = None
+_default_lock = threading.Lock()
+_history_source = None
+_summary_source = None
+
+
+def set_history_source(loader, summaries=None):
+    """
+    Register a callable returning recent generated_history rows (and
+    optionally one returning generated_history_summaries rows). They are only
+    called the first time the offline backend is actually needed.
+    """
+    global _history_source, _summary_source
+    _history_source = loader
+    _summary_source = summaries
+
+
+def get_generator():
+    global _default
+    with _default_lock:
+        if _default is None:
+            history = []
+            if _history_source:
+                try:
+                    history = _history_source() or []
+                except Exception as e:
+                    print(f"⚠️ Offline generator: could not load history ({str(e)[:100]})")
+            _default = OfflineGenerator(history=history)
+            if _summary_source:
+                try:
+                    _default.load_summaries(_summary_source() or [])
+                except Exception as e:
+                    print(f"⚠️ Offline generator: could not load history summaries ({str(e)[:100]})")
+        return _default
+
+
+def generate_offline(language):
+    """Module-level entry point used by get_random_content()."""
+    return get_generator().generate(language)
+
+
+def generated_count():
+    """Files produced by the default instance in this process."""
+    return _default.generated if _default else 0
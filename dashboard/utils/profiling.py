@@ -0,0 +1,167 @@
+"""
+Opt-in profiling of one cron run.
+
+Enabled per request with ?profile=1 (or ?profile=cprofile), or for every run
+with the CRON_PROFILE env var. When neither is set nothing here is started
+and the run pays only for the flag check.
+
+Modes:
+    sample    a background thread samples the run's stack every
+              PROFILE_INTERVAL_MS (wall clock, so time blocked on Gemini,
+              GitHub or Supabase shows up). Writes <name>.folded - collapsed
+              stacks for flamegraph.pl, speedscope or inferno.
+    cprofile  deterministic cProfile of the run thread. Writes <name>.prof
+              (pstats; flameprof/snakeviz render it as a flame graph).
+
+Both also write <name>.top.txt with the PROFILE_TOP hottest functions.
+Files go to PROFILE_DIR (default /tmp, the only writable path on Vercel) and,
+if PROFILE_BUCKET is set, are uploaded to that Supabase storage bucket.
+"""
+
+import io
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+
+MODES = ('sample', 'cprofile')
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp")
+PROFILE_BUCKET = os.environ.get("PROFILE_BUCKET")
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", "25"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval into {stack tuple: samples}."""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL_MS / 1000.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self):
+        """Collapsed-stack text: 'root;caller;leaf count' per line."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, n):
+        """[(label, self samples, total samples)] for the `n` functions with most total samples."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        return [(label, own[label], count) for label, count in total.most_common(n)]
+
+
+class RunProfile:
+    """One profiled run: start() on construction, finish() writes the outputs."""
+
+    def __init__(self, mode='sample', name='cron', top_n=PROFILE_TOP):
+        self.mode = mode
+        self.name = f"{name}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{mode}"
+        self.top_n = top_n
+        self.started = time.perf_counter()
+        if mode == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler(threading.get_ident())
+            self._profiler.start()
+
+    def _stop(self):
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+    def _outputs(self, elapsed):
+        """{file suffix: bytes} for this run."""
+        if self.mode == 'cprofile':
+            import pstats
+            stream = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=stream)
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            top = f"{self.name}: {elapsed:.2f}s wall\n" + stream.getvalue()
+            # Same bytes as Stats.dump_stats(), without a temp file
+            return {'.prof': marshal.dumps(stats.stats), '.top.txt': top.encode('utf-8')}
+
+        sampler = self._profiler
+        lines = [f"{self.name}: {elapsed:.2f}s wall, {sampler.samples} samples every {sampler.interval * 1000:.0f}ms",
+                 f"{'total%':>7} {'self%':>7}  function"]
+        for label, own, total in sampler.top(self.top_n):
+            lines.append(f"{100.0 * total / max(sampler.samples, 1):6.1f}% {100.0 * own / max(sampler.samples, 1):6.1f}%  {label}")
+        return {'.folded': sampler.folded().encode('utf-8'), '.top.txt': ("\n".join(lines) + "\n").encode('utf-8')}
+
+    def finish(self, supabase=None):
+        """Stop profiling and write the outputs. Returns log lines."""
+        self._stop()
+        elapsed = time.perf_counter() - self.started
+        logs = []
+        for suffix, data in self._outputs(elapsed).items():
+            file_name = self.name + suffix
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                with open(os.path.join(PROFILE_DIR, file_name), 'wb') as f:
+                    f.write(data)
+                where = os.path.join(PROFILE_DIR, file_name)
+            except OSError as e:
+                where = f"not written ({e})"
+            if supabase is not None and PROFILE_BUCKET:
+                try:
+                    supabase.storage.from_(PROFILE_BUCKET).upload(file_name, data, {"content-type": "text/plain"})
+                    where += f", uploaded to {PROFILE_BUCKET}"
+                except Exception as e:
+                    where += f", upload failed: {str(e)[:100]}"
+            logs.append(f"Profile {suffix}: {where}")
+        return logs
+
+    def abort(self):
+        """Stop without writing anything (the run failed)."""
+        self._stop()
+
+
+def requested_mode(path=None):
+    """Profiling mode asked for by ?profile= on `path` or CRON_PROFILE, else None."""
+    value = None
+    if path:
+        value = parse_qs(urlparse(path).query).get('profile', [None])[0]
+    value = (value or os.environ.get("CRON_PROFILE") or '').lower()
+    if not value or value in ('0', 'false', 'off'):
+        return None
+    return value if value in MODES else 'sample'
+
+
+def start_profile(path=None, name='cron'):
+    """A started RunProfile if profiling was requested, else None."""
+    mode = requested_mode(path)
+    return RunProfile(mode, name) if mode else None
@@ -0,0 +1,251 @@
+"""
+Versioned, precompiled prompt templates for Gemini.
+
+Each template is a static instruction part (built once per process) plus a
+small variable part, so the per-call work is just formatting the variable
+part. Every call through generate() records latency and token usage per
+template version (see usage_summary()), including the static share of the
+prompt and the tokens Gemini reports as cached. The static parts are far
+below Gemini's minimum cacheable prompt size, so no caching is expected
+from them.
+
+With a `stream_check` (see the *_prefix_reason() checks in
+utils/code_validation.py) the response is streamed and checked as it
+arrives; an off-format start cancels the stream and raises EarlyAbort.
+GEMINI_STREAM_CHECKS=0 turns this off. Hedged attempts (a `cancel` from
+utils/hedging.py) are always streamed so the losing one can be stopped.
+"""
+
+import os
+import string
+import threading
+import time
+
+from utils.adaptive_limit import limiter
+from utils.code_validation import EarlyAbort
+from utils.hedging import AttemptCancelled
+
+STREAM_CHECKS = os.environ.get("GEMINI_STREAM_CHECKS", "1").lower() in ('1', 'true', 'on')
+
+
+class PromptTemplate:
+    """A named, versioned prompt: static prefix + format string for the variable part."""
+
+    __slots__ = ('name', 'version', 'static', 'dynamic', 'fields')
+
+    def __init__(self, name, version, static, dynamic):
+        self.name = name
+        self.version = version
+        self.static = static
+        self.dynamic = dynamic
+        # Compile once: the set of fields the variable part needs
+        self.fields = frozenset(
+            field for _, field, _, _ in string.Formatter().parse(dynamic) if field
+        )
+
+    @property
+    def key(self):
+        return f"{self.name}@v{self.version}"
+
+    def render(self, suffix=None, **params):
+        """Full prompt text; `suffix` is appended verbatim (e.g. regeneration feedback)."""
+        missing = self.fields - params.keys()
+        if missing:
+            raise KeyError(f"{self.key} missing {', '.join(sorted(missing))}")
+        prompt = self.static + self.dynamic.format(**params)
+        return prompt + suffix if suffix else prompt
+
+
+# === TEMPLATES ===
+
+TUTORIAL_IDEA = PromptTemplate('tutorial_idea', 2, (
+    "Generate ONE creative, educational coding tutorial idea.\n"
+    "Give me:\n"
+    "1. A short, descriptive filename (2-3 words, snake_case, no extension)\n"
+    "2. A one-line description of what to build\n"
+    "\n"
+    "Requirements:\n"
+    "- Must be a LEARNING example (tutorial-style, educational)\n"
+    "- Should teach a useful concept or technique\n"
+    "- Examples: 'simple_http_server' (Create HTTP server basics), 'responsive_webpage' (Build responsive layout)\n"
+    "- Make it DIFFERENT from common examples\n"
+    "- Be creative and practical\n"
+    "\n"
+    "Format your response EXACTLY as:\n"
+    "FILENAME: your_filename_here\n"
+    "DESCRIPTION: Your description here\n"
+    "\n"
+), "Language: {language}\n")
+
+TUTORIAL_CODE = PromptTemplate('tutorial_code', 2, (
+    "Create an EDUCATIONAL code tutorial.\n"
+    "\n"
+    "Requirements:\n"
+    "1. Write CLEAR, WELL-COMMENTED code that teaches concepts\n"
+    "2. Include comments explaining WHAT and WHY (educational style)\n"
+    "3. Add a header comment explaining the learning objective\n"
+    "4. Make it 80-150 lines (complete but not overwhelming)\n"
+    "5. Use best practices and modern features of the language\n"
+    "6. Include example usage at the end\n"
+    "7. Focus on ONE concept and teach it well\n"
+    "8. NO markdown formatting - just raw code with comments\n"
+    "9. Make it practical and immediately useful for learning\n"
+    "\n"
+    "Write code that a beginner could learn from!\n"
+    "\n"
+), "Topic: {description}\nLanguage: {language}\n")
+
+LEETCODE_SOLUTION = PromptTemplate('leetcode_solution', 3, """You are a LeetCode expert.
+
+Write a COMPLETE, WORKING Python solution with the OPTIMAL algorithm:
+- `class Solution` with LeetCode's method signature
+- A docstring explaining the approach, inline comments for key steps
+- `# Time Complexity: O(?)` and `# Space Complexity: O(?)` at the end
+
+Return only the code in a single ```python block.
+
+""", "Problem #{problem_number}: {title} ({difficulty}). Topics: {tags}.")
+
+ENTERPRISE_DAY = PromptTemplate('enterprise_day', 2, """Generate realistic, production-quality code for one day of a 15-day project build.
+
+Generate ONE complete, functional file that would be created on the given day.
+Include:
+1. Proper file path (e.g., src/components/Header.tsx or backend/routes/auth.js)
+2. Complete, working code with proper imports
+3. Comments explaining key parts
+4. Follow best practices for the tech stack
+
+Format your response EXACTLY as:
+FILEPATH: path/to/file.ext
+CODE:
+[complete code here]
+
+Generate actual working code, not templates or placeholders.
+
+""", """Project: {project_name}
+Description: {description}
+Tech Stack: {tech_stack}
+Phase: {phase} (Day {day}/15)
+Focus: {focus}""")
+
+BATCH_ITEMS = PromptTemplate('batch_items', 1, (
+    "You will complete several independent coding tasks in ONE response.\n"
+    "For EACH task, output exactly:\n"
+    "=== ITEM <id> ===\n"
+    "<raw code only, no markdown fences>\n"
+    "=== END <id> ===\n"
+    "\n"
+    "Every task must be complete. Do not skip any id.\n"
+    "\n"
+    "Tasks:\n"
+), "{tasks}")
+
+
+# === USAGE METRICS ===
+
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def _record(template, latency, prompt_chars, usage, aborted_chars=None):
+    prompt_tokens = getattr(usage, 'prompt_token_count', None)
+    with _usage_lock:
+        stats = _usage.setdefault(template.key, {
+            'calls': 0, 'seconds': 0.0, 'prompt_chars': 0, 'static_chars': 0,
+            'prompt_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0,
+            'aborted': 0, 'aborted_seconds': 0.0,
+        })
+        if aborted_chars is not None:
+            stats['aborted'] += 1
+            stats['aborted_seconds'] += latency
+            stats['output_tokens'] += aborted_chars // 4
+        stats['calls'] += 1
+        stats['seconds'] += latency
+        stats['prompt_chars'] += prompt_chars
+        stats['static_chars'] += len(template.static)
+        # Older SDKs have no usage_metadata - fall back to ~4 chars per token
+        stats['prompt_tokens'] += prompt_tokens if prompt_tokens is not None else prompt_chars // 4
+        stats['cached_tokens'] += getattr(usage, 'cached_content_token_count', 0) or 0
+        stats['output_tokens'] += getattr(usage, 'candidates_token_count', 0) or 0
+
+
+def _streamed(model, prompt, stream_check=None, cancel=None):
+    """
+    Stream the response, running `stream_check` on the text so far after each
+    chunk. A hedging `cancel` closes the stream from the winner's thread.
+    """
+    response = model.generate_content(prompt, stream=True)
+    # Closing the gRPC stream stops generation (and billing) server-side
+    close = getattr(getattr(response, '_iterator', None), 'cancel', None)
+    if cancel is not None and close:
+        cancel.on_cancel(close)
+    text = ""
+    try:
+        for chunk in response:
+            if cancel is not None and cancel.cancelled:
+                break
+            try:
+                text += chunk.text
+            except ValueError:
+                break           # blocked / empty candidate: left to the caller's checks
+            reason = stream_check(text) if stream_check else None
+            if reason:
+                if close:
+                    close()
+                raise EarlyAbort(reason, len(text))
+    except EarlyAbort:
+        raise
+    except Exception:
+        if cancel is None or not cancel.cancelled:
+            raise
+    if cancel is not None and cancel.cancelled:
+        raise AttemptCancelled(len(text))
+    return response
+
+
+def generate(model, template, suffix=None, stream_check=None, cancel=None, **params):
+    """
+    Render `template`, call model.generate_content and record usage. Returns the response.
+    `stream_check(text_so_far)` streams the call and raises EarlyAbort on the first reason it returns;
+    a `cancel` (utils/hedging.Cancel) streams it too and raises AttemptCancelled once cancelled.
+    """
+    prompt = template.render(suffix, **params)
+    # Adaptive concurrency cap shared by every Gemini call (see utils/adaptive_limit.py)
+    with limiter('gemini').slot():
+        started = time.monotonic()
+        try:
+            if (stream_check and STREAM_CHECKS) or cancel is not None:
+                response = _streamed(model, prompt, stream_check if STREAM_CHECKS else None, cancel)
+            else:
+                response = model.generate_content(prompt)
+        except (EarlyAbort, AttemptCancelled) as abort:
+            _record(template, time.monotonic() - started, len(prompt), None, abort.chars)
+            raise
+    _record(template, time.monotonic() - started, len(prompt), getattr(response, 'usage_metadata', None))
+    return response
+
+
+def usage_stats():
+    """Copy of the per-template usage counters."""
+    with _usage_lock:
+        return {key: dict(stats) for key, stats in _usage.items()}
+
+
+def usage_summary():
+    """One log line per template: calls, avg latency, tokens and the static share."""
+    lines = []
+    for key, stats in sorted(usage_stats().items()):
+        calls = stats['calls']
+        static_share = stats['static_chars'] / stats['prompt_chars'] if stats['prompt_chars'] else 0
+        lines.append(
+            f"Prompt {key}: {calls} calls, avg {stats['seconds'] / calls:.1f}s, "
+            f"{stats['prompt_tokens']} prompt tokens ({stats['cached_tokens']} cached, "
+            f"{static_share:.0%} static prefix), {stats['output_tokens']} output tokens"
+            + (f", {stats['aborted']} cancelled early ({stats['aborted_seconds']:.1f}s)" if stats['aborted'] else "")
+        )
+    return lines
+
+
+def reset_usage():
+    with _usage_lock:
+        _usage.clear()
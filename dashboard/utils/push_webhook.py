@@ -0,0 +1,222 @@
+"""
+GitHub push-webhook ingestion for the contribution ledger.
+
+Pushes to a user's regular repo (the ones they make themselves included) are
+counted into user_settings.push_day/push_count, which the ledger (see
+utils/contribution_ledger.py) folds into today's known commits - so a user
+who has already pushed enough today is skipped by the cron run without any
+GitHub call. Events are collapsed in batches: repeated deliveries and pushes
+to other branches or unmanaged repos are dropped, the rest become one
+apply_push_counts() call per batch (supabase_push_webhook.sql), which also
+skips deliveries counted before.
+
+Setup: add a webhook on the repo (or org/app) with payload URL
+https://<deployment>/api/webhook, content type application/json, the
+GITHUB_WEBHOOK_SECRET as secret and the "push" event.
+
+Replay recorded deliveries (from the dashboard directory):
+    python -m utils.push_webhook replay --dry-run deliveries/*.json
+    python -m utils.push_webhook replay deliveries/*.json
+A recording is either a raw push payload or {"event", "delivery",
+"signature", "body"} with the raw body string as GitHub sent it.
+"""
+
+import argparse
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+from utils.contribution_ledger import ledger_day, regular_repo_name
+
+WEBHOOK_SECRET = os.environ.get("GITHUB_WEBHOOK_SECRET")
+BATCH_SIZE = 100
+# 0 flushes on every delivery (serverless instances may freeze between requests)
+BATCH_SECONDS = float(os.environ.get("WEBHOOK_BATCH_SECONDS", "0"))
+
+
+def verify_signature(secret, body, signature):
+    """True if `signature` (X-Hub-Signature-256) is the HMAC-SHA256 of the raw `body`."""
+    if not secret or not signature or not signature.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len('sha256='):])
+
+
+def _parse_time(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def parse_push(delivery, payload, now_utc):
+    """
+    Push event dict {delivery, owner, repo, day, commits} for a push to the
+    repo's default branch, counting commits timestamped on the ledger day of
+    `now_utc`. None for other branches, tag pushes and branch deletions.
+    """
+    repository = payload.get('repository') or {}
+    default_branch = repository.get('default_branch') or 'main'
+    if payload.get('deleted') or payload.get('ref') != f"refs/heads/{default_branch}":
+        return None
+
+    owner = repository.get('owner') or {}
+    day = ledger_day(now_utc)
+    commits = 0
+    # GitHub lists at most 20 commits per push, so this stays a lower bound
+    for commit in payload.get('commits') or []:
+        try:
+            if ledger_day(_parse_time(commit['timestamp'])) == day:
+                commits += 1
+        except (KeyError, ValueError):
+            continue
+
+    return {
+        'delivery': delivery,
+        'owner': owner.get('login') or owner.get('name'),
+        'repo': repository.get('name'),
+        'day': day.isoformat(),
+        'commits': commits,
+    }
+
+
+def collapse(events):
+    """Drop repeated deliveries and pushes with no commits for their day."""
+    unique = {}
+    for event in events:
+        if event['commits'] > 0 and event['owner'] and event['repo']:
+            unique[event['delivery']] = event
+    return list(unique.values())
+
+
+def resolve_users(supabase, events):
+    """{(owner, repo) lowercased: user id} for events that hit a user's regular repo."""
+    owners = sorted({event['owner'] for event in events})
+    if not owners:
+        return {}
+    users = supabase.table("user_settings").select("id, github_username, repo_name").in_("github_username", owners).execute().data
+    return {(u['github_username'].lower(), regular_repo_name(u).lower()): u['id'] for u in users or []}
+
+
+def apply_events(supabase, events):
+    """Collapse `events` and write them. Returns batch stats."""
+    events = collapse(events)
+    stats = {'events': len(events), 'matched': 0, 'users_updated': 0}
+    repo_users = resolve_users(supabase, events)
+
+    by_day = {}
+    for event in events:
+        user_id = repo_users.get((event['owner'].lower(), event['repo'].lower()))
+        if user_id:
+            by_day.setdefault(event['day'], []).append(
+                {'delivery': event['delivery'], 'user_id': user_id, 'commits': event['commits']})
+
+    for day, rows in sorted(by_day.items()):
+        stats['matched'] += len(rows)
+        updated = supabase.rpc("apply_push_counts", {"p_day": day, "p_rows": rows}).execute().data
+        stats['users_updated'] += updated or 0
+    return stats
+
+
+class PushBatcher:
+    """Buffers push events and applies them once `max_events` or `max_seconds` is reached."""
+
+    def __init__(self, supabase, max_events=BATCH_SIZE, max_seconds=BATCH_SECONDS):
+        self.supabase = supabase
+        self.max_events = max_events
+        self.max_seconds = max_seconds
+        self._events = []
+        self._first_at = None
+        self._lock = threading.Lock()
+
+    def add(self, event):
+        """Buffer one event. Returns True when the batch is due for flush()."""
+        with self._lock:
+            if not self._events:
+                self._first_at = time.monotonic()
+            self._events.append(event)
+            return self._due()
+
+    def _due(self):
+        return bool(self._events) and (
+            len(self._events) >= self.max_events or time.monotonic() - self._first_at >= self.max_seconds)
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return {'events': 0, 'matched': 0, 'users_updated': 0}
+        return apply_events(self.supabase, events)
+
+
+# === REPLAY ===
+
+def load_recording(path):
+    """(event name, delivery id, signature or None, raw body bytes) of a recorded delivery."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+    if 'body' in data:
+        return data.get('event', 'push'), data.get('delivery') or path, data.get('signature'), data['body'].encode('utf-8')
+    return 'push', os.path.basename(path), None, raw
+
+
+def received_at(payload):
+    """When a recorded push most likely arrived: its latest commit timestamp."""
+    stamps = [_parse_time(c['timestamp']) for c in payload.get('commits') or [] if c.get('timestamp')]
+    return max(stamps) if stamps else datetime.datetime.now(datetime.timezone.utc)
+
+
+def replay(paths, supabase=None, secret=WEBHOOK_SECRET, batch_size=BATCH_SIZE):
+    """Feed recorded deliveries through the same parse/collapse/apply path as the endpoint."""
+    events, skipped = [], 0
+    for path in paths:
+        name, delivery, signature, body = load_recording(path)
+        if signature and secret and not verify_signature(secret, body, signature):
+            print(f"❌ {path}: signature mismatch")
+            skipped += 1
+            continue
+        if name != 'push':
+            skipped += 1
+            continue
+        payload = json.loads(body)
+        event = parse_push(delivery, payload, received_at(payload))
+        if event is None:
+            skipped += 1
+            continue
+        events.append(event)
+
+    print(f"Replaying {len(events)} push events ({skipped} skipped)")
+    if supabase is None:
+        for event in collapse(events):
+            print(f"  {event['owner']}/{event['repo']} {event['day']}: +{event['commits']} ({event['delivery']})")
+        return None
+
+    totals = {'events': 0, 'matched': 0, 'users_updated': 0}
+    for start in range(0, len(events), batch_size):
+        stats = apply_events(supabase, events[start:start + batch_size])
+        for key in totals:
+            totals[key] += stats[key]
+    print(f"Applied {totals['events']} events, {totals['matched']} matched users' repos, "
+          f"{totals['users_updated']} user rows updated")
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GitHub push webhook tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay_parser = sub.add_parser("replay", help="Replay recorded push deliveries")
+    replay_parser.add_argument("paths", nargs="+")
+    replay_parser.add_argument("--dry-run", action="store_true", help="Print collapsed events without writing")
+    args = parser.parse_args(argv)
+
+    supabase = None
+    if not args.dry_run:
+        from api.cron import create_supabase_client
+        supabase = create_supabase_client()
+    replay(args.paths, supabase)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Incremental rollups for admin stats.
+
+Folds new generated_history and analytics rows into per-minute, per-hour and
+per-day counters (stat_rollups, see supabase_rollups.sql) keyed by plan,
+language and outcome. Each run continues from a (created_at, id) high-water
+mark stored in rollup_state, so it only reads rows it has not counted yet;
+counters and the mark are written together by the apply_rollup() function.
+Admin reads then cost O(buckets) instead of O(rows), and raw rows below the
+mark can be pruned on a schedule.
+
+Plans are looked up from user_settings when a batch is rolled up (the plan
+at rollup time, not at commit time).
+
+Usage (from the dashboard directory):
+    python -m utils.rollups
+    python -m utils.rollups --prune
+"""
+
+import argparse
+import datetime
+import os
+
+from utils.decisions import parse_timestamp
+
+EPOCH = '1970-01-01T00:00:00+00:00'
+GRANULARITIES = ('minute', 'hour', 'day')
+
+SOURCES = {
+    'commits': {
+        'table': 'generated_history',
+        'columns': 'id, user_id, language, created_at',
+        'retention_days': int(os.environ.get("GENERATED_HISTORY_RETENTION_DAYS", "90")),
+    },
+    'page_views': {
+        'table': 'analytics',
+        'columns': 'id, user_id, created_at',
+        'retention_days': int(os.environ.get("ANALYTICS_RETENTION_DAYS", "30")),
+    },
+}
+
+# Fine-grained buckets are only useful for recent windows; day buckets are kept
+ROLLUP_RETENTION_DAYS = {'minute': 3, 'hour': 90}
+
+BATCH_SIZE = 1000
+MAX_BATCHES = 50
+LAG_SECONDS = 60    # rows newer than this may belong to transactions still committing
+
+
+def bucket_start(ts, granularity):
+    """Start of the minute/hour/day bucket containing `ts` (UTC)."""
+    if granularity == 'minute':
+        return ts.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _dimensions(source, row, plans):
+    user_id = row.get('user_id')
+    plan = plans.get(user_id, 'unknown') if user_id else 'visitor'
+    if source == 'commits':
+        return plan, (row.get('language') or '').lower(), 'committed'
+    return plan, '', 'view'
+
+
+def aggregate(source, rows, plans):
+    """Counter rows for apply_rollup(): one per (granularity, bucket, plan, language, outcome)."""
+    counts = {}
+    for row in rows:
+        ts = parse_timestamp(row['created_at']).astimezone(datetime.timezone.utc)
+        dims = _dimensions(source, row, plans)
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(ts, granularity).isoformat()) + dims
+            counts[key] = counts.get(key, 0) + 1
+    return [
+        {'granularity': g, 'bucket': bucket, 'plan': plan, 'language': language, 'outcome': outcome, 'count': count}
+        for (g, bucket, plan, language, outcome), count in counts.items()
+    ]
+
+
+def read_state(supabase, source):
+    """(high_water, last_id) for `source`, EPOCH/None before the first run."""
+    data = supabase.table("rollup_state").select("high_water, last_id").eq("source", source).execute().data
+    if not data:
+        return EPOCH, None
+    return data[0]['high_water'], data[0].get('last_id')
+
+
+def fetch_batch(supabase, source, high_water, last_id, cutoff, batch_size=BATCH_SIZE, config=None):
+    """Next rows after the (high_water, last_id) keyset position, up to `cutoff`."""
+    config = config or SOURCES[source]
+    # "created_at,id" is passed through as PostgREST's multi-column order
+    rows = supabase.table(config['table']).select(config['columns']) \
+        .gte("created_at", high_water).lte("created_at", cutoff) \
+        .order("created_at,id").limit(batch_size).execute().data
+    if not last_id:
+        return rows, len(rows)
+    # gte re-reads rows sharing the mark's timestamp; drop the ones already counted
+    mark = parse_timestamp(high_water)
+    fresh = [row for row in rows if parse_timestamp(row['created_at']) > mark or row['id'] > last_id]
+    return fresh, len(rows)
+
+
+def plan_lookup(supabase, rows):
+    """user_id -> plan_type for the users in `rows`."""
+    user_ids = sorted({row['user_id'] for row in rows if row.get('user_id')})
+    if not user_ids:
+        return {}
+    data = supabase.table("user_settings").select("id, plan_type").in_("id", user_ids).execute().data
+    return {row['id']: row.get('plan_type') or 'free' for row in data}
+
+
+def run_rollup(supabase, source, now=None, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES):
+    """Roll up new rows of one source. Returns a stats dict."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    cutoff = (now - datetime.timedelta(seconds=LAG_SECONDS)).isoformat()
+    high_water, last_id = read_state(supabase, source)
+    stats = {'source': source, 'rows': 0, 'batches': 0, 'counters': 0, 'high_water': high_water}
+
+    for _ in range(max_batches):
+        rows, fetched = fetch_batch(supabase, source, high_water, last_id, cutoff, batch_size)
+        if not rows:
+            break
+        counters = aggregate(source, rows, plan_lookup(supabase, rows))
+        supabase.rpc("apply_rollup", {
+            'p_source': source,
+            'p_expected': high_water,
+            'p_expected_id': last_id,
+            'p_high_water': rows[-1]['created_at'],
+            'p_last_id': rows[-1]['id'],
+            'p_rows': counters,
+        }).execute()
+        high_water, last_id = rows[-1]['created_at'], rows[-1]['id']
+        stats['rows'] += len(rows)
+        stats['batches'] += 1
+        stats['counters'] += len(counters)
+        if fetched < batch_size:
+            break
+
+    stats['high_water'] = high_water
+    return stats
+
+
+def run_all(supabase, now=None):
+    """Roll up every source. Returns a list of stats dicts."""
+    return [run_rollup(supabase, source, now) for source in SOURCES]
+
+
+def prune(supabase, now=None):
+    """
+    Delete raw rows past their retention that are already rolled up, and
+    minute/hour buckets past theirs. Returns {target: cutoff}.
+    generated_history rows must also be compacted (utils/history_compaction.py);
+    whole monthly partitions are dropped where possible.
+    """
+    from utils.history_compaction import STATE_SOURCE as COMPACTION_SOURCE
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    pruned = {}
+    for source, config in SOURCES.items():
+        high_water, _ = read_state(supabase, source)
+        retention_cutoff = now - datetime.timedelta(days=config['retention_days'])
+        # Never delete rows the rollup hasn't counted yet
+        cutoff = min(retention_cutoff, parse_timestamp(high_water))
+        if config['table'] == 'generated_history':
+            # ...or the compaction hasn't folded into a summary yet
+            compacted, _ = read_state(supabase, COMPACTION_SOURCE)
+            cutoff = min(cutoff, parse_timestamp(compacted)).isoformat()
+            try:
+                supabase.rpc("prune_generated_history", {'p_before': cutoff}).execute()
+            except Exception:
+                # Partitioning migration not applied: plain delete
+                supabase.table(config['table']).delete(returning="minimal").lt("created_at", cutoff).execute()
+        else:
+            cutoff = cutoff.isoformat()
+            supabase.table(config['table']).delete(returning="minimal").lt("created_at", cutoff).execute()
+        pruned[config['table']] = cutoff
+    for granularity, days in ROLLUP_RETENTION_DAYS.items():
+        cutoff = (now - datetime.timedelta(days=days)).isoformat()
+        supabase.table("stat_rollups").delete(returning="minimal") \
+            .eq("granularity", granularity).lt("bucket", cutoff).execute()
+        pruned[f"stat_rollups/{granularity}"] = cutoff
+    return pruned
+
+
+def format_report(results, pruned=None):
+    lines = [
+        f"Rollup {stats['source']}: {stats['rows']} rows in {stats['batches']} batches "
+        f"({stats['counters']} counters), high-water {stats['high_water']}"
+        for stats in results
+    ]
+    for target, cutoff in (pruned or {}).items():
+        lines.append(f"Pruned {target} before {cutoff}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll up generated_history and analytics into stat_rollups")
+    parser.add_argument("--prune", action="store_true", help="Also delete raw rows and buckets past retention")
+    args = parser.parse_args(argv)
+
+    from api.cron import create_supabase_client
+    supabase = create_supabase_client()
+    results = run_all(supabase)
+    from utils import history_compaction
+    compaction = history_compaction.compact(supabase)
+    pruned = prune(supabase) if args.prune else None
+    print(format_report(results, pruned))
+    print(history_compaction.format_report(compaction))
+
+
+if __name__ == "__main__":
+    main()
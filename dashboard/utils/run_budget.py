@@ -0,0 +1,139 @@
+"""
+Run-level time budget with deadline propagation.
+
+The entry point (api/cron.py do_GET) starts a budget; every external call
+then gets min(its own timeout, time left) - Gemini through the per-key
+client (content_generator.gemini_model), GitHub through the pooled
+requesters and PostgREST through the limited httpx transport (both in
+utils/adaptive_limit.py). A user is only started while the time left covers
+a typical user's duration, so the handler can still answer with full logs
+and a list of deferred users instead of being killed mid-run.
+
+BudgetExceeded derives from BaseException so the broad `except Exception`
+handlers in process_user can't swallow it and carry on (retries, fallbacks,
+failure records) on an expired budget; the run loop catches it and defers
+the user. A GitHub write and its bookkeeping run under committing(): the
+budget is checked once before the write, and the calls inside keep their own
+timeouts, so a commit that went through is always recorded.
+
+Outside a run (local_bot daemon, scripts) calls keep their own timeouts.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+
+# The Actions job that calls /api/cron is killed after 5 minutes
+RUN_BUDGET_SECONDS = float(os.environ.get("RUN_BUDGET_SECONDS", "240"))
+# Kept back for the summary and the response
+BUDGET_MARGIN_SECONDS = 10.0
+MIN_CALL_SECONDS = 1.0
+USER_ESTIMATE_SECONDS = 30.0     # until a few users have finished this run
+COMMIT_RESERVE_SECONDS = 5.0     # a GitHub write plus its Supabase bookkeeping
+
+_local = threading.local()
+
+
+class BudgetExceeded(BaseException):
+    """Not enough of the run budget left to start this call (not an Exception, see above)."""
+
+
+class RunBudget:
+    """Deadline for one run plus the observed cost of a user."""
+
+    def __init__(self, seconds=RUN_BUDGET_SECONDS, margin=BUDGET_MARGIN_SECONDS):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.deadline = self.started + max(seconds - margin, 0.0)
+        self._lock = threading.Lock()
+        self._durations = []
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def timeout(self, own):
+        """min(`own`, time left); raises BudgetExceeded when under MIN_CALL_SECONDS is left."""
+        remaining = self.remaining()
+        if remaining < MIN_CALL_SECONDS:
+            raise BudgetExceeded(f"run budget of {self.seconds:.0f}s used up")
+        return min(own, remaining) if own else remaining
+
+    def release_margin(self):
+        """Let the summary and the response use the margin kept back so far."""
+        self.deadline = self.started + self.seconds
+
+    def record_user(self, seconds):
+        with self._lock:
+            self._durations.append(seconds)
+
+    def user_estimate(self):
+        """Slow-end estimate of one user's run time (90th percentile once known)."""
+        with self._lock:
+            durations = sorted(self._durations)
+        if len(durations) < 3:
+            return max(durations + [USER_ESTIMATE_SECONDS])
+        return durations[int(0.9 * (len(durations) - 1))]
+
+    def can_start_user(self):
+        return self.remaining() >= self.user_estimate()
+
+
+_current = None
+
+
+def requested_budget(path=None):
+    """Budget in seconds from ?budget= on `path`, else RUN_BUDGET_SECONDS."""
+    if path:
+        value = parse_qs(urlparse(path).query).get('budget', [None])[0]
+        try:
+            if value and float(value) > 0:
+                return float(value)
+        except ValueError:
+            pass
+    return RUN_BUDGET_SECONDS
+
+
+def start_run(seconds=None):
+    """Begin a budgeted run (one per process at a time)."""
+    global _current
+    _current = RunBudget(seconds or RUN_BUDGET_SECONDS)
+    return _current
+
+
+def end_run():
+    global _current
+    _current = None
+
+
+def current():
+    return _current
+
+
+def call_timeout(own):
+    """Timeout for an external call: `own`, clamped to the current run's time left."""
+    budget = _current
+    if budget is None or getattr(_local, 'committing', 0):
+        return own
+    return budget.timeout(own)
+
+
+@contextmanager
+def committing(reserve=COMMIT_RESERVE_SECONDS):
+    """
+    A GitHub write and its bookkeeping: raises BudgetExceeded up front when
+    less than `reserve` seconds are left, then lets the calls inside finish
+    on their own timeouts.
+    """
+    budget = _current
+    if budget is not None and budget.remaining() < reserve:
+        raise BudgetExceeded(f"less than {reserve:.0f}s of the run budget left for a commit")
+    _local.committing = getattr(_local, 'committing', 0) + 1
+    try:
+        yield
+    finally:
+        _local.committing -= 1
@@ -0,0 +1,320 @@
+"""
+Persistent, tail-able run log for the admin Live Terminal.
+
+A run's log lines used to live only in the `logs` list returned in the cron
+HTTP body. A RunLog also sends every line, as a structured event, to a store
+with a monotonic cursor (`seq`), so the dashboard can follow a run while it
+is going and pick up later with `tail(since=cursor)` without re-reading
+history:
+
+    SupabaseSink   run_logs ring-buffer table (supabase_run_logs.sql): one
+                   append_run_logs RPC per batch, seq from a sequence
+    SegmentSink    append-only JSON-lines segment files (local_bot.py); the
+                   oldest segments are dropped past MAX_SEGMENTS
+
+Emitting only appends to an in-memory buffer: a background thread writes
+batches (every FLUSH_SECONDS or BATCH_SIZE events) and close() writes the
+rest, so the cron hot path never waits on the store. Store errors never
+fail a run - after STORE_ERRORS_BEFORE_OFF failures in a row the log is
+switched off for the run and pending events are dropped.
+
+Tail from a shell:
+    python -m utils.run_log tail --dir run_logs --follow
+"""
+
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from utils.run_budget import call_timeout, BudgetExceeded
+
+RUN_LOG_STORE = os.environ.get("RUN_LOG_STORE", "supabase").lower()     # supabase / off
+RUN_LOG_CAPACITY = int(os.environ.get("RUN_LOG_CAPACITY", "100000"))     # ring slots
+BATCH_SIZE = 100
+FLUSH_SECONDS = 2.0
+MAX_PENDING = 5000              # events buffered while the store is slow; oldest dropped
+STORE_ERRORS_BEFORE_OFF = 3
+CLOSE_TIMEOUT_SECONDS = 10
+TAIL_LIMIT = 500
+
+SEGMENT_BYTES = 1 << 20
+MAX_SEGMENTS = 16
+
+
+def level_for(line):
+    """info / warn / error from the log line's wording (the bot logs plain strings)."""
+    if '❌' in line or line.startswith('Error'):
+        return 'error'
+    if '⚠️' in line or line.startswith('Warning') or 'rejected' in line:
+        return 'warn'
+    return 'info'
+
+
+# === SINKS ===
+
+class SupabaseSink:
+    """run_logs ring-buffer table; seq is assigned by the database."""
+
+    def __init__(self, supabase, capacity=RUN_LOG_CAPACITY):
+        self.supabase = supabase
+        self.capacity = capacity
+
+    def append(self, events):
+        result = self.supabase.rpc('append_run_logs', {'p_events': events, 'p_capacity': self.capacity}).execute()
+        return result.data
+
+    def tail(self, since=0, limit=TAIL_LIMIT):
+        return self.supabase.table("run_logs").select("seq, run_id, source, level, username, message, created_at") \
+            .gt("seq", since).order("seq").limit(limit).execute().data or []
+
+
+class SegmentSink:
+    """
+    Append-only JSON-lines segments named by their first seq
+    (runlog-000000000001.jsonl); a segment is closed at SEGMENT_BYTES and
+    the oldest are deleted past MAX_SEGMENTS.
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, max_segments=MAX_SEGMENTS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.last_seq = self._recover()
+
+    def _segments(self):
+        """[(first seq, path)] oldest first."""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith('runlog-') and name.endswith('.jsonl'):
+                try:
+                    segments.append((int(name[7:-6]), os.path.join(self.directory, name)))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _recover(self):
+        segments = self._segments()
+        if not segments:
+            return 0
+        last_seq = segments[-1][0] - 1
+        with open(segments[-1][1], 'rb') as f:
+            for line in f:
+                try:
+                    last_seq = json.loads(line)['seq']
+                except (ValueError, KeyError):
+                    break       # torn last line from a crash
+        return last_seq
+
+    def append(self, events):
+        with self._lock:
+            segments = self._segments()
+            if segments and os.path.getsize(segments[-1][1]) < self.segment_bytes:
+                path = segments[-1][1]
+            else:
+                path = os.path.join(self.directory, f"runlog-{self.last_seq + 1:012d}.jsonl")
+                segments.append((self.last_seq + 1, path))
+            lines = []
+            for event in events:
+                self.last_seq += 1
+                lines.append(json.dumps(dict(event, seq=self.last_seq), ensure_ascii=False))
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            for _, old in segments[:-self.max_segments]:
+                os.remove(old)
+            return self.last_seq
+
+    def tail(self, since=0, limit=TAIL_LIMIT):
+        segments = self._segments()
+        # Start at the last segment whose first seq is <= since + 1
+        start = 0
+        for index, (first_seq, _) in enumerate(segments):
+            if first_seq <= since + 1:
+                start = index
+        events = []
+        for _, path in segments[start:]:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue
+                        if event['seq'] > since:
+                            events.append(event)
+                            if len(events) >= limit:
+                                return events
+            except FileNotFoundError:
+                continue        # dropped by the ring while reading
+        return events
+
+
+# === WRITER ===
+
+class RunLog:
+    """Buffered, batched writer of one run's log events to a sink."""
+
+    def __init__(self, sink, source='cron', run_id=None, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.sink = sink
+        self.source = source
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.cursor = None          # last seq written
+        self.metrics = {'emitted': 0, 'written': 0, 'batches': 0, 'dropped': 0, 'errors': 0}
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._errors_in_row = 0
+        self._flusher = threading.Thread(target=self._run, name="run-log", daemon=True)
+        self._flusher.start()
+
+    def emit(self, message, username=None, level=None):
+        event = {
+            'run_id': self.run_id, 'source': self.source, 'level': level or level_for(message),
+            'username': username, 'message': message,
+            'at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.append(event)
+            self.metrics['emitted'] += 1
+            if len(self._pending) > MAX_PENDING:
+                self._pending.popleft()
+                self.metrics['dropped'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _take(self):
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popleft())
+        return batch
+
+    def _write(self, batch):
+        try:
+            cursor = self.sink.append(batch)
+        except (Exception, BudgetExceeded) as e:
+            with self._cond:
+                self.metrics['errors'] += 1
+                self._errors_in_row += 1
+                if self._errors_in_row < STORE_ERRORS_BEFORE_OFF:
+                    self._pending.extendleft(reversed(batch))
+                    return False
+                self.metrics['dropped'] += len(batch) + len(self._pending)
+                self._pending.clear()
+                self._closed = True
+            print(f"⚠️ Run log store off for this run: {e}")
+            return False
+        with self._cond:
+            self._errors_in_row = 0
+            self.cursor = cursor
+            self.metrics['written'] += len(batch)
+            self.metrics['batches'] += 1
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._pending) < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_seconds)
+                if self._closed:
+                    return
+                batch = self._take()
+            if batch and not self._write(batch):
+                with self._cond:
+                    if not self._closed:
+                        self._cond.wait(self.flush_seconds)     # back off; close() wakes it
+
+    def close(self, timeout=CLOSE_TIMEOUT_SECONDS):
+        """Stop the flusher and write what is left (bounded by `timeout` and the run budget)."""
+        with self._cond:
+            if self._closed:
+                return self.cursor
+            self._closed = True
+            self._cond.notify()
+        try:
+            timeout = call_timeout(timeout)
+        except BudgetExceeded:
+            timeout = 0     # the run is out of time: what's pending is dropped
+        deadline = time.monotonic() + timeout
+        self._flusher.join(max(deadline - time.monotonic(), 0))
+        while time.monotonic() < deadline:
+            with self._cond:
+                batch = self._take()
+            if not batch or not self._write(batch):
+                break
+        with self._cond:
+            self.metrics['dropped'] += len(self._pending)
+            self._pending.clear()
+        return self.cursor
+
+    def summary(self):
+        m = self.metrics
+        return (f"Run log: {m['written']}/{m['emitted']} lines stored in {m['batches']} batches"
+                f" (cursor {self.cursor}), {m['dropped']} dropped, {m['errors']} store errors")
+
+
+class LogLines(list):
+    """The run's `logs` list; every line added is also emitted to a RunLog."""
+
+    def __init__(self, run_log):
+        super().__init__()
+        self.run_log = run_log
+
+    def append(self, line):
+        super().append(line)
+        if self.run_log:
+            self.run_log.emit(line)
+
+    def extend(self, lines, username=None):
+        lines = list(lines)
+        super().extend(lines)
+        if self.run_log:
+            for line in lines:
+                self.run_log.emit(line, username)
+
+
+def open_run_log(supabase, source='cron'):
+    """RunLog on the configured store (RUN_LOG_STORE), or None when it is off."""
+    if RUN_LOG_STORE == 'off':
+        return None
+    return RunLog(SupabaseSink(supabase), source)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run log store tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tail_cmd = sub.add_parser("tail", help="Print events after a cursor")
+    tail_cmd.add_argument("--dir", help="Segment directory (local_bot.py); default: Supabase run_logs")
+    tail_cmd.add_argument("--since", type=int, default=0)
+    tail_cmd.add_argument("--follow", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.dir:
+        sink = SegmentSink(args.dir)
+    else:
+        from api.cron import create_supabase_client
+        sink = SupabaseSink(create_supabase_client())
+
+    cursor = args.since
+    while True:
+        events = sink.tail(cursor)
+        for event in events:
+            print(f"{event['seq']:>8} [{event['source']}] {event['message']}")
+            cursor = event['seq']
+        if not args.follow:
+            return
+        if len(events) < TAIL_LIMIT:
+            time.sleep(FLUSH_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
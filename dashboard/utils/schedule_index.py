@@ -0,0 +1,199 @@
+"""
+Schedule index for commit_time gating.
+
+Users are bucketed into a timing wheel with one slot per IST minute of the
+day, so a cron tick only touches the users whose slot has come up instead of
+re-parsing every user's commit_time and logging the "too early" ones.
+The index is kept up to date incrementally from each row's updated_at.
+
+Users without a commit_time can optionally be spread over their day (a
+stable slot derived from their id, ending before their custom deadline)
+so they don't all fire on the same tick.
+"""
+
+import hashlib
+
+MINUTES_PER_DAY = 24 * 60
+
+# Default deadline (matches user_settings.custom_deadline_hour/minute defaults)
+DEFAULT_DEADLINE_HOUR = 23
+DEFAULT_DEADLINE_MINUTE = 45
+
+# Spread slots end this many minutes before the deadline so a late tick still
+# catches them
+SPREAD_MARGIN_MINUTES = 30
+
+
+def parse_commit_time(commit_time_str):
+    """
+    Parse a commit_time value ("HH:MM" or "HH:MM:SS") into a minute of the day.
+    Seconds are ignored. Raises ValueError/IndexError on malformed input.
+    """
+    time_parts = commit_time_str.split(':')
+    target_hour = int(time_parts[0])
+    target_minute = int(time_parts[1]) if len(time_parts) > 1 else 0
+    if not (0 <= target_hour < 24 and 0 <= target_minute < 60):
+        raise ValueError(f"time out of range: {commit_time_str}")
+    return target_hour * 60 + target_minute
+
+
+def deadline_minute(user):
+    """A user's custom deadline as a minute of the day."""
+    hour = user.get('custom_deadline_hour')
+    minute = user.get('custom_deadline_minute')
+    hour = DEFAULT_DEADLINE_HOUR if hour is None else hour
+    minute = DEFAULT_DEADLINE_MINUTE if minute is None else minute
+    return min(max(int(hour) * 60 + int(minute), 0), MINUTES_PER_DAY - 1)
+
+
+def spread_slot(user_id, deadline=None):
+    """
+    Stable slot for a user without a commit_time: a hash of the id mapped
+    onto [00:00, deadline - SPREAD_MARGIN_MINUTES].
+    """
+    if deadline is None:
+        deadline = DEFAULT_DEADLINE_HOUR * 60 + DEFAULT_DEADLINE_MINUTE
+    window_end = max(deadline - SPREAD_MARGIN_MINUTES, 0)
+    digest = hashlib.md5(str(user_id).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % (window_end + 1)
+
+
+def minute_of_day(now):
+    """Minute of the day (0-1439) for a datetime."""
+    return now.hour * 60 + now.minute
+
+
+class ScheduleIndex:
+    """
+    Timing wheel of user ids keyed by their commit_time minute.
+
+    Users without a commit_time live in a separate "anytime" bucket and are
+    due on every tick, unless `spread_anytime` is set, in which case they get
+    a stable spread_slot() before their deadline. Users with an unparseable
+    commit_time are kept in `invalid` (id -> error message) so callers can
+    report them.
+    """
+
+    def __init__(self, spread_anytime=False):
+        self.spread_anytime = spread_anytime
+        self._wheel = [set() for _ in range(MINUTES_PER_DAY)]
+        self._anytime = set()
+        self._slot_of = {}      # user_id -> slot (None for anytime)
+        self._stamp = {}        # user_id -> (updated_at, commit_time) last indexed
+        self.invalid = {}       # user_id -> error message
+        self._day = None        # date the cursor belongs to
+        self._cursor = -1       # last minute swept by advance()
+        self._late = set()      # placed behind the cursor since the last advance()
+
+    def __len__(self):
+        return len(self._slot_of) + len(self.invalid)
+
+    def __contains__(self, user_id):
+        return user_id in self._slot_of or user_id in self.invalid
+
+    def slot_of(self, user_id):
+        """Minute of the day the user is due at (None = anytime)."""
+        return self._slot_of.get(user_id)
+
+    def _place(self, user_id, slot):
+        self._slot_of[user_id] = slot
+        if self._day is not None and (slot is None or slot <= self._cursor):
+            # Already swept past today - hand it to the next advance()
+            self._late.add(user_id)
+        if slot is None:
+            self._anytime.add(user_id)
+        else:
+            self._wheel[slot].add(user_id)
+
+    def remove(self, user_id):
+        """Drop a user from the index (no-op if absent)."""
+        self._stamp.pop(user_id, None)
+        self.invalid.pop(user_id, None)
+        self._late.discard(user_id)
+        if user_id not in self._slot_of:
+            return
+        slot = self._slot_of.pop(user_id)
+        if slot is None:
+            self._anytime.discard(user_id)
+        else:
+            self._wheel[slot].discard(user_id)
+
+    def upsert(self, user_id, commit_time_str, updated_at=None, deadline=None):
+        """
+        Index (or re-index) one user. Returns True if the user's slot was
+        (re)computed, False if the row is unchanged since the last upsert.
+        `deadline` (minute of the day) bounds the spread slot.
+        """
+        stamp = (updated_at, commit_time_str, deadline)
+        if updated_at is not None and self._stamp.get(user_id) == stamp:
+            return False
+
+        self.remove(user_id)
+        self._stamp[user_id] = stamp
+
+        if not commit_time_str:
+            self._place(user_id, spread_slot(user_id, deadline) if self.spread_anytime else None)
+            return True
+
+        try:
+            self._place(user_id, parse_commit_time(commit_time_str))
+        except (ValueError, IndexError) as e:
+            self.invalid[user_id] = f"Invalid time format {commit_time_str} - {e}"
+        return True
+
+    def sync(self, users, prune=True):
+        """
+        Bring the index in line with a list of user_settings rows.
+        Only rows whose updated_at/commit_time changed are re-parsed; ids no
+        longer present are removed unless `prune` is False (a page of a
+        streamed read, see retain()). Returns the number of rows re-indexed.
+        """
+        seen = set()
+        changed = 0
+        for user in users:
+            seen.add(user['id'])
+            if self.upsert(user['id'], user.get('commit_time'), user.get('updated_at'),
+                           deadline_minute(user)):
+                changed += 1
+        if prune:
+            self.retain(seen)
+        return changed
+
+    def retain(self, user_ids):
+        """Remove every user not in `user_ids` (after syncing all pages of a read)."""
+        for user_id in [uid for uid in self._stamp if uid not in user_ids]:
+            self.remove(user_id)
+
+    def is_due(self, user_id, minute):
+        """Whether a valid indexed user is due at or before `minute` today (anytime users always are)."""
+        if user_id not in self._slot_of:
+            return False
+        slot = self._slot_of[user_id]
+        return slot is None or slot <= minute
+
+    def due_through(self, minute):
+        """All users due at or before `minute` today, plus the anytime bucket."""
+        due = set(self._anytime)
+        for slot in range(min(minute, MINUTES_PER_DAY - 1) + 1):
+            if self._wheel[slot]:
+                due.update(self._wheel[slot])
+        return due
+
+    def advance(self, day, minute):
+        """
+        Sweep the wheel from the last position up to `minute` and return the
+        user ids whose slot was passed. A new `day` restarts the sweep from
+        midnight. Anytime users are returned on the first sweep of each day,
+        and users (re)indexed behind the cursor on the next sweep.
+        """
+        due = self._late
+        self._late = set()
+        if day != self._day:
+            self._day = day
+            self._cursor = -1
+            due = set(self._anytime)
+        for slot in range(self._cursor + 1, min(minute, MINUTES_PER_DAY - 1) + 1):
+            if self._wheel[slot]:
+                due.update(self._wheel[slot])
+        self._cursor = max(self._cursor, minute)
+        return due
@@ -0,0 +1,117 @@
+"""
+Streaming, keyset-paginated reads of user_settings.
+
+Instead of one select("*") holding every active user in a single response
+(and in memory) before any work starts, user_pages() walks the table by id
+(`id > last id ORDER BY id LIMIT n`, which stays an index range scan however
+deep it goes) and prefetched() fetches the next page on a background thread
+while the current one is processed. The queue between them is bounded, so a
+slow consumer stops the fetching (backpressure) and memory stays at a few
+pages; the first users are processed as soon as the first page arrives.
+
+With `due_before` ("HH:MM") only users whose commit_time has come up are
+read: PostgREST filters on the zero-padded text, and rows without a
+commit_time or not in HH:MM form are always read, so the schedule index
+(utils/schedule_index.py) still gates and reports them.
+
+bounded() applies the same idea to a thread pool: at most `limit` items are
+submitted at a time and results come back in submission order.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+
+USER_PAGE_SIZE = int(os.environ.get("USER_PAGE_SIZE", "500"))
+PREFETCH_PAGES = 2
+_DONE = object()
+
+
+def due_filter(due_before):
+    """PostgREST or= filter: commit_time before `due_before`, unset, or not zero-padded HH:MM."""
+    return f"commit_time.is.null,commit_time.lt.{due_before},commit_time.not.match.^[0-9][0-9]:[0-9][0-9]"
+
+
+def user_pages(supabase, page_size=USER_PAGE_SIZE, columns="*", active_only=True, due_before=None):
+    """Yield user_settings rows in pages of up to `page_size`, ordered by id."""
+    last_id = None
+    while True:
+        query = supabase.table("user_settings").select(columns)
+        if active_only:
+            query = query.eq("pause_bot", False)
+        if due_before:
+            # The pinned postgrest client has no or_()
+            query.params = query.params.add("or", f"({due_filter(due_before)})")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.order("id").limit(page_size).execute().data or []
+        if page:
+            last_id = page[-1]['id']
+            yield page
+        if len(page) < page_size:
+            return
+
+
+def prefetched(iterable, depth=PREFETCH_PAGES):
+    """
+    Iterate `iterable` on a background thread, at most `depth` items ahead of
+    the consumer. Errors are re-raised in the consumer; closing the generator
+    stops the producer.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="user-pages", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def stream_users(supabase, page_size=USER_PAGE_SIZE, columns="*", active_only=True, due_before=None):
+    """Pages of active users, the next one fetched while the current one is used."""
+    return prefetched(user_pages(supabase, page_size, columns, active_only, due_before))
+
+
+def bounded(pool, fn, items, limit):
+    """
+    Submit fn(*item) for each item to `pool` with at most `limit` in flight.
+    Yields (item, future) in submission order once each future is done.
+    """
+    pending = deque()
+    for item in items:
+        pending.append((item, pool.submit(fn, *item)))
+        while len(pending) >= limit or (pending and pending[0][1].done()):
+            head, future = pending.popleft()
+            future.exception()      # wait for it without raising
+            yield head, future
+    while pending:
+        head, future = pending.popleft()
+        future.exception()
+        yield head, future